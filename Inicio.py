@@ -1,27 +1,8 @@
 import streamlit as st
-from utils import auth
+from utils import page
 
-st.set_page_config(
-    page_title="Dashboard Pricing",
-    page_icon="https://chiper.cl/wp-content/uploads/2023/06/cropped-favicon-192x192.png",
-    layout="wide",
-initial_sidebar_state="expanded"
-)
-
-try:
-    token = auth.ensure_authenticated(show_controls_in_sidebar=True)
-except ValueError:
-    st.stop()  # el usuario no se autenticó; detenemos la app
-
-st.sidebar.markdown(
-    """
-    <div style="text-align:center; margin-bottom:20px;">
-        <a href="https://yourwebsite.com" target="_blank">
-            <img src="https://chiper.cl/wp-content/uploads/2023/09/logo-chiper-1.svg" width="120">
-        </a>
-    </div>
-    """,
-    unsafe_allow_html=True
+token = page.setup(
+    "Dashboard Pricing", script=__file__, page_icon=page.FAVICON_URL, initial_sidebar_state="expanded",
 )
 
 st.markdown(
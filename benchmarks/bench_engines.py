@@ -0,0 +1,97 @@
+"""
+Motores de ``utils.report_engine`` sobre una tabla de hechos Parquet: tiempo y consistencia.
+
+Escribe una tabla de hechos sintética (particionada por Período con ``--partitioned``), corre
+las mismas agregaciones con cada motor instalado y compara las celdas contra el cubo en
+memoria (``AggregateCube.from_facts``). Sale con código 1 si algún motor difiere.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_engines --rows 1000000
+    python -m benchmarks.bench_engines --rows 100000 --engines arrow pandas --partitioned
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils.report_cube import MEASURE_COLUMNS, AggregateCube
+from utils.report_engine import ENGINES, available_engines
+from utils.synthetic import make_fact_table
+
+QUERIES = [
+    (["Macro", "Categoría"], {"Período": ["P01"]}),
+    (["Marca"], {"Período": ["P01"]}),
+    (["Período", "Macro"], None),
+    (["Marca"], {"Período": ["P02", "P03"], "Macro": ["abarrotes", "galletas"]}),
+]
+
+
+def write_facts(facts: pd.DataFrame, folder: str, partitioned: bool) -> str:
+    if partitioned:
+        facts.to_parquet(folder, partition_cols=["Período"], index=False)
+        return folder
+    path = os.path.join(folder, "hechos.parquet")
+    facts.to_parquet(path, index=False, row_group_size=100_000)
+    return path
+
+
+def reference(facts: pd.DataFrame, by: Sequence[str], where) -> pd.DataFrame:
+    df = facts
+    for col, values in (where or {}).items():
+        df = df[df[col].astype(str).isin(values)]
+    cells = AggregateCube.from_facts(df, by).cells
+    out = cells.assign(**{c: cells[c].astype(str) for c in by})
+    return out.sort_values(list(by), ignore_index=True)
+
+
+def same_cells(a: pd.DataFrame, b: pd.DataFrame, by: Sequence[str]) -> bool:
+    if len(a) != len(b):
+        return False
+    if any((a[c].astype(str).to_numpy() != b[c].astype(str).to_numpy()).any() for c in by):
+        return False
+    return np.allclose(a[MEASURE_COLUMNS].to_numpy(), b[MEASURE_COLUMNS].to_numpy(), rtol=1e-9, atol=1e-6)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--engines", nargs="+", default=None, help=f"default: instalados de {', '.join(ENGINES)}")
+    ap.add_argument("--partitioned", action="store_true", help="dataset particionado por Período (Hive)")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    engines: List[str] = args.engines or available_engines()
+    facts = make_fact_table(args.rows)
+    folder = tempfile.mkdtemp(prefix="bench_engines_")
+    failures = 0
+    try:
+        source = write_facts(facts, folder, args.partitioned)
+        refs = [reference(facts, by, where) for by, where in QUERIES]
+        print(f"{'engine':>8} {'query':>28} {'ms':>10} {'cells':>8} ok")
+        for name in engines:
+            engine = ENGINES[name]()
+            for (by, where), ref in zip(QUERIES, refs):
+                times = []
+                for _ in range(args.repeat):
+                    t0 = time.perf_counter()
+                    cells = engine.aggregate(source, by, where)
+                    times.append(time.perf_counter() - t0)
+                ok = same_cells(cells, ref, by)
+                failures += not ok
+                label = "/".join(by) + (" | " + ",".join(where) if where else "")
+                print(f"{name:>8} {label:>28} {1000 * min(times):>10.1f} {len(cells):>8,} {'sí' if ok else 'NO'}")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
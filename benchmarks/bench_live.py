@@ -0,0 +1,92 @@
+"""
+Modo en vivo del dashboard contra el feed simulado: costo por tick, backpressure y consistencia.
+
+Simula ``--ticks`` ticks del panel en vivo con un reloj controlado (sin esperar): cada tick
+avanza el reloj ``--interval`` segundos, trae los puntos nuevos (``LiveView.pull``), lee los KPIs
+y arma lo que iría al gráfico (``LiveView.chart_frame``: la historia reducida al ancho del
+gráfico, que se redibuja en cada tick). ``sent`` es el promedio de filas mandadas al navegador por tick. ``kpi ms`` (traer + KPIs incrementales) se
+compara con ``full ms``: recalcular los KPIs sobre la historia retenida con pandas en cada tick.
+``p50``/``p95`` son por tick completo (KPIs + gráfico).
+
+Verifica en cada tick que la historia no pase de ``--cap``, que ningún lote pase de
+``--max-batch``, que recibidos + descartados = puntos producidos, y que el último valor de los
+KPIs sea el último del feed. Sale con código 1 si algo falla.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_live
+    python -m benchmarks.bench_live --rates 20 2000 20000 --interval 0.5 --cap 10000
+"""
+
+from __future__ import annotations
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from utils.kpi_engine import KPIEngine, abs_diff_name
+from utils.live_feed import LiveView, SimulatedFeed
+
+COLUMNS = ["serie_a", "serie_b"]
+
+
+def run(rate: float, args: argparse.Namespace) -> bool:
+    now = [0.0]
+    feed = SimulatedFeed(COLUMNS, rate=rate, clock=lambda: now[0])
+    kpis = KPIEngine(COLUMNS, window=30, period=30, abs_diff=[tuple(COLUMNS)])
+    view = LiveView(feed, args.cap, kpis=kpis)
+    kpi_ms, chart_ms, full_ms, sizes, sent = [], [], [], [], []
+    ok = True
+    for _ in range(args.ticks):
+        now[0] += args.interval
+        t0 = time.perf_counter()
+        batch = view.pull(args.max_batch)
+        snap = view.kpis.snapshot()
+        kpi_ms.append(1000 * (time.perf_counter() - t0))
+        t0 = time.perf_counter()
+        rows = view.chart_frame(method="minmax")
+        chart_ms.append(1000 * (time.perf_counter() - t0))
+        sent.append(len(rows))
+
+        # Referencia: KPIs recalculados sobre toda la historia en cada tick.
+        hist = view.history()
+        t0 = time.perf_counter()
+        diff = (hist["serie_a"] - hist["serie_b"]).abs()
+        ref = (hist["serie_a"].iloc[-1], diff.mean(), diff.tail(30).mean())
+        full_ms.append(1000 * (time.perf_counter() - t0))
+
+        sizes.append(len(batch.frame))
+        ok &= len(hist) <= args.cap and len(batch.frame) <= args.max_batch
+        ok &= view.received + view.dropped == feed.produced
+        ok &= bool(np.isclose(snap["serie_a"]["last"], ref[0]))
+        if not view.dropped:
+            d = snap[abs_diff_name(*COLUMNS)]
+            ok &= bool(np.isclose(d["rolling_mean"], ref[2]))
+    p50, p95 = np.percentile(np.add(kpi_ms, chart_ms), [50, 95])
+    print(
+        f"{rate:>8,.0f} {np.mean(sizes):>10,.0f} {np.median(kpi_ms):>8.2f} {np.median(full_ms):>9.2f} "
+        f"{np.median(chart_ms):>9.2f} {np.mean(sent):>8,.0f} {p50:>8.2f} {p95:>8.2f} "
+        f"{view.dropped:>10,} {len(view.history()):>8,} {'sí' if ok else 'NO'}"
+    )
+    return ok
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rates", type=float, nargs="+", default=[20, 2_000, 20_000], help="puntos por segundo")
+    ap.add_argument("--interval", type=float, default=1.0, help="segundos entre ticks")
+    ap.add_argument("--cap", type=int, default=10_000, help="historia máxima por sesión")
+    ap.add_argument("--max-batch", type=int, default=2_000, help="puntos por tick antes de descartar")
+    ap.add_argument("--ticks", type=int, default=200)
+    args = ap.parse_args()
+
+    print(
+        f"{'pts/s':>8} {'pts/tick':>10} {'kpi ms':>8} {'full ms':>9} {'chart ms':>9} "
+        f"{'sent':>8} {'p50 ms':>8} {'p95 ms':>8} {'dropped':>10} {'hist':>8} ok"
+    )
+    failures = sum(not run(rate, args) for rate in args.rates)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
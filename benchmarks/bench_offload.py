@@ -0,0 +1,95 @@
+"""
+Cuánto frena una etapa pesada a las demás sesiones: en el hilo de la sesión vs en el pool.
+
+Mientras un hilo corre la etapa pesada (el reporte sintético a escala o la descarga CSV de
+una tabla grande), otro hilo hace de "sesión vecina": cada pocos ms corre un rerun chico
+(filtro + total del reporte sobre una tabla de demo) y mide cuánto tarda. En el hilo de la
+sesión, la etapa pesada toma el GIL y los reruns vecinos esperan; en el pool
+(``utils.offload``) el hilo solo espera el resultado.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_offload --rows 500000 2000000 --workers 2
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from utils import offload
+from utils.report_cube import AggregateCube
+from utils.report_view import ReportView
+from utils.synthetic import make_report_table
+
+LABEL = "Macro / Categoría"
+DIMS = ["Macro", "Categoría", "Marca"]
+
+
+def _neighbor(stop: threading.Event, latencies: List[float], pause_s: float) -> None:
+    base = make_report_table(2_000)
+    cube = AggregateCube.from_facts(base, [LABEL])
+    mask = np.random.default_rng(1).random(len(base)) < 0.5
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        ReportView(base, cube, mask, normalize=True).materialize()
+        latencies.append((time.perf_counter() - t0) * 1000)
+        time.sleep(pause_s)
+
+
+def run(stage: Callable[[], object], pause_s: float) -> Dict[str, float]:
+    latencies: List[float] = []
+    stop = threading.Event()
+    neighbor = threading.Thread(target=_neighbor, args=(stop, latencies, pause_s), daemon=True)
+    neighbor.start()
+    time.sleep(0.2)  # que la vecina arranque antes de la etapa
+    latencies.clear()
+    t0 = time.perf_counter()
+    stage()
+    wall = time.perf_counter() - t0
+    stop.set()
+    neighbor.join()
+    lat = np.asarray(latencies or [0.0])
+    return {"wall_s": wall, "ticks": len(latencies), "p50": float(np.percentile(lat, 50)),
+            "p95": float(np.percentile(lat, 95)), "max": float(lat.max())}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, nargs="+", default=[500_000, 2_000_000], help="filas de la tabla de hechos")
+    ap.add_argument("--workers", type=int, default=2, help="procesos del pool")
+    ap.add_argument("--pause-ms", type=float, default=5.0, help="pausa entre reruns de la sesión vecina")
+    args = ap.parse_args()
+
+    offload.OFFLOAD_WORKERS = args.workers
+    offload.OFFLOAD_MIN_ROWS = 0
+    # Procesos ya levantados: se mide la etapa, no el arranque del pool.
+    offload.synthetic_cells(1_000, 0, DIMS)
+
+    tmp = tempfile.mkdtemp(prefix="bench_offload_")
+    print(f"{'rows':>10} {'etapa':>10} {'modo':>7} {'total s':>8} {'reruns':>7} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for n in args.rows:
+        big = pd.concat([make_report_table(50_000)] * max(1, n // 50_000), ignore_index=True)
+        stages = {
+            "reporte": lambda: offload.synthetic_cells(n, 1, DIMS),
+            "csv": lambda: offload.write_export(big, "csv", os.path.join(tmp, "t.csv"), 100_000),
+        }
+        for name, stage in stages.items():
+            for mode, workers in (("sesión", 0), ("pool", args.workers)):
+                offload.OFFLOAD_WORKERS = workers
+                r = run(stage, args.pause_ms / 1000)
+                print(f"{n:>10,} {name:>10} {mode:>7} {r['wall_s']:>8.2f} {r['ticks']:>7} "
+                      f"{r['p50']:>8.1f} {r['p95']:>8.1f} {r['max']:>8.1f}")
+    offload.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Latencia y memoria pico por rerun del pipeline filtro → total → normalizar del reporte.
+
+Compara el pipeline anterior (copias + concat + sort + filtrar 'Grand Total' por texto)
+con ``ReportView`` (máscara + totales del cubo, una sola materialización).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_pipeline --rows 10000 100000 1000000
+"""
+
+from __future__ import annotations
+import argparse
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from utils.report_cube import AggregateCube
+from utils.report_view import ReportView
+from utils.synthetic import make_report_table
+
+LABEL = "Macro / Categoría"
+
+
+# ---------- Pipeline anterior (pages/4_ReportePlantilla.py antes del cambio) ----------
+def _legacy_total(df: pd.DataFrame) -> pd.DataFrame:
+    total = pd.DataFrame({
+        LABEL: ["Grand Total"],
+        "PV": [df["PV"].sum()],
+        "CENTRAL 1": [df["CENTRAL 1"].mean()],
+        "ALVI 1": [df["ALVI 1"].mean()],
+        "VENTA NETA": [df["VENTA NETA"].sum()],
+        "MARGEN": [df["MARGEN"].mean()],
+    })
+    return pd.concat([df, total], ignore_index=True)
+
+
+def legacy_rerun(base: pd.DataFrame, mask: np.ndarray) -> pd.DataFrame:
+    df = base.loc[mask].copy()
+    df = _legacy_total(df)
+    df_no_total = df[df[LABEL] != "Grand Total"].copy()
+    s = df_no_total["PV"].sum()
+    if s > 0:
+        df_no_total["PV"] = df_no_total["PV"] / s
+    df_no_total = df_no_total.sort_values("PV", ascending=False, ignore_index=True)
+    df = _legacy_total(df_no_total)
+    return df.copy()
+
+
+def view_rerun(base: pd.DataFrame, cube: AggregateCube, mask: np.ndarray) -> pd.DataFrame:
+    return ReportView(base, cube, mask, normalize=True).materialize()
+
+
+# ---------- Medición ----------
+def measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    times: List[float] = []
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {"ms": 1000 * float(np.median(times)), "peak_mb": peak / 2**20}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--selectivity", type=float, default=0.5, help="fracción de filas que pasa el filtro")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"{'rows':>10} {'pipeline':>8} {'ms':>10} {'peak MB':>10}")
+    for n in args.rows:
+        base = make_report_table(n)
+        cube = AggregateCube.from_facts(base, [LABEL])
+        mask = np.random.default_rng(1).random(n) < args.selectivity
+        for name, fn in (
+            ("legacy", lambda: legacy_rerun(base, mask)),
+            ("view", lambda: view_rerun(base, cube, mask)),
+        ):
+            r = measure(fn, args.repeat)
+            print(f"{n:>10,} {name:>8} {r['ms']:>10.1f} {r['peak_mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Costo de reproducir respuestas grabadas (``API_FIXTURES=replay``) frente a la API en vivo.
+
+1. ``record``: corre ``--requests`` requests (listados con distintos parámetros, detalles por
+   SKU y tablas del reporte) contra la API de prueba (``benchmarks.stub_api``) con
+   ``--latency-ms`` de latencia, grabándolos en un almacén temporal.
+2. ``replay`` a velocidad 0 (sin esperas): la misma carga sin red. El tiempo por request es el
+   overhead del modo (clave + índice en memoria + lectura de la fila + armar la respuesta).
+3. ``replay`` a velocidad 1: debería tardar lo mismo que la corrida en vivo.
+
+Verifica además que cada cuerpo reproducido sea idéntico al grabado.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_replay --requests 5000 --latency-ms 5
+"""
+
+from __future__ import annotations
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.stub_api import StubAPI
+from utils import api_client, api_fixtures
+from utils.report_data import PERIODOS
+
+
+def workload(n: int, rows: int) -> List[Tuple[str, Dict[str, object]]]:
+    calls: List[Tuple[str, Dict[str, object]]] = []
+    for i in range(n):
+        kind = i % 4
+        if kind == 0:
+            calls.append(("/catalogo/skus", {"limit": 50, "offset": (i * 7) % rows, "orden": "nombre"}))
+        elif kind == 1:
+            calls.append((f"/catalogo/skus/78{(i % rows) + 1:011d}", {}))
+        elif kind == 2:
+            calls.append(("/catalogo/proveedores", {"limit": 10, "offset": i % 40, "q": str(i % 10)}))
+        else:
+            table = ("ponderado", "marcas", "detalle")[i % 3]
+            calls.append((f"/reportes/posicionamiento/{table}", {"periodo": PERIODOS[i % len(PERIODOS)]}))
+    return calls
+
+
+def run(calls: List[Tuple[str, Dict[str, object]]]) -> Tuple[float, List[str]]:
+    digests = []
+    t0 = time.perf_counter()
+    for path, params in calls:
+        r = api_client.get(path, params=params, retries=0)
+        digests.append(hashlib.sha1(r.content).hexdigest())
+    return time.perf_counter() - t0, digests
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=5_000)
+    ap.add_argument("--rows", type=int, default=2_000, help="SKUs de la API de prueba")
+    ap.add_argument("--latency-ms", type=float, default=5.0, help="latencia de la API de prueba")
+    args = ap.parse_args()
+
+    calls = workload(args.requests, args.rows)
+    with tempfile.TemporaryDirectory(prefix="bench_replay_") as tmp, \
+            StubAPI(args.rows, latency_ms=args.latency_ms) as stub:
+        api_client.API_BASE_URL = stub.url
+        api_client.set_token("bench")
+        api_fixtures.API_FIXTURES_PATH = os.path.join(tmp, "fixtures.sqlite3")
+
+        api_fixtures.API_FIXTURES = "record"
+        live_s, live = run(calls)
+        store = api_fixtures.get_store()
+        st_ = store.stats()
+        size_mb = os.path.getsize(api_fixtures.API_FIXTURES_PATH) / 2**20
+        print(f"grabado: {st_['responses']:,} respuestas, {st_['keys']:,} claves, {size_mb:,.1f} MB")
+
+        api_fixtures.API_FIXTURES = "replay"
+        stub.stop()  # sin red: un request sin fixture fallaría
+        print(f"{'modo':>16} {'total s':>9} {'µs/request':>11} {'iguales':>8}")
+        print(f"{'en vivo':>16} {live_s:>9.2f} {live_s / len(calls) * 1e6:>11.0f} {'-':>8}")
+        for speed in (0.0, 1.0):
+            api_fixtures.API_REPLAY_SPEED = speed
+            replay_s, replayed = run(calls)
+            same = sum(a == b for a, b in zip(live, replayed))
+            print(f"{f'replay x{speed:g}':>16} {replay_s:>9.2f} {replay_s / len(calls) * 1e6:>11.0f} "
+                  f"{same:>8,}")
+        st_ = store.stats()
+        print(f"aciertos {st_['hits']:,} · sin fixture {st_['misses']:,}")
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
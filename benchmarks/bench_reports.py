@@ -0,0 +1,150 @@
+"""
+Benchmark de las computaciones de los reportes de posicionamiento por etapa, de 10³ a 10⁷ filas.
+
+Etapas sobre la tabla de hechos (N filas Período × Macro × Categoría × Marca):
+    generate, cube, rollup
+Etapas sobre una tabla del reporte de N etiquetas (como la de marcas, a escala):
+    table, index, filter, totals, materialize, style, csv
+
+Para cada etapa informa tiempo y memoria pico. El tiempo se mide en una corrida sin
+tracemalloc (su overhead multiplica los tiempos de código Python); la memoria pico, en una
+segunda corrida con tracemalloc hasta ``--max-memory-rows``, sobre objetos nuevos cuando la
+etapa memoiza (``rollup``, ``materialize``): si no, la segunda corrida sale del cache. ``index`` y ``style`` se saltan
+por sobre ``--max-index-rows`` / ``--max-style-rows`` (costo fuera de escala para una
+página); en ese caso ``filter`` usa ``str.contains``.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_reports                       # 10³ .. 10⁷
+    python -m benchmarks.bench_reports --sizes 3 4 5 --json bench.json
+    python -m benchmarks.bench_reports --sizes 3 4 5 --compare bench.json
+
+Con ``--compare`` sale con código 1 si alguna etapa tarda más de ``--tolerance`` veces
+lo registrado en el JSON de referencia.
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from utils.report_cube import AggregateCube
+from utils.report_style import style_report
+from utils.report_view import LABEL_COLUMN, ReportView
+from utils.search_index import SearchIndex
+from utils.synthetic import make_fact_table, make_report_table
+
+FACT_DIMS = ["Período", "Macro", "Categoría", "Marca"]
+
+
+class Runner:
+    def __init__(self, max_memory_rows: int = 1_000_000):
+        self.max_memory_rows = max_memory_rows
+        self.results: List[Dict[str, object]] = []
+
+    def stage(self, rows: int, name: str, fn: Callable[[], object],
+              fresh: Optional[Callable[[], Callable[[], object]]] = None) -> object:
+        """``fresh()`` arma (fuera de tracemalloc) una ``fn`` equivalente sin nada memoizado."""
+        t0 = time.perf_counter()
+        out = fn()
+        seconds = time.perf_counter() - t0
+        peak_mb = None
+        if rows <= self.max_memory_rows:
+            again = fresh() if fresh is not None else fn
+            tracemalloc.start()
+            again()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+        self._record(rows, name, seconds, peak_mb)
+        return out
+
+    def skip(self, rows: int, name: str) -> None:
+        self._record(rows, name, None, None)
+
+    def _record(self, rows: int, name: str, seconds: Optional[float], peak_mb: Optional[float]) -> None:
+        self.results.append({"rows": rows, "stage": name, "seconds": seconds, "peak_mb": peak_mb})
+        ms = "skip" if seconds is None else f"{seconds * 1000:.1f}"
+        mb = "-" if peak_mb is None else f"{peak_mb:.1f}"
+        print(f"{rows:>12,} {name:>12} {ms:>10} {mb:>10}", flush=True)
+
+
+def run_size(r: Runner, n: int, args: argparse.Namespace) -> None:
+    # ---------- Tabla de hechos ----------
+    facts = r.stage(n, "generate", lambda: make_fact_table(n, seed=args.seed))
+    cube = r.stage(n, "cube", lambda: AggregateCube.from_facts(facts, FACT_DIMS))
+    r.stage(n, "rollup", lambda: cube.rollup(["Marca"], weighted=True),
+            fresh=lambda: partial(AggregateCube(cube.cells, FACT_DIMS).rollup, ["Marca"], weighted=True))
+    del facts, cube
+
+    # ---------- Tabla del reporte ----------
+    table = r.stage(n, "table", lambda: make_report_table(n, seed=args.seed))
+    table_cube = AggregateCube.from_facts(table, [LABEL_COLUMN])
+    if n <= args.max_index_rows:
+        index = r.stage(n, "index", lambda: SearchIndex(table, [LABEL_COLUMN]))
+        mask = r.stage(n, "filter", lambda: index.mask(args.term))
+    else:
+        r.skip(n, "index")
+        mask = r.stage(n, "filter", lambda: table[LABEL_COLUMN].str.contains(args.term, case=False).to_numpy())
+    view = r.stage(n, "totals", lambda: ReportView(table, table_cube, mask, normalize=True))
+    frame = r.stage(n, "materialize", view.materialize,
+                    fresh=lambda: ReportView(table, table_cube, mask, normalize=True).materialize)
+    if len(frame) <= args.max_style_rows:
+        r.stage(n, "style", lambda: style_report(frame).to_html())
+    else:
+        r.skip(n, "style")
+    r.stage(n, "csv", lambda: frame.to_csv(index=False).encode("utf-8"))
+
+
+def compare(results: List[Dict[str, object]], baseline_path: str, tolerance: float) -> int:
+    with open(baseline_path, encoding="utf-8") as fh:
+        base = {(b["rows"], b["stage"]): b for b in json.load(fh)["results"]}
+    regressions = 0
+    print(f"\nComparación contra {baseline_path} (tolerancia x{tolerance:.2f})")
+    for cur in results:
+        ref = base.get((cur["rows"], cur["stage"]))
+        if not ref or cur["seconds"] is None or not ref["seconds"]:
+            continue
+        ratio = cur["seconds"] / ref["seconds"]
+        flag = "REGRESIÓN" if ratio > tolerance else ""
+        regressions += bool(flag)
+        print(f"{cur['rows']:>12,} {cur['stage']:>12} x{ratio:>6.2f} {flag}")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[3, 4, 5, 6, 7], help="exponentes: 10^k filas")
+    ap.add_argument("--term", default="carozzi", help="término de búsqueda para la etapa filter")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--max-index-rows", type=int, default=1_000_000)
+    ap.add_argument("--max-style-rows", type=int, default=100_000)
+    ap.add_argument("--max-memory-rows", type=int, default=1_000_000,
+                    help="medir memoria pico hasta este tamaño (0 = nunca)")
+    ap.add_argument("--json", help="guardar resultados en este archivo")
+    ap.add_argument("--compare", help="JSON de referencia para detectar regresiones")
+    ap.add_argument("--tolerance", type=float, default=1.25)
+    args = ap.parse_args()
+
+    r = Runner(max_memory_rows=args.max_memory_rows)
+    print(f"{'rows':>12} {'stage':>12} {'ms':>10} {'peak MB':>10}")
+    for k in args.sizes:
+        run_size(r, 10 ** k, args)
+
+    if args.json:
+        meta = {"python": sys.version.split()[0], "numpy": np.__version__, "platform": platform.platform(),
+                "max_memory_rows": r.max_memory_rows}
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"meta": meta, "results": r.results}, fh, indent=2)
+    if args.compare:
+        return compare(r.results, args.compare, args.tolerance)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
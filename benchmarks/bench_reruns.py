@@ -0,0 +1,326 @@
+"""
+Latencia de rerun por página con interacciones típicas, a varios tamaños de datos.
+
+Cada tamaño corre en un proceso nuevo (los tamaños se leen de variables de entorno al importar
+``utils``) con una API de prueba local (``benchmarks.stub_api``) y el runner headless de
+Streamlit (``AppTest``). Por página:
+
+1. login real por el formulario (``POST /auth/login`` contra la API de prueba)
+2. ``--repeat`` rondas de interacciones guionadas: escribir en la búsqueda letra a letra,
+   alternar "Normalizar", cambiar selectores, cargar listados, subir un CSV y enviar el batch,
+   ver el estado de los caches y el detalle de los trabajos encolados por el batch
+3. una ronda más con ``tracemalloc`` para el pico de memoria de Python de esas interacciones
+
+Las pestañas de ``st.tabs`` se cambian en el navegador sin rerun; lo que se mide es usar los
+widgets de cada pestaña. ``AppTest`` siempre hace reruns completos (no parciales de fragmento):
+la latencia medida es la de un rerun del script entero.
+
+Reporta por página ``first ms`` (el run del login, con caches del proceso en frío), ``p50``/``p95``
+de todos los reruns de interacción, ``peak MB`` (tracemalloc) y ``rss MB`` (máximo del proceso
+hasta esa página), más la mediana por paso en el JSON. ``--compare`` muestra la diferencia
+de p50/p95 contra un reporte anterior.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_reruns --json antes.json
+    python -m benchmarks.bench_reruns --compare antes.json
+    python -m benchmarks.bench_reruns --sizes chico grande --pages pages/4_ReportePlantilla.py --repeat 5
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+# Tamaños: variables de entorno de ``utils`` + SKUs de la API de prueba + interacción según tamaño.
+SIZES: Dict[str, Dict[str, object]] = {
+    "chico": {
+        "env": {"REPORT_SYNTHETIC_ROWS": "0", "SALES_STORE_SKUS": "500", "SALES_STORE_DAYS": "90"},
+        "api_rows": 200, "puntos": 10_000, "batch_rows": 100,
+    },
+    "medio": {
+        "env": {"REPORT_SYNTHETIC_ROWS": "200000", "SALES_STORE_SKUS": "2000", "SALES_STORE_DAYS": "365"},
+        "api_rows": 1_000, "puntos": 100_000, "batch_rows": 1_000,
+    },
+    "grande": {
+        "env": {"REPORT_SYNTHETIC_ROWS": "2000000", "SALES_STORE_SKUS": "10000", "SALES_STORE_DAYS": "365"},
+        "api_rows": 5_000, "puntos": 1_000_000, "batch_rows": 5_000,
+    },
+}
+
+PAGES = [
+    "Inicio.py",
+    "pages/1_Dashboard.py",
+    "pages/2_API_Local.py",
+    "pages/3_Plantilla.py",
+    "pages/4_ReportePlantilla.py",
+    "pages/5_ReportePlantilla2.py",
+    "pages/6_Estado_Caches.py",
+    "pages/7_Trabajos.py",  # después de 2_API_Local: muestra los batch que encoló (mismo login)
+]
+
+SEARCH_TERM = "limpieza"  # se escribe letra a letra: un rerun por letra (como al confirmar cada una)
+
+
+# ---------- Interacciones ----------
+def _by_label(widgets, label: str):
+    for w in widgets:
+        if w.label == label:
+            return w
+    raise LookupError(f"widget no encontrado: {label!r}")
+
+
+def _typing(i: int) -> List[str]:
+    """Textos sucesivos al escribir ``SEARCH_TERM`` letra a letra (las rondas impares borran)."""
+    if i % 2:
+        return [""]
+    return [SEARCH_TERM[:n] for n in range(1, len(SEARCH_TERM) + 1)]
+
+
+# Un paso: (nombre, acción). La acción toca widgets del AppTest antes del rerun; ``i`` es la ronda.
+Step = Tuple[str, Callable[..., None]]
+
+
+def _steps(page: str, size: Dict[str, object]) -> Callable[[object, int], List[Step]]:
+    def click(label):
+        return lambda at: _by_label(at.button, label).click()
+
+    def rerun(at):
+        pass
+
+    def build(at, i: int) -> List[Step]:
+        steps: List[Step] = [("rerun", rerun)]
+        if page == "Inicio.py":
+            steps.append(("contador", click("Incrementar contador global")))
+
+        elif page == "pages/1_Dashboard.py":
+            n = int(size["puntos"])
+            steps += [
+                ("puntos", lambda at: _by_label(at.select_slider, "Puntos por serie").set_value(n)),
+                ("método", lambda at: _by_label(at.radio, "Reducción para el gráfico").set_value(
+                    ["lttb", "minmax"][i % 2])),
+                ("rango x", lambda at: _by_label(at.slider, "Rango x").set_value((1, n // (2 + i % 2)))),
+            ]
+
+        elif page == "pages/2_API_Local.py":
+            rows = int(size["api_rows"])
+            csv = "id_proveedor,id_categoria,id_formato,id_segmento,sku,nombre\n" + "".join(
+                f"{k % 50 + 1},{k % 40 + 1},,,79{k:011d},Nuevo {k}\n" for k in range(int(size["batch_rows"]))
+            )
+            # Widgets repetidos entre pestañas ("limit", "q ..."): se buscan dentro de la pestaña.
+            steps += [
+                ("SKUs: limit", lambda at: _by_label(at.tabs[0].number_input, "limit").set_value(min(rows, 1000))),
+                ("SKUs: cargar", click("Cargar SKUs")),
+                ("SKUs: refrescar", click("Refrescar listado")),
+                ("SKUs: detalle", click("Buscar detalle")),
+                ("proveedores: q", lambda at: _by_label(at.tabs[1].text_input, "q (búsqueda por nombre)").set_value(
+                    "00" if i % 2 == 0 else "")),
+                ("proveedores: buscar", click("Buscar proveedores")),
+                ("categorías: buscar", click("Buscar categorías")),
+                ("batch: subir CSV", lambda at: _by_label(at.file_uploader, "CSV de SKUs").set_value(
+                    ("skus.csv", csv.encode("utf-8"), "text/csv"))),
+                ("batch: enviar", click("Enviar batch")),
+            ]
+
+        elif page == "pages/3_Plantilla.py":
+            steps += [
+                ("categoría", lambda at: _by_label(at.selectbox, "Categoría").set_value(
+                    _by_label(at.selectbox, "Categoría").options[(i + 1) % 3])),
+                ("top N", lambda at: _by_label(at.slider, "Top N").set_value(10 + 5 * (i % 4))),
+            ]
+
+        elif page in ("pages/4_ReportePlantilla.py", "pages/5_ReportePlantilla2.py"):
+            label = "Buscar macro/categoría o marca"
+            for value in _typing(i):
+                steps.append(("buscar", lambda at, v=value: _by_label(at.text_input, label).set_value(v)))
+            if page == "pages/4_ReportePlantilla.py":
+                steps += [
+                    ("normalizar", lambda at: _by_label(at.checkbox, "Normalizar PV al 100% en el filtro").set_value(
+                        i % 2 == 1)),
+                    ("ponderado", lambda at: _by_label(at.checkbox, "Grand Total ponderado por PV").set_value(
+                        i % 2 == 0)),
+                ]
+            else:
+                steps += [
+                    ("ordenar", lambda at: _by_label(at.selectbox, "Ordenar por").set_value(
+                        ["MARGEN", "PV"][i % 2])),
+                    ("descendente", lambda at: _by_label(at.checkbox, "Descendente").set_value(i % 2 == 1)),
+                ]
+            steps.append(("período", lambda at: _by_label(at.sidebar.selectbox, "Selecciona un período").set_value(
+                _by_label(at.sidebar.selectbox, "Selecciona un período").options[(i + 1) % 2])))
+
+        elif page == "pages/6_Estado_Caches.py":
+            steps.append(("refresco", rerun))  # la página no tiene widgets: el rerun es el refresco
+
+        elif page == "pages/7_Trabajos.py":
+            def detalle(at):
+                # Sin trabajos (página corrida sola con ``--pages``) no hay selector: solo el rerun.
+                boxes = [w for w in at.selectbox if w.label == "Detalle del trabajo"]
+                if boxes:
+                    boxes[0].select_index(i % len(boxes[0].options))
+
+            steps.append(("detalle", detalle))
+        return steps
+
+    return build
+
+
+# ---------- Proceso hijo (un tamaño) ----------
+def _check(at, page: str, step: str) -> None:
+    # Contra la API de prueba ningún paso debería terminar en excepción ni en ``st.error``.
+    problems = [e.value for e in at.exception] + [e.value for e in at.error]
+    if problems:
+        raise RuntimeError(f"{page} · {step}: {problems[0]}")
+
+
+def _login(at, page: str) -> float:
+    at.run()
+    _by_label(at.text_input, "Email").set_value("bench@example.com")
+    _by_label(at.text_input, "Contraseña").set_value("bench")
+    _by_label(at.button, "Entrar").click()
+    t0 = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - t0
+    _check(at, page, "login")
+    if not at.session_state["jwt"]:
+        raise RuntimeError(f"{page}: el login no dejó token")
+    return elapsed * 1000
+
+
+def _round(at, page: str, build, i: int, timings: Dict[str, List[float]]) -> None:
+    for name, action in build(at, i):
+        action(at)
+        t0 = time.perf_counter()
+        at.run()
+        timings.setdefault(name, []).append((time.perf_counter() - t0) * 1000)
+        _check(at, page, name)
+
+
+def run_size(size_name: str, pages: List[str], repeat: int, timeout: float) -> Dict[str, object]:
+    from benchmarks.stub_api import StubAPI
+
+    size = SIZES[size_name]
+    stub = StubAPI(int(size["api_rows"])).start()
+    os.environ["API_BASE_URL"] = stub.url  # antes de importar utils.api_client (lo hace la página)
+    from streamlit.testing.v1 import AppTest
+
+    result: Dict[str, object] = {}
+    for page in pages:
+        try:
+            at = AppTest.from_file(os.path.abspath(page), default_timeout=timeout)
+            first_ms = _login(at, page)
+            build = _steps(page, size)
+            timings: Dict[str, List[float]] = {}
+            for i in range(repeat):
+                _round(at, page, build, i, timings)
+            tracemalloc.start()
+            _round(at, page, build, repeat, {})
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        except Exception as exc:
+            tracemalloc.stop()
+            result[page] = {"error": str(exc)[:300]}
+            continue
+        samples = [ms for values in timings.values() for ms in values]
+        p50, p95 = np.percentile(samples, [50, 95])
+        result[page] = {
+            "first_ms": first_ms,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "reruns": len(samples),
+            "peak_mb": peak / 2**20,
+            "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "steps": {name: statistics.median(values) for name, values in timings.items()},
+        }
+    result["_api_requests"] = dict(stub.requests)
+    stub.stop()
+    return result
+
+
+# ---------- Proceso padre ----------
+def bench_size(size_name: str, args: argparse.Namespace) -> Dict[str, object]:
+    env = dict(os.environ, REPORT_WARM="0", WARMUP_ENABLED="0", PYTHONPATH=os.getcwd(), **SIZES[size_name]["env"])
+    with tempfile.TemporaryDirectory(prefix="bench_reruns_") as cache_dir:
+        env["DISK_CACHE_DIR"] = cache_dir
+        env["JOBS_DB"] = os.path.join(cache_dir, "jobs.sqlite3")
+        cmd = [sys.executable, "-m", "benchmarks.bench_reruns", "--child", size_name,
+               "--repeat", str(args.repeat), "--timeout", str(args.timeout), "--pages", *args.pages]
+        proc = subprocess.run(cmd, capture_output=True, text=True, env=env)
+    if proc.returncode != 0 or not proc.stdout.strip():
+        return {"error": (proc.stderr.strip().splitlines() or ["sin salida"])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _delta(entry: Dict[str, object], before: Dict[str, object], key: str) -> str:
+    if key in before and key in entry:
+        return f"{entry[key] - before[key]:+8.0f}"
+    return f"{'':>8}"
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", nargs="+", default=["chico", "medio"], choices=list(SIZES))
+    ap.add_argument("--pages", nargs="+", default=PAGES)
+    ap.add_argument("--repeat", type=int, default=3, help="rondas de interacciones por página")
+    ap.add_argument("--timeout", type=float, default=300, help="segundos máximos por rerun")
+    ap.add_argument("--json", help="guardar el reporte en este archivo")
+    ap.add_argument("--compare", help="reporte JSON anterior para mostrar la diferencia")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(run_size(args.child, args.pages, args.repeat, args.timeout)))
+        return 0
+
+    previous: Dict[str, Dict[str, Dict[str, object]]] = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            previous = json.load(fh)["sizes"]
+
+    report: Dict[str, Dict[str, object]] = {}
+    failed = False
+    print(
+        f"{'tamaño':<7} {'página':<30} {'first ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'peak MB':>8} "
+        f"{'rss MB':>7} {'Δ p50':>8} {'Δ p95':>8}"
+    )
+    for size_name in args.sizes:
+        result = bench_size(size_name, args)
+        report[size_name] = result
+        if "error" in result:
+            failed = True
+            print(f"{size_name:<7} error: {result['error']}")
+            continue
+        for page in args.pages:
+            entry = result[page]
+            if "error" in entry:
+                failed = True
+                print(f"{size_name:<7} {page:<30} error: {entry['error']}")
+                continue
+            before = previous.get(size_name, {}).get(page, {})
+            print(
+                f"{size_name:<7} {page:<30} {entry['first_ms']:>9.0f} {entry['p50_ms']:>8.1f} "
+                f"{entry['p95_ms']:>8.1f} {entry['peak_mb']:>8.1f} {entry['rss_mb']:>7.0f} "
+                f"{_delta(entry, before, 'p50_ms')} {_delta(entry, before, 'p95_ms')}"
+            )
+        calls = result["_api_requests"]
+        print(f"{size_name:<7} API de prueba: {sum(calls.values())} requests "
+              f"({', '.join(f'{route} {n}' for route, n in sorted(calls.items()))})")
+
+    if args.json:
+        meta = {"sizes": {name: SIZES[name] for name in args.sizes}, "repeat": args.repeat}
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"config": meta, "sizes": report}, fh, indent=2, ensure_ascii=False, sort_keys=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+"""
+Carga multiusuario contra la API de prueba: cuántas sesiones aguanta un worker.
+
+Simula ``N`` sesiones concurrentes (un hilo cada una, como las sesiones de un worker de
+Streamlit) que corren flujos realistas con el código real de ``utils.api_client`` y
+``utils.report_data`` (``REPORT_SOURCE=api``):
+
+- ``login``: ``POST /auth/login`` y ``api_client.set_token`` (lo que hace ``utils.auth``)
+- ``listado``: ``GET /catalogo/skus`` paginado + ``GET /catalogo/proveedores?q=...``
+- ``detalle``: ``GET /catalogo/skus/{sku}`` + ``GET /catalogo/proveedores/{id}``
+- ``batch``: ``POST /catalogo/skus/batch`` con ``--batch-rows`` ítems
+- ``reporte``: ``report_data.load_report`` de un período al azar (cache compartido del proceso)
+
+Cada sesión hace login, y luego elige flujos según ``--mix`` con una pausa exponencial de media
+``--think-ms`` entre flujos. La API de prueba (``benchmarks.stub_api``) corre en otro proceso,
+así la CPU y memoria medidas son solo las del worker; ``--latency-ms``, ``--jitter-ms`` y
+``--error-rate`` inyectan latencia y fallas del backend, y ``--capacity`` lo satura (latencia
+que crece y 429 con ``Retry-After``) para ver el control adaptativo de ``utils.api_limits``
+(``--no-adaptive`` lo apaga para comparar).
+
+Por cada nivel de ``--users`` (cada uno arranca con el cache de reportes vacío) reporta flujos/s
+(y ok/s: los que terminaron sin error), p50/p95/p99 por flujo, % de flujos con error, requests
+que llegaron al backend (y por flujo de usuario), conexiones TCP abiertas, CPU del worker (% de
+un núcleo) y RSS máximo. La línea de
+``reporte`` muestra el efecto del cache: requests a ``/reportes`` por carga pedida. La de
+conexiones muestra si hay pooling: sin pooling, conexiones ≈ requests.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.load_api --users 1 10 50 --duration 20 --json carga.json
+    python -m benchmarks.load_api --users 50 --latency-ms 80 --jitter-ms 40 --error-rate 0.02
+    python -m benchmarks.load_api --compare carga.json --mix listado=1 reporte=3
+    python -m benchmarks.load_api --users 100 --think-ms 10 --capacity 8 --no-adaptive --json sin_control.json
+    python -m benchmarks.load_api --users 100 --think-ms 10 --capacity 8 --compare sin_control.json
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+DEFAULT_MIX = {"login": 1, "listado": 4, "detalle": 4, "batch": 1, "reporte": 3}
+
+
+# ---------- API de prueba (otro proceso) ----------
+def start_stub(args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    cmd = [
+        sys.executable, "-m", "benchmarks.stub_api", "--port", "0", "--rows", str(args.rows),
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+        "--error-rate", str(args.error_rate), "--capacity", str(args.capacity),
+        "--retry-after", str(args.retry_after),
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True, env=dict(os.environ, PYTHONPATH=os.getcwd()))
+    line = proc.stdout.readline()  # "API de prueba en http://host:port (...)"
+    url = next((tok for tok in line.split() if tok.startswith("http://")), None)
+    if url is None:
+        proc.kill()
+        raise RuntimeError(f"la API de prueba no arrancó: {line!r}")
+    return proc, url
+
+
+def stub_stats(url: str) -> Dict[str, object]:
+    with urllib.request.urlopen(f"{url}/_stats", timeout=10) as resp:
+        return json.load(resp)
+
+
+# ---------- Flujos ----------
+class Session:
+    """Una sesión simulada: su RNG y sus credenciales."""
+
+    def __init__(self, user: int, args: argparse.Namespace):
+        self.user = user
+        self.args = args
+        self.rng = random.Random(user)
+
+    def flows(self) -> Dict[str, Callable[[], None]]:
+        return {
+            "login": self.login,
+            "listado": self.listado,
+            "detalle": self.detalle,
+            "batch": self.batch,
+            "reporte": self.reporte,
+        }
+
+    @staticmethod
+    def _ok(resp) -> None:
+        resp.raise_for_status()
+
+    def login(self) -> None:
+        from utils import api_client
+
+        resp = api_client.post("/auth/login", json={"email": f"user{self.user}@example.com", "password": "x"},
+                               retries=0)
+        self._ok(resp)
+        api_client.set_token(resp.json()["access_token"])
+
+    def listado(self) -> None:
+        from utils import api_client
+
+        offset = self.rng.randrange(0, max(1, self.args.rows - 50))
+        self._ok(api_client.get("/catalogo/skus", params={"limit": 50, "offset": offset}))
+        q = f"{self.rng.randrange(10):d}"
+        self._ok(api_client.get("/catalogo/proveedores", params={"limit": 10, "orden": "nombre", "q": q}))
+
+    def detalle(self) -> None:
+        from utils import api_client
+
+        sku = f"78{self.rng.randrange(1, self.args.rows + 1):011d}"
+        self._ok(api_client.get(f"/catalogo/skus/{sku}"))
+        self._ok(api_client.get(f"/catalogo/proveedores/{self.rng.randrange(1, 51)}"))
+
+    def batch(self) -> None:
+        from utils import api_client
+
+        items = [
+            {"id_proveedor": 1, "id_categoria": 1, "id_formato": None, "id_segmento": None,
+             "sku": f"79{self.user:05d}{k:06d}", "nombre": f"Carga {k}"}
+            for k in range(self.args.batch_rows)
+        ]
+        self._ok(api_client.post("/catalogo/skus/batch", json={"items": items, "chunk_size": 200}))
+
+    def reporte(self) -> None:
+        from utils import report_data
+
+        report_data.load_report(self.rng.choice(report_data.PERIODOS), provider=report_data.ApiProvider())
+
+
+def _user_loop(session: Session, mix: Dict[str, float], stop: threading.Event,
+               results: List[Tuple[str, float, bool]]) -> None:
+    flows = session.flows()
+    names, weights = list(mix), list(mix.values())
+    pending = ["login"]  # toda sesión parte con login
+    while not stop.is_set():
+        name = pending.pop() if pending else session.rng.choices(names, weights)[0]
+        t0 = time.perf_counter()
+        try:
+            flows[name]()
+            ok = True
+        except Exception:
+            ok = False
+        results.append((name, (time.perf_counter() - t0) * 1000, ok))
+        stop.wait(session.rng.expovariate(1000 / session.args.think_ms) if session.args.think_ms > 0 else 0)
+
+
+# ---------- Un nivel de carga ----------
+def _cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_level(users: int, url: str, args: argparse.Namespace, mix: Dict[str, float]) -> Dict[str, object]:
+    from utils import api_limits, report_data
+
+    report_data.clear_cache(disk=True)
+    api_limits.reset()
+    before = stub_stats(url)
+    stop = threading.Event()
+    results: List[Tuple[str, float, bool]] = []  # list.append es atómico: no hace falta lock
+    threads = [
+        threading.Thread(target=_user_loop, args=(Session(u, args), mix, stop, results), daemon=True)
+        for u in range(users)
+    ]
+    cpu0, t0 = _cpu_seconds(), time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    wall, cpu = time.perf_counter() - t0, _cpu_seconds() - cpu0
+    after = stub_stats(url)
+
+    backend = {
+        route: n - before["requests"].get(route, 0)
+        for route, n in after["requests"].items() if n - before["requests"].get(route, 0)
+    }
+    per_flow: Dict[str, Dict[str, float]] = {}
+    for name in sorted({r[0] for r in results}):
+        ms = [r[1] for r in results if r[0] == name]
+        errors = sum(not r[2] for r in results if r[0] == name)
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        per_flow[name] = {"n": len(ms), "errors": errors, "p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+    all_ms = [r[1] for r in results] or [0.0]
+    p50, p95, p99 = np.percentile(all_ms, [50, 95, 99])
+    report_loads = per_flow.get("reporte", {}).get("n", 0)
+    report_requests = sum(n for route, n in backend.items() if "/reportes/" in route)
+    return {
+        "users": users,
+        "flows": len(results),
+        "flows_per_s": len(results) / wall,
+        "ok_per_s": sum(r[2] for r in results) / wall,
+        "errors": sum(not r[2] for r in results),
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "backend_requests": sum(backend.values()),
+        "backend_per_s": sum(backend.values()) / wall,
+        "backend": backend,
+        "connections": after["connections"] - before["connections"],
+        "report_loads": report_loads,
+        "report_requests": report_requests,
+        "cpu_pct": 100 * cpu / wall,
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "per_flow": per_flow,
+        "backend_max_inflight": after.get("max_inflight", 0),
+        "limits": api_limits.stats().to_dict("records"),
+    }
+
+
+def _parse_mix(items: List[str]) -> Dict[str, float]:
+    if not items:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for item in items:
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise SystemExit(f"flujo desconocido: {name!r} (usa {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--users", type=int, nargs="+", default=[1, 10, 50], help="sesiones concurrentes por nivel")
+    ap.add_argument("--duration", type=float, default=10.0, help="segundos por nivel")
+    ap.add_argument("--think-ms", type=float, default=100.0, help="pausa media entre flujos de una sesión")
+    ap.add_argument("--mix", nargs="*", default=[], help="pesos de los flujos, ej. listado=4 reporte=1")
+    ap.add_argument("--rows", type=int, default=5_000, help="SKUs del catálogo de prueba")
+    ap.add_argument("--batch-rows", type=int, default=500, help="ítems por batch")
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="latencia del backend por request")
+    ap.add_argument("--jitter-ms", type=float, default=10.0)
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fracción de requests que fallan (503)")
+    ap.add_argument("--capacity", type=int, default=0,
+                    help="requests en curso que aguanta el backend antes de frenar y responder 429")
+    ap.add_argument("--retry-after", type=float, default=1.0, help="Retry-After (s) de esos 429")
+    ap.add_argument("--no-adaptive", dest="adaptive", action="store_false",
+                    help="sin control adaptativo de concurrencia (API_ADAPTIVE=0)")
+    ap.add_argument("--json", help="guardar el reporte en este archivo")
+    ap.add_argument("--compare", help="reporte JSON anterior para mostrar la diferencia")
+    args = ap.parse_args()
+    mix = _parse_mix(args.mix)
+
+    stub, url = start_stub(args)
+    # Antes de importar utils: la URL y los caches se leen al importar.
+    os.environ.update(API_BASE_URL=url, REPORT_SOURCE="api", REPORT_WARM="0",
+                      API_ADAPTIVE="1" if args.adaptive else "0")
+    os.environ.setdefault("DISK_CACHE_DIR", tempfile.mkdtemp(prefix="load_api_"))
+
+    previous: Dict[str, Dict[str, object]] = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            previous = {str(level["users"]): level for level in json.load(fh)["levels"]}
+
+    levels = []
+    print(
+        f"{'users':>5} {'flujos/s':>9} {'ok/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'err %':>6} "
+        f"{'backend':>8} {'req/flujo':>9} {'conex':>6} {'cpu %':>6} {'rss MB':>7} {'Δ ok/s':>7} {'Δ p95':>7}"
+    )
+    try:
+        for users in args.users:
+            level = run_level(users, url, args, mix)
+            levels.append(level)
+            before = previous.get(str(users), {})
+            d_tput = f"{level['ok_per_s'] - before['ok_per_s']:+7.1f}" if before.get("ok_per_s") is not None else f"{'':>7}"
+            d_p95 = f"{level['p95_ms'] - before['p95_ms']:+7.0f}" if before else f"{'':>7}"
+            print(
+                f"{users:>5} {level['flows_per_s']:>9.1f} {level['ok_per_s']:>7.1f} {level['p50_ms']:>8.1f} {level['p95_ms']:>8.1f} "
+                f"{level['p99_ms']:>8.1f} {100 * level['errors'] / max(1, level['flows']):>6.1f} "
+                f"{level['backend_requests']:>8,} {level['backend_requests'] / max(1, level['flows']):>9.2f} "
+                f"{level['connections']:>6,} {level['cpu_pct']:>6.0f} {level['rss_mb']:>7.0f} {d_tput} {d_p95}"
+            )
+            limits = {lim["Endpoint"]: lim for lim in level["limits"]}
+            if limits:
+                throttled = sum(lim["429/503"] for lim in limits.values())
+                print(f"{'':>5} límites: " + ", ".join(
+                    f"{name} {lim['Límite']:g}" for name, lim in sorted(limits.items())
+                    if lim["Requests"] >= 20) + f" · 429/503 {throttled:,} · máx. en curso en el backend "
+                    f"{level['backend_max_inflight']}")
+            if level["report_loads"]:
+                print(f"{'':>5} reporte: {level['report_loads']:,} cargas -> "
+                      f"{level['report_requests']:,} requests a /reportes")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    if args.json:
+        config = {k: v for k, v in vars(args).items() if k not in ("json", "compare")}
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"config": dict(config, mix=mix), "levels": levels}, fh, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Arranque en frío por página: tiempo hasta el primer render e imports que lo pagan.
+
+Cada página corre en un proceso nuevo (como el primer usuario tras un deploy) con el runner
+headless de Streamlit (``AppTest``) y ``python -X importtime``. Por página reporta:
+
+- ``first ms``: primer run completo (imports de la página + datos + render), la mediana de
+  ``--repeat`` procesos
+- ``rerun ms``: un segundo run en el mismo proceso (ya sin imports)
+- ``import ms``: tiempo en imports hechos durante el primer run, y los más caros
+- ``mods``: módulos cargados durante el primer run (no depende de la carga de la máquina)
+
+Streamlit ya está importado antes del run (el servidor lo tiene cargado). Se usa un
+``DISK_CACHE_DIR`` vacío y ``REPORT_WARM=0`` para que todas las corridas partan igual.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.profile_pages --json antes.json
+    python -m benchmarks.profile_pages --compare antes.json
+    python -m benchmarks.profile_pages --root /otro/checkout --pages Inicio.py pages/5_ReportePlantilla2.py
+"""
+
+from __future__ import annotations
+import argparse
+import glob
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+MARKER = "---profile-pages-run---"
+
+# Proceso hijo: corre la página dos veces y escribe el resultado como JSON en stdout.
+CHILD = f"""
+import json, os, sys, time
+root, page = sys.argv[1], sys.argv[2]
+sys.path.insert(0, root)
+os.chdir(root)
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(os.path.join(root, page), default_timeout=300)
+at.session_state["jwt"] = "x"
+sys.stderr.write("{MARKER}\\n"); sys.stderr.flush()
+loaded = len(sys.modules)
+t0 = time.perf_counter(); at.run(); first = time.perf_counter() - t0
+loaded = len(sys.modules) - loaded
+t0 = time.perf_counter(); at.run(); rerun = time.perf_counter() - t0
+print(json.dumps({{"first_ms": first * 1000, "rerun_ms": rerun * 1000, "modules": loaded,
+                  "exceptions": [str(e.value)[:200] for e in at.exception]}}))
+"""
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def default_pages(root: str) -> List[str]:
+    pages = ["Inicio.py"] if os.path.exists(os.path.join(root, "Inicio.py")) else []
+    return pages + sorted(os.path.relpath(p, root) for p in glob.glob(os.path.join(root, "pages", "*.py")))
+
+
+def top_level_imports(stderr: str) -> Dict[str, float]:
+    """Módulos importados en el primer nivel durante el run -> ms acumulados."""
+    _, _, after = stderr.partition(MARKER)
+    out: Dict[str, float] = {}
+    for line in after.splitlines():
+        m = _IMPORT_LINE.match(line)
+        if m and len(m.group(3)) <= 1:
+            out[m.group(4)] = out.get(m.group(4), 0.0) + int(m.group(2)) / 1000
+    return out
+
+
+def profile_page(root: str, page: str) -> Dict[str, object]:
+    env = dict(os.environ, REPORT_WARM="0", WARMUP_ENABLED="0", PYTHONPATH=root)
+    with tempfile.TemporaryDirectory(prefix="profile_pages_") as cache_dir:
+        env["DISK_CACHE_DIR"] = cache_dir
+        env["JOBS_DB"] = os.path.join(cache_dir, "jobs.sqlite3")
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", CHILD, root, page],
+            capture_output=True, text=True, env=env, cwd=root,
+        )
+    if proc.returncode != 0 or not proc.stdout.strip():
+        return {"error": proc.stderr.strip().splitlines()[-1:] or ["sin salida"]}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    imports = top_level_imports(proc.stderr)
+    result["import_ms"] = sum(imports.values())
+    result["top_imports"] = dict(sorted(imports.items(), key=lambda kv: -kv[1])[:5])
+    return result
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--root", default=os.getcwd(), help="checkout a perfilar (default: directorio actual)")
+    ap.add_argument("--pages", nargs="+", default=None)
+    ap.add_argument("--repeat", type=int, default=3, help="procesos por página (se usa la mediana)")
+    ap.add_argument("--json", help="guardar el reporte en este archivo")
+    ap.add_argument("--compare", help="reporte JSON anterior para mostrar la diferencia")
+    args = ap.parse_args()
+
+    root = os.path.abspath(args.root)
+    previous = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            previous = json.load(fh)["pages"]
+
+    report: Dict[str, Dict[str, object]] = {}
+    print(
+        f"{'página':<32} {'first ms':>9} {'rerun ms':>9} {'import ms':>10} {'mods':>5} "
+        f"{'Δ first':>8} {'Δ mods':>6}  imports más caros"
+    )
+    for page in args.pages or default_pages(root):
+        runs = [profile_page(root, page) for _ in range(args.repeat)]
+        ok = [r for r in runs if "error" not in r]
+        if not ok:
+            report[page] = runs[0]
+            print(f"{page:<32} error: {runs[0]['error']}")
+            continue
+        best = sorted(ok, key=lambda r: r["first_ms"])[len(ok) // 2]
+        entry = {
+            "first_ms": statistics.median(r["first_ms"] for r in ok),
+            "rerun_ms": statistics.median(r["rerun_ms"] for r in ok),
+            "import_ms": statistics.median(r["import_ms"] for r in ok),
+            "modules": best["modules"],
+            "top_imports": best["top_imports"],
+            "exceptions": best["exceptions"],
+        }
+        report[page] = entry
+        before = previous.get(page, {})
+        delta = f"{entry['first_ms'] - before['first_ms']:+8.0f}" if "first_ms" in before else f"{'':>8}"
+        delta_mods = f"{entry['modules'] - before['modules']:+6d}" if "modules" in before else f"{'':>6}"
+        top = ", ".join(f"{name} {ms:.0f}" for name, ms in entry["top_imports"].items())
+        print(
+            f"{page:<32} {entry['first_ms']:>9.0f} {entry['rerun_ms']:>9.0f} "
+            f"{entry['import_ms']:>10.0f} {entry['modules']:>5} {delta} {delta_mods}  {top}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"root": root, "pages": report}, fh, indent=2, ensure_ascii=False)
+    return 1 if any("error" in r or r.get("exceptions") for r in report.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
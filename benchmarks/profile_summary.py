@@ -0,0 +1,102 @@
+"""
+Resumen de trazas de ``utils.profiler``: tiempo por página y etapa, y comparación entre carpetas.
+
+Cada archivo es un run (Chrome trace en "JSON Array" sin cerrar, un evento por línea). Por
+página y etapa reporta cuántas veces aparece, p50, p95 y promedio en ms. Con ``--compare`` muestra la diferencia de p50 contra
+otra carpeta (ej. trazas de producción antes y después de un deploy).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.profile_summary .cache/profiles
+    python -m benchmarks.profile_summary trazas_nuevas --compare trazas_viejas --page 4_ReportePlantilla.py
+"""
+
+from __future__ import annotations
+import argparse
+import glob
+import json
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+Key = Tuple[str, str]  # (página, etapa)
+
+RUN_STAGE = "(run completo)"
+
+
+def load(directory: str, page: Optional[str] = None, partial: bool = False) -> Dict[Key, List[float]]:
+    """ms por (página, etapa). Los reruns parciales se excluyen salvo ``partial=True``."""
+    out: Dict[Key, List[float]] = {}
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        try:
+            with open(path, encoding="utf-8") as fh:
+                # una línea cortada (run en curso) se ignora
+                events = [e for e in map(_parse, fh) if e is not None]
+        except OSError:
+            continue
+        meta = next((e["args"] for e in events if e.get("ph") == "M" and e.get("name") == "run"), {})
+        if page and meta.get("page") != page:
+            continue
+        if meta.get("partial") and not partial:
+            continue
+        name = meta.get("page", "?")
+        # el total se agrega en cada escritura: vale el último
+        elapsed = [e["args"]["elapsed_ms"] for e in events if e.get("ph") == "C"]
+        out.setdefault((name, RUN_STAGE), []).append(float(elapsed[-1]) if elapsed else 0.0)
+        for event in events:
+            if event.get("ph") == "X":
+                out.setdefault((name, event["name"]), []).append(event["dur"] / 1000)
+    return out
+
+
+def _parse(line: str) -> Optional[dict]:
+    # "[" de apertura, "]" si alguien cerró el arreglo, y la coma que sigue a cada evento
+    line = line.strip().rstrip(",")
+    if line in ("", "[", "]"):
+        return None
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+def summarize(samples: Dict[Key, List[float]]) -> Dict[Key, Dict[str, float]]:
+    return {
+        key: {
+            "n": len(values),
+            "p50": float(np.percentile(values, 50)),
+            "p95": float(np.percentile(values, 95)),
+            "mean": float(np.mean(values)),
+        }
+        for key, values in samples.items()
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("directory", nargs="?", default=os.path.join(".cache", "profiles"))
+    ap.add_argument("--compare", help="carpeta de trazas de referencia")
+    ap.add_argument("--page", help="solo esta página (ej. 4_ReportePlantilla.py)")
+    ap.add_argument("--partial", action="store_true", help="incluir reruns parciales (fragmentos)")
+    args = ap.parse_args()
+
+    current = summarize(load(args.directory, args.page, args.partial))
+    if not current:
+        print(f"Sin trazas en {args.directory}")
+        return 1
+    reference = summarize(load(args.compare, args.page, args.partial)) if args.compare else {}
+
+    print(f"{'página':<28} {'etapa':<32} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'media':>9} {'Δ p50':>9}")
+    for (page, stage), stats in sorted(current.items(), key=lambda kv: (kv[0][0], -kv[1]["p50"])):
+        ref = reference.get((page, stage))
+        delta = f"{stats['p50'] - ref['p50']:+9.1f}" if ref else f"{'':>9}"
+        print(
+            f"{page[:28]:<28} {stage[:32]:<32} {stats['n']:>5} {stats['p50']:>9.1f} "
+            f"{stats['p95']:>9.1f} {stats['mean']:>9.1f} {delta}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
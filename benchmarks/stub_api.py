@@ -0,0 +1,338 @@
+"""
+API local de mentira para benchmarks: ``/auth/login``, los endpoints ``/catalogo/*`` que usa
+la página 2 (datos deterministas de ``--rows`` SKUs) y ``/reportes/posicionamiento/*`` de
+``REPORT_SOURCE=api`` (las tablas chicas de la fuente sintética).
+
+- ``POST /auth/login`` devuelve ``{"access_token": ...}`` para cualquier email/contraseña
+- ``/catalogo/*`` y ``/reportes/*`` exigen ``Authorization: Bearer <token>`` (401 si falta)
+- listados con ``limit``/``offset``/``orden``/``q`` (y ``macro_id`` en categorías)
+- ``POST /catalogo/skus`` y ``POST /catalogo/skus/batch`` aceptan y cuentan, no guardan
+- ``GET /_stats``: requests por ruta, conexiones TCP abiertas y pico de requests en curso desde
+  la consulta anterior (sin latencia ni errores)
+
+Inyección de fallas: cada request espera ``latency_ms`` ± ``jitter_ms`` y una fracción
+``error_rate`` responde ``error_status`` (default 503) sin llegar al handler.
+
+Capacidad (``capacity`` > 0): con más de ``capacity`` requests en curso la latencia crece en
+proporción (un backend saturado que encola), y con más del doble responde 429 con
+``Retry-After: retry_after_s`` sin llegar al handler.
+
+Se usa desde otros benchmarks (``StubAPI(rows=...).start()``) o suelto para probar la app::
+
+    python -m benchmarks.stub_api --port 8000 --rows 5000 --latency-ms 80 --error-rate 0.02 --capacity 16
+    API_BASE_URL=http://127.0.0.1:8000 streamlit run Inicio.py
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+N_PROVEEDORES = 50
+N_MACROS = 8
+N_CATEGORIAS = 40
+
+
+# ---------- Datos ----------
+def make_catalog(rows: int) -> Dict[str, List[Dict[str, object]]]:
+    proveedores = [{"id": i, "nombre": f"Proveedor {i:03d}"} for i in range(1, N_PROVEEDORES + 1)]
+    categorias = [
+        {
+            "id": i,
+            "categoria": f"Categoría {i:02d}",
+            "macro_id": (i - 1) % N_MACROS + 1,
+            "macrocategoria": f"Macro {(i - 1) % N_MACROS + 1}",
+        }
+        for i in range(1, N_CATEGORIAS + 1)
+    ]
+    skus = [
+        {
+            "id": i,
+            "id_proveedor": i % N_PROVEEDORES + 1,
+            "id_categoria": i % N_CATEGORIAS + 1,
+            "id_formato": (i % 5 + 1) if i % 3 else None,
+            "id_segmento": (i % 4 + 1) if i % 2 else None,
+            "sku": f"78{i:011d}",
+            "nombre": f"Producto {i}",
+        }
+        for i in range(1, rows + 1)
+    ]
+    return {"proveedores": proveedores, "categorias": categorias, "skus": skus}
+
+
+def _listing(items: List[Dict[str, object]], query: Dict[str, str], text_keys: Tuple[str, ...]) -> List[Dict[str, object]]:
+    q = query.get("q", "").strip().lower()
+    if q:
+        items = [it for it in items if any(q in str(it.get(k, "")).lower() for k in text_keys)]
+    if query.get("macro_id"):
+        items = [it for it in items if str(it.get("macro_id")) == query["macro_id"]]
+    orden = query.get("orden", "")
+    if orden:
+        key = orden.lstrip("-")
+        items = sorted(items, key=lambda it: (it.get(key) is None, it.get(key)), reverse=orden.startswith("-"))
+    offset = int(query.get("offset", 0) or 0)
+    limit = int(query.get("limit", 50) or 50)
+    return items[offset:offset + limit]
+
+
+# ---------- Servidor ----------
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+    protocol_version = "HTTP/1.1"  # keep-alive: la sesión de requests reutiliza la conexión
+
+    def setup(self):
+        super().setup()
+        self.server.stub.count_connection()
+
+    def log_message(self, format, *args):  # noqa: A002 - firma de BaseHTTPRequestHandler
+        pass
+
+    def _send(self, status: int, payload: object, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> object:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            return json.loads(raw or b"null")
+        except ValueError:
+            return None
+
+    def _handle(self, method: str) -> None:
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        body = self._body() if method in ("POST", "PUT") else None
+        stub = self.server.stub
+        if url.path == "/_stats":
+            self._send(200, stub.stats())
+            return
+        stub.enter()
+        try:
+            failure = stub.inject()
+            if failure == 429:
+                stub.count(f"{method} (429 por capacidad)")
+                self._send(429, {"detail": "demasiados requests"}, {"Retry-After": f"{stub.retry_after_s:g}"})
+                return
+            if failure is not None:
+                stub.count(f"{method} (falla inyectada {failure})")
+                self._send(failure, {"detail": "falla inyectada"})
+                return
+            status, payload, route = stub.dispatch(method, url.path, query, body, self.headers.get("Authorization"))
+            stub.count(f"{method} {route}")
+            self._send(status, payload)
+        finally:
+            stub.leave()
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    stub: "StubAPI"
+
+
+class StubAPI:
+    """Servidor en un hilo de fondo. ``url`` queda lista tras ``start()``."""
+
+    def __init__(
+        self,
+        rows: int = 1000,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        capacity: int = 0,
+        retry_after_s: float = 1.0,
+        seed: int = 0,
+    ):
+        self.data = make_catalog(rows)
+        self._by_sku = {str(it["sku"]): it for it in self.data["skus"]}
+        self._reports: Dict[Tuple[str, str], List[Dict[str, object]]] = {}
+        self._host, self._port = host, port
+        self._server: Optional[_Server] = None
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self.latency_ms, self.jitter_ms = latency_ms, jitter_ms
+        self.error_rate, self.error_status = error_rate, error_status
+        self.capacity, self.retry_after_s = capacity, retry_after_s
+        self.requests: Counter = Counter()
+        self.connections = 0
+        self.inflight = 0
+        self.max_inflight = 0
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None, "StubAPI no iniciado"
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubAPI":
+        self._server = _Server((self._host, self._port), _Handler)
+        self._server.stub = self
+        threading.Thread(target=self._server.serve_forever, name="stub-api", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "StubAPI":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def count(self, route: str) -> None:
+        with self._lock:
+            self.requests[route] += 1
+
+    def count_connection(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def enter(self) -> None:
+        with self._lock:
+            self.inflight += 1
+            self.max_inflight = max(self.max_inflight, self.inflight)
+
+    def leave(self) -> None:
+        with self._lock:
+            self.inflight -= 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            peak, self.max_inflight = self.max_inflight, self.inflight  # pico desde la consulta anterior
+            return {"requests": dict(self.requests), "connections": self.connections, "max_inflight": peak}
+
+    def inject(self) -> Optional[int]:
+        """Espera la latencia configurada; devuelve un status de error si toca fallar."""
+        with self._lock:
+            delay = self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+            fail = self._rng.random() < self.error_rate
+            load = self.inflight / self.capacity if self.capacity > 0 else 0.0
+        if load > 2:
+            return 429
+        if load > 1:
+            delay *= load
+        if delay > 0:
+            time.sleep(delay / 1000)
+        return self.error_status if fail else None
+
+    def _report(self, table: str, periodo: str) -> List[Dict[str, object]]:
+        key = (table, periodo)
+        if key not in self._reports:
+            from utils.report_data import SyntheticProvider
+
+            data = SyntheticProvider(n_rows=0).load(periodo)
+            for name, attr in (("ponderado", "weighted"), ("marcas", "brands"), ("detalle", "detail")):
+                rows = json.loads(getattr(data, attr).to_json(orient="records", force_ascii=False))
+                self._reports[(name, periodo)] = rows
+        return self._reports[key]
+
+    def dispatch(
+        self, method: str, path: str, query: Dict[str, str], body: object, authorization: Optional[str],
+    ) -> Tuple[int, object, str]:
+        """-> (status, payload, ruta normalizada para las estadísticas)."""
+        path = "/" + path.strip("/")
+        if method == "POST" and path == "/auth/login":
+            email = (body or {}).get("email") if isinstance(body, dict) else None
+            if not email or not body.get("password"):
+                return 422, {"detail": "email y password requeridos"}, path
+            return 200, {"access_token": f"stub-{email}", "token_type": "bearer"}, path
+
+        if not path.startswith(("/catalogo/", "/reportes/")):
+            return 404, {"detail": "no encontrado"}, path
+        if not (authorization or "").startswith("Bearer "):
+            return 401, {"detail": "no autenticado"}, path
+
+        m = re.fullmatch(r"/reportes/posicionamiento/(ponderado|marcas|detalle)", path)
+        if m is not None and method == "GET":
+            if not query.get("periodo"):
+                return 422, {"detail": "periodo requerido"}, path
+            with self._lock:
+                return 200, self._report(m.group(1), query["periodo"]), path
+
+        m = re.fullmatch(r"/catalogo/(skus|proveedores|categorias)(?:/([^/]+))?", path)
+        if m is None:
+            return 404, {"detail": "no encontrado"}, path
+        table, key = m.group(1), m.group(2)
+        route = f"/catalogo/{table}" + ("/{id}" if key else "")
+
+        if method == "POST" and table == "skus" and key == "batch":
+            items = body.get("items", []) if isinstance(body, dict) else []
+            chunk = max(1, int(body.get("chunk_size", 200))) if isinstance(body, dict) else 200
+            return 200, {"recibidos": len(items), "insertados": len(items), "chunks": math.ceil(len(items) / chunk)}, \
+                "/catalogo/skus/batch"
+        if method == "POST" and table == "skus" and key is None:
+            return 201, dict(body or {}, id=len(self.data["skus"]) + 1), route
+        if method != "GET":
+            return 405, {"detail": "método no permitido"}, route
+
+        if key is None:
+            text_keys = ("nombre", "sku") if table != "categorias" else ("categoria", "macrocategoria")
+            return 200, _listing(self.data[table], query, text_keys), route
+        if table == "skus":
+            item = self._by_sku.get(key)
+        else:
+            item = next((it for it in self.data[table] if str(it["id"]) == key), None)
+        return (200, item, route) if item is not None else (404, {"detail": "no encontrado"}, route)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--rows", type=int, default=1000, help="SKUs del catálogo")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="latencia agregada a cada request")
+    ap.add_argument("--jitter-ms", type=float, default=0.0, help="variación uniforme ± de la latencia")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fracción de requests que fallan")
+    ap.add_argument("--error-status", type=int, default=503)
+    ap.add_argument("--capacity", type=int, default=0, help="requests en curso antes de saturarse (0 = sin tope)")
+    ap.add_argument("--retry-after", type=float, default=1.0, help="Retry-After de los 429 por capacidad")
+    args = ap.parse_args()
+
+    stub = StubAPI(
+        args.rows, host=args.host, port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, error_status=args.error_status, capacity=args.capacity,
+        retry_after_s=args.retry_after,
+    ).start()
+    # La primera línea es la URL: ``benchmarks.load_api`` la lee para conectarse (``--port 0``).
+    print(f"API de prueba en {stub.url} ({args.rows:,} SKUs). Ctrl+C para salir.", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.stop()
+        for route, n in sorted(stub.requests.items()):
+            print(f"{n:>8,}  {route}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
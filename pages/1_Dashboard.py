@@ -1,46 +1,109 @@
-from utils import auth
+from utils import downsample, fragments, page, profiler
+from utils.kpi_engine import KPIEngine, abs_diff_name
+from utils.live_feed import LiveView, SimulatedFeed
 import streamlit as st
 import pandas as pd
 import numpy as np
 
-try:
-    token = auth.ensure_authenticated(show_controls_in_sidebar=True)
-except ValueError:
-    st.stop()  # el usuario no se autenticó; detenemos la app
-
-st.sidebar.markdown(
-    """
-    <div style="text-align:center; margin-bottom:20px;">
-        <a href="https://yourwebsite.com" target="_blank">
-            <img src="https://chiper.cl/wp-content/uploads/2023/09/logo-chiper-1.svg" width="120">
-        </a>
-    </div>
-    """,
-    unsafe_allow_html=True
+token = page.setup(script=__file__)
+
+st.sidebar.header("Serie")
+n_puntos = st.sidebar.select_slider("Puntos por serie", [50, 10_000, 100_000, 1_000_000], value=50)
+metodo = st.sidebar.radio(
+    "Reducción para el gráfico", downsample.METHODS,
+    format_func={"lttb": "LTTB (forma)", "minmax": "Mín/Máx por bucket (picos)"}.get,
 )
 
+st.sidebar.header("En vivo")
+en_vivo = st.sidebar.toggle("Modo en vivo", value=False)
+if en_vivo:
+    intervalo = st.sidebar.select_slider("Intervalo de actualización (s)", [0.25, 0.5, 1.0, 2.0, 5.0], value=1.0)
+    historia = st.sidebar.select_slider("Historia máxima (puntos)", [500, 2_000, 10_000, 50_000], value=2_000)
+    tasa = st.sidebar.select_slider("Puntos por segundo del feed", [1, 20, 200, 2_000, 20_000], value=20)
+    fragments.timings_toggle()
+
 st.title("Dashboard")
 
-# Data de ejemplo
-np.random.seed(42)
-data = pd.DataFrame(
-    {
-        "x": np.arange(1, 51),
-        "serie_a": np.random.randn(50).cumsum(),
-        "serie_b": np.random.randn(50).cumsum(),
-    }
-)
+# Data de ejemplo (compartida entre sesiones y reruns: tratar como solo lectura)
+@st.cache_resource
+def serie_ejemplo(n: int) -> pd.DataFrame:
+    np.random.seed(42)
+    return pd.DataFrame(
+        {
+            "x": np.arange(1, n + 1),
+            "serie_a": np.random.randn(n).cumsum(),
+            "serie_b": np.random.randn(n).cumsum(),
+        }
+    ).set_index("x", drop=False)
+
+def nuevo_kpi_engine() -> KPIEngine:
+    return KPIEngine(["serie_a", "serie_b"], window=30, period=30, abs_diff=[("serie_a", "serie_b")])
+
+# KPIs incrementales: se calculan una vez por serie; puntos nuevos se agregan en O(1).
+@st.cache_resource
+def kpis_ejemplo(n: int) -> KPIEngine:
+    engine = nuevo_kpi_engine()
+    engine.extend(serie_ejemplo(n))
+    return engine
+
+def mostrar_kpis(engine: KPIEngine, slots) -> None:
+    kpis = engine.snapshot()
+    kpi_a, kpi_b = kpis["serie_a"], kpis["serie_b"]
+    kpi_diff = kpis[abs_diff_name("serie_a", "serie_b")]
+    slots[0].metric("Último valor A", f"{kpi_a['last']:.2f}", f"{kpi_a['last'] - kpi_a['rolling_mean']:+.2f} vs media 30")
+    slots[1].metric("Último valor B", f"{kpi_b['last']:.2f}", f"{kpi_b['last'] - kpi_b['rolling_mean']:+.2f} vs media 30")
+    slots[2].metric(
+        "Diferencia media |A-B|", f"{kpi_diff['mean']:.2f}",
+        f"{kpi_diff['rolling_mean']:.2f} últimos 30", delta_color="off",
+    )
+
+# -------- Modo en vivo
+# Feed compartido por proceso; cada sesión lleva su cursor, su historia acotada y sus KPIs.
+@st.cache_resource
+def feed_en_vivo(tasa: float) -> SimulatedFeed:
+    return SimulatedFeed(["serie_a", "serie_b"], rate=tasa)
+
+def vista_en_vivo(tasa: float, historia: int) -> LiveView:
+    view = st.session_state.get("live_view")
+    if view is None or view.feed is not feed_en_vivo(tasa) or view.cap != historia:
+        view = LiveView(feed_en_vivo(tasa), historia, kpis=nuevo_kpi_engine())
+        st.session_state["live_view"] = view
+    return view
+
+if en_vivo:
+    view = vista_en_vivo(tasa, historia)
+    # Lugares fijos fuera del fragmento: cada tick reemplaza los KPIs y el gráfico.
+    kpi_slots = [col.empty() for col in st.columns(3)]
+    chart_slot = st.empty()
 
-kpi1 = data["serie_a"].iloc[-1]
-kpi2 = data["serie_b"].iloc[-1]
-kpi3 = (data["serie_a"] - data["serie_b"]).abs().mean()
+    # Cada tick trae del feed solo los puntos nuevos (O(nuevos) en historia y KPIs). El
+    # gráfico se redibuja con la historia reducida al ancho del gráfico: el costo por tick
+    # depende del ancho, no del tope de historia.
+    @fragments.timed_fragment("En vivo", run_every=intervalo)
+    def panel_en_vivo() -> None:
+        batch = view.pull()
+        mostrar_kpis(view.kpis, kpi_slots)
+        chart_slot.line_chart(view.chart_frame(method=metodo))
+        st.caption(
+            f"Punto {view.cursor:,} · +{len(batch.frame):,} en este tick · {view.received:,} recibidos · "
+            f"{view.dropped:,} descartados por backpressure · historia {view.history_len:,}/{view.cap:,}."
+        )
 
-c1, c2, c3 = st.columns(3)
-c1.metric("Último valor A", f"{kpi1:.2f}")
-c2.metric("Último valor B", f"{kpi2:.2f}")
-c3.metric("Diferencia media |A-B|", f"{kpi3:.2f}")
+    panel_en_vivo()
+else:
+    with profiler.stage("datos: serie", n=n_puntos):
+        data = serie_ejemplo(n_puntos)
+    with profiler.stage("KPIs"):
+        mostrar_kpis(kpis_ejemplo(n_puntos), st.columns(3))
 
-st.line_chart(data.set_index("x")[["serie_a", "serie_b"]])
+    # El gráfico recibe a lo sumo ~1 punto por pixel; con zoom suficiente, la serie completa.
+    rango = st.slider("Rango x", 1, n_puntos, (1, n_puntos))
+    with profiler.stage("reducción", metodo=metodo):
+        vista = downsample.chart_data(
+            data, key=("dashboard", n_puntos), columns=["serie_a", "serie_b"], method=metodo, x_range=rango,
+        )
+    st.line_chart(vista)
+    st.caption(f"{len(vista):,} puntos graficados de {rango[1] - rango[0] + 1:,} en el rango.")
 
 st.caption("Ejemplo de visualización y KPIs rápidos.")
 
@@ -1,36 +1,41 @@
-from utils import auth
-
 import streamlit as st
 import pandas as pd
-from typing import Optional, List, Dict, Any
+from typing import Optional, Dict, Any
 from utils import api_client as api
+from utils import api_fixtures
+from utils import catalog
+from utils import page
+from utils import schema
+from utils.jobs import get_job_queue
+from utils.reference_data import get_reference_data
 
-st.set_page_config(page_title="Catálogo API", layout="wide")
-
-try:
-    token = auth.ensure_authenticated(show_controls_in_sidebar=True)
-except ValueError:
-    st.stop()  # el usuario no se autenticó; detenemos la app
-
-st.sidebar.markdown(
-    """
-    <div style="text-align:center; margin-bottom:20px;">
-        <a href="https://yourwebsite.com" target="_blank">
-            <img src="https://chiper.cl/wp-content/uploads/2023/09/logo-chiper-1.svg" width="120">
-        </a>
-    </div>
-    """,
-    unsafe_allow_html=True
-)
+token = page.setup("Catálogo API", script=__file__)
 
 st.title("Catálogo – API Local")
 
 with st.expander("Configuración"):
     st.write(f"Base URL: `{api.API_BASE_URL}`")
+    if api_fixtures.mode() != "off":
+        st.caption(f"Fixtures de la API en modo **{api_fixtures.mode()}** (`{api_fixtures.API_FIXTURES_PATH}`).")
     timeout = st.number_input("Timeout (seg)", 1.0, 60.0, 8.0, step=1.0)
     retries = st.slider("Reintentos", 0, 3, 1)
     st.caption("Ajusta para APIs lentas o inestables.")
 
+# Proveedores y categorías: una copia por proceso, compartida por todas las sesiones.
+refdata = get_reference_data()
+with st.expander("Datos de referencia compartidos"):
+    st.dataframe(refdata.stats(), hide_index=True, use_container_width=True)
+    resumen = refdata.summary()
+    st.caption(
+        f"{resumen['bytes'] / 1024:,.1f} KB de {resumen['max_bytes'] / 2**20:,.0f} MB · "
+        f"búsquedas por id: {resumen['hits']:,} encontradas, {resumen['misses']:,} no encontradas · "
+        f"refresco cada {refdata.refresh_s:,.0f} s "
+        f"({'en segundo plano' if refdata.service_token else 'al leer, con el token de la sesión'})"
+    )
+    if st.button("Recargar datos de referencia"):
+        refdata.refresh(token=token)
+        st.rerun()
+
 # ------------------------------------------------------------
 # Helpers
 def _show_response(resp):
@@ -55,6 +60,29 @@ def _get_json(path: str, params: Optional[Dict[str, Any]], timeout: float, retri
     r.raise_for_status()
     return r.json()
 
+# Los listados también quedan en disco (``utils.catalog``): tras un reinicio, o si el warm-up
+# ya los precargó, se sirven sin volver a pedirlos.
+@st.cache_data(ttl=20)
+def _get_frame(path: str, params: Optional[Dict[str, Any]], timeout: float, retries: int) -> Optional[pd.DataFrame]:
+    """Listado como DataFrame con tipos compactos (None si la API no devolvió una lista)."""
+    return catalog.fetch_frame(path, params, timeout=timeout, retries=retries)
+
+def _show_frame(df: pd.DataFrame):
+    st.dataframe(df, use_container_width=True)
+    st.caption(f"{len(df):,} filas · {schema.frame_nbytes(df) / 1024:,.1f} KB en memoria")
+
+def _show_listing(path: str, params: Dict[str, Any]):
+    """Listado compacto; si la API no devolvió una lista, la respuesta como tabla o JSON."""
+    df = _get_frame(path, params, timeout, retries)
+    if df is not None:
+        _show_frame(df)
+        return
+    data = _get_json(path, params, timeout, retries)
+    try:
+        st.dataframe(pd.DataFrame(data), use_container_width=True)
+    except ValueError:  # ej. un objeto con escalares: no arma tabla
+        st.json(data)
+
 # ============================================================
 # Tabs: SKUs | Proveedores | Categorías
 tab_skus, tab_prov, tab_cat = st.tabs(["SKUs", "Proveedores", "Categorías"])
@@ -75,13 +103,14 @@ with tab_skus:
 
     if st.button("Refrescar listado"):
         st.cache_data.clear()
+        catalog.clear("/catalogo/skus")
 
     try:
-        data = _get_json("/catalogo/skus", {"limit": int(limit)}, timeout, retries)
-        if isinstance(data, list):
-            st.dataframe(pd.DataFrame(data), use_container_width=True)
+        df_skus = _get_frame("/catalogo/skus", {"limit": int(limit)}, timeout, retries)
+        if df_skus is not None:
+            _show_frame(df_skus)
         else:
-            st.write(data)
+            st.write(_get_json("/catalogo/skus", {"limit": int(limit)}, timeout, retries))
     except Exception as e:
         st.error(f"Fallo GET /catalogo/skus: {e}")
 
@@ -110,6 +139,17 @@ with tab_skus:
             nombre = st.text_input("nombre", value="Producto de prueba")
         submitted = st.form_submit_button("Crear SKU")
         if submitted:
+            # Aviso contra los datos de referencia, que pueden tener hasta ``REFDATA_REFRESH_S`` de
+            # antigüedad: un proveedor o categoría recién creado no aparece aún. Decide la API.
+            desconocidos = [
+                f"{campo} {int(valor)}"
+                for campo, tabla, valor in (("id_proveedor", "proveedores", id_proveedor),
+                                            ("id_categoria", "categorias", id_categoria))
+                if (ref := refdata.table(tabla, token)) is not None and valor not in ref
+            ]
+            if desconocidos:
+                st.warning(f"No aparecen en los datos de referencia: {', '.join(desconocidos)}. "
+                           "Se envía igual; si no existen, la API lo rechazará.")
             payload = {
                 "id_proveedor": int(id_proveedor),
                 "id_categoria": int(id_categoria),
@@ -125,6 +165,7 @@ with tab_skus:
                 if r.status_code >= 400:
                     st.error("Error al crear SKU. Revisa el detalle arriba.")
                 else:
+                    catalog.clear("/catalogo/skus")
                     st.success("SKU creado correctamente.")
             except Exception as e:
                 st.error(f"Fallo POST /catalogo/skus: {e}")
@@ -138,32 +179,15 @@ with tab_skus:
 
     archivo = st.file_uploader("CSV de SKUs", type=["csv"])
     chunk_size = st.number_input("chunk_size (tamaño buffer por transacción)", 1, 5000, 200, step=50)
+    # La carga corre en segundo plano (``utils.jobs``): la página vuelve al instante y el avance
+    # se sigue en "Trabajos", aunque se cambie de página.
     if archivo is not None and st.button("Enviar batch"):
-        try:
-            df = pd.read_csv(archivo, dtype={"sku": str})
-            # Normaliza NaN -> None
-            df = df.where(pd.notnull(df), None)
-            items: List[Dict[str, Any]] = []
-            for _, row in df.iterrows():
-                items.append({
-                    "id_proveedor": int(row["id_proveedor"]) if row["id_proveedor"] is not None else None,
-                    "id_categoria": int(row["id_categoria"]) if row["id_categoria"] is not None else None,
-                    "id_formato": int(row["id_formato"]) if row["id_formato"] not in (None, "", "nan") else None,
-                    "id_segmento": int(row["id_segmento"]) if row["id_segmento"] not in (None, "", "nan") else None,
-                    "sku": str(row["sku"]) if row["sku"] is not None else None,
-                    "nombre": row["nombre"] if row["nombre"] is not None else None,
-                })
-            r = api.post("/catalogo/skus/batch",
-                         json={"items": items, "chunk_size": int(chunk_size)},
-                         timeout=timeout, retries=retries,
-                         headers={"Content-Type": "application/json"})
-            _show_response(r)
-            if r.status_code >= 400:
-                st.error("Error en carga masiva.")
-            else:
-                st.success("Batch enviado. Revisa resultados.")
-        except Exception as e:
-            st.error(f"Fallo batch: {e}")
+        job_id = get_job_queue().submit(
+            "sku_batch", f"Carga masiva {archivo.name}",
+            {"chunk_size": int(chunk_size), "timeout": timeout, "retries": retries},
+            archivo.getvalue(), token=token,
+        )
+        st.success(f"Batch encolado (trabajo `{job_id}`). Sigue el avance en la página **Trabajos**.")
 
 # ============================================================
 # Proveedores
@@ -178,8 +202,7 @@ with tab_prov:
             params = {"limit": int(limit), "offset": int(offset), "orden": orden}
             if q.strip():
                 params["q"] = q.strip()
-            data = _get_json("/catalogo/proveedores", params, timeout, retries)
-            st.dataframe(pd.DataFrame(data), use_container_width=True)
+            _show_listing("/catalogo/proveedores", params)
         except Exception as e:
             st.error(f"Fallo GET proveedores: {e}")
 
@@ -213,8 +236,7 @@ with tab_cat:
                 params["q"] = q.strip()
             if macro_id.strip():
                 params["macro_id"] = int(macro_id.strip())
-            data = _get_json("/catalogo/categorias", params, timeout, retries)
-            st.dataframe(pd.DataFrame(data), use_container_width=True)
+            _show_listing("/catalogo/categorias", params)
         except Exception as e:
             st.error(f"Fallo GET categorías: {e}")
 
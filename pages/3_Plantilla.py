@@ -1,47 +1,42 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from utils import auth
+from utils import downsample, page, profiler
+from utils.kpi_engine import KPIEngine
+from utils.sales_store import SalesStore, demo_store
 
-st.set_page_config(page_title="Demo Dashboard", layout="wide")
+token = page.setup("Demo Dashboard", script=__file__)
 
-try:
-    token = auth.ensure_authenticated(show_controls_in_sidebar=True)
-except ValueError:
-    st.stop()  # el usuario no se autenticó; detenemos la app
+st.title("Catálogo – API Local")
+# -------- Datos (una vez por proceso, compartidos por las sesiones)
+@st.cache_resource
+def get_store() -> SalesStore:
+    return demo_store()
 
-st.sidebar.markdown(
-    """
-    <div style="text-align:center; margin-bottom:20px;">
-        <a href="https://yourwebsite.com" target="_blank">
-            <img src="https://chiper.cl/wp-content/uploads/2023/09/logo-chiper-1.svg" width="120">
-        </a>
-    </div>
-    """,
-    unsafe_allow_html=True
-)
+with profiler.stage("datos: store"):
+    store = get_store()
 
-st.title("Catálogo – API Local")
 # -------- Filtros
-
+# Se resuelven en el store: rango de fechas y categoría por índice, top N con argpartition.
 st.header("Filtros")
-fecha = st.date_input("Fecha")
-cat = st.selectbox("Categoría", ["Todas","A","B","C"])
+fecha = st.date_input("Fecha", value=store.dates, min_value=store.dates[0], max_value=store.dates[1])
+# Mientras se elige el rango, date_input devuelve solo la fecha de inicio.
+rango = tuple(fecha) if isinstance(fecha, (tuple, list)) else (fecha,)
+desde, hasta = (rango[0], rango[-1]) if rango else store.dates
+cat = st.selectbox("Categoría", ["Todas"] + store.categories)
 top_n = st.slider("Top N", 5, 50, 10)
 
-# -------- Datos de ejemplo
-np.random.seed(0)
-df_time = pd.DataFrame({
-    "fecha": pd.date_range("2025-01-01", periods=60, freq="D"),
-    "ventas": np.random.randint(80, 150, 60).cumsum(),
-    "costos": np.random.randint(50, 120, 60).cumsum()
-})
-df_share = pd.DataFrame({"categoria":["A","B","C"], "participacion":[0.4,0.35,0.25]})
-df_detalle = pd.DataFrame({"sku":[f"S{i:03d}" for i in range(1,51)], "ventas":np.random.randint(100, 2000, 50)})
+with profiler.stage("consultas", desde=desde, hasta=hasta, categoria=cat):
+    df_time = store.daily_series(desde, hasta, cat)
+    df_share = store.share(desde, hasta)
+    top_df = store.top_skus(top_n, desde, hasta, cat)
 
 # -------- KPIs
+# Totales y variación de los últimos 7 días contra los 7 anteriores, en una pasada por el rango.
+kpis = KPIEngine.from_frame(df_time, ["ventas", "costos"], window=7, period=7).snapshot()
+ventas = kpis["ventas"]
+variacion = f"{ventas['delta_pct']:+.1%} 7d" if pd.notna(ventas["delta_pct"]) else None
 c1, c2, c3 = st.columns(3)
-c1.metric("Ingresos", f"${df_time['ventas'].iloc[-1]:,.0f}", "+5%")
+c1.metric("Ingresos", f"${ventas['total']:,.0f}", variacion)
 c2.metric("Órdenes", "41.2K", "-1.2%")
 c3.metric("Ticket Prom.", "$301", "+2.1%")
 
@@ -51,7 +46,12 @@ st.divider()
 g1, g2 = st.columns([2,1])
 with g1:
     st.subheader("Ventas vs Costos")
-    st.line_chart(df_time.set_index("fecha")[["ventas","costos"]], use_container_width=True)
+    # ~1 punto por pixel del gráfico (2/3 del ancho): series largas no se mandan completas.
+    serie = downsample.chart_data(
+        df_time, key=("plantilla", "ventas_costos", str(desde), str(hasta), cat), columns=["ventas","costos"],
+        width_px=downsample.CHART_WIDTH_PX * 2 // 3,
+    )
+    st.line_chart(serie, use_container_width=True)
 with g2:
     st.subheader("Participación por categoría")
     st.bar_chart(df_share.set_index("categoria"), use_container_width=True)
@@ -62,7 +62,7 @@ st.divider()
 with st.expander("Top SKUs"):
     t1, t2 = st.tabs(["Tabla", "Distribución"])
     with t1:
-        top_df = df_detalle.sort_values("ventas", ascending=False).head(top_n)
         st.dataframe(top_df, use_container_width=True)
+        st.caption(f"Top {len(top_df)} de {store.n_skus:,} SKUs · {store.n_rows:,} filas SKU-día en el store.")
     with t2:
-        st.area_chart(top_df.set_index("sku"), use_container_width=True)
+        st.area_chart(top_df.set_index("sku")[["ventas"]], use_container_width=True)
@@ -1,271 +1,172 @@
 # app.py
 from __future__ import annotations
-from utils import auth
+from utils import exports, fragments, offload, page, report_data
+from utils.report_style import money_fmt, pct_fmt, style_report
+from utils.report_view import ReportView
+from utils.search_index import fold
 import streamlit as st
-import numpy as np
-import pandas as pd
 
 # ---------- Config básica ----------
-st.set_page_config(page_title="Reporte posicionamiento", layout="wide")
-try:
-    token = auth.ensure_authenticated(show_controls_in_sidebar=True)
-except ValueError:
-    st.stop()  # el usuario no se autenticó; detenemos la app
-
-st.sidebar.markdown(
-    """
-    <div style="text-align:center; margin-bottom:20px;">
-        <a href="https://yourwebsite.com" target="_blank">
-            <img src="https://chiper.cl/wp-content/uploads/2023/09/logo-chiper-1.svg" width="120">
-        </a>
-    </div>
-    """,
-    unsafe_allow_html=True
-)
-
-# ---------- Helpers de estilo ----------
-def pct_fmt(x: float) -> str:
-    if pd.isna(x):
-        return ""
-    return f"{x:.2%}"
-
-def money_fmt(x: float) -> str:
-    if pd.isna(x):
-        return ""
-    return f"$ {x:,.0f}"
-
-def semaforo_100(s: pd.Series) -> list[str]:
-    """
-    Colorea alrededor de 100%:
-    < 95% rojo; 95-100 ámbar; 100-105 verde claro; >105 verde.
-    """
-    styles = []
-    for v in s:
-        if pd.isna(v):
-            styles.append("")
-            continue
-        if v < 0.95:
-            styles.append("background-color:#f8d7da; color:#842029")
-        elif v < 1.00:
-            styles.append("background-color:#fff3cd; color:#664d03")
-        elif v <= 1.05:
-            styles.append("background-color:#d1e7dd; color:#0f5132")
-        else:
-            styles.append("background-color:#bfe5c5; color:#0b3e26")
-    return styles
-
-def heat_pv(s: pd.Series) -> list[str]:
-    """Degradado simple para PV: más alto, más intenso."""
-    if s.max() == 0:
-        return ["" for _ in s]
-    vals = (s - s.min()) / (s.max() - s.min() + 1e-9)
-    return [f"background: linear-gradient(90deg,#ffeaa7 {v*100:.0f}%, transparent {v*100:.0f}%);" for v in vals]
-
-# ---------- Data fake ----------
-rng = np.random.default_rng(123)
-
-MACROS = [
-    "abarrotes","aseo_y_limpieza","bebes","bebidas_no_alcoholicas","confites_y_snacks",
-    "despensa","farmacia_e_higiene_personal","ferreteria","galletas","mascotas","papeles"
-]
-
-MARCAS = [
-    "icb","carozzi","abarrotes","bebes","bebidas_no_alcoholicas","confites_y_snacks",
-    "despensa","galletas","mascotas","tresmontes","virutex_ilko","tucapel","ccu","colun",
-    "genomma","lucchetti","spl","electrolit","ambientes_limpios","novaceites"
-]
-
-def make_weighted_table(n_rows: int = len(MACROS)) -> pd.DataFrame:
-    pv = rng.random(n_rows)
-    pv = pv / pv.sum()  # suma 1
-    central = 0.98 + 0.08 * rng.random(n_rows)  # 98% a 106%
-    alvi = 0.95 + 0.12 * rng.random(n_rows)     # 95% a 107%
-    venta_neta = (5e6 + 90e6 * rng.random(n_rows)).round(0)
-    margen = 0.08 + 0.12 * rng.random(n_rows)   # 8% a 20%
-
-    df = pd.DataFrame({
-        "Macro / Categoría": MACROS[:n_rows],
-        "PV": pv,
-        "CENTRAL 1": central,
-        "ALVI 1": alvi,
-        "VENTA NETA": venta_neta,
-        "MARGEN": margen
-    })
-    df = df.sort_values("PV", ascending=False, ignore_index=True)
-    return df  # SIN total acá (lo calculamos después según filtro)
-
-def make_brand_table(n_rows: int = len(MARCAS)) -> pd.DataFrame:
-    pv = (rng.random(n_rows) * 0.03)  # marcas con PV pequeño
-    central = 1.00 + 0.12 * (rng.random(n_rows) - 0.5)  # ~ 94% a 106%
-    alvi = 1.00 + 0.16 * (rng.random(n_rows) - 0.5)     # ~ 92% a 108%
-    venta_neta = (2e5 + 2.0e7 * rng.random(n_rows)).round(0)
-    margen = 0.10 + 0.12 * rng.random(n_rows)
-
-    df = pd.DataFrame({
-        "Macro / Categoría": MARCAS[:n_rows],
-        "PV": pv,
-        "CENTRAL 1": central,
-        "ALVI 1": alvi,
-        "VENTA NETA": venta_neta,
-        "MARGEN": margen
-    }).sort_values("PV", ascending=False, ignore_index=True)
-    return df
-
-def with_total_row(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Agrega 'Grand Total' consistente con el DF actual (ya filtrado).
-    - PV: suma (si luego normalizamos, suma será 1).
-    - CENTRAL 1 / ALVI 1 / MARGEN: promedio simple (puedes cambiar a ponderado por PV si lo prefieres).
-    - VENTA NETA: suma.
-    """
-    if df.empty:
-        total = pd.DataFrame({
-            "Macro / Categoría": ["Grand Total"],
-            "PV": [0.0],
-            "CENTRAL 1": [np.nan],
-            "ALVI 1": [np.nan],
-            "VENTA NETA": [0.0],
-            "MARGEN": [np.nan],
-        })
-        return pd.concat([df, total], ignore_index=True)
-
-    total = pd.DataFrame({
-        "Macro / Categoría": ["Grand Total"],
-        "PV": [df["PV"].sum()],
-        "CENTRAL 1": [df["CENTRAL 1"].mean()],
-        "ALVI 1": [df["ALVI 1"].mean()],
-        "VENTA NETA": [df["VENTA NETA"].sum()],
-        "MARGEN": [df["MARGEN"].mean()],
-    })
-    return pd.concat([df, total], ignore_index=True)
-
-def normalize_pv(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Renormaliza PV para que la suma de las filas NO-total sea 1.0.
-    Mantiene 'Grand Total' actualizado después.
-    """
-    df_no_total = df[df["Macro / Categoría"] != "Grand Total"].copy()
-    s = df_no_total["PV"].sum()
-    if s > 0:
-        df_no_total["PV"] = df_no_total["PV"] / s
-    df_no_total = df_no_total.sort_values("PV", ascending=False, ignore_index=True)
-    return with_total_row(df_no_total)
+token = page.setup("Reporte posicionamiento", script=__file__)
 
 # ---------- Sidebar ----------
 st.sidebar.header("Período")
 periodo = st.sidebar.selectbox(
     "Selecciona un período",
-    ["01-09 al 21-09", "22-09 al 30-09", "01-10 al 21-10"],
+    report_data.PERIODOS,
     index=0
 )
-
-st.sidebar.header("Filtros")
-busqueda = st.sidebar.text_input("Buscar macro/categoría o marca", "")
-normalizar = st.sidebar.checkbox("Normalizar PV al 100% en el filtro", value=True)
+fragments.timings_toggle()
 
 # ---------- Header ----------
 st.title("Reporte posicionamiento")
 st.caption(f"PERÍODO: {periodo}")
 
 # ---------- Construcción base (sin total aún) ----------
-base_left = make_weighted_table()
-base_right = make_brand_table()
-
-# ---------- Aplicar filtro ANTES de KPIs ----------
-def apply_text_filter(df: pd.DataFrame, term: str) -> pd.DataFrame:
-    term = term.strip()
-    if term == "":
-        return df.copy()
-    mask = df["Macro / Categoría"].str.contains(term, case=False, na=False)
-    return df.loc[mask].copy()
-
-left_f = apply_text_filter(base_left, busqueda)
-right_f = apply_text_filter(base_right, busqueda)
-
-# Agregar total y normalizar si corresponde
-left_f = with_total_row(left_f)
-right_f = with_total_row(right_f)
-
-if normalizar:
-    left_f = normalize_pv(left_f)
-    right_f = normalize_pv(right_f)
-
-# ---------- KPIs con datos filtrados ----------
-pv_total = left_f.loc[left_f["Macro / Categoría"] == "Grand Total", "PV"].values[0]
-venta_total = left_f[left_f["Macro / Categoría"] != "Grand Total"]["VENTA NETA"].sum()
-margen_prom = left_f[left_f["Macro / Categoría"] != "Grand Total"]["MARGEN"].mean()
-
-kpi_cols = st.columns(4)
-with kpi_cols[0]:
-    st.metric("PV Total", f"{pv_total:.2%}")
-with kpi_cols[1]:
-    st.metric("VENTA NETA Total", money_fmt(venta_total))
-with kpi_cols[2]:
-    st.metric("MARGEN Prom.", pct_fmt(margen_prom))
-with kpi_cols[3]:
-    st.metric("Nº Marcas", f"{len(right_f[right_f['Macro / Categoría']!='Grand Total']):,}")
-
-st.divider()
-
-# ---------- Render: 2 columnas ----------
-c1, c2 = st.columns([1, 1], gap="large")
-
-with c1:
+# Sale del cache compartido: buscar o normalizar no vuelve a leer la fuente.
+with offload.placeholder(f"Calculando el reporte de {periodo}…", show=not report_data.is_cached(periodo)):
+    data = report_data.load_report(periodo)
+base_left = data.weighted
+base_right = data.brands
+
+
+# ---------- Fragmentos ----------
+# Cada bloque se vuelve a ejecutar solo cuando cambia un widget propio (o el del bloque
+# que lo contiene): filtrar no repite auth/sidebar/carga y cambiar el formato de descarga
+# no re-renderiza las tablas.
+@fragments.timed_fragment("KPIs")
+def render_kpis(left_view: ReportView, right_view: ReportView) -> None:
+    pv_total = left_view.grand_total["PV"]
+    venta_total = left_view.grand_total["VENTA NETA"]
+    margen_prom = left_view.grand_total["MARGEN"]
+
+    kpi_cols = st.columns(4)
+    with kpi_cols[0]:
+        st.metric("PV Total", f"{pv_total:.2%}")
+    with kpi_cols[1]:
+        st.metric("VENTA NETA Total", money_fmt(venta_total))
+    with kpi_cols[2]:
+        st.metric("MARGEN Prom.", pct_fmt(margen_prom))
+    with kpi_cols[3]:
+        st.metric("Nº Marcas", f"{right_view.n_rows:,}")
+
+
+def show_styled(df) -> None:
+    # Semáforo + degradado PV. El Styler recorre cada celda: con tablas grandes el HTML se
+    # arma en el pool de procesos y este hilo solo espera; las chicas siguen en el hilo.
+    if not offload.enabled(len(df)):
+        st.dataframe(style_report(df), use_container_width=True, height=520)
+        return
+    with offload.placeholder(f"Aplicando formato a {len(df):,} filas…"):
+        html = offload.render_styled(df)
+    st.markdown(f'<div style="height:520px; overflow:auto">{html}</div>', unsafe_allow_html=True)
+
+
+@fragments.timed_fragment("Tabla surtido")
+def render_left(view: ReportView) -> None:
     st.subheader("Posicionamiento — Detalle surtido")
-    df = left_f.copy()
-    sty = (
-        df.style
-          .format({"PV": pct_fmt, "CENTRAL 1": pct_fmt, "ALVI 1": pct_fmt,
-                   "VENTA NETA": money_fmt, "MARGEN": pct_fmt})
-          .apply(heat_pv, subset=["PV"])
-          .apply(semaforo_100, subset=["CENTRAL 1"])
-          .apply(semaforo_100, subset=["ALVI 1"])
-    )
-    st.dataframe(sty, use_container_width=True, height=520)
+    # Única materialización de la tabla: la reutilizan el render y la descarga (si se pide).
+    show_styled(view.materialize())
 
-with c2:
+
+@fragments.timed_fragment("Tabla proveedor")
+def render_right(view: ReportView) -> None:
     st.subheader("Posicionamiento — Detalle proveedor")
-    df2 = right_f.copy()
-    sty2 = (
-        df2.style
-           .format({"PV": pct_fmt, "CENTRAL 1": pct_fmt, "ALVI 1": pct_fmt,
-                    "VENTA NETA": money_fmt, "MARGEN": pct_fmt})
-           .apply(heat_pv, subset=["PV"])
-           .apply(semaforo_100, subset=["CENTRAL 1"])
-           .apply(semaforo_100, subset=["ALVI 1"])
-    )
-    st.dataframe(sty2, use_container_width=True, height=520)
+    show_styled(view.materialize())
 
-st.divider()
 
-# ---------- Descargas (consistentes con lo visible) ----------
-col_a, col_b = st.columns(2)
-with col_a:
-    st.download_button(
-        "Descargar tabla ponderado por venta (CSV)",
-        left_f.to_csv(index=False).encode("utf-8"),
-        file_name="posicionamiento_ponderado.csv",
-        mime="text/csv",
-        use_container_width=True,
-    )
-with col_b:
-    st.download_button(
-        "Descargar tabla por marca (CSV)",
-        right_f.to_csv(index=False).encode("utf-8"),
-        file_name="posicionamiento_marcas.csv",
-        mime="text/csv",
-        use_container_width=True,
+@fragments.timed_fragment("Descargas")
+def render_downloads(left_view: ReportView, right_view: ReportView, filtros: dict) -> None:
+    # El archivo se genera solo al hacer clic y queda en cache por versión de datos + filtros.
+    # Filas de la tabla más grande + 'Grand Total': XLSX se ofrece solo si caben.
+    n_rows = max(left_view.n_rows, right_view.n_rows) + 1
+    fmt = st.selectbox(
+        "Formato de descarga", exports.available_formats(n_rows),
+        format_func=lambda k: exports.FORMATS[k].label,
     )
+    col_a, col_b = st.columns(2)
+    with col_a:
+        st.download_button(
+            f"Descargar tabla ponderado por venta ({exports.FORMATS[fmt].label})",
+            exports.download_data(left_view.materialize, table="ponderado", version=data.version,
+                                  filters=filtros, fmt=fmt),
+            file_name=exports.file_name("posicionamiento_ponderado", fmt),
+            mime=exports.FORMATS[fmt].mime,
+            on_click="ignore",
+            use_container_width=True,
+        )
+    with col_b:
+        st.download_button(
+            f"Descargar tabla por marca ({exports.FORMATS[fmt].label})",
+            exports.download_data(right_view.materialize, table="marcas", version=data.version,
+                                  filters=filtros, fmt=fmt),
+            file_name=exports.file_name("posicionamiento_marcas", fmt),
+            mime=exports.FORMATS[fmt].mime,
+            on_click="ignore",
+            use_container_width=True,
+        )
+
+
+@fragments.timed_fragment("Reporte filtrado")
+def render_report() -> None:
+    # Los filtros viven dentro del fragmento (un fragmento no puede escribir en la sidebar):
+    # al cambiarlos se re-ejecuta solo este bloque y los anidados.
+    f1, f2, f3 = st.columns([2, 1, 1])
+    with f1:
+        busqueda = st.text_input("Buscar macro/categoría o marca", "")
+        aproximada = st.checkbox("Búsqueda aproximada", value=True,
+                                 help="Suma coincidencias con errores de tipeo o variantes (higiene ≈ higiénico). Sin marcar se busca solo el texto exacto.")
+    with f2:
+        normalizar = st.checkbox("Normalizar PV al 100% en el filtro", value=True)
+    with f3:
+        ponderado = st.checkbox("Grand Total ponderado por PV", value=False)
+
+    # ---------- Aplicar filtro ANTES de KPIs ----------
+    # Índice de trigramas armado una vez por carga: subcadena sin tildes más, si se deja
+    # marcada "aproximada", las coincidencias difusas.
+    mask_left = data.indexes["weighted"].mask(busqueda, fuzzy=aproximada)
+    mask_right = data.indexes["brands"].mask(busqueda, fuzzy=aproximada)
+
+    # Vistas sobre la base compartida: máscara + totales del cubo, sin copias.
+    # PV normalizado y 'Grand Total' se resuelven sin tocar las filas de detalle.
+    left_view = ReportView(base_left, data.cubes["weighted"], mask_left, normalize=normalizar, weighted=ponderado)
+    right_view = ReportView(base_right, data.cubes["brands"], mask_right, normalize=normalizar, weighted=ponderado)
+
+    render_kpis(left_view, right_view)
+    st.divider()
+
+    # ---------- Render: 2 columnas ----------
+    c1, c2 = st.columns([1, 1], gap="large")
+    with c1:
+        render_left(left_view)
+    with c2:
+        render_right(right_view)
+
+    st.divider()
+
+    # ---------- Descargas (consistentes con lo visible) ----------
+    filtros = {"periodo": periodo, "busqueda": fold(busqueda), "aproximada": aproximada,
+               "normalizar": normalizar, "ponderado": ponderado}
+    render_downloads(left_view, right_view, filtros)
+
+
+render_report()
+
+# ---------- Memoria ----------
+with st.expander("Memoria de tablas"):
+    # Tablas compartidas por las sesiones, con tipos compactos (utils.schema).
+    st.dataframe(data.memory_report(), hide_index=True, use_container_width=True)
 
 # ---------- Nota para futura API ----------
 with st.expander("Integración futura con API"):
     st.markdown(
         """
-        Cuando tengas el endpoint, reemplaza `make_weighted_table()` y `make_brand_table()` por la lectura real
-        y mantén estas columnas:  
+        Los datos salen de `utils.report_data`. Elige la fuente con `REPORT_SOURCE`
+        (`synthetic`, `file` o `api`) y mantén estas columnas:  
         **["Macro / Categoría","PV","CENTRAL 1","ALVI 1","VENTA NETA","MARGEN"]**.
 
-        Si prefieres **promedios ponderados por PV** en el Grand Total (CENTRAL/ALVI/MARGEN),
-        se puede ajustar fácilmente (lo dejé simple: promedio aritmético).
+        El Grand Total y los KPIs salen del cubo de agregados (`utils.report_cube`): por defecto
+        CENTRAL/ALVI/MARGEN son promedio aritmético; marca **"Grand Total ponderado por PV"**
+        sobre las tablas para usar promedios ponderados por PV.
         """
     )
@@ -1,289 +1,245 @@
 # app.py
 from __future__ import annotations
-from utils import auth
+from utils import exports, fragments, offload, page, report_data
+from utils.report_style import money_fmt, pct_fmt
 import streamlit as st
-import numpy as np
 import pandas as pd
-from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
+from utils.pivot_server import CHILDREN_COLUMN
+from utils.report_view import ReportView
+from utils.search_index import fold
 
 # ---------- Config básica ----------
-st.set_page_config(page_title="Reporte posicionamiento", layout="wide")
-try:
-    token = auth.ensure_authenticated(show_controls_in_sidebar=True)
-except ValueError:
-    st.stop()  # el usuario no se autenticó; detenemos la app
-
-st.sidebar.markdown(
-    """
-    <div style="text-align:center; margin-bottom:20px;">
-        <a href="https://yourwebsite.com" target="_blank">
-            <img src="https://chiper.cl/wp-content/uploads/2023/09/logo-chiper-1.svg" width="120">
-        </a>
-    </div>
-    """,
-    unsafe_allow_html=True
-)
-
-# ---------- Helpers de estilo ----------
-def pct_fmt(x: float) -> str:
-    if pd.isna(x):
-        return ""
-    return f"{x:.2%}"
-
-def money_fmt(x: float) -> str:
-    if pd.isna(x):
-        return ""
-    return f"$ {x:,.0f}"
-
-def semaforo_100(s: pd.Series) -> list[str]:
-    """
-    Colorea alrededor de 100%:
-    < 95% rojo; 95-100 ámbar; 100-105 verde claro; >105 verde.
-    """
-    styles = []
-    for v in s:
-        if pd.isna(v):
-            styles.append("")
-            continue
-        if v < 0.95:
-            styles.append("background-color:#f8d7da; color:#842029")
-        elif v < 1.00:
-            styles.append("background-color:#fff3cd; color:#664d03")
-        elif v <= 1.05:
-            styles.append("background-color:#d1e7dd; color:#0f5132")
-        else:
-            styles.append("background-color:#bfe5c5; color:#0b3e26")
-    return styles
-
-def heat_pv(s: pd.Series) -> list[str]:
-    """Degradado simple para PV: más alto, más intenso."""
-    if s.max() == 0:
-        return ["" for _ in s]
-    vals = (s - s.min()) / (s.max() - s.min() + 1e-9)
-    return [f"background: linear-gradient(90deg,#ffeaa7 {v*100:.0f}%, transparent {v*100:.0f}%);" for v in vals]
-
-# ---------- Data fake ----------
-rng = np.random.default_rng(123)
-
-MACROS = [
-    "abarrotes","aseo_y_limpieza","bebes","bebidas_no_alcoholicas","confites_y_snacks",
-    "despensa","farmacia_e_higiene_personal","ferreteria","galletas","mascotas","papeles"
-]
-
-MARCAS = [
-    "icb","carozzi","abarrotes","bebes","bebidas_no_alcoholicas","confites_y_snacks",
-    "despensa","galletas","mascotas","tresmontes","virutex_ilko","tucapel","ccu","colun",
-    "genomma","lucchetti","spl","electrolit","ambientes_limpios","novaceites"
-]
-
-def make_weighted_table(n_rows: int = len(MACROS)) -> pd.DataFrame:
-    pv = rng.random(n_rows)
-    pv = pv / pv.sum()  # suma 1
-    central = 0.98 + 0.08 * rng.random(n_rows)  # 98% a 106%
-    alvi = 0.95 + 0.12 * rng.random(n_rows)     # 95% a 107%
-    venta_neta = (5e6 + 90e6 * rng.random(n_rows)).round(0)
-    margen = 0.08 + 0.12 * rng.random(n_rows)   # 8% a 20%
-
-    df = pd.DataFrame({
-        "Macro / Categoría": MACROS[:n_rows],
-        "PV": pv,
-        "CENTRAL 1": central,
-        "ALVI 1": alvi,
-        "VENTA NETA": venta_neta,
-        "MARGEN": margen
-    })
-    df = df.sort_values("PV", ascending=False, ignore_index=True)
-
-    total_row = pd.DataFrame({
-        "Macro / Categoría": ["Grand Total"],
-        "PV": [df["PV"].sum()],
-        "CENTRAL 1": [df["CENTRAL 1"].mean()],
-        "ALVI 1": [df["ALVI 1"].mean()],
-        "VENTA NETA": [df["VENTA NETA"].sum()],
-        "MARGEN": [df["MARGEN"].mean()],
-    })
-    return pd.concat([df, total_row], ignore_index=True)
-
-def make_brand_table(n_rows: int = len(MARCAS)) -> pd.DataFrame:
-    pv = (rng.random(n_rows) * 0.03)  # marcas con PV pequeño
-    central = 1.00 + 0.12 * (rng.random(n_rows) - 0.5)  # ~ 94% a 106%
-    alvi = 1.00 + 0.16 * (rng.random(n_rows) - 0.5)     # ~ 92% a 108%
-    venta_neta = (2e5 + 2.0e7 * rng.random(n_rows)).round(0)
-    margen = 0.10 + 0.12 * rng.random(n_rows)
-
-    df = pd.DataFrame({
-        "Macro / Categoría": MARCAS[:n_rows],
-        "PV": pv,
-        "CENTRAL 1": central,
-        "ALVI 1": alvi,
-        "VENTA NETA": venta_neta,
-        "MARGEN": margen
-    }).sort_values("PV", ascending=False, ignore_index=True)
-    return df
-
-# --- Data fake a nivel Macro/Categoría para tabla dinámica ---
-CATEGORIAS = {
-    "abarrotes": ["arroz","aceite","fideos"],
-    "aseo_y_limpieza": ["detergente","cloro","suavizante"],
-    "bebes": ["pañales","toallitas"],
-    "bebidas_no_alcoholicas": ["gaseosas","jugos","agua"],
-    "confites_y_snacks": ["chocolates","snacks_salados"],
-    "despensa": ["salsas","conservas"],
-    "farmacia_e_higiene_personal": ["analgésicos","jabones"],
-    "ferreteria": ["pinturas","herramientas"],
-    "galletas": ["dulces","saladas"],
-    "mascotas": ["alimento_perro","alimento_gato"],
-    "papeles": ["higiénico","toalla"]
-}
-def make_detail_table(seed: int = 999) -> pd.DataFrame:
-    r = np.random.default_rng(seed)
-    rows = []
-    for macro, cats in CATEGORIAS.items():
-        for cat in cats:
-            pv = r.uniform(0.001, 0.05)
-            central = r.uniform(0.92, 1.08)
-            alvi = r.uniform(0.92, 1.10)
-            venta_neta = float(r.integers(80_000, 40_000_000))
-            margen = r.uniform(0.07, 0.22)
-            rows.append([macro, cat, pv, central, alvi, venta_neta, margen])
-    df = pd.DataFrame(rows, columns=[
-        "Macro","Categoría","PV","CENTRAL 1","ALVI 1","VENTA NETA","MARGEN"
-    ])
-    return df
+token = page.setup("Reporte posicionamiento", script=__file__)
 
 # ---------- Sidebar ----------
 st.sidebar.header("Período")
 periodo = st.sidebar.selectbox(
     "Selecciona un período",
-    ["01-09 al 21-09", "22-09 al 30-09", "01-10 al 21-10"],
+    report_data.PERIODOS,
     index=0
 )
-
-st.sidebar.header("Filtros")
-busqueda = st.sidebar.text_input("Buscar macro/categoría o marca", "")
+fragments.timings_toggle()
 
 # ---------- Header ----------
 st.title("Reporte posicionamiento")
 st.caption(f"PERÍODO: {periodo}")
 
 # ---------- KPIs ----------
-left_table = make_weighted_table()
-right_table = make_brand_table()
-
-kpi_cols = st.columns(4)
-with kpi_cols[0]:
-    st.metric("PV Total", f"{left_table.loc[left_table['Macro / Categoría']=='Grand Total','PV'].values[0]:.2%}")
-with kpi_cols[1]:
-    st.metric("VENTA NETA Total", money_fmt(left_table["VENTA NETA"].iloc[:-1].sum()))
-with kpi_cols[2]:
-    st.metric("MARGEN Prom.", pct_fmt(left_table["MARGEN"].iloc[:-1].mean()))
-with kpi_cols[3]:
-    st.metric("Nº Marcas", f"{len(right_table):,}")
+# Sale del cache compartido: buscar no vuelve a leer la fuente.
+with offload.placeholder(f"Calculando el reporte de {periodo}…", show=not report_data.is_cached(periodo)):
+    data = report_data.load_report(periodo)
+# 'Grand Total' (PV y VENTA NETA suma; CENTRAL/ALVI/MARGEN promedio simple) sale del cubo.
+left_view = ReportView(data.weighted, data.cubes["weighted"])
+right_view = ReportView(data.brands, data.cubes["brands"])
+
+
+# Los KPIs no dependen de la búsqueda: quedan fuera del fragmento de filtros y solo se
+# recalculan en un rerun completo (cambio de período).
+@fragments.timed_fragment("KPIs")
+def render_kpis(left_view: ReportView, right_view: ReportView) -> None:
+    kpi_cols = st.columns(4)
+    with kpi_cols[0]:
+        st.metric("PV Total", f"{left_view.grand_total['PV']:.2%}")
+    with kpi_cols[1]:
+        st.metric("VENTA NETA Total", money_fmt(left_view.grand_total["VENTA NETA"]))
+    with kpi_cols[2]:
+        st.metric("MARGEN Prom.", pct_fmt(left_view.grand_total["MARGEN"]))
+    with kpi_cols[3]:
+        st.metric("Nº Marcas", f"{right_view.n_rows:,}")
+
+
+render_kpis(left_view, right_view)
 
 st.divider()
 
-# ---------- Filtros de texto ----------
-if busqueda.strip():
-    mask_left = left_table["Macro / Categoría"].str.contains(busqueda, case=False, na=False)
-    mask_right = right_table["Macro / Categoría"].str.contains(busqueda, case=False, na=False)
-    left_table = left_table[mask_left | (left_table["Macro / Categoría"]=="Grand Total")]
-    right_table = right_table[mask_right]
-
-
 
 # ---------- Tabla dinámica (AgGrid): Macro → Categoría ----------
-st.subheader("Tabla dinámica — Macro y Categoría")
-
-detail_df = make_detail_table()
-
-# Filtro de texto opcional sobre la tabla dinámica
-if busqueda.strip():
-    m = (
-        detail_df["Macro"].str.contains(busqueda, case=False, na=False) |
-        detail_df["Categoría"].str.contains(busqueda, case=False, na=False)
+METRIC_VIEW_COLS = ["PV %","CENTRAL 1 %","ALVI 1 %","VENTA NETA $","MARGEN %"]
+
+def to_view(df: pd.DataFrame, label_cols: list[str], extra_cols: list[str] = ()) -> pd.DataFrame:
+    """Versión con columnas derivadas amigables para visualizar."""
+    return df.assign(
+        **{
+            "PV %": (df["PV"]*100).round(2),
+            "CENTRAL 1 %": (df["CENTRAL 1"]*100).round(2),
+            "ALVI 1 %": (df["ALVI 1"]*100).round(2),
+            "VENTA NETA $": df["VENTA NETA"].round(0).astype("int64"),
+            "MARGEN %": (df["MARGEN"]*100).round(2),
+        }
+    )[list(label_cols) + METRIC_VIEW_COLS + list(extra_cols)]
+
+
+@fragments.timed_fragment("Tabla dinámica")
+def render_pivot(busqueda: str, aproximada: bool) -> None:
+    # Modo, macros abiertas y orden solo re-ejecutan este fragmento.
+    # st_aggrid se importa acá: los KPIs de arriba se dibujan sin esperarlo.
+    from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
+
+    st.subheader("Tabla dinámica — Macro y Categoría")
+    modo_pivot = st.radio(
+        "Modo tabla dinámica",
+        ["Servidor (por nivel)", "Cliente (AgGrid completo)"],
+        horizontal=True,
+        help="En modo servidor se filtra, agrupa, agrega y ordena en Python y solo se envía el nivel abierto.",
     )
-    detail_df = detail_df[m]
-
-# Versión con columnas derivadas amigables para visualizar
-detail_view = detail_df.assign(
-    **{
-        "PV %": (detail_df["PV"]*100).round(2),
-        "CENTRAL 1 %": (detail_df["CENTRAL 1"]*100).round(2),
-        "ALVI 1 %": (detail_df["ALVI 1"]*100).round(2),
-        "VENTA NETA $": detail_df["VENTA NETA"].round(0).astype("int64"),
-        "MARGEN %": (detail_df["MARGEN"]*100).round(2),
-    }
-)[["Macro","Categoría","PV %","CENTRAL 1 %","ALVI 1 %","VENTA NETA $","MARGEN %"]]
-
-gb = GridOptionsBuilder.from_dataframe(detail_view)
-gb.configure_default_column(
-    resizable=True, sortable=True, filter=True, enablePivot=True,
-    aggFunc="sum", editable=False
-)
-
-# Agrupar y sub-agrupar por defecto
-gb.configure_column("Macro", rowGroup=True)
-gb.configure_column("Categoría", rowGroup=True)
-
-# Columnas de valores y funciones de agregación
-gb.configure_column("PV %", type=["numericColumn"], aggFunc="sum")
-gb.configure_column("CENTRAL 1 %", type=["numericColumn"], aggFunc="avg")
-gb.configure_column("ALVI 1 %", type=["numericColumn"], aggFunc="avg")
-gb.configure_column("VENTA NETA $", type=["numericColumn"], aggFunc="sum",
-                    valueFormatter="x.toLocaleString()")
-gb.configure_column("MARGEN %", type=["numericColumn"], aggFunc="avg")
-
-grid_options = gb.build()
-grid_options.update({
-    "animateRows": True,
-    "groupDisplayType": "groupRows",
-    "autoGroupColumnDef": {"headerName": "Macro / Categoría", "minWidth": 280},
-    "rowGroupPanelShow": "always",   # panel para arrastrar columnas y agrupar
-    "pivotPanelShow": "always",      # panel para pivot
-})
-
-AgGrid(
-    detail_view,
-    gridOptions=grid_options,
-    update_mode=GridUpdateMode.NO_UPDATE,
-    allow_unsafe_jscode=True,
-    height=520,
-    fit_columns_on_grid_load=True,
-    enable_enterprise_modules=True,  # requerido para pivot/rowGroup
-)
-st.caption("Arrastra columnas al panel superior para agrupar o pivotar. Cambia la agregación desde el menú de cada columna.")
 
-st.divider()
-
-# ---------- Descargas ----------
-col_a, col_b = st.columns(2)
-with col_a:
-    st.download_button(
-        "Descargar tabla ponderado por venta (CSV)",
-        left_table.to_csv(index=False).encode("utf-8"),
-        file_name="posicionamiento_ponderado.csv",
-        mime="text/csv",
-        use_container_width=True,
-    )
-with col_b:
-    st.download_button(
-        "Descargar tabla por marca (CSV)",
-        right_table.to_csv(index=False).encode("utf-8"),
-        file_name="posicionamiento_marcas.csv",
-        mime="text/csv",
-        use_container_width=True,
+    if modo_pivot.startswith("Servidor"):
+        # Solo viajan al navegador los niveles abiertos; los agregados quedan en cache por camino de grupos.
+        pivot = data.pivot("detail")
+        macros = pivot.options((), term=busqueda, fuzzy=aproximada)
+        cs1, cs2, cs3 = st.columns([2, 2, 1])
+        with cs1:
+            # Grupos abiertos en session_state: sobreviven a cambios de búsqueda que los ocultan.
+            abiertos = st.session_state.setdefault("pivot_abiertos", [])
+            elegidos = st.multiselect("Abrir macros", macros, default=[m for m in abiertos if m in macros])
+            st.session_state["pivot_abiertos"] = [m for m in abiertos if m not in macros] + elegidos
+        with cs2:
+            orden = st.selectbox("Ordenar por", ["PV","CENTRAL 1","ALVI 1","VENTA NETA","MARGEN"])
+        with cs3:
+            desc = st.checkbox("Descendente", value=True)
+
+        tree_df = pivot.tree([(m,) for m in elegidos], term=busqueda, fuzzy=aproximada,
+                             sort_by=orden, ascending=not desc)
+        tree_df[pivot.group_cols] = tree_df[pivot.group_cols].fillna("")
+        tree_view = to_view(tree_df, pivot.group_cols, [CHILDREN_COLUMN])
+
+        gb = GridOptionsBuilder.from_dataframe(tree_view)
+        # Orden y filtro los resuelve el servidor: la grilla solo muestra los niveles abiertos.
+        gb.configure_default_column(resizable=True, sortable=False, filter=False, editable=False)
+        gb.configure_column("VENTA NETA $", type=["numericColumn"], valueFormatter="x.toLocaleString()")
+        AgGrid(
+            tree_view,
+            gridOptions=gb.build(),
+            update_mode=GridUpdateMode.NO_UPDATE,
+            height=520,
+            fit_columns_on_grid_load=True,
+        )
+        st.caption(
+            f"Macros abiertas: {', '.join(elegidos) or 'ninguna'} · {len(tree_view):,} filas enviadas. "
+            "PV y VENTA NETA suman; CENTRAL 1, ALVI 1 y MARGEN son promedio simple."
+        )
+    else:
+        detail_df = data.detail
+
+        # Filtro de texto opcional sobre la tabla dinámica
+        if busqueda.strip():
+            detail_df = detail_df[data.indexes["detail"].mask(busqueda, fuzzy=aproximada)]
+
+        detail_view = to_view(detail_df, ["Macro","Categoría"])
+
+        gb = GridOptionsBuilder.from_dataframe(detail_view)
+        gb.configure_default_column(
+            resizable=True, sortable=True, filter=True, enablePivot=True,
+            aggFunc="sum", editable=False
+        )
+
+        # Agrupar y sub-agrupar por defecto
+        gb.configure_column("Macro", rowGroup=True)
+        gb.configure_column("Categoría", rowGroup=True)
+
+        # Columnas de valores y funciones de agregación
+        gb.configure_column("PV %", type=["numericColumn"], aggFunc="sum")
+        gb.configure_column("CENTRAL 1 %", type=["numericColumn"], aggFunc="avg")
+        gb.configure_column("ALVI 1 %", type=["numericColumn"], aggFunc="avg")
+        gb.configure_column("VENTA NETA $", type=["numericColumn"], aggFunc="sum",
+                            valueFormatter="x.toLocaleString()")
+        gb.configure_column("MARGEN %", type=["numericColumn"], aggFunc="avg")
+
+        grid_options = gb.build()
+        grid_options.update({
+            "animateRows": True,
+            "groupDisplayType": "groupRows",
+            "autoGroupColumnDef": {"headerName": "Macro / Categoría", "minWidth": 280},
+            "rowGroupPanelShow": "always",   # panel para arrastrar columnas y agrupar
+            "pivotPanelShow": "always",      # panel para pivot
+        })
+
+        AgGrid(
+            detail_view,
+            gridOptions=grid_options,
+            update_mode=GridUpdateMode.NO_UPDATE,
+            allow_unsafe_jscode=True,
+            height=520,
+            fit_columns_on_grid_load=True,
+            enable_enterprise_modules=True,  # requerido para pivot/rowGroup
+        )
+        st.caption("Arrastra columnas al panel superior para agrupar o pivotar. Cambia la agregación desde el menú de cada columna.")
+
+
+@fragments.timed_fragment("Descargas")
+def render_downloads(left_view: ReportView, right_view: ReportView, filtros: dict) -> None:
+    # El archivo se genera solo al hacer clic y queda en cache por versión de datos + filtros.
+    # Filas de la tabla más grande + 'Grand Total': XLSX se ofrece solo si caben.
+    n_rows = max(left_view.n_rows, right_view.n_rows) + 1
+    fmt = st.selectbox(
+        "Formato de descarga", exports.available_formats(n_rows),
+        format_func=lambda k: exports.FORMATS[k].label,
     )
+    col_a, col_b = st.columns(2)
+    with col_a:
+        st.download_button(
+            f"Descargar tabla ponderado por venta ({exports.FORMATS[fmt].label})",
+            exports.download_data(left_view.materialize, table="ponderado", version=data.version,
+                                  filters=filtros, fmt=fmt),
+            file_name=exports.file_name("posicionamiento_ponderado", fmt),
+            mime=exports.FORMATS[fmt].mime,
+            on_click="ignore",
+            use_container_width=True,
+        )
+    with col_b:
+        st.download_button(
+            f"Descargar tabla por marca ({exports.FORMATS[fmt].label})",
+            exports.download_data(right_view.materialize, table="marcas", version=data.version,
+                                  filters=filtros, fmt=fmt),
+            file_name=exports.file_name("posicionamiento_marcas", fmt),
+            mime=exports.FORMATS[fmt].mime,
+            on_click="ignore",
+            use_container_width=True,
+        )
+
+
+@fragments.timed_fragment("Búsqueda")
+def render_filtered(left_view: ReportView, right_view: ReportView) -> None:
+    # La búsqueda vive dentro del fragmento (un fragmento no puede escribir en la sidebar):
+    # al escribir se re-ejecutan la tabla dinámica y las descargas, no los KPIs.
+    busqueda = st.text_input("Buscar macro/categoría o marca", "")
+    aproximada = st.checkbox("Búsqueda aproximada", value=True,
+                             help="Suma coincidencias con errores de tipeo o variantes (higiene ≈ higiénico). Sin marcar se busca solo el texto exacto.")
+
+    # ---------- Filtros de texto ----------
+    # Índice de trigramas armado una vez por carga: subcadena sin tildes más, si se deja
+    # marcada "aproximada", las coincidencias difusas.
+    if busqueda.strip():
+        mask_left = data.indexes["weighted"].mask(busqueda, fuzzy=aproximada)
+        mask_right = data.indexes["brands"].mask(busqueda, fuzzy=aproximada)
+        # 'Grand Total' lo agrega la vista al materializar, sobre las filas visibles.
+        left_view = ReportView(data.weighted, data.cubes["weighted"], mask_left)
+        right_view = ReportView(data.brands, data.cubes["brands"], mask_right)
+
+    render_pivot(busqueda, aproximada)
+    st.divider()
+
+    # ---------- Descargas ----------
+    render_downloads(left_view, right_view, {"periodo": periodo, "busqueda": fold(busqueda), "aproximada": aproximada})
+
+
+render_filtered(left_view, right_view)
+
+# ---------- Memoria ----------
+with st.expander("Memoria de tablas"):
+    # Tablas compartidas por las sesiones, con tipos compactos (utils.schema).
+    st.dataframe(data.memory_report(), hide_index=True, use_container_width=True)
 
 # ---------- Nota para futura API ----------
 with st.expander("Integración futura con API"):
     st.markdown(
         """
-        Cuando tengas el endpoint, reemplaza las funciones `make_weighted_table()`,
-        `make_brand_table()` y `make_detail_table()` por lecturas tipo:
+        Los datos salen de `utils.report_data`. Elige la fuente con `REPORT_SOURCE`
+        (`synthetic`, `file` o `api`); `ApiProvider` lee tipo:
 
         ```python
-        import requests
-        df = pd.DataFrame(requests.get(URL).json())
+        r = api_client.get("/reportes/posicionamiento/ponderado", params={"periodo": periodo})
+        df = pd.DataFrame(r.json())
         ```
 
         Mantén los mismos nombres de columnas:
@@ -0,0 +1,82 @@
+import time
+
+import pandas as pd
+import streamlit as st
+
+from utils import api_limits, fragments, offload, page, report_data, warmup
+from utils.disk_cache import DISK
+from utils.reference_data import get_reference_data
+
+token = page.setup("Estado de caches", script=__file__)
+
+st.title("Estado de caches")
+st.caption(
+    "Warm-up del proceso (``utils.warmup``) y caches compartidos por todas las sesiones. "
+    "Se actualiza solo cada pocos segundos."
+)
+
+
+def _mb(n: float) -> str:
+    return f"{n / 2**20:,.1f} MB" if n >= 2**20 else f"{n / 1024:,.1f} KB"
+
+
+@fragments.timed_fragment("Estado", run_every=3)
+def render_estado() -> None:
+    # ---------- Warm-up ----------
+    st.subheader("Warm-up")
+    warmer = warmup.get_warmer()
+    if warmer is None:
+        st.info("Warm-up deshabilitado (WARMUP_ENABLED=0).")
+    else:
+        done, total = warmer.progress()
+        st.progress(done / total if total else 1.0, text=f"{done} de {total} tareas precargadas")
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Caches listos", "sí" if warmer.ready else "no")
+        c2.metric("Rondas", warmer.rounds)
+        proxima = f"en {max(0, warmer.next_round_at - time.time()):,.0f} s" if warmer.next_round_at else "—"
+        c3.metric("Próximo refresco", proxima)
+        st.dataframe(pd.DataFrame(warmer.status()), hide_index=True, use_container_width=True)
+
+    # ---------- Caches ----------
+    st.subheader("Caches")
+    mem = report_data.cache_stats()
+    disk = DISK.stats()
+    ref = get_reference_data().summary()
+    st.dataframe(
+        pd.DataFrame([
+            {"Cache": "Reportes (memoria)", "Entradas": mem["entries"], "Uso": _mb(mem["bytes"]),
+             "Tope": _mb(mem["max_bytes"]), "Aciertos": mem["hits"], "Fallos": mem["misses"]},
+            {"Cache": "Disco (reportes y listados)", "Entradas": disk["entries"], "Uso": _mb(disk["bytes"]),
+             "Tope": _mb(disk["max_bytes"]), "Aciertos": disk["hits"], "Fallos": disk["misses"]},
+            {"Cache": "Datos de referencia", "Entradas": ref["tables"], "Uso": _mb(ref["bytes"]),
+             "Tope": _mb(ref["max_bytes"]), "Aciertos": ref["hits"], "Fallos": ref["misses"]},
+        ]),
+        hide_index=True,
+        use_container_width=True,
+    )
+    st.dataframe(get_reference_data().stats(), hide_index=True, use_container_width=True)
+
+    # ---------- Pool de procesos ----------
+    st.subheader("Pool de procesos")
+    pool = offload.stats()
+    if not pool["workers"]:
+        st.info("Pool deshabilitado (OFFLOAD_WORKERS=0): las etapas pesadas corren en la sesión.")
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Procesos", int(pool["workers"]))
+    c2.metric("Tareas en el pool", int(pool["pool"]), help=f"{int(pool['errors'])} con error")
+    c3.metric("En la sesión", int(pool["inline"]), help=f"menos de {int(pool['min_rows']):,} filas o pool deshabilitado")
+    c4.metric("Transferido", _mb(pool["shared_bytes"]), help="Arrow IPC por memoria compartida")
+
+    # ---------- API ----------
+    st.subheader("API: límites por endpoint")
+    if not api_limits.API_ADAPTIVE:
+        st.info("Control adaptativo deshabilitado (API_ADAPTIVE=0): los requests salen sin límite.")
+    else:
+        limites = api_limits.stats()
+        if limites.empty:
+            st.caption("Todavía no hay requests a la API en este proceso.")
+        else:
+            st.dataframe(limites, hide_index=True, use_container_width=True)
+
+
+render_estado()
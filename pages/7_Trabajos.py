@@ -0,0 +1,92 @@
+import time
+
+import pandas as pd
+import streamlit as st
+
+from utils import fragments, jobs, page
+
+token = page.setup("Trabajos", script=__file__)
+
+st.title("Trabajos en segundo plano")
+st.caption(
+    "Cargas masivas encoladas desde la página de catálogo (``utils.jobs``). Siguen corriendo "
+    "aunque cambies de página. Solo ves los trabajos encolados con tu login. Se actualiza sola "
+    "cada pocos segundos."
+)
+
+queue = jobs.get_job_queue()
+owner = jobs.owner_of(token)
+
+
+def _fmt_time(ts: float) -> str:
+    return time.strftime("%H:%M:%S", time.localtime(ts)) if ts and not pd.isna(ts) else "—"
+
+
+@fragments.timed_fragment("Trabajos", run_every=2)
+def render_trabajos() -> None:
+    listado = queue.store.jobs(owner=owner)
+    if listado.empty:
+        st.info("Todavía no hay trabajos. Sube un CSV en Catálogo API → SKUs → Carga masiva.")
+        return
+
+    now = time.time()
+    corriendo = int((listado["status"] == jobs.RUNNING).sum())
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Corriendo", corriendo, help=f"hasta {queue.workers} a la vez")
+    c2.metric("En cola", int((listado["status"] == jobs.QUEUED).sum()))
+    c3.metric("Terminados", int(listado["status"].isin(jobs.FINISHED).sum()))
+
+    rows = listado.to_dict("records")
+    st.dataframe(
+        pd.DataFrame([
+            {
+                "Trabajo": j["id"],
+                "Descripción": j["label"],
+                "Estado": j["status"],
+                "Avance": (j["done"] + j["failed"]) / j["total"] if j["total"] else 0.0,
+                "Filas ok": j["done"],
+                "Filas con error": j["failed"],
+                "Filas/s": round(jobs.throughput(j, now), 1),
+                "Creado": _fmt_time(j["created_at"]),
+                "Error": j["error"],
+            }
+            for j in rows
+        ]),
+        column_config={"Avance": st.column_config.ProgressColumn("Avance", min_value=0.0, max_value=1.0)},
+        hide_index=True,
+        use_container_width=True,
+    )
+
+    # ---------- Detalle ----------
+    ids = [j["id"] for j in rows]
+    job_id = st.selectbox("Detalle del trabajo", ids, format_func=lambda i: f"{i} · {listado.set_index('id').at[i, 'label']}")
+    job = queue.store.get(job_id)
+    if job is None or job["owner"] != owner:
+        return
+    hechas = job["done"] + job["failed"]
+    st.progress(hechas / job["total"] if job["total"] else 0.0,
+                text=f"{hechas:,} de {job['total']:,} filas · {job['status']} · {jobs.throughput(job, now):,.1f} filas/s")
+    b1, b2 = st.columns(2)
+    if job["status"] in (jobs.QUEUED, jobs.RUNNING) and b1.button("Cancelar", key=f"cancel-{job_id}"):
+        if queue.cancel(job_id, token):
+            st.toast("Cancelación pedida: se detiene al terminar el chunk en curso.")
+        else:
+            st.toast("No se pudo cancelar: ya terminó o corre en otro proceso del servidor.")
+    if job["status"] in (jobs.PARTIAL, jobs.FAILED, jobs.CANCELLED, jobs.INTERRUPTED) and b2.button(
+        "Reanudar (solo chunks pendientes o con error)", key=f"resume-{job_id}"
+    ):
+        if queue.resume(job_id, token):
+            st.toast("Trabajo encolado de nuevo.")
+
+    chunks = queue.store.chunks(job_id)
+    if not chunks.empty:
+        chunks = chunks.assign(
+            ok=chunks["ok"].astype(bool),
+            ms=chunks["ms"].round(1),
+            finished_at=chunks["finished_at"].map(_fmt_time),
+        ).rename(columns={"idx": "Chunk", "rows": "Filas", "ok": "OK", "http_status": "HTTP",
+                          "ms": "ms", "detail": "Respuesta", "finished_at": "Hora"})
+        st.dataframe(chunks, hide_index=True, use_container_width=True)
+
+
+render_trabajos()
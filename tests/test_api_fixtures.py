@@ -0,0 +1,46 @@
+import pytest
+import requests
+
+from benchmarks.stub_api import StubAPI
+from utils import api_client, api_fixtures
+
+CALLS = [
+    ("/catalogo/skus", {"limit": 5, "offset": 0}),
+    ("/catalogo/skus", {"limit": 5, "offset": 5}),
+    ("/catalogo/proveedores", None),
+    ("/reportes/posicionamiento/ponderado", {"periodo": "P01"}),
+]
+
+
+def _run(headers):
+    out = []
+    for path, params in CALLS:
+        resp = api_client.get(path, params=params, headers=headers)
+        out.append((resp.status_code, resp.headers.get("Content-Type"), resp.content))
+    return out
+
+
+def test_record_then_replay_without_network(tmp_path, monkeypatch):
+    monkeypatch.setattr(api_fixtures, "_STORE", api_fixtures.FixtureStore(str(tmp_path / "fx.sqlite3")))
+    monkeypatch.setattr(api_fixtures, "API_REPLAY_SPEED", 0.0)
+
+    monkeypatch.setattr(api_fixtures, "API_FIXTURES", "record")
+    with StubAPI(rows=50) as stub:
+        monkeypatch.setattr(api_client, "API_BASE_URL", stub.url)
+        login = api_client.post("/auth/login", json={"email": "a@b.c", "password": "x"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        recorded = _run(headers)
+    assert all(status == 200 for status, _, _ in recorded)
+
+    # Sin red: el servidor ya no existe y cualquier request real falla.
+    def offline(*args, **kwargs):
+        raise AssertionError("request a la red en modo replay")
+
+    monkeypatch.setattr(requests, "request", offline)
+    monkeypatch.setattr(api_fixtures, "API_FIXTURES", "replay")
+    replayed_login = api_client.post("/auth/login", json={"email": "a@b.c", "password": "x"})
+    assert replayed_login.json() == login.json()
+    assert _run({"Authorization": "Bearer otro-usuario"}) == recorded  # el token no es parte de la clave
+
+    with pytest.raises(api_fixtures.FixtureMissing, match="/catalogo/skus\\?limit=5&offset=10"):
+        api_client.get("/catalogo/skus", params={"limit": 5, "offset": 10})
@@ -0,0 +1,85 @@
+import pytest
+import requests
+
+from utils import api_client, api_limits
+
+
+def _response(status, retry_after=None):
+    resp = requests.Response()
+    resp.status_code = status
+    if retry_after is not None:
+        resp.headers["Retry-After"] = str(retry_after)
+    return resp
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """``_send`` falso: responde la lista de status en orden y anota el timeout de cada intento."""
+    calls, sleeps, replies = [], [], []
+
+    def send(method, path, url, *, params, json, data, headers, timeout):
+        calls.append(timeout)
+        return replies.pop(0)
+
+    monkeypatch.setattr(api_client, "_send", send)
+    monkeypatch.setattr(api_client.time, "sleep", sleeps.append)
+    api_limits.reset()
+    yield calls, sleeps, replies
+    api_limits.reset()
+
+
+def test_get_retries_429_within_timeout(backend):
+    calls, sleeps, replies = backend
+    replies += [_response(429, retry_after=2), _response(200)]
+    resp = api_client.get("/catalogo/skus", timeout=5, retries=1)
+    assert resp.status_code == 200
+    assert sleeps == [2.0]
+    assert len(calls) == 2
+    assert calls[1] <= 3.0  # la espera del Retry-After se descuenta del timeout
+
+
+def test_get_does_not_wait_past_timeout(backend):
+    calls, sleeps, replies = backend
+    replies += [_response(503, retry_after=10)]
+    resp = api_client.get("/catalogo/skus", timeout=5, retries=1)
+    assert resp.status_code == 503
+    assert sleeps == [] and len(calls) == 1
+
+
+def test_post_is_not_resent_on_429(backend):
+    calls, sleeps, replies = backend
+    replies += [_response(429, retry_after=0)]
+    resp = api_client.post("/catalogo/skus/batch", json={"items": []}, timeout=5, retries=2)
+    assert resp.status_code == 429
+    assert len(calls) == 1 and sleeps == []
+
+
+def test_retry_after_pauses_only_that_caller():
+    limiter = api_limits.EndpointLimiter("GET /x", initial=8)
+    limiter.acquire(1.0, caller="a")
+    limiter.release(latency_ms=10.0, status=429, retry_after=5.0, caller="a")
+
+    limiter.acquire(0.05, caller="b")  # otra sesión sale sin esperar
+    limiter.release(latency_ms=10.0, caller="b")
+    with pytest.raises(api_limits.Throttled):
+        limiter.acquire(0.05, caller="a")
+    assert limiter.snapshot()["Sesiones en pausa"] == 1
+
+
+def test_401_with_own_authorization_keeps_process_token(backend, monkeypatch):
+    calls, sleeps, replies = backend
+    monkeypatch.setattr(api_client, "_API_TOKEN", "token-de-la-sesion")
+    replies += [_response(401)]
+    with pytest.raises(api_client.AuthError):
+        api_client.post("/catalogo/skus/batch", json={"items": []},
+                        headers={"Authorization": "Bearer token-del-trabajo"})
+    assert api_client.get_token() == "token-de-la-sesion"
+
+
+def test_401_with_process_token_clears_it(backend, monkeypatch):
+    calls, sleeps, replies = backend
+    monkeypatch.setattr(api_client, "_API_TOKEN", "token-vencido")
+    replies += [_response(401)]
+    with pytest.raises(api_client.AuthError):
+        api_client.get("/catalogo/skus")
+    assert api_client.get_token() is None
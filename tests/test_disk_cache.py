@@ -0,0 +1,15 @@
+import numpy as np
+import pandas as pd
+
+from utils.disk_cache import DiskCache
+
+
+def test_warm_keeps_live_entries_and_drops_expired(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1 << 30)
+    df = pd.DataFrame({"x": np.arange(50_000, dtype="float64"),
+                       "Marca": pd.Categorical(["a", "b"] * 25_000)})
+    cache.put("report:test", {"p": 1}, df)
+    cache.put("report:test", {"p": 2}, df, ttl=-1)
+    assert cache.warm() == 1
+    assert not cache.contains("report:test", {"p": 2})
+    pd.testing.assert_frame_equal(cache.get("report:test", {"p": 1}), df)
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from utils.downsample import chart_data, lttb_indices, minmax_indices
+
+
+def test_minmax_checks_tail():
+    y = np.zeros(1099)
+    y[1050] = 100.0
+    assert 1050 in minmax_indices(y, 100)
+
+
+def test_minmax_keeps_extreme_of_every_bucket():
+    rng = np.random.default_rng(0)
+    y = rng.normal(size=10_007)
+    y[rng.choice(len(y), 50, replace=False)] = np.nan
+    n_buckets = 333
+    idx = minmax_indices(y, n_buckets)
+    edges = np.linspace(0, len(y), n_buckets + 1).astype(int)
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        inside = idx[(idx >= lo) & (idx < hi)]
+        assert np.nanmin(y[lo:hi]) in y[inside]
+        assert np.nanmax(y[lo:hi]) in y[inside]
+    assert idx[0] == 0 and idx[-1] == len(y) - 1
+    assert len(idx) <= 2 * n_buckets + 2
+
+
+def test_short_series_untouched():
+    assert minmax_indices(np.arange(10.0), 5).tolist() == list(range(10))
+    assert lttb_indices(np.arange(10.0), np.arange(10.0), 20).tolist() == list(range(10))
+
+
+def test_chart_data_keeps_spike():
+    df = pd.DataFrame({"v": np.zeros(50_003)})
+    df.iloc[50_001, 0] = 7.0
+    out = chart_data(df, key=("spike", 1), width_px=500, method="minmax")
+    assert len(out) <= 502
+    assert out["v"].max() == 7.0
@@ -0,0 +1,24 @@
+import os
+
+import pandas as pd
+
+from utils import exports
+
+
+def test_download_rebuilds_file_evicted_before_open(tmp_path, monkeypatch):
+    monkeypatch.setattr(exports, "EXPORT_DIR", str(tmp_path))
+    df = pd.DataFrame({"Marca": ["a", "b"], "PV": [0.25, 0.75]})
+    calls = []
+    build = exports.build_export
+
+    def evicted_once(frame_fn, key, fmt):
+        path = build(frame_fn, key, fmt)
+        if not calls:
+            os.remove(path)  # otra descarga lo expulsa (y borra) entre build_export y open
+        calls.append(path)
+        return path
+
+    monkeypatch.setattr(exports, "build_export", evicted_once)
+    load = exports.download_data(lambda: df, table="t", version="v1", filters={"x": 1}, fmt="csv")
+    assert load() == df.to_csv(index=False).encode("utf-8")
+    assert len(calls) == 2 and calls[0] != calls[1]
@@ -0,0 +1,36 @@
+import base64
+import json
+
+from utils import jobs
+
+
+def _jwt(claims):
+    def part(obj):
+        return base64.urlsafe_b64encode(json.dumps(obj).encode()).rstrip(b"=").decode()
+    return f"{part({'alg': 'HS256', 'typ': 'JWT'})}.{part(claims)}.firma"
+
+
+def test_owner_is_stable_across_tokens_of_the_same_user():
+    first = _jwt({"sub": "42", "email": "ana@ejemplo.cl", "iat": 1})
+    renewed = _jwt({"sub": "42", "email": "ana@ejemplo.cl", "iat": 2})
+    other = _jwt({"sub": "7", "iat": 1})
+    assert jobs.owner_of(first) == jobs.owner_of(renewed)
+    assert jobs.owner_of(first) != jobs.owner_of(other)
+
+
+def test_owner_falls_back_to_email_and_opaque_tokens():
+    assert jobs.owner_of(_jwt({"email": "ana@ejemplo.cl", "iat": 1})) == \
+        jobs.owner_of(_jwt({"email": "ana@ejemplo.cl", "iat": 2}))
+    assert jobs.owner_of("stub-ana") == jobs.owner_of("stub-ana") != jobs.owner_of("stub-beto")
+    assert jobs.owner_of(None) == "" and jobs.owner_of("") == ""
+
+
+def test_owner_check_accepts_a_renewed_token(tmp_path):
+    store = jobs.JobStore(str(tmp_path / "jobs.sqlite3"))
+    old, new = _jwt({"sub": "42", "iat": 1}), _jwt({"sub": "42", "iat": 2})
+    job_id = store.create("sku_batch", "prueba", {}, b"", owner=jobs.owner_of(old))
+    store.update(job_id, status=jobs.INTERRUPTED)
+    queue = jobs.JobQueue.__new__(jobs.JobQueue)  # sin hilos: solo la lógica de dueño
+    queue.store = store
+    assert queue.owns(job_id, new)
+    assert not queue.owns(job_id, _jwt({"sub": "7"}))
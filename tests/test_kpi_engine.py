@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.kpi_engine import KPIEngine, abs_diff_name
+
+WINDOW, PERIOD = 30, 7
+
+
+def _frame(n, seed=0, nan_every=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"a": rng.normal(100, 10, n).cumsum(), "b": rng.normal(90, 15, n).cumsum()})
+    if nan_every:
+        df.loc[::nan_every, "a"] = np.nan
+    return df
+
+
+def _reference(s):
+    """KPIs del último punto con pandas: NaN ocupa su lugar en la ventana pero no suma."""
+    period = s.rolling(PERIOD, min_periods=0).sum()
+    prev = period.shift(PERIOD)
+    return {
+        "count": len(s),
+        "missing": int(s.isna().sum()),
+        "total": s.sum(),
+        "mean": s.mean(),
+        "last": s.dropna().iloc[-1],
+        "rolling_mean": s.rolling(WINDOW, min_periods=1).mean().iloc[-1],
+        "period": period.iloc[-1],
+        "prev_period": prev.iloc[-1],
+        "delta": period.diff(PERIOD).iloc[-1],
+    }
+
+
+def _check(engine, df):
+    series = {"a": df["a"], "b": df["b"], abs_diff_name("a", "b"): (df["a"] - df["b"]).abs()}
+    snap = engine.snapshot()
+    for name, s in series.items():
+        ref = _reference(s)
+        got = {k: snap[name][k] for k in ref}
+        np.testing.assert_allclose(list(got.values()), list(ref.values()), rtol=1e-9, atol=1e-6,
+                                   err_msg=name)
+
+
+@pytest.mark.parametrize("n", [1, 5, PERIOD + 1, 2 * PERIOD + 3, 500])
+@pytest.mark.parametrize("nan_every", [0, 4])
+def test_append_matches_pandas(n, nan_every):
+    df = _frame(n, nan_every=nan_every)
+    engine = KPIEngine(["a", "b"], window=WINDOW, period=PERIOD, abs_diff=[("a", "b")])
+    for point in df.to_dict("records"):
+        engine.append(point)
+    if n > PERIOD:
+        _check(engine, df)
+    else:  # sin período anterior: prev_period y delta quedan en NaN
+        assert np.isnan(engine.get("a", "delta"))
+
+
+@pytest.mark.parametrize("nan_every", [0, 3])
+def test_vectorised_extend_matches_pandas(nan_every):
+    df = _frame(100_000, seed=1, nan_every=nan_every)
+    engine = KPIEngine(["a", "b"], window=WINDOW, period=PERIOD, abs_diff=[("a", "b")])
+    # Primero un lote chico (por append), después lotes más largos que el buffer.
+    engine.extend(df.iloc[:10])
+    engine.extend(df.iloc[10:60_000])
+    engine.extend(df.iloc[60_000:])
+    _check(engine, df)
+
+
+def test_nan_does_not_poison_the_windows():
+    engine = KPIEngine(["a"], window=3, period=2)
+    for x in [1.0, np.nan, 3.0, 5.0, 7.0, 9.0]:
+        engine.append({"a": x})
+    kpis = engine.snapshot()["a"]
+    assert kpis["rolling_mean"] == pytest.approx(7.0)
+    assert kpis["total"] == pytest.approx(25.0)
+    assert kpis["mean"] == pytest.approx(5.0)
+    assert (kpis["period"], kpis["prev_period"]) == (pytest.approx(16.0), pytest.approx(8.0))
+    assert kpis["missing"] == 1 and kpis["last"] == 9.0
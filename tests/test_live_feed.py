@@ -0,0 +1,51 @@
+import numpy as np
+
+from utils.live_feed import LiveView, SimulatedFeed
+
+COLUMNS = ["serie_a", "serie_b"]
+
+
+def _feed(rate):
+    now = [0.0]
+    return SimulatedFeed(COLUMNS, rate=rate, clock=lambda: now[0]), now
+
+
+def test_backpressure_drops_oldest():
+    feed, now = _feed(100)
+    view = LiveView(feed, 5_000)
+    now[0] = 10.0  # 1000 puntos pendientes
+    batch = view.pull(limit=200)
+    assert len(batch.frame) == 200
+    assert batch.dropped == 800
+    assert batch.frame.index.tolist() == list(range(801, 1001))  # quedan los más nuevos
+    assert view.received + view.dropped == feed.produced
+
+
+def test_history_cap():
+    feed, now = _feed(100)
+    view = LiveView(feed, 50)
+    for _ in range(10):
+        now[0] += 0.3
+        view.pull()
+    hist = view.history()
+    assert len(hist) == view.history_len == 50
+    assert hist.index[-1] == view.cursor == feed.produced
+    assert np.all(np.diff(hist.index) == 1)
+
+
+def test_chart_frame_is_history_reduced_to_width():
+    feed, now = _feed(10)
+    view = LiveView(feed, 1_000)
+    now[0] = 5.0
+    view.pull()
+    assert view.chart_frame().equals(view.history())  # menos puntos que el ancho: todo
+
+    feed, now = _feed(1_000)
+    view = LiveView(feed, 5_000)
+    for _ in range(10):
+        now[0] += 0.5
+        view.pull()
+        rows = view.chart_frame(width_px=100, method="minmax")
+        hist = view.history()
+        assert len(rows) <= len(COLUMNS) * (100 + 2)  # ~ancho por serie (+ extremos)
+        assert rows.index[0] == hist.index[0] and rows.index[-1] == hist.index[-1]
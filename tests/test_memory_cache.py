@@ -0,0 +1,48 @@
+import threading
+import time
+
+import pytest
+
+from utils.memory_cache import MemoryLRU
+
+
+def _lru():
+    return MemoryLRU(1 << 20, sizeof=lambda v: 1)
+
+
+def test_concurrent_get_or_load_runs_loader_once():
+    cache = _lru()
+    calls = []
+    start = threading.Barrier(8)
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)  # las demás sesiones llegan mientras carga
+        return "valor"
+
+    results = []
+
+    def session():
+        start.wait()
+        results.append(cache.get_or_load("k", loader))
+
+    threads = [threading.Thread(target=session) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert results == ["valor"] * 8
+
+
+def test_failing_loader_does_not_poison_key():
+    cache = _lru()
+
+    def broken():
+        raise RuntimeError("fuente caída")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("k", broken)
+    assert "k" not in cache
+    assert cache.get_or_load("k", lambda: "ok") == "ok"
+    assert cache.peek("k") == "ok"
@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+from utils import report_data
+from utils.pivot_server import CHILDREN_COLUMN, LEVEL_COLUMN
+
+
+def _row(macro, cat, pv, venta):
+    return {"Macro": macro, "Categoría": cat, "PV": pv, "CENTRAL 1": 1.0, "ALVI 1": 1.0,
+            "VENTA NETA": venta, "MARGEN": 0.1}
+
+
+@pytest.fixture
+def data():
+    # Detalle con pares (Macro, Categoría) repetidos: el cubo los junta en una celda.
+    detail = pd.DataFrame([
+        _row("abarrotes", "arroz", 0.2, 10.0),
+        _row("abarrotes", "arroz", 0.1, 5.0),
+        _row("abarrotes", "fideos", 0.1, 4.0),
+        _row("bebidas", "aguas", 0.3, 20.0),
+        _row("higiene", "jabón", 0.05, 2.0),
+    ])
+    labels = pd.DataFrame({"Macro / Categoría": ["abarrotes", "bebidas", "higiene"], "PV": [0.4, 0.3, 0.05],
+                           "CENTRAL 1": 1.0, "ALVI 1": 1.0, "VENTA NETA": [19.0, 20.0, 2.0], "MARGEN": 0.1})
+    raw = report_data.ReportData(periodo="p", weighted=labels, brands=labels, detail=detail)
+    return report_data.build_derived(raw)
+
+
+def test_pivot_with_repeated_pairs(data):
+    pivot = data.pivot("detail")
+    cats = pivot.level(("abarrotes",), sort_by="VENTA NETA")
+    assert cats["Categoría"].tolist() == ["arroz", "fideos"]
+    assert cats["VENTA NETA"].tolist() == [15.0, 4.0]
+    assert cats[CHILDREN_COLUMN].tolist() == [2, 1]
+    assert pivot.level((), term="jabon")["Macro"].tolist() == ["higiene"]
+
+
+def test_tree_expands_several_groups(data):
+    pivot = data.pivot("detail")
+    tree = pivot.tree({("abarrotes",), ("bebidas",)}, sort_by="VENTA NETA")
+    assert list(zip(tree["Macro"], tree["Categoría"].fillna(""), tree[LEVEL_COLUMN])) == [
+        ("bebidas", "", 0),
+        ("bebidas", "aguas", 1),
+        ("abarrotes", "", 0),
+        ("abarrotes", "arroz", 1),
+        ("abarrotes", "fideos", 1),
+        ("higiene", "", 0),
+    ]
+
+
+def test_tree_without_expanded_groups(data):
+    tree = data.pivot("detail").tree()
+    assert sorted(tree["Macro"]) == ["abarrotes", "bebidas", "higiene"]
+    assert tree["Categoría"].isna().all()
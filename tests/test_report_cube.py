@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.report_cube import RATIO_MEASURES, AggregateCube, finish
+
+LABEL = "Macro / Categoría"
+
+
+def with_total_row(df):
+    """Grand Total de la versión en pandas: sumas y ``mean()``, que ignora los NaN."""
+    total = {LABEL: "Grand Total", "PV": df["PV"].sum(), "VENTA NETA": df["VENTA NETA"].sum()}
+    total.update({r: df[r].mean() if len(df) else np.nan for r in RATIO_MEASURES})
+    return pd.concat([df, pd.DataFrame([total])], ignore_index=True)
+
+
+@pytest.fixture
+def table():
+    # Etiquetas repetidas (el cubo guarda medidas por fila) y ratios con NaN.
+    return pd.DataFrame({
+        LABEL: ["arroz", "arroz", "fideos", "aguas", "jabón", "jabón"],
+        "PV": [0.2, 0.1, 0.1, 0.3, 0.05, 0.25],
+        "CENTRAL 1": [1.0, 1.0, np.nan, 0.9, np.nan, 1.2],
+        "ALVI 1": [np.nan, np.nan, np.nan, 1.1, 0.8, 1.0],
+        "VENTA NETA": [10.0, 5.0, 4.0, 20.0, 2.0, 7.0],
+        "MARGEN": [0.1, np.nan, 0.3, 0.2, 0.15, np.nan],
+    })
+
+
+@pytest.mark.parametrize("mask", [
+    None,
+    [True, True, False, False, False, False],   # solo arroz: ALVI 1 sin datos
+    [True, False, True, True, False, True],     # excluye filas con NaN y sin NaN
+    [False] * 6,
+])
+def test_totals_match_with_total_row(table, mask):
+    cube = AggregateCube.from_facts(table, [LABEL])
+    got = cube.totals(None if mask is None else np.array(mask))
+    sub = table if mask is None else table[np.array(mask)]
+    ref = with_total_row(sub).iloc[-1]
+    assert got["n"] == len(sub)
+    for col in ["PV", "VENTA NETA", *RATIO_MEASURES]:
+        np.testing.assert_allclose(got[col], ref[col], equal_nan=True, err_msg=col)
+
+
+def test_cells_match_pandas_groupby(table):
+    cube = AggregateCube.from_facts(table, [LABEL])
+    got = cube.rollup([LABEL])
+    ref = table.groupby(LABEL, sort=False).agg(
+        {"PV": "sum", "CENTRAL 1": "mean", "ALVI 1": "mean", "VENTA NETA": "sum", "MARGEN": "mean"}
+    ).reset_index()
+    assert got[LABEL].tolist() == ref[LABEL].tolist()
+    cols = ["PV", "VENTA NETA", *RATIO_MEASURES]
+    np.testing.assert_allclose(got[cols].to_numpy(), ref[cols].to_numpy(), equal_nan=True)
+
+
+def test_weighted_average_skips_rows_without_ratio(table):
+    cube = AggregateCube.from_facts(table, [LABEL])
+    got = cube.totals(weighted=True)
+    for r in RATIO_MEASURES:
+        known = table[r].notna()
+        ref = (table.loc[known, r] * table.loc[known, "PV"]).sum() / table.loc[known, "PV"].sum()
+        np.testing.assert_allclose(got[r], ref, err_msg=r)
+    cells = finish(cube.cells, weighted=True, keep=[LABEL])
+    assert np.isnan(cells.loc[cells[LABEL] == "arroz", "ALVI 1"]).all()
@@ -0,0 +1,15 @@
+from types import SimpleNamespace
+
+from utils import report_data
+
+
+def test_api_report_key_changes_after_ttl(monkeypatch):
+    now = [1_000.0]
+    monkeypatch.setattr(report_data, "REPORT_API_TTL_S", 300.0)
+    monkeypatch.setattr(report_data, "time", SimpleNamespace(time=lambda: now[0]))
+    provider = report_data.ApiProvider(token="t")
+    key = provider.cache_key("2024-01")
+    now[0] += 100
+    assert provider.cache_key("2024-01") == key
+    now[0] += 300
+    assert provider.cache_key("2024-01") != key
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.report_cube import MEASURE_COLUMNS, AggregateCube
+from utils.report_engine import ENGINES, available_engines, get_engine
+from utils.synthetic import make_fact_table
+
+QUERIES = [
+    (["Macro", "Categoría"], None),
+    (["Marca"], {"Período": ["P01"]}),
+    (["Período", "Macro"], {"Macro": ["abarrotes", "galletas"]}),
+    (["Marca"], {"Período": ["P02", "P03"], "Macro": ["abarrotes"]}),
+]
+
+
+@pytest.fixture(scope="module")
+def facts():
+    facts = make_fact_table(20_000, n_brands=40, n_categories=15, seed=1)
+    # Ratios sin informar: cada motor los tiene que contar fuera del promedio.
+    facts.loc[::7, "MARGEN"] = np.nan
+    facts.loc[::11, "CENTRAL 1"] = np.nan
+    return facts
+
+
+@pytest.fixture(scope="module", params=["file", "partitioned"])
+def source(request, facts, tmp_path_factory):
+    folder = tmp_path_factory.mktemp(request.param)
+    if request.param == "partitioned":
+        facts.to_parquet(folder, partition_cols=["Período"], index=False)
+        return str(folder)
+    path = folder / "hechos.parquet"
+    facts.to_parquet(path, index=False, row_group_size=5_000)
+    return str(path)
+
+
+def _filtered(facts, where):
+    df = facts
+    for col, values in (where or {}).items():
+        df = df[df[col].astype(str).isin(values)]
+    return df
+
+
+def _reference(facts, by, where):
+    cells = AggregateCube.from_facts(_filtered(facts, where), by).cells
+    cells = cells.assign(**{c: cells[c].astype(str) for c in by})
+    return cells.sort_values(by, ignore_index=True)
+
+
+# Un motor no instalado caería a pandas: se salta para no medir pandas con otro nombre.
+@pytest.fixture(params=list(ENGINES))
+def engine(request):
+    if request.param not in available_engines():
+        pytest.skip(f"{request.param} no está instalado")
+    engine = get_engine(request.param)
+    assert engine.name == request.param
+    return engine
+
+
+@pytest.mark.parametrize("by, where", QUERIES)
+def test_aggregate_matches_pandas(engine, source, facts, by, where):
+    got = engine.aggregate(source, by, where)
+    ref = _reference(facts, by, where)
+    assert got[by].astype(str).values.tolist() == ref[by].values.tolist()
+    np.testing.assert_allclose(got[MEASURE_COLUMNS].to_numpy(), ref[MEASURE_COLUMNS].to_numpy(),
+                               rtol=1e-9, atol=1e-6)
+
+
+@pytest.mark.parametrize("where", [None, {"Período": ["P01"]}, {"Período": ["P02"], "Macro": ["abarrotes"]}])
+def test_scan_matches_pandas(engine, source, facts, where):
+    columns = ["Período", "Macro", "Marca", "VENTA NETA"]
+    got = pd.concat(list(engine.scan(source, columns, where, batch_rows=3_000)), ignore_index=True)
+    ref = _filtered(facts, where)[columns]
+    key = ["Período", "Macro", "Marca", "VENTA NETA"]
+    got = got.assign(**{c: got[c].astype(str) for c in key[:3]}).sort_values(key, ignore_index=True)
+    ref = ref.assign(**{c: ref[c].astype(str) for c in key[:3]}).sort_values(key, ignore_index=True)
+    assert len(got) == len(ref)
+    assert got[key[:3]].values.tolist() == ref[key[:3]].values.tolist()
+    np.testing.assert_allclose(got["VENTA NETA"].to_numpy(), ref["VENTA NETA"].to_numpy())
+
+
+def test_explicit_engine_that_is_missing_falls_back_to_pandas(monkeypatch, caplog):
+    def missing():
+        raise ImportError("No module named 'duckdb'")
+    monkeypatch.setitem(ENGINES, "duckdb", missing)
+    with caplog.at_level("WARNING", logger="utils.report_engine"):
+        assert get_engine("duckdb").name == "pandas"
+    assert "REPORT_ENGINE='duckdb'" in caplog.text
+    assert get_engine("auto").name != "duckdb"
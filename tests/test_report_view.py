@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import report_data
+from utils.report_view import LABEL_COLUMN, TOTAL_LABEL, ReportView
+
+MACROS = ["abarrotes", "bebidas_no_alcoholicas", "confites_y_snacks", "despensa",
+          "farmacia_e_higiene_personal", "ferreteria", "galletas", "mascotas", "papeles"]
+MEASURES = ["PV", "CENTRAL 1", "ALVI 1", "VENTA NETA", "MARGEN"]
+
+
+def with_total_row(df):
+    """'Grand Total' de la página en pandas: sumas y promedios simples de las filas visibles."""
+    total = {LABEL_COLUMN: TOTAL_LABEL, "PV": df["PV"].sum(), "CENTRAL 1": df["CENTRAL 1"].mean(),
+             "ALVI 1": df["ALVI 1"].mean(), "VENTA NETA": df["VENTA NETA"].sum(), "MARGEN": df["MARGEN"].mean()}
+    return pd.concat([df, pd.DataFrame([total])], ignore_index=True)
+
+
+@pytest.fixture
+def weighted():
+    rng = np.random.default_rng(5)
+    n = len(MACROS)
+    pv = rng.random(n)
+    df = pd.DataFrame({
+        LABEL_COLUMN: MACROS,
+        "PV": pv / pv.sum(),
+        "CENTRAL 1": 0.98 + 0.08 * rng.random(n),
+        "ALVI 1": 0.95 + 0.12 * rng.random(n),
+        "VENTA NETA": (5e6 + 90e6 * rng.random(n)).round(0),
+        "MARGEN": 0.08 + 0.12 * rng.random(n),
+    })
+    return df.sort_values("PV", ascending=False, ignore_index=True)
+
+
+@pytest.fixture
+def data(weighted):
+    raw = report_data.ReportData(periodo="p", weighted=weighted, brands=weighted.head(3),
+                                 detail=weighted.assign(Macro=weighted[LABEL_COLUMN], Categoría="x"))
+    return report_data.build_derived(raw)
+
+
+def test_kpis_match_unfiltered_table(data, weighted):
+    view = ReportView(data.weighted, data.cubes["weighted"])
+    ref = with_total_row(weighted).iloc[-1]
+    assert view.grand_total["PV"] == pytest.approx(1.0, rel=1e-6)
+    assert view.grand_total["VENTA NETA"] == pytest.approx(weighted["VENTA NETA"].sum())
+    assert view.grand_total["MARGEN"] == pytest.approx(ref["MARGEN"], rel=1e-6)
+
+
+@pytest.mark.parametrize("term", ["a", "higiene", "SNACKS", "zzz"])
+def test_filtered_view_matches_pandas_filter_and_total_row(data, weighted, term):
+    mask = data.indexes["weighted"].mask(term, fuzzy=False)
+    contains = weighted[LABEL_COLUMN].str.contains(term, case=False, na=False)
+    assert mask.tolist() == contains.tolist()
+
+    got = ReportView(data.weighted, data.cubes["weighted"], mask).materialize()
+    ref = with_total_row(weighted[contains])
+    assert got[LABEL_COLUMN].astype(str).tolist() == ref[LABEL_COLUMN].tolist()
+    np.testing.assert_allclose(got[MEASURES].to_numpy("float64"), ref[MEASURES].to_numpy("float64"),
+                               rtol=1e-6, equal_nan=True)
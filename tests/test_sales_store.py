@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.sales_store import SalesStore
+from utils.synthetic import make_sales_table
+
+RANGES = [
+    (None, None),
+    ("2025-01-10", "2025-02-05"),
+    ("2024-12-01", "2025-01-20"),   # empieza antes del primer día
+    ("2025-02-15", "2025-06-01"),   # termina después del último
+    ("2024-11-01", "2024-12-01"),   # fuera de los datos
+]
+
+
+@pytest.fixture(scope="module")
+def facts():
+    facts = make_sales_table(300, 60, seed=3)
+    # Varias filas por SKU y día: se suman.
+    return pd.concat([facts, facts.sample(500, random_state=1)], ignore_index=True)
+
+
+@pytest.fixture(scope="module")
+def store(facts):
+    return SalesStore(facts)
+
+
+def _in_range(facts, start, end, categoria=None):
+    fecha = pd.to_datetime(facts["fecha"])
+    keep = np.ones(len(facts), dtype=bool)
+    if start is not None:
+        keep &= fecha >= pd.Timestamp(start)
+    if end is not None:
+        keep &= fecha <= pd.Timestamp(end)
+    if categoria is not None:
+        keep &= facts["categoria"] == categoria
+    return facts[keep]
+
+
+@pytest.mark.parametrize("start, end", RANGES)
+@pytest.mark.parametrize("categoria", [None, "B"])
+def test_range_totals_match_groupby(store, facts, start, end, categoria):
+    sub = _in_range(facts, start, end, categoria)
+    ids, totals = store.sku_totals(start, end, categoria)
+    got = pd.Series(totals, index=store.sku_names[ids].astype(str))
+    ref = sub.groupby(sub["sku"].astype(str))["ventas"].sum()
+    np.testing.assert_allclose(got.reindex(ref.index).to_numpy(), ref.to_numpy())
+    assert got.drop(ref.index).eq(0).all()  # SKUs sin ventas en el rango
+
+    series = store.daily_series(start, end, categoria)
+    daily = sub.groupby(pd.to_datetime(sub["fecha"]))[["ventas", "costos"]].sum()
+    np.testing.assert_allclose(series.reindex(daily.index).to_numpy(), daily.to_numpy())
+    assert series["ventas"].sum() == pytest.approx(sub["ventas"].sum())
+
+
+@pytest.mark.parametrize("start, end", RANGES)
+@pytest.mark.parametrize("categoria", [None, "A"])
+def test_top_n_matches_nlargest(store, facts, start, end, categoria):
+    sub = _in_range(facts, start, end, categoria)
+    ref = sub.groupby(sub["sku"].astype(str))["ventas"].sum().nlargest(10)
+    got = store.top_skus(10, start, end, categoria)
+    if ref.empty:
+        assert got["ventas"].eq(0).all()
+        return
+    np.testing.assert_allclose(got["ventas"].to_numpy()[:len(ref)], ref.to_numpy())
+    # Con empates el orden entre SKUs iguales puede variar: cada SKU trae su total correcto.
+    totals = sub.groupby(sub["sku"].astype(str))["ventas"].sum()
+    np.testing.assert_allclose(totals.reindex(got["sku"].astype(str)).fillna(0).to_numpy(), got["ventas"].to_numpy())
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from utils.schema import Schema, compact, infer_kind
+
+
+def test_whole_valued_float_measure_stays_float():
+    s = pd.Series([1200.0, 3400.0, np.nan])
+    assert infer_kind("VENTA UNIDADES", s) is None
+    assert compact(pd.DataFrame({"VENTA UNIDADES": s}), Schema("t"))["VENTA UNIDADES"].dtype == np.float64
+
+
+def test_ids_and_codes_narrowed():
+    assert infer_kind("id_producto", pd.Series([1.0, 2.0, np.nan])) == "id"
+    assert infer_kind("cod_local", pd.Series([10.0, 20.0])) == "id"
+    out = compact(pd.DataFrame({"id_producto": [1.0, 2.0, np.nan]}), Schema("t"))
+    assert str(out["id_producto"].dtype) == "Int8"
+
+
+def test_integer_measure_keeps_int64():
+    df = pd.DataFrame({"unidades": [100, 120, 3]})
+    assert infer_kind("unidades", df["unidades"]) is None
+    out = compact(df, Schema("t"))
+    assert out["unidades"].dtype == np.int64
+    assert (out["unidades"] * 2).tolist() == [200, 240, 6]
+
+
+def test_declared_id_column_is_narrowed():
+    out = compact(pd.DataFrame({"local": [1, 2, 3]}), Schema("t", {"local": "id"}))
+    assert str(out["local"].dtype) == "Int8"
@@ -0,0 +1,21 @@
+import pandas as pd
+
+from utils.search_index import SearchIndex
+
+
+def _index():
+    df = pd.DataFrame({"Macro / Categoría": ["papel higiénico", "farmacia_e_higiene_personal", "detergente", "Jabón"]})
+    return SearchIndex(df, ["Macro / Categoría"])
+
+
+def test_default_returns_substring_and_fuzzy_hits():
+    index = _index()
+    assert index.search("higiene").tolist() == [0, 1]
+    assert index.search("JABON").tolist() == [3]
+    assert index.search("").tolist() == [0, 1, 2, 3]
+
+
+def test_exact_search_keeps_substring_hits_only():
+    index = _index()
+    assert index.search("higiene", fuzzy=False).tolist() == [1]
+    assert index.search("higienico", fuzzy=False).tolist() == [0]
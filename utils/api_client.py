@@ -5,6 +5,10 @@ Env:
 - API_BASE_URL: base URL for the API (default: http://localhost:8000)
 - API_TOKEN: optional Bearer token to include initially (e.g., from secrets)
 - API_TIMEOUT: default request timeout in seconds (default: 8)
+- API_FIXTURES: off | record | replay, to record responses or serve them back offline
+  (see ``utils.api_fixtures``; default: off)
+- API_ADAPTIVE: per-endpoint adaptive concurrency/rate limits (see ``utils.api_limits``;
+  default: 1)
 """
 
 from __future__ import annotations
@@ -14,6 +18,8 @@ from typing import Dict, Optional
 import requests
 from requests import Response
 
+from utils import api_fixtures, api_limits, profiler
+
 class AuthError(Exception):
     """Indica que la autenticación es necesaria (token inválido/expirado)."""
     pass
@@ -26,6 +32,7 @@ except Exception:
 
 DEFAULT_TIMEOUT = float(os.getenv("API_TIMEOUT", "8"))
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+RETRY_OVERLOAD_METHODS = ("GET", "HEAD")  # sin efectos: reintentar un 429/503 no duplica nada
 
 # Token en memoria del proceso. No persistente.
 _API_TOKEN = os.getenv("API_TOKEN", "").strip()
@@ -47,6 +54,27 @@ def set_token(token: Optional[str]) -> None:
 def get_token() -> Optional[str]:
     return _API_TOKEN or None
 
+def _send(method: str, path: str, url: str, *, params, json, data, headers: Dict[str, str],
+          timeout: float) -> Response:
+    """Un request: a la red, a la red grabando, o desde los fixtures (``API_FIXTURES``)."""
+    mode = api_fixtures.mode()
+    if mode == "replay":
+        return api_fixtures.replay(method, path, url, params, json, data)
+    t0 = time.perf_counter()
+    resp = requests.request(
+        method=method.upper(),
+        url=url,
+        params=params,
+        json=json,
+        data=data,
+        headers=headers,
+        timeout=timeout,
+    )
+    if mode == "record":
+        api_fixtures.get_store().record(method, path, params, json, data, resp,
+                                        (time.perf_counter() - t0) * 1000)
+    return resp
+
 def _request_with_retry(
     method: str,
     path: str,
@@ -59,22 +87,32 @@ def _request_with_retry(
     backoff: float = 0.5,
     headers: Optional[Dict[str, str]] = None,
 ) -> Response:
-    """Request con reintentos para timeouts/conexión. Lanza AuthError en 401/403."""
+    """
+    Request con reintentos para timeouts/conexión y, solo en GET/HEAD, para 429/503 (respetando
+    Retry-After): un POST rechazado puede haberse procesado igual y reenviarlo duplicaría el alta.
+    Lanza AuthError en 401/403. Si el request lleva su propio ``Authorization`` en ``headers``
+    (ej. un trabajo en segundo plano con el token de quien lo encoló), el 401/403 es de ese
+    token: el del proceso no se toca.
+    """
     url = f"{API_BASE_URL.rstrip('/')}/{path.lstrip('/')}"
+    own_auth = bool(headers) and "Authorization" in headers
     last_exc: Optional[Exception] = None
+    budget = timeout  # lo que le queda al intento: la espera de un Retry-After también cuenta
 
     for attempt in range(retries + 1):
         try:
-            resp = requests.request(
-                method=method.upper(),
-                url=url,
-                params=params,
-                json=json,
-                data=data,
-                headers=_headers(headers),
-                timeout=timeout,
-            )
-
+            # Cupo del endpoint (``utils.api_limits``): espera si la API está saturada. El request
+            # sale con lo que queda del timeout, así el intento completo no pasa de ``timeout``.
+            with api_limits.slot(method, path, budget) as slot, \
+                    profiler.stage(f"API {method.upper()} {path}", attempt=attempt):
+                left = slot.timeout() if slot is not None else budget
+                resp = _send(method, path, url, params=params, json=json, data=data,
+                             headers=_headers(headers), timeout=left)
+                if slot is not None:
+                    slot.done(resp)
+
+            if resp.status_code in (401, 403) and own_auth:
+                raise AuthError(f"Authentication required ({resp.status_code})")
             if resp.status_code in (401, 403):
                 # Limpiar token local
                 try:
@@ -88,12 +126,26 @@ def _request_with_retry(
                         pass
                 raise AuthError(f"Authentication required ({resp.status_code})")
 
+            if (resp.status_code in api_limits.OVERLOAD_STATUS and attempt < retries
+                    and method.upper() in RETRY_OVERLOAD_METHODS):
+                # Backend saturado: esperar lo que pide o backoff, descontado del timeout del
+                # siguiente intento. Si la espera no deja tiempo para el request, no reintentar.
+                wait = api_limits.parse_retry_after(resp.headers.get("Retry-After"))
+                wait = wait if wait is not None else backoff * (2 ** attempt)
+                if wait < timeout:
+                    time.sleep(wait)
+                    budget = timeout - wait
+                    continue
+
             return resp
 
+        except api_fixtures.FixtureMissing:
+            raise  # reintentar no va a encontrar otra respuesta grabada
         except (requests.Timeout, requests.ConnectionError) as exc:
             last_exc = exc
             if attempt < retries:
                 time.sleep(backoff * (2 ** attempt))
+                budget = timeout
                 continue
             raise
         except AuthError:
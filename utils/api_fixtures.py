@@ -0,0 +1,219 @@
+"""
+Grabar y reproducir respuestas de la API (``utils.api_client``) para trabajar sin backend.
+
+- ``record``: cada request sale a la API real y la respuesta (status, headers, cuerpo y
+  latencia) se guarda en el almacén de fixtures.
+- ``replay``: no hay red. La respuesta sale del almacén, con la latencia grabada dividida por
+  ``API_REPLAY_SPEED``. Un request sin fixture falla como error de conexión
+  (``FixtureMissing``).
+
+Clave de un fixture: método + path + parámetros ordenados + hash del cuerpo enviado. El token
+no forma parte de la clave, así que grabar con un usuario y reproducir con otro funciona. Del
+request solo se guarda el hash del cuerpo, nunca el cuerpo (el login lleva la contraseña). Las
+respuestas sí se guardan enteras, incluido el token del login: los fixtures son para
+desarrollo.
+
+Si la misma clave se pide varias veces al grabar (ej. el listado antes y después de crear un
+SKU), se guarda la secuencia y al reproducir se entrega en ese orden, volviendo a empezar al
+final. Cada grabación reemplaza la secuencia anterior de esa clave.
+
+El almacén es un SQLite (``API_FIXTURES_PATH``). Al reproducir, el índice clave → filas se
+carga una vez en memoria, así que buscar un fixture es un acceso a dict más la lectura de una
+fila por id.
+
+Env:
+- API_FIXTURES: off | record | replay (default: off)
+- API_FIXTURES_PATH: archivo SQLite de los fixtures (default: .cache/api_fixtures.sqlite3)
+- API_REPLAY_SPEED: 1 = latencia grabada, 2 = el doble de rápido, 0 = sin esperas (default: 1)
+- API_FIXTURES_PER_KEY: respuestas máximas por clave al grabar (default: 20)
+"""
+
+from __future__ import annotations
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlencode
+
+import requests
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+API_FIXTURES = os.getenv("API_FIXTURES", "off").strip().lower()
+API_FIXTURES_PATH = os.getenv("API_FIXTURES_PATH", os.path.join(".cache", "api_fixtures.sqlite3"))
+API_REPLAY_SPEED = float(os.getenv("API_REPLAY_SPEED", "1"))
+API_FIXTURES_PER_KEY = int(os.getenv("API_FIXTURES_PER_KEY", "20"))
+
+MODES = ("off", "record", "replay")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    path TEXT NOT NULL,
+    query TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    reason TEXT NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    latency_ms REAL NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_key ON responses (key, seq);
+"""
+
+
+class FixtureMissing(requests.ConnectionError):
+    """Modo ``replay`` y no hay respuesta grabada para el request."""
+
+
+def _canonical_query(params: Any) -> str:
+    if not params:
+        return ""
+    items = params.items() if isinstance(params, Mapping) else params
+    return urlencode(sorted((str(k), str(v)) for k, v in items if v is not None))
+
+
+def _body_digest(json_body: Any, data: Any) -> str:
+    if json_body is not None:
+        raw = json.dumps(json_body, sort_keys=True, default=str).encode("utf-8")
+    elif data is not None:
+        raw = data if isinstance(data, bytes) else str(data).encode("utf-8")
+    else:
+        return ""
+    return hashlib.sha1(raw).hexdigest()
+
+
+def request_key(method: str, path: str, params: Any = None, json_body: Any = None, data: Any = None) -> Tuple[str, str]:
+    """-> (clave, query canónica)."""
+    query = _canonical_query(params)
+    path = "/" + path.strip("/")
+    raw = f"{method.upper()} {path}?{query}#{_body_digest(json_body, data)}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest(), query
+
+
+class FixtureStore:
+    """Respuestas grabadas en SQLite, con un índice clave → ids en memoria para reproducir."""
+
+    def __init__(self, path: str = API_FIXTURES_PATH, *, per_key: int = API_FIXTURES_PER_KEY):
+        self.path = path
+        self.per_key = max(1, int(per_key))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Una conexión compartida por todos los hilos, serializada con ``_lock``.
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, List[int]]] = None
+        self._cursor: Dict[str, int] = {}    # próxima posición de la secuencia al reproducir
+        self._recorded: Dict[str, int] = {}  # claves grabadas en este proceso -> largo de la secuencia
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+    # ---------- Grabar ----------
+    def record(self, method: str, path: str, params: Any, json_body: Any, data: Any,
+               resp: Response, latency_ms: float) -> None:
+        key, query = request_key(method, path, params, json_body, data)
+        with self._lock, self._conn:
+            seq = self._recorded.get(key)
+            if seq is None:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                seq = 0
+            if seq >= self.per_key:
+                return
+            self._conn.execute(
+                "INSERT INTO responses (key, seq, method, path, query, status, reason, headers, body,"
+                " latency_ms, recorded_at) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                (key, seq, method.upper(), "/" + path.strip("/"), query, resp.status_code, resp.reason or "",
+                 json.dumps(dict(resp.headers)), resp.content, latency_ms, time.time()),
+            )
+            self._recorded[key] = seq + 1
+            self._index = None
+            self.recorded += 1
+
+    # ---------- Reproducir ----------
+    def _load_index(self) -> Dict[str, List[int]]:
+        index: Dict[str, List[int]] = {}
+        for key, id_ in self._conn.execute("SELECT key, id FROM responses ORDER BY key, seq"):
+            index.setdefault(key, []).append(id_)
+        return index
+
+    def lookup(self, method: str, path: str, params: Any = None, json_body: Any = None,
+               data: Any = None) -> Optional[Dict[str, Any]]:
+        key, _ = request_key(method, path, params, json_body, data)
+        with self._lock:
+            if self._index is None:
+                self._index = self._load_index()
+            ids = self._index.get(key)
+            if not ids:
+                self.misses += 1
+                return None
+            pos = self._cursor.get(key, 0)
+            self._cursor[key] = (pos + 1) % len(ids)
+            row = self._conn.execute(
+                "SELECT status, reason, headers, body, latency_ms FROM responses WHERE id = ?", (ids[pos],)
+            ).fetchone()
+            self.hits += 1
+        status, reason, headers, body, latency_ms = row
+        return {"status": status, "reason": reason, "headers": json.loads(headers), "body": bytes(body),
+                "latency_ms": latency_ms}
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self._conn.execute("SELECT COUNT(*), COUNT(DISTINCT key) FROM responses").fetchone()
+            return {"responses": total[0], "keys": total[1], "hits": self.hits, "misses": self.misses,
+                    "recorded": self.recorded}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def build_response(fixture: Dict[str, Any], url: str) -> Response:
+    """``requests.Response`` equivalente a la grabada (sin red)."""
+    resp = Response()
+    resp.status_code = int(fixture["status"])
+    resp.reason = fixture["reason"]
+    resp.headers = CaseInsensitiveDict(fixture["headers"])
+    resp._content = fixture["body"]
+    resp.url = url
+    resp.encoding = requests.utils.get_encoding_from_headers(resp.headers)
+    resp.elapsed = datetime.timedelta(milliseconds=float(fixture["latency_ms"]))
+    return resp
+
+
+# ---------- Modo del proceso ----------
+_STORE: Optional[FixtureStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def mode() -> str:
+    if API_FIXTURES not in MODES:
+        raise ValueError(f"API_FIXTURES={API_FIXTURES!r}; opciones: {', '.join(MODES)}")
+    return API_FIXTURES
+
+
+def get_store() -> FixtureStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = FixtureStore(API_FIXTURES_PATH)
+        return _STORE
+
+
+def replay(method: str, path: str, url: str, params: Any, json_body: Any, data: Any) -> Response:
+    """Respuesta grabada para el request, tras esperar su latencia / ``API_REPLAY_SPEED``."""
+    fixture = get_store().lookup(method, path, params, json_body, data)
+    if fixture is None:
+        query = _canonical_query(params)
+        raise FixtureMissing(f"sin fixture para {method.upper()} {path}" + (f"?{query}" if query else ""))
+    if API_REPLAY_SPEED > 0 and fixture["latency_ms"] > 0:
+        time.sleep(fixture["latency_ms"] / 1000 / API_REPLAY_SPEED)
+    return build_response(fixture, url)
@@ -0,0 +1,337 @@
+"""
+Control adaptativo de concurrencia y ritmo de los requests a la API (``utils.api_client``).
+
+Con cargas masivas, detalles y reportes corriendo a la vez, un paralelismo fijo o deja
+capacidad sin usar o satura al backend (429/5xx, timeouts). Cada endpoint (método + path con
+los ids reemplazados por ``{id}``) tiene su propio ``EndpointLimiter``:
+
+- Límite de concurrencia AIMD: cada request toma un cupo antes de salir. Mientras la latencia
+  y los errores están sanos, el límite sube +1 por cada ``límite`` respuestas (solo si se está
+  usando); ante 429/503 o un timeout baja a la mitad, y ante una latencia que pasa
+  ``API_LATENCY_TOLERANCE`` veces la de base baja un 10%. Una bajada por ventana de latencia,
+  para no desplomarse con todos los requests en vuelo que fallan juntos.
+- Token bucket: tope de requests por segundo (``API_RATE_LIMIT``, ráfagas de
+  ``API_RATE_BURST``).
+- ``Retry-After`` de un 429/503 pausa hasta esa hora solo a la sesión que lo recibió (la sesión
+  de Streamlit, o el hilo fuera de un run): las demás siguen, con el límite ya a la mitad.
+
+La latencia de base es la mediana de las últimas respuestas sanas (con la mínima, el jitter
+normal ya contaba como sobrecarga); la actual, un promedio móvil (EWMA). Un request que no
+consigue cupo dentro de su ``timeout`` falla con ``Throttled`` (un ``requests.Timeout``); el
+que lo consigue sale con lo que le queda del ``timeout`` tras la espera (``_Slot.timeout()``),
+así un intento nunca pasa del ``timeout`` pedido. ``stats()`` deja ver límites, en vuelo,
+esperas y señales de sobrecarga por endpoint (la página "Estado de caches" lo muestra).
+
+Contra la API de prueba saturada (``benchmarks.load_api --capacity``) deja los flujos sin error
+por segundo igual que sin control y baja los flujos con error de ~14% a ~2%; con el backend
+sano no cambia el throughput.
+
+Env:
+- API_ADAPTIVE: activar el control; 0 = requests sin límite (default: 1)
+- API_LIMIT_INITIAL: límite de concurrencia inicial por endpoint (default: 8)
+- API_LIMIT_MIN / API_LIMIT_MAX: rango del límite (default: 1 / 64)
+- API_LATENCY_TOLERANCE: latencia actual / base que cuenta como sobrecarga (default: 2.5)
+- API_RATE_LIMIT: requests por segundo por endpoint; 0 = sin tope (default: 0)
+- API_RATE_BURST: tamaño del bucket (default: 10)
+- API_RETRY_AFTER_MAX: tope en segundos para un ``Retry-After`` (default: 30)
+"""
+
+from __future__ import annotations
+import email.utils
+import os
+import re
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Deque, Dict, Iterator, Optional
+
+import requests
+
+if TYPE_CHECKING:  # pandas solo para ``stats()``: el cliente HTTP no lo necesita
+    import pandas as pd
+
+API_ADAPTIVE = os.getenv("API_ADAPTIVE", "1").strip().lower() not in ("0", "false", "no")
+API_LIMIT_INITIAL = float(os.getenv("API_LIMIT_INITIAL", "8"))
+API_LIMIT_MIN = float(os.getenv("API_LIMIT_MIN", "1"))
+API_LIMIT_MAX = float(os.getenv("API_LIMIT_MAX", "64"))
+API_LATENCY_TOLERANCE = float(os.getenv("API_LATENCY_TOLERANCE", "2.5"))
+API_RATE_LIMIT = float(os.getenv("API_RATE_LIMIT", "0"))
+API_RATE_BURST = float(os.getenv("API_RATE_BURST", "10"))
+API_RETRY_AFTER_MAX = float(os.getenv("API_RETRY_AFTER_MAX", "30"))
+
+OVERLOAD_STATUS = (429, 503)
+LATENCY_SLACK_MS = 20.0  # margen absoluto: con latencias de pocos ms el ruido no cuenta
+BASELINE_WINDOW = 200    # respuestas sanas para la latencia de base
+EWMA_ALPHA = 0.2
+BACKOFF_ERROR = 0.5      # factor ante 429/503 o timeout
+BACKOFF_SLOW = 0.9       # factor ante latencia alta: señal temprana, bajada suave
+
+_ID_SEGMENT = re.compile(r"^(?=.*\d)[\w.-]{1,}$")
+
+
+class Throttled(requests.Timeout):
+    """No hubo cupo para el request dentro de su ``timeout``."""
+
+
+def endpoint_key(method: str, path: str) -> str:
+    """``GET /catalogo/skus/7800000000001`` -> ``GET /catalogo/skus/{id}``."""
+    parts = [("{id}" if _ID_SEGMENT.match(p) else p) for p in path.strip("/").split("/")]
+    return f"{method.upper()} /" + "/".join(parts)
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Segundos de un header ``Retry-After`` (número o fecha HTTP), acotados. ``None`` si no hay."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = email.utils.parsedate_to_datetime(value).timestamp()
+        except (TypeError, ValueError, IndexError):
+            return None
+        seconds = when - (now or time.time())
+    return min(max(seconds, 0.0), API_RETRY_AFTER_MAX)
+
+
+def caller_key() -> object:
+    """Quién hace el request: la sesión de Streamlit del hilo, o el hilo fuera de un run."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except ImportError:
+        ctx = None
+    return ctx.session_id if ctx is not None else threading.get_ident()
+
+
+class EndpointLimiter:
+    """Límite AIMD de concurrencia + token bucket de un endpoint + pausa por ``Retry-After`` por sesión."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        initial: float = API_LIMIT_INITIAL,
+        min_limit: float = API_LIMIT_MIN,
+        max_limit: float = API_LIMIT_MAX,
+        tolerance: float = API_LATENCY_TOLERANCE,
+        rate: float = API_RATE_LIMIT,
+        burst: float = API_RATE_BURST,
+    ):
+        self.name = name
+        self.min_limit, self.max_limit = float(min_limit), float(max_limit)
+        self.limit = min(max(float(initial), self.min_limit), self.max_limit)
+        self.tolerance = float(tolerance)
+        self.rate, self.burst = float(rate), max(1.0, float(burst))
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._paused: Dict[object, float] = {}  # sesión -> hasta cuándo (monotonic)
+        self.inflight = 0
+        self.waiting = 0
+        self.ewma_ms: Optional[float] = None
+        self._samples: Deque[float] = deque(maxlen=BASELINE_WINDOW)
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        # contadores
+        self.requests = 0
+        self.overloads = 0   # respuestas 429/503
+        self.timeouts = 0
+        self.slow = 0        # sobrecargas por latencia
+        self.decreases = 0
+        self.throttled = 0   # requests que se rindieron esperando cupo
+        self.wait_s = 0.0
+
+    # ---------- Cupos ----------
+    def _refill(self, now: float) -> None:
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _delay(self, now: float, caller: object) -> float:
+        """Segundos a esperar antes de poder salir (0 = ya)."""
+        paused_until = self._paused.get(caller, 0.0)
+        if now < paused_until:
+            return paused_until - now
+        if self.inflight >= int(self.limit):
+            return float("inf")  # espera a que termine otro request (``notify``)
+        if self.rate > 0 and self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        return 0.0
+
+    def acquire(self, timeout: Optional[float], deadline: Optional[float] = None,
+                caller: Optional[object] = None) -> None:
+        """Espera un cupo hasta ``deadline`` (monotonic; por defecto ahora + ``timeout``)."""
+        t0 = time.monotonic()
+        caller = caller_key() if caller is None else caller
+        if deadline is None and timeout:
+            deadline = t0 + timeout
+        with self._cond:
+            self.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    # Con el plazo vencido no queda tiempo para el request en sí, aunque haya cupo.
+                    if deadline is not None and now >= deadline:
+                        self.throttled += 1
+                        raise Throttled(f"sin cupo para {self.name} en {timeout:g} s (límite {int(self.limit)})")
+                    delay = self._delay(now, caller)
+                    if delay <= 0:
+                        break
+                    if deadline is not None:
+                        delay = min(delay, deadline - now)
+                    self._cond.wait(None if delay == float("inf") else delay)
+            finally:
+                self.waiting -= 1
+            if self.rate > 0:
+                self._tokens -= 1
+            self.inflight += 1
+            self.requests += 1
+            self.wait_s += time.monotonic() - t0
+
+    def release(self, *, latency_ms: Optional[float], status: Optional[int] = None,
+                retry_after: Optional[float] = None, timed_out: bool = False,
+                caller: Optional[object] = None) -> None:
+        """Devuelve el cupo y ajusta el límite según cómo le fue al request."""
+        with self._cond:
+            self.inflight -= 1
+            now = time.monotonic()
+            overloaded = timed_out or status in OVERLOAD_STATUS
+            backoff = BACKOFF_ERROR
+            if status in OVERLOAD_STATUS:
+                self.overloads += 1
+            if timed_out:
+                self.timeouts += 1
+            if retry_after is not None and status in OVERLOAD_STATUS:
+                # Solo la sesión que recibió el ``Retry-After`` espera; las demás siguen con el
+                # límite (que ya baja a la mitad).
+                caller = caller_key() if caller is None else caller
+                self._paused = {k: t for k, t in self._paused.items() if t > now}
+                self._paused[caller] = max(self._paused.get(caller, 0.0), now + retry_after)
+            if latency_ms is not None and not overloaded:
+                self.ewma_ms = latency_ms if self.ewma_ms is None else (
+                    EWMA_ALPHA * latency_ms + (1 - EWMA_ALPHA) * self.ewma_ms)
+                self._samples.append(latency_ms)
+                base = statistics.median(self._samples)
+                if len(self._samples) >= 10 and self.ewma_ms > max(base * self.tolerance, base + LATENCY_SLACK_MS):
+                    self.slow += 1
+                    overloaded, backoff = True, BACKOFF_SLOW
+            if overloaded:
+                # Una bajada por ventana de latencia: los que estaban en vuelo fallan juntos.
+                window = (self.ewma_ms or 0.0) / 1000
+                if now - self._last_decrease >= window:
+                    self.limit = max(self.min_limit, self.limit * backoff)
+                    self._last_decrease = now
+                    self.decreases += 1
+            elif self.inflight + 1 >= int(self.limit):
+                # Crece solo si el límite se está usando: +1 por cada ``limit`` respuestas sanas.
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, timeout: Optional[float]) -> Iterator["_Slot"]:
+        deadline = time.monotonic() + timeout if timeout else None
+        caller = caller_key()
+        self.acquire(timeout, deadline, caller)
+        slot = _Slot(self, deadline, caller)
+        try:
+            yield slot
+        except requests.Timeout:
+            slot.finish(timed_out=True)
+            raise
+        finally:
+            slot.finish()
+
+    # ---------- Estado ----------
+    def snapshot(self) -> Dict[str, object]:
+        with self._cond:
+            now = time.monotonic()
+            return {
+                "Endpoint": self.name,
+                "Límite": round(self.limit, 1),
+                "En vuelo": self.inflight,
+                "Esperando": self.waiting,
+                "Requests": self.requests,
+                "Espera media (ms)": round(1000 * self.wait_s / self.requests, 1) if self.requests else 0.0,
+                "Latencia (ms)": round(self.ewma_ms, 1) if self.ewma_ms is not None else None,
+                "Base (ms)": round(statistics.median(self._samples), 1) if self._samples else None,
+                "429/503": self.overloads,
+                "Timeouts": self.timeouts,
+                "Lentas": self.slow,
+                "Bajadas": self.decreases,
+                "Sin cupo": self.throttled,
+                "Sesiones en pausa": sum(t > now for t in self._paused.values()),
+            }
+
+
+class _Slot:
+    """Cupo tomado: ``done(resp)`` con la respuesta, o se libera sin señal al salir del bloque."""
+
+    def __init__(self, limiter: EndpointLimiter, deadline: Optional[float] = None,
+                 caller: Optional[object] = None):
+        self._limiter = limiter
+        self._deadline = deadline
+        self._caller = caller
+        self._t0 = time.perf_counter()
+        self._released = False
+
+    def timeout(self) -> Optional[float]:
+        """Lo que queda del ``timeout`` del request tras esperar el cupo."""
+        if self._deadline is None:
+            return None
+        return max(self._deadline - time.monotonic(), 0.001)
+
+    def finish(self, *, status: Optional[int] = None, retry_after: Optional[float] = None,
+               timed_out: bool = False, measured: bool = False) -> None:
+        if self._released:
+            return
+        self._released = True
+        latency = (time.perf_counter() - self._t0) * 1000 if measured else None
+        self._limiter.release(latency_ms=latency, status=status, retry_after=retry_after, timed_out=timed_out,
+                              caller=self._caller)
+
+    def done(self, resp: requests.Response) -> None:
+        self.finish(status=resp.status_code, retry_after=parse_retry_after(resp.headers.get("Retry-After")),
+                    measured=True)
+
+
+# ---------- Registro del proceso ----------
+_LIMITERS: Dict[str, EndpointLimiter] = {}
+_LOCK = threading.Lock()
+
+
+def get_limiter(method: str, path: str) -> EndpointLimiter:
+    key = endpoint_key(method, path)
+    limiter = _LIMITERS.get(key)
+    if limiter is None:
+        with _LOCK:
+            limiter = _LIMITERS.setdefault(key, EndpointLimiter(key))
+    return limiter
+
+
+@contextmanager
+def slot(method: str, path: str, timeout: Optional[float]) -> Iterator[Optional[_Slot]]:
+    """Cupo para un request (``None`` con ``API_ADAPTIVE=0``)."""
+    if not API_ADAPTIVE:
+        yield None
+        return
+    with get_limiter(method, path).slot(timeout) as s:
+        yield s
+
+
+def stats() -> pd.DataFrame:
+    """Una fila por endpoint con límite, en vuelo, esperas y señales de sobrecarga."""
+    import pandas as pd
+
+    with _LOCK:
+        limiters = list(_LIMITERS.values())
+    return pd.DataFrame([lim.snapshot() for lim in sorted(limiters, key=lambda lim: lim.name)])
+
+
+def reset() -> None:
+    with _LOCK:
+        _LIMITERS.clear()
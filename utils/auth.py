@@ -10,7 +10,7 @@ LOGIN_ENDPOINT = "/auth/login"   # backend espera {"email","password"}
 # Usa un nombre NUEVO para cortar con duplicados previos
 COOKIE_NAME = "jwt"
 COOKIE_PATH = "/"
-LEGACY_COOKIE_NAMES = ("app_jwt")
+LEGACY_COOKIE_NAMES = ("app_jwt",)
 
 # --- Helpers de UI ---
 def _notify(msg: str) -> None:
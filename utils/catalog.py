@@ -0,0 +1,57 @@
+"""
+Listados del catálogo (``/catalogo/*``) como DataFrames compactos, con cache en disco.
+
+Lo usan la página 2 (debajo de su ``st.cache_data``) y el warm-up (``utils.warmup``): los dos
+leen y escriben las mismas entradas de ``utils.disk_cache``, así un listado precargado al
+arrancar es el mismo que después pide la página.
+"""
+
+from __future__ import annotations
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from utils import api_client, schema
+from utils.disk_cache import DISK
+
+# Tras un reinicio los listados se sirven desde disco sin volver a pedirlos (hasta este TTL).
+CATALOG_DISK_TTL = 300
+
+
+def disk_source(path: str) -> str:
+    return f"api:{path}"
+
+
+def _disk_params(params: Optional[Dict[str, Any]]) -> Dict[str, object]:
+    return {"base": api_client.API_BASE_URL, "params": params or {}}
+
+
+def fetch_frame(
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    *,
+    timeout: float = api_client.DEFAULT_TIMEOUT,
+    retries: int = 1,
+    refresh: bool = False,
+    token: Optional[str] = None,
+) -> Optional[pd.DataFrame]:
+    """
+    Listado como DataFrame con tipos compactos (None si la API no devolvió una lista).
+    ``refresh``: ignorar el disco y volver a pedirlo (el resultado reemplaza la entrada).
+    ``token``: pedirlo con ese token en vez del global de ``api_client`` (hilos de fondo).
+    """
+    df = None if refresh else DISK.get(disk_source(path), _disk_params(params))
+    if df is None:
+        headers = {"Authorization": f"Bearer {token}"} if token else None
+        r = api_client.get(path, params=params or {}, timeout=timeout, retries=retries, headers=headers)
+        r.raise_for_status()
+        data = r.json()
+        if not isinstance(data, list):
+            return None
+        df = schema.compact(pd.DataFrame(data), schema.CATALOG_SCHEMA)
+        DISK.put(disk_source(path), _disk_params(params), df, ttl=CATALOG_DISK_TTL)
+    return df
+
+
+def clear(path: str) -> None:
+    DISK.clear(disk_source(path))
@@ -0,0 +1,268 @@
+"""
+Cache persistente en disco para DataFrames (Arrow IPC), debajo de los caches en memoria.
+
+Sobrevive a reinicios y deploys: tras un restart, el primer usuario lee las tablas del disco
+en vez de reconstruirlas desde la fuente. Cada entrada es un archivo Arrow IPC sin comprimir
+que se lee con ``memory_map``: las columnas numéricas y de texto Arrow quedan apuntando a las
+páginas del archivo, así que varios procesos worker comparten la misma memoria del sistema
+operativo en vez de tener cada uno su copia. Las columnas ``category`` son la excepción: pandas
+reconstruye sus códigos (1 byte por fila con pocas categorías). Quien lee no debe volver a
+convertir los frames (ej. ``schema.compact``): eso los copia al heap del proceso.
+
+- Clave: ``source`` (ej. ``"report:synthetic"``, ``"api:/catalogo/skus"``) + ``params`` + versión.
+- TTL por entrada (vence al leerla o al podar).
+- Tope total en disco: al superarlo se borran primero las entradas usadas hace más tiempo.
+- Escrituras atómicas (archivo temporal + ``os.replace``): seguro con varios procesos.
+
+Sin ``pyarrow`` el cache queda deshabilitado (``get`` devuelve ``None`` y ``put`` no hace nada).
+
+Env:
+- DISK_CACHE_DIR: carpeta del cache (default: .cache/streamlit_data)
+- DISK_CACHE_MB: tope total en MB; 0 deshabilita el cache (default: 1024)
+- DISK_CACHE_TTL: vida de una entrada en segundos (default: 86400)
+- DISK_CACHE_VERSION: se incluye en la clave; cambiarla invalida todo (default: 1)
+"""
+
+from __future__ import annotations
+import glob
+import hashlib
+import json
+import mmap
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+DISK_CACHE_DIR = os.getenv("DISK_CACHE_DIR", os.path.join(".cache", "streamlit_data"))
+DISK_CACHE_MB = float(os.getenv("DISK_CACHE_MB", "1024"))
+DISK_CACHE_TTL = float(os.getenv("DISK_CACHE_TTL", "86400"))
+DISK_CACHE_VERSION = os.getenv("DISK_CACHE_VERSION", "1")
+
+_META = b"disk_cache"
+
+
+def _digest(raw: str, n: int = 40) -> str:
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:n]
+
+
+def _touch_pages(array) -> None:
+    """Lee un byte por página de los buffers de ``array`` (y de su diccionario)."""
+    for buf in array.buffers():
+        if buf is not None and buf.size:
+            np.frombuffer(buf, dtype=np.uint8)[::mmap.PAGESIZE].sum()
+    dictionary = getattr(array, "dictionary", None)
+    if dictionary is not None:
+        _touch_pages(dictionary)
+
+
+class DiskCache:
+    """
+    DataFrames en archivos ``<hash(source)>-<hash(clave)>.arrow``. El prefijo por ``source``
+    permite invalidar una fuente completa (``clear(source)``).
+    """
+
+    def __init__(
+        self,
+        directory: str = DISK_CACHE_DIR,
+        max_bytes: int = int(DISK_CACHE_MB * 1024 * 1024),
+        ttl: float = DISK_CACHE_TTL,
+        version: str = DISK_CACHE_VERSION,
+    ):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self.ttl = float(ttl)
+        self.version = version
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        try:
+            import pyarrow  # noqa: F401
+            self.enabled = self.max_bytes > 0
+        except ImportError:
+            self.enabled = False
+
+    # ---------- Claves ----------
+    def _path(self, source: str, params: Mapping[str, object]) -> str:
+        raw = json.dumps({"s": source, "p": dict(params), "v": self.version}, sort_keys=True, default=str)
+        return os.path.join(self.directory, f"{_digest(source, 12)}-{_digest(raw)}.arrow")
+
+    # ---------- Lectura / escritura ----------
+    def get(self, source: str, params: Mapping[str, object]) -> Optional[pd.DataFrame]:
+        if not self.enabled:
+            return None
+        path = self._path(source, params)
+        df = self._read(path)
+        with self._lock:
+            if df is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return df
+
+    def contains(self, source: str, params: Mapping[str, object]) -> bool:
+        """Hay archivo para la clave (sin leerlo ni contar acierto/fallo; puede estar vencido)."""
+        return self.enabled and os.path.exists(self._path(source, params))
+
+    def _read(self, path: str) -> Optional[pd.DataFrame]:
+        import pyarrow as pa
+
+        try:
+            source = pa.memory_map(path, "r")
+            table = pa.ipc.open_file(source).read_all()
+        except (OSError, pa.ArrowInvalid):
+            return None
+        meta = json.loads((table.schema.metadata or {}).get(_META, b"{}"))
+        if time.time() > meta.get("expires", 0):
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)  # recencia para la poda LRU
+        except OSError:
+            pass
+        # split_blocks evita consolidar columnas: lo que Arrow permite queda sin copiar (mmap).
+        return table.replace_schema_metadata(meta.get("pandas")).to_pandas(split_blocks=True)
+
+    def put(self, source: str, params: Mapping[str, object], df: pd.DataFrame, ttl: Optional[float] = None) -> bool:
+        """Guarda ``df``; devuelve False si no se pudo (tipos no representables en Arrow)."""
+        if not self.enabled:
+            return False
+        import pyarrow as pa
+
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowException, TypeError, ValueError):
+            return False
+        meta = {
+            "source": source,
+            "created": time.time(),
+            "expires": time.time() + (self.ttl if ttl is None else ttl),
+            "pandas": {k.decode(): v.decode() for k, v in (table.schema.metadata or {}).items()},
+        }
+        table = table.replace_schema_metadata({_META: json.dumps(meta).encode("utf-8")})
+
+        path = self._path(source, params)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp, path)
+        except OSError:
+            self._remove(tmp)
+            return False
+        with self._lock:
+            self.writes += 1
+        self.prune()
+        return True
+
+    def get_or_load(
+        self,
+        source: str,
+        params: Mapping[str, object],
+        loader: Callable[[], pd.DataFrame],
+        ttl: Optional[float] = None,
+    ) -> pd.DataFrame:
+        df = self.get(source, params)
+        if df is None:
+            df = loader()
+            self.put(source, params, df, ttl=ttl)
+        return df
+
+    # ---------- Poda ----------
+    def _entries(self, source: Optional[str] = None) -> List[str]:
+        prefix = _digest(source, 12) if source else "*"
+        return glob.glob(os.path.join(self.directory, f"{prefix}-*.arrow"))
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def prune(self) -> int:
+        """Borra las entradas usadas hace más tiempo hasta quedar bajo ``max_bytes``."""
+        entries = []
+        for path in self._entries():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            removed += 1
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    def warm(self) -> int:
+        """
+        Recorre las entradas y borra las vencidas. De las vigentes lee cada lote a través del
+        memory map y toca un byte por página de sus buffers, así sus páginas quedan en el cache
+        del sistema operativo sin copiarlas al heap. Devuelve cuántas quedaron vigentes.
+        """
+        if not self.enabled:
+            return 0
+        import pyarrow as pa
+
+        alive = 0
+        for path in self._entries():
+            try:
+                with pa.memory_map(path, "r") as source:
+                    reader = pa.ipc.open_file(source)
+                    meta = json.loads((reader.schema.metadata or {}).get(_META, b"{}"))
+                    if time.time() > meta.get("expires", 0):
+                        expired = True
+                    else:
+                        expired = False
+                        for i in range(reader.num_record_batches):
+                            for column in reader.get_batch(i).columns:
+                                _touch_pages(column)
+            except (OSError, pa.ArrowInvalid):
+                continue
+            if expired:
+                self._remove(path)
+            else:
+                alive += 1
+        return alive
+
+    def clear(self, source: Optional[str] = None) -> int:
+        """Borra todas las entradas (o solo las de ``source``)."""
+        paths = self._entries(source)
+        for path in paths:
+            self._remove(path)
+        return len(paths)
+
+    def stats(self) -> Dict[str, float]:
+        sizes = []
+        for path in self._entries():
+            try:
+                sizes.append(os.path.getsize(path))
+            except OSError:
+                pass
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(sizes),
+                "bytes": sum(sizes),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+            }
+
+
+# Instancia compartida por el proceso (reportes y catálogo).
+DISK = DiskCache()
@@ -0,0 +1,155 @@
+"""
+Reducción de series de tiempo para gráficos de líneas (``st.line_chart`` / ``st.area_chart``).
+
+Un gráfico de ``W`` pixeles de ancho no puede mostrar más de ~``W`` puntos distintos; mandar
+millones solo congela el navegador. ``chart_data`` recorta la serie al rango visible (zoom) y,
+si quedan más puntos que los que caben, elige un subconjunto que conserva la forma:
+
+- ``lttb``: Largest-Triangle-Three-Buckets, un punto por bucket (el que forma el triángulo
+  de mayor área con sus vecinos). Buena forma general con pocos puntos.
+- ``minmax``: mínimo y máximo de cada bucket. Conserva todos los picos (ventas diarias con
+  outliers), a costa de 2 puntos por bucket.
+
+Con varias columnas se reduce cada una y se usa la unión de índices, para que ninguna serie
+pierda sus picos. Si el rango visible ya entra en el ancho, se devuelve a resolución completa.
+El resultado queda en un cache LRU por serie (``key``), columnas, método, ancho y rango.
+
+Env:
+- CHART_WIDTH_PX: ancho supuesto del gráfico en pixeles (default: 1000)
+- CHART_POINTS_PER_PX: puntos por pixel (default: 1)
+- DOWNSAMPLE_CACHE_MB: tope del cache de series reducidas en MB (default: 64)
+"""
+
+from __future__ import annotations
+import os
+from typing import Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.memory_cache import MemoryLRU
+
+CHART_WIDTH_PX = int(os.getenv("CHART_WIDTH_PX", "1000"))
+CHART_POINTS_PER_PX = float(os.getenv("CHART_POINTS_PER_PX", "1"))
+DOWNSAMPLE_CACHE_MB = float(os.getenv("DOWNSAMPLE_CACHE_MB", "64"))
+
+METHODS = ("lttb", "minmax")
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Índices elegidos por LTTB (incluye siempre el primero y el último)."""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    # n_out - 2 buckets entre el primer y el último punto.
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        nlo, nhi = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else n)
+        with np.errstate(invalid="ignore"):
+            avg_x = x[nlo:nhi].mean()
+            avg_y = np.nanmean(y[nlo:nhi]) if nhi > nlo else y[-1]
+        xs, ys = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - avg_x) * (ys - y[a]) - (x[a] - xs) * (avg_y - y[a]))
+        a = lo + int(np.nan_to_num(area, nan=-1.0).argmax())
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """Índices del mínimo y el máximo de cada bucket, más el primero y el último."""
+    n = len(y)
+    if n_buckets < 1 or 2 * n_buckets >= n:
+        return np.arange(n)
+    y = np.asarray(y, dtype="float64")
+    # Bordes repartidos sobre toda la serie: los buckets difieren a lo más en un punto y la
+    # cola (n no múltiplo de n_buckets) también se revisa.
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    bucket = np.repeat(np.arange(n_buckets), np.diff(edges))
+    nan = np.isnan(y)
+    picks = [[0, n - 1]]
+    for fill, reduce in ((np.inf, np.minimum), (-np.inf, np.maximum)):
+        vals = np.where(nan, fill, y)
+        best = reduce.reduceat(vals, edges[:-1])
+        # primera posición de cada bucket que alcanza su extremo
+        hits = np.flatnonzero(vals == best[bucket])
+        _, first = np.unique(bucket[hits], return_index=True)
+        picks.append(hits[first])
+    return np.unique(np.concatenate(picks))
+
+
+def _x_values(index: pd.Index) -> np.ndarray:
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8.astype("float64")
+    try:
+        return np.asarray(index, dtype="float64")
+    except (TypeError, ValueError):
+        return np.arange(len(index), dtype="float64")
+
+
+def _window(index: pd.Index, x_range: Optional[Tuple[object, object]]) -> Tuple[int, int]:
+    if x_range is None:
+        return 0, len(index)
+    lo, hi = x_range
+    start = 0 if lo is None else int(index.searchsorted(lo, side="left"))
+    stop = len(index) if hi is None else int(index.searchsorted(hi, side="right"))
+    return start, max(start, stop)
+
+
+def reduce_indices(df: pd.DataFrame, n_points: int, method: str = "lttb") -> np.ndarray:
+    """Índices (posiciones) a graficar para que cada columna quede en ~``n_points`` puntos."""
+    if method not in METHODS:
+        raise ValueError(f"Método desconocido: {method!r} (usa {', '.join(METHODS)})")
+    if len(df) <= n_points:
+        return np.arange(len(df))
+    x = _x_values(df.index)
+    picks = []
+    for col in df.columns:
+        y = df[col].to_numpy(dtype="float64", na_value=np.nan)
+        if method == "lttb":
+            picks.append(lttb_indices(x, y, n_points))
+        else:
+            picks.append(minmax_indices(y, max(1, n_points // 2)))
+    return np.unique(np.concatenate(picks)) if len(picks) > 1 else picks[0]
+
+
+_CACHE = MemoryLRU(
+    int(DOWNSAMPLE_CACHE_MB * 1024 * 1024),
+    sizeof=lambda df: int(df.memory_usage(index=True, deep=False).sum()),
+)
+
+
+def chart_data(
+    df: pd.DataFrame,
+    *,
+    key: Hashable,
+    width_px: int = CHART_WIDTH_PX,
+    method: str = "lttb",
+    x_range: Optional[Tuple[object, object]] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """
+    Frame listo para ``st.line_chart``: índice = eje x (ordenado), una columna por serie.
+    ``key`` identifica la serie y su versión (quien llama la cambia si cambian los datos).
+    """
+    columns = list(columns) if columns is not None else list(df.columns)
+    n_points = max(3, int(width_px * CHART_POINTS_PER_PX))
+    cache_key = (key, tuple(columns), method, n_points, x_range)
+
+    def _load() -> pd.DataFrame:
+        start, stop = _window(df.index, x_range)
+        window = df.iloc[start:stop][columns]
+        if len(window) <= n_points:
+            return window  # zoom suficiente: resolución completa
+        return window.iloc[reduce_indices(window, n_points, method)]
+
+    return _CACHE.get_or_load(cache_key, _load)
+
+
+def cache_stats():
+    return _CACHE.stats()
@@ -0,0 +1,249 @@
+"""
+Descargas de los reportes: se generan solo al pedirlas, en disco, por bloques y con cache.
+
+``download_data`` devuelve un callable para ``st.download_button(data=...)``: Streamlit lo
+ejecuta recién cuando el usuario hace clic, así que los reruns normales no codifican nada.
+El archivo se escribe por bloques de filas (CSV, Parquet o XLSX) en un directorio temporal
+y queda en un cache LRU acotado por tamaño, con clave = versión de los datos + filtros
+activos + tabla + formato. La misma descarga pedida de nuevo (u otra sesión con los mismos
+filtros) se sirve desde el archivo ya escrito. Dos sesiones que piden la misma descarga a la
+vez la escriben una sola vez; descargas distintas se escriben en paralelo. Un archivo más
+grande que todo el cache se entrega y se borra, sin guardarlo.
+
+La lectura no es por bloques: ``st.download_button`` guarda la respuesta completa en su
+almacén de archivos en memoria, así que el archivo se lee entero al hacer clic.
+
+Parquet necesita ``pyarrow``, XLSX ``openpyxl`` y HTML (la tabla con el formato y colores de
+``utils.report_style``) ``jinja2``; si faltan, el formato no se ofrece. Las tablas grandes se
+codifican en el pool de procesos de ``utils.offload``, no en el hilo de la sesión.
+
+Env:
+- EXPORT_DIR: carpeta para los archivos (default: <tmp>/streamlit_exports)
+- EXPORT_CACHE_MB: tope total de los archivos en cache en MB (default: 512)
+- EXPORT_CHUNK_ROWS: filas por bloque al escribir (default: 100000)
+"""
+
+from __future__ import annotations
+import hashlib
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Iterator, List, Mapping, Optional, Tuple
+
+import pandas as pd
+
+from utils import offload, profiler
+from utils.memory_cache import MemoryLRU
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(tempfile.gettempdir(), "streamlit_exports"))
+EXPORT_CACHE_MB = float(os.getenv("EXPORT_CACHE_MB", "512"))
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "100000"))
+
+XLSX_MAX_ROWS = 1_048_576
+STYLED_COLUMNS = ("PV", "CENTRAL 1", "ALVI 1")  # columnas que usa ``style_report``
+
+
+@dataclass(frozen=True)
+class ExportFormat:
+    label: str
+    extension: str
+    mime: str
+    module: str  # dependencia opcional ("" = ninguna)
+    max_rows: Optional[int] = None  # filas de datos que admite el formato (sin encabezado)
+
+
+FORMATS: Dict[str, ExportFormat] = {
+    "csv": ExportFormat("CSV", "csv", "text/csv", ""),
+    "parquet": ExportFormat("Parquet", "parquet", "application/vnd.apache.parquet", "pyarrow"),
+    "xlsx": ExportFormat("XLSX", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "openpyxl",
+                         XLSX_MAX_ROWS - 1),
+    "html": ExportFormat("HTML con formato", "html", "text/html", "jinja2"),
+}
+
+
+def available_formats(n_rows: int = 0) -> List[str]:
+    """Formatos instalados que admiten ``n_rows`` filas (XLSX no aparece sobre su límite)."""
+    # find_spec no importa el módulo: openpyxl/pyarrow se cargan recién al escribir un archivo.
+    return [
+        key for key, fmt in FORMATS.items()
+        if (not fmt.module or importlib.util.find_spec(fmt.module))
+        and (fmt.max_rows is None or n_rows <= fmt.max_rows)
+    ]
+
+
+# ---------- Escritores por bloques ----------
+def _chunks(df: pd.DataFrame, rows: int):
+    for start in range(0, max(len(df), 1), rows):
+        yield start, df.iloc[start:start + rows]
+
+
+def _write_csv(df: pd.DataFrame, path: str, rows: int) -> None:
+    with open(path, "wb") as fh:
+        for start, chunk in _chunks(df, rows):
+            fh.write(chunk.to_csv(index=False, header=(start == 0)).encode("utf-8"))
+
+
+def _write_parquet(df: pd.DataFrame, path: str, rows: int) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for _, chunk in _chunks(df, rows):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _write_xlsx(df: pd.DataFrame, path: str, rows: int) -> None:
+    from openpyxl import Workbook
+
+    if len(df) > FORMATS["xlsx"].max_rows:
+        raise ValueError(f"XLSX admite hasta {XLSX_MAX_ROWS - 1:,} filas; usa CSV o Parquet")
+    wb = Workbook(write_only=True)  # escribe fila a fila sin mantener el libro en memoria
+    ws = wb.create_sheet("reporte")
+    ws.append([str(c) for c in df.columns])
+    for _, chunk in _chunks(df, rows):
+        for row in chunk.itertuples(index=False, name=None):
+            ws.append([None if pd.isna(v) else v for v in row])
+    wb.save(path)
+
+
+def _write_html(df: pd.DataFrame, path: str, rows: int) -> None:
+    from utils.report_style import styled_html
+
+    if set(STYLED_COLUMNS) <= set(df.columns):
+        html = styled_html(df)
+    else:
+        # El Styler arma todo el HTML de una vez (no hay escritura por bloques).
+        with pd.option_context("styler.render.max_elements", max(df.size, 1)):
+            html = df.style.hide(axis="index").to_html()
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(html)
+
+
+WRITERS: Dict[str, Callable[[pd.DataFrame, str, int], None]] = {
+    "csv": _write_csv,
+    "parquet": _write_parquet,
+    "xlsx": _write_xlsx,
+    "html": _write_html,
+}
+
+
+# ---------- Cache de archivos ----------
+def _remove_file(_key: Hashable, path: object) -> None:
+    try:
+        os.remove(str(path))
+    except OSError:
+        pass
+
+
+_CACHE = MemoryLRU(
+    int(EXPORT_CACHE_MB * 1024 * 1024),
+    sizeof=lambda path: os.path.getsize(str(path)),
+    on_evict=_remove_file,
+)
+# Un lock por clave: la misma descarga se escribe una vez, las distintas en paralelo.
+_BUILD_LOCKS: Dict[str, Tuple[threading.Lock, int]] = {}
+_LOCKS_GUARD = threading.Lock()
+
+
+@contextmanager
+def _build_lock(key: str) -> Iterator[None]:
+    with _LOCKS_GUARD:
+        lock, users = _BUILD_LOCKS.get(key, (None, 0))
+        lock = lock or threading.Lock()
+        _BUILD_LOCKS[key] = (lock, users + 1)
+    try:
+        with lock:
+            yield
+    finally:
+        with _LOCKS_GUARD:
+            lock, users = _BUILD_LOCKS[key]
+            if users == 1:
+                del _BUILD_LOCKS[key]
+            else:
+                _BUILD_LOCKS[key] = (lock, users - 1)
+
+
+def export_key(table: str, version: str, filters: Mapping[str, object], fmt: str) -> str:
+    """Clave estable a partir de tabla, versión de los datos, filtros activos y formato."""
+    raw = json.dumps({"t": table, "v": version, "f": dict(filters), "fmt": fmt}, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def build_export(frame_fn: Callable[[], pd.DataFrame], key: str, fmt: str) -> str:
+    """
+    Ruta del archivo exportado; lo escribe solo si no está en cache. Si no cabe en el cache
+    no se guarda (``is_cached`` da False) y quien lo lee debe borrarlo.
+    """
+    path = _CACHE.get(key)
+    if path is not None and os.path.exists(str(path)):
+        return str(path)
+    with _build_lock(key):
+        path = _CACHE.get(key)
+        if path is not None and os.path.exists(str(path)):
+            return str(path)
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        # nombre único: reemplazar una entrada nunca borra el archivo recién escrito
+        path = os.path.join(EXPORT_DIR, f"{key}-{uuid.uuid4().hex[:8]}.{FORMATS[fmt].extension}")
+        try:
+            with profiler.stage(f"export {fmt}", key=key):
+                offload.write_export(frame_fn(), fmt, path, EXPORT_CHUNK_ROWS)
+        except Exception:
+            _remove_file(key, path)
+            raise
+        if os.path.getsize(path) <= _CACHE.max_bytes:
+            _CACHE.put(key, path)
+        return path
+
+
+def is_cached(key: str, path: str) -> bool:
+    return _CACHE.peek(key) == path
+
+
+def _read_export(key: str, path: str) -> bytes:
+    try:
+        with open(path, "rb") as fh:
+            return fh.read()
+    finally:
+        if not is_cached(key, path):
+            _remove_file(key, path)
+
+
+def download_data(
+    frame_fn: Callable[[], pd.DataFrame],
+    *,
+    table: str,
+    version: str,
+    filters: Mapping[str, object],
+    fmt: str = "csv",
+) -> Callable[[], bytes]:
+    """Callable para ``st.download_button``: construye (o reutiliza) el archivo al hacer clic."""
+    key = export_key(table, version, filters, fmt)
+
+    def _load() -> bytes:
+        try:
+            return _read_export(key, build_export(frame_fn, key, fmt))
+        except FileNotFoundError:
+            # Otra descarga lo expulsó del cache (y lo borró) antes de abrirlo: se escribe de nuevo.
+            return _read_export(key, build_export(frame_fn, key, fmt))
+
+    return _load
+
+
+def file_name(stem: str, fmt: str) -> str:
+    return f"{stem}.{FORMATS[fmt].extension}"
+
+
+def cache_stats() -> Dict[str, float]:
+    return _CACHE.stats()
@@ -0,0 +1,86 @@
+"""
+Fragmentos de página con re-render independiente y tiempos por fragmento.
+
+``timed_fragment(nombre)`` envuelve una función con ``st.fragment``: un widget dentro del
+fragmento vuelve a ejecutar solo ese fragmento (y los que tenga anidados), no el script
+completo (auth, sidebar, carga de datos, el resto de la página). Cada ejecución guarda su
+duración en ``st.session_state`` y, si está activo "Mostrar tiempos por fragmento",
+muestra un caption al pie del fragmento.
+
+Si la versión de Streamlit no trae ``st.fragment`` la función se ejecuta tal cual.
+"""
+
+from __future__ import annotations
+import functools
+import time
+from typing import Callable, Dict, Optional, TypeVar
+
+import streamlit as st
+
+from utils import profiler
+
+TIMINGS_KEY = "_fragment_timings"
+SHOW_TIMINGS_KEY = "show_fragment_timings"
+
+F = TypeVar("F", bound=Callable[..., object])
+
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+
+def _record(name: str, seconds: float, partial: bool) -> Dict[str, float]:
+    timings = st.session_state.setdefault(TIMINGS_KEY, {})
+    entry = timings.setdefault(name, {"runs": 0, "partial_runs": 0, "last_ms": 0.0, "total_ms": 0.0})
+    entry["runs"] += 1
+    entry["partial_runs"] += int(partial)
+    entry["last_ms"] = seconds * 1000
+    entry["total_ms"] += seconds * 1000
+    return entry
+
+
+def _in_partial_rerun() -> bool:
+    """True si este run lo disparó un fragmento (no es un rerun completo del script)."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        return bool(ctx and getattr(ctx, "fragment_ids_this_run", None))
+    except Exception:
+        return False
+
+
+def timed_fragment(name: str, *, run_every: Optional[float] = None) -> Callable[[F], F]:
+    def deco(fn: F) -> F:
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            partial = _in_partial_rerun()
+            t0 = time.perf_counter()
+            try:
+                with profiler.fragment_stage(name, partial=partial):
+                    return fn(*args, **kwargs)
+            finally:
+                entry = _record(name, time.perf_counter() - t0, partial)
+                if st.session_state.get(SHOW_TIMINGS_KEY):
+                    st.caption(
+                        f"⏱ {name}: {entry['last_ms']:.1f} ms "
+                        f"· {entry['runs']} ejecuciones ({entry['partial_runs']} parciales)"
+                    )
+
+        if _fragment is None:
+            return inner  # type: ignore[return-value]
+        frag = _fragment(inner, run_every=run_every)
+
+        @functools.wraps(fn)
+        def outer(*args, **kwargs):
+            # Llamado desde la página (run completo); los reruns parciales llaman a ``frag``.
+            try:
+                return frag(*args, **kwargs)
+            finally:
+                profiler.refresh()
+
+        return outer  # type: ignore[return-value]
+
+    return deco
+
+
+def timings_toggle() -> None:
+    """Checkbox de sidebar para mostrar los tiempos (se llama fuera de los fragmentos)."""
+    st.sidebar.checkbox("Mostrar tiempos por fragmento", key=SHOW_TIMINGS_KEY)
@@ -0,0 +1,444 @@
+"""
+Trabajos largos en segundo plano (por ahora: carga masiva de SKUs), fuera del ciclo de reruns.
+
+La página encola el trabajo (``get_job_queue().submit(...)``) y vuelve al instante; hilos del
+proceso (``JOBS_WORKERS``) lo corren aunque el usuario cambie de página o cierre la pestaña.
+Varios trabajos corren en paralelo y el resto espera en la cola.
+
+Todo queda en un SQLite local (``JOBS_DB``): el trabajo con sus parámetros y el archivo subido,
+estado, avance, filas por segundo y el resultado de cada chunk (status HTTP, filas, ms, detalle).
+La página "Trabajos" lo consulta cada pocos segundos. Si el proceso se reinicia, los trabajos
+que quedaron a medias pasan a ``interrumpido`` y se pueden reanudar: se saltan los chunks que
+ya habían salido bien.
+
+Cada trabajo guarda qué proceso lo corre (``runner``) y cada proceso con cola marca su latido
+en la tabla ``runners``. Solo se marcan ``interrumpido`` los trabajos de procesos sin latido
+reciente: otro servidor con el mismo ``JOBS_DB`` o una cola recreada (``st.cache_resource``
+limpiado) no tocan los trabajos que siguen corriendo.
+
+El token de la API no se guarda en disco: cada trabajo usa el de la sesión que lo encoló (o el
+de la que lo reanuda), en memoria, y lo manda en su propio ``Authorization``: si vence, el
+trabajo falla sin cerrar la sesión de nadie más. Como dueño se guarda la huella del usuario
+del token (``owner_of``: claim ``sub``/``email`` del JWT), que no cambia al renovar el token
+ni al volver a entrar: la página solo muestra, cancela y reanuda los trabajos de ese usuario.
+
+Env:
+- JOBS_DB: archivo SQLite de los trabajos (default: .cache/jobs.sqlite3)
+- JOBS_WORKERS: trabajos que corren a la vez (default: 2)
+- JOBS_KEEP: trabajos terminados que se conservan; los más viejos se borran (default: 200)
+"""
+
+from __future__ import annotations
+import base64
+import hashlib
+import io
+import json
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+import streamlit as st
+
+from utils import api_client
+
+JOBS_DB = os.getenv("JOBS_DB", os.path.join(".cache", "jobs.sqlite3"))
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))
+JOBS_KEEP = int(os.getenv("JOBS_KEEP", "200"))
+
+# Estados de un trabajo
+QUEUED, RUNNING, DONE, PARTIAL, FAILED, CANCELLED, INTERRUPTED = (
+    "en cola", "corriendo", "listo", "con errores", "error", "cancelado", "interrumpido",
+)
+FINISHED = (DONE, PARTIAL, FAILED, CANCELLED, INTERRUPTED)
+
+BOOT_ID = uuid.uuid4().hex[:12]  # este proceso
+HEARTBEAT_S = 10.0               # latido de los procesos con cola
+RUNNER_STALE_S = 3 * HEARTBEAT_S  # sin latido en este tiempo = proceso muerto
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    label TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    payload BLOB,
+    total INTEGER NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    error TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner TEXT NOT NULL DEFAULT '',
+    runner TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    ok INTEGER NOT NULL,
+    http_status INTEGER,
+    ms REAL NOT NULL,
+    detail TEXT NOT NULL DEFAULT '',
+    finished_at REAL NOT NULL,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE TABLE IF NOT EXISTS runners (
+    id TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    seen_at REAL NOT NULL
+);
+"""
+# Columnas agregadas después de la primera versión del esquema (bases ya creadas).
+_ADDED_COLUMNS = {"owner": "TEXT NOT NULL DEFAULT ''", "runner": "TEXT NOT NULL DEFAULT ''"}
+
+
+OWNER_CLAIMS = ("sub", "email", "user_id")  # claims del JWT que identifican al usuario
+
+
+def token_claims(token: str) -> Dict[str, Any]:
+    """Claims de un JWT, sin verificar la firma (eso lo hace la API); {} si no es un JWT."""
+    try:
+        part = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(part + "=" * (-len(part) % 4)))
+    except (IndexError, ValueError):
+        return {}
+    return claims if isinstance(claims, dict) else {}
+
+
+def owner_of(token: Optional[str]) -> str:
+    """
+    Dueño de un trabajo: huella del usuario del token (primer claim de ``OWNER_CLAIMS``), igual
+    para todos sus tokens. Un token que no es JWT se identifica por su propia huella; "" sin token.
+    """
+    if not token:
+        return ""
+    claims = token_claims(token)
+    user = next((f"{k}:{claims[k]}" for k in OWNER_CLAIMS if claims.get(k)), token)
+    return hashlib.sha256(user.encode("utf-8")).hexdigest()[:16]
+
+
+# ---------- Almacén ----------
+class JobStore:
+    """Trabajos y chunks en SQLite. Seguro entre hilos (una conexión por operación)."""
+
+    def __init__(self, path: str = JOBS_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")  # lectores (la página) no esperan al escritor
+            conn.executescript(_SCHEMA)
+            cols = {r["name"] for r in conn.execute("PRAGMA table_info(jobs)")}
+            for name, decl in _ADDED_COLUMNS.items():
+                if name not in cols:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {decl}")
+
+    @contextmanager
+    def _conn(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def create(self, kind: str, label: str, params: Dict[str, Any], payload: bytes, *,
+               owner: str = "", runner: str = BOOT_ID) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, label, status, params, payload, created_at, owner, runner)"
+                " VALUES (?,?,?,?,?,?,?,?,?)",
+                (job_id, kind, label, QUEUED, json.dumps(params), payload, time.time(), owner, runner),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._conn() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        with self._conn() as conn:
+            conn.execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+
+    def add_chunk(self, job_id: str, idx: int, rows: int, ok: bool, http_status: Optional[int],
+                  ms: float, detail: str) -> None:
+        """Guarda el resultado del chunk y suma sus filas al avance del trabajo (una transacción)."""
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO chunks VALUES (?,?,?,?,?,?,?,?)",
+                (job_id, idx, rows, int(ok), http_status, ms, detail[:500], time.time()),
+            )
+            conn.execute(
+                "UPDATE jobs SET done = (SELECT COALESCE(SUM(rows), 0) FROM chunks WHERE job_id = ? AND ok = 1),"
+                " failed = (SELECT COALESCE(SUM(rows), 0) FROM chunks WHERE job_id = ? AND ok = 0) WHERE id = ?",
+                (job_id, job_id, job_id),
+            )
+
+    def ok_chunks(self, job_id: str) -> set:
+        with self._conn() as conn:
+            return {r[0] for r in conn.execute("SELECT idx FROM chunks WHERE job_id = ? AND ok = 1", (job_id,))}
+
+    def clear_failed_chunks(self, job_id: str) -> None:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM chunks WHERE job_id = ? AND ok = 0", (job_id,))
+            conn.execute("UPDATE jobs SET failed = 0 WHERE id = ?", (job_id,))
+
+    def jobs(self, limit: int = 50, *, owner: Optional[str] = None) -> pd.DataFrame:
+        """Trabajos más recientes primero (sin el archivo subido); solo los de ``owner`` si se da."""
+        where, args = ("WHERE owner = ?", (owner,)) if owner is not None else ("", ())
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT id, kind, label, status, total, done, failed, error, created_at, started_at, finished_at"
+                f" FROM jobs {where} ORDER BY created_at DESC LIMIT ?", (*args, limit),
+            ).fetchall()
+        return pd.DataFrame([dict(r) for r in rows])
+
+    def chunks(self, job_id: str) -> pd.DataFrame:
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT idx, rows, ok, http_status, ms, detail, finished_at FROM chunks WHERE job_id = ? ORDER BY idx",
+                (job_id,),
+            ).fetchall()
+        return pd.DataFrame([dict(r) for r in rows])
+
+    def heartbeat(self, runner: str = BOOT_ID) -> None:
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO runners VALUES (?,?,?,?)",
+                         (runner, socket.gethostname(), os.getpid(), time.time()))
+
+    def mark_interrupted(self, runner: str = BOOT_ID, stale_s: float = RUNNER_STALE_S) -> int:
+        """
+        Lo que quedó ``en cola``/``corriendo`` en un proceso sin latido reciente no va a terminar.
+        Los trabajos de ``runner`` (este proceso) y de procesos vivos no se tocan.
+        """
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("DELETE FROM runners WHERE seen_at < ? AND id != ?", (now - stale_s, runner))
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = 'el proceso se reinició'"
+                " WHERE status IN (?, ?) AND runner != ? AND runner NOT IN (SELECT id FROM runners)",
+                (INTERRUPTED, now, QUEUED, RUNNING, runner),
+            )
+            return cur.rowcount
+
+    def prune(self, keep: int = JOBS_KEEP) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE id IN (SELECT id FROM jobs WHERE status IN (?,?,?,?,?)"
+                " ORDER BY created_at DESC LIMIT -1 OFFSET ?)", (*FINISHED, keep),
+            )
+
+
+# ---------- Tipos de trabajo ----------
+class Cancelled(Exception):
+    pass
+
+
+class JobContext:
+    """Lo que recibe el handler: parámetros, archivo, token, chunks ya hechos y cancelación."""
+
+    def __init__(self, store: JobStore, job: Dict[str, Any], token: Optional[str], cancel: threading.Event):
+        self.store = store
+        self.job_id = job["id"]
+        self.params: Dict[str, Any] = json.loads(job["params"])
+        self.payload: bytes = job["payload"] or b""
+        self.token = token
+        self.skip = store.ok_chunks(job["id"])
+        self._cancel = cancel
+
+    def check_cancel(self) -> None:
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    def headers(self) -> Dict[str, str]:
+        h = {"Content-Type": "application/json"}
+        if self.token:
+            h["Authorization"] = f"Bearer {self.token}"
+        return h
+
+
+def _opt_int(value: object) -> Optional[int]:
+    return None if value is None or pd.isna(value) or value == "" else int(value)
+
+
+def sku_items(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Filas del CSV de carga masiva -> items de ``POST /catalogo/skus/batch``."""
+    # Columnas vacías -> None (con pandas 3 ``where(notnull, None)`` deja NaN en columnas float)
+    df = df.astype(object).where(df.notna(), None)
+    return [
+        {
+            "id_proveedor": _opt_int(row["id_proveedor"]),
+            "id_categoria": _opt_int(row["id_categoria"]),
+            "id_formato": _opt_int(row["id_formato"]),
+            "id_segmento": _opt_int(row["id_segmento"]),
+            "sku": str(row["sku"]) if row["sku"] is not None else None,
+            "nombre": row["nombre"],
+        }
+        for _, row in df.iterrows()
+    ]
+
+
+def _run_sku_batch(ctx: JobContext) -> None:
+    """Un ``POST /catalogo/skus/batch`` por chunk de ``chunk_size`` filas del CSV subido."""
+    items = sku_items(pd.read_csv(io.BytesIO(ctx.payload), dtype={"sku": str}))
+    size = max(1, int(ctx.params.get("chunk_size", 200)))
+    ctx.store.update(ctx.job_id, total=len(items))
+    for idx, start in enumerate(range(0, len(items), size)):
+        ctx.check_cancel()
+        if idx in ctx.skip:
+            continue
+        chunk = items[start:start + size]
+        t0 = time.perf_counter()
+        try:
+            r = api_client.post(
+                "/catalogo/skus/batch", json={"items": chunk, "chunk_size": size},
+                timeout=float(ctx.params.get("timeout", api_client.DEFAULT_TIMEOUT)),
+                retries=int(ctx.params.get("retries", 1)), headers=ctx.headers(),
+            )
+            ok, status, detail = r.status_code < 400, r.status_code, r.text
+        except api_client.AuthError:
+            raise  # sin token válido no tiene sentido seguir con los demás chunks
+        except Exception as exc:
+            ok, status, detail = False, None, f"{type(exc).__name__}: {exc}"
+        ctx.store.add_chunk(ctx.job_id, idx, len(chunk), ok, status, (time.perf_counter() - t0) * 1000, detail)
+    from utils import catalog
+    catalog.clear("/catalogo/skus")
+
+
+HANDLERS: Dict[str, Callable[[JobContext], None]] = {
+    "sku_batch": _run_sku_batch,
+}
+
+
+# ---------- Cola y workers ----------
+class JobQueue:
+    """Cola en memoria + ``workers`` hilos que corren los trabajos y guardan su estado en ``store``."""
+
+    def __init__(self, store: JobStore, *, workers: int = JOBS_WORKERS):
+        self.store = store
+        self.workers = max(1, int(workers))
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._tokens: Dict[str, Optional[str]] = {}
+        self._cancel: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        # Latido antes de marcar: otro proceso que arranque a la vez ya ve este como vivo.
+        store.heartbeat()
+        store.mark_interrupted()
+        store.prune()
+        threading.Thread(target=self._heartbeat, name="jobs-heartbeat", daemon=True).start()
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f"jobs-{i}", daemon=True).start()
+
+    def submit(self, kind: str, label: str, params: Dict[str, Any], payload: bytes,
+               token: Optional[str]) -> str:
+        if kind not in HANDLERS:
+            raise ValueError(f"tipo de trabajo desconocido: {kind!r}")
+        job_id = self.store.create(kind, label, params, payload, owner=owner_of(token))
+        self._enqueue(job_id, token)
+        return job_id
+
+    def owns(self, job_id: str, token: Optional[str]) -> bool:
+        job = self.store.get(job_id)
+        return job is not None and job["owner"] == owner_of(token)
+
+    def resume(self, job_id: str, token: Optional[str]) -> bool:
+        """
+        Vuelve a encolar un trabajo terminado: repite solo los chunks que no salieron bien.
+        Solo el dueño (mismo usuario, aunque el token sea otro); devuelve False si no se encoló.
+        """
+        job = self.store.get(job_id)
+        if job is None or job["status"] not in FINISHED or job["owner"] != owner_of(token):
+            return False
+        self.store.clear_failed_chunks(job_id)
+        self.store.update(job_id, status=QUEUED, error="", finished_at=None, runner=BOOT_ID)
+        self._enqueue(job_id, token)
+        return True
+
+    def cancel(self, job_id: str, token: Optional[str]) -> bool:
+        """Pide cancelar (se detiene al terminar el chunk en curso). Solo el dueño."""
+        if not self.owns(job_id, token):
+            return False
+        with self._lock:
+            event = self._cancel.get(job_id)
+        if event is not None:
+            event.set()
+        return event is not None
+
+    def _enqueue(self, job_id: str, token: Optional[str]) -> None:
+        with self._lock:
+            self._tokens[job_id] = token
+            self._cancel[job_id] = threading.Event()
+        self._queue.put(job_id)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _heartbeat(self) -> None:
+        while True:
+            time.sleep(HEARTBEAT_S)
+            try:
+                self.store.heartbeat()
+                self.store.mark_interrupted()  # trabajos de otro proceso que murió
+            except sqlite3.Error:
+                pass
+
+    def _worker(self) -> None:
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run(job_id)
+            finally:
+                with self._lock:
+                    self._tokens.pop(job_id, None)
+                    self._cancel.pop(job_id, None)
+                self._queue.task_done()
+
+    def _run(self, job_id: str) -> None:
+        job = self.store.get(job_id)
+        with self._lock:
+            token, cancel = self._tokens.get(job_id), self._cancel.get(job_id, threading.Event())
+        if job is None:
+            return
+        if cancel.is_set():
+            self.store.update(job_id, status=CANCELLED, finished_at=time.time())
+            return
+        self.store.update(job_id, status=RUNNING, started_at=job["started_at"] or time.time())
+        try:
+            HANDLERS[job["kind"]](JobContext(self.store, job, token, cancel))
+        except Cancelled:
+            self.store.update(job_id, status=CANCELLED, finished_at=time.time())
+            return
+        except Exception as exc:
+            self.store.update(job_id, status=FAILED, finished_at=time.time(),
+                              error=f"{type(exc).__name__}: {exc}"[:500])
+            return
+        job = self.store.get(job_id) or job
+        self.store.update(job_id, status=PARTIAL if job["failed"] else DONE, finished_at=time.time())
+
+
+def throughput(job: Dict[str, Any], now: Optional[float] = None) -> float:
+    """Filas procesadas (bien o mal) por segundo desde que arrancó el trabajo."""
+    if not job.get("started_at"):
+        return 0.0
+    end = job.get("finished_at") or now or time.time()
+    return (job["done"] + job["failed"]) / max(end - job["started_at"], 1e-3)
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_queue() -> JobQueue:
+    """La cola del proceso (una para todas las sesiones)."""
+    return JobQueue(JobStore())
@@ -0,0 +1,185 @@
+"""
+KPIs incrementales para los dashboards: cada punto nuevo actualiza los agregados en O(1).
+
+``KPIEngine`` mantiene, por serie:
+
+- ``last``, ``count``, ``missing``, ``total`` (acumulado) y ``mean`` (promedio histórico)
+- ``rolling_mean``: promedio de los últimos ``window`` puntos
+- ``period`` / ``prev_period``: suma de los últimos ``period`` puntos y de los ``period``
+  anteriores; ``delta`` y ``delta_pct`` comparan ambos (período contra período)
+
+y para cada par ``(a, b)`` de ``abs_diff`` una serie derivada ``|a-b|`` con los mismos KPIs
+(ej. "diferencia media |A-B|").
+
+Las ventanas son en puntos (un punto = un día, una hora, según la serie). Cada serie guarda
+solo un buffer circular de ``max(window, 2 * period)`` valores y sumas corrientes: al llegar un
+punto se suma el nuevo y se restan los que salen de cada ventana, sin recorrer la historia.
+Para que el error de punto flotante no se acumule, las sumas de ventana se recalculan desde
+el buffer cada ``capacidad`` puntos (O(1) amortizado).
+
+Un ``NaN`` (punto faltante del feed) ocupa su lugar en las ventanas pero no suma: las sumas
+lo saltan (como ``np.nansum``), los promedios dividen por los puntos válidos (como
+``rolling(...).mean()`` de pandas) y ``missing`` cuenta cuántos hubo. ``last`` es el último
+valor válido.
+"""
+
+from __future__ import annotations
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class _RollingSeries:
+    def __init__(self, window: int, period: int):
+        self.window = window
+        self.period = period
+        self.capacity = max(window, 2 * period, 1)
+        self._buf = np.zeros(self.capacity, dtype="float64")
+        self.count = 0
+        self.missing = 0
+        self.total = 0.0
+        self.last = float("nan")
+        self._win = 0.0
+        self._win_n = 0  # puntos válidos en la ventana
+        self._cur = 0.0
+        self._prev = 0.0
+
+    def _at(self, i: int) -> float:
+        """Valor del punto absoluto ``i`` (debe estar dentro del buffer)."""
+        return float(self._buf[i % self.capacity])
+
+    def append(self, x: float) -> None:
+        n = self.count
+        if n >= self.window:
+            out = self._at(n - self.window)
+            if out == out:  # no es NaN
+                self._win -= out
+                self._win_n -= 1
+        if n >= self.period:
+            moved = self._at(n - self.period)
+            if moved == moved:
+                self._cur -= moved
+                self._prev += moved
+        if n >= 2 * self.period:
+            out = self._at(n - 2 * self.period)
+            if out == out:
+                self._prev -= out
+        self._buf[n % self.capacity] = x
+        self.count = n + 1
+        if x == x:
+            self.total += x
+            self.last = x
+            self._win += x
+            self._win_n += 1
+            self._cur += x
+        else:
+            self.missing += 1
+        if self.count % self.capacity == 0:
+            self._resum()
+
+    def extend(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype="float64")
+        if len(values) < self.capacity:
+            for x in values.tolist():
+                self.append(x)
+            return
+        # Lote grande: basta con el total y la cola que entra en el buffer.
+        n = self.count + len(values)
+        tail = values[-self.capacity:]
+        idx = (np.arange(n - len(tail), n)) % self.capacity
+        self._buf[idx] = tail
+        self.count = n
+        valid = values[~np.isnan(values)]
+        self.missing += len(values) - len(valid)
+        self.total += float(valid.sum())
+        if len(valid):
+            self.last = float(valid[-1])
+        self._resum()
+
+    def _tail(self, k: int, skip: int = 0) -> np.ndarray:
+        """Últimos ``k`` valores antes de saltar los ``skip`` más recientes."""
+        stop = self.count - skip
+        start = max(0, stop - k)
+        if stop <= start:
+            return np.zeros(0)
+        return self._buf[np.arange(start, stop) % self.capacity]
+
+    def _resum(self) -> None:
+        win = self._tail(self.window)
+        self._win = float(np.nansum(win))
+        self._win_n = int(np.count_nonzero(~np.isnan(win)))
+        self._cur = float(np.nansum(self._tail(self.period)))
+        self._prev = float(np.nansum(self._tail(self.period, skip=self.period)))
+
+    def snapshot(self) -> Dict[str, float]:
+        n = self.count
+        valid = n - self.missing
+        prev_n = min(max(n - self.period, 0), self.period)
+        delta = self._cur - self._prev if prev_n else float("nan")
+        return {
+            "last": self.last,
+            "count": n,
+            "missing": self.missing,
+            "total": self.total,
+            "mean": self.total / valid if valid else float("nan"),
+            "rolling_mean": self._win / self._win_n if self._win_n else float("nan"),
+            "period": self._cur,
+            "prev_period": self._prev if prev_n else float("nan"),
+            "delta": delta,
+            "delta_pct": delta / self._prev if prev_n and self._prev else float("nan"),
+        }
+
+
+def abs_diff_name(a: str, b: str) -> str:
+    return f"|{a}-{b}|"
+
+
+class KPIEngine:
+    """Agregados incrementales para varias series que avanzan juntas (una fila por punto)."""
+
+    def __init__(
+        self,
+        series: Sequence[str],
+        *,
+        window: int = 30,
+        period: int = 7,
+        abs_diff: Iterable[Tuple[str, str]] = (),
+    ):
+        self.series: List[str] = list(series)
+        self.pairs: List[Tuple[str, str]] = [tuple(p) for p in abs_diff]
+        self.window = window
+        self.period = period
+        names = self.series + [abs_diff_name(a, b) for a, b in self.pairs]
+        self._state: Dict[str, _RollingSeries] = {name: _RollingSeries(window, period) for name in names}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, series: Optional[Sequence[str]] = None, **kwargs) -> "KPIEngine":
+        engine = cls(series if series is not None else list(df.columns), **kwargs)
+        engine.extend(df)
+        return engine
+
+    def append(self, point: Mapping[str, float]) -> None:
+        """Agrega un punto (un valor por serie). O(1) por serie."""
+        for name in self.series:
+            self._state[name].append(float(point[name]))
+        for a, b in self.pairs:
+            self._state[abs_diff_name(a, b)].append(abs(float(point[a]) - float(point[b])))
+
+    def extend(self, df: pd.DataFrame) -> None:
+        """Agrega varias filas; lotes más largos que el buffer se cargan vectorizados."""
+        cols = {name: df[name].to_numpy(dtype="float64") for name in self.series}
+        for name, values in cols.items():
+            self._state[name].extend(values)
+        for a, b in self.pairs:
+            self._state[abs_diff_name(a, b)].extend(np.abs(cols[a] - cols[b]))
+
+    @property
+    def count(self) -> int:
+        return self._state[self.series[0]].count if self.series else 0
+
+    def get(self, series: str, kpi: str) -> float:
+        return self._state[series].snapshot()[kpi]
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {name: state.snapshot() for name, state in self._state.items()}
@@ -0,0 +1,169 @@
+"""
+Feed local de puntos para el modo en vivo del dashboard (página 1).
+
+- ``SimulatedFeed``: caminata aleatoria con ``rate`` puntos por segundo. No usa hilos: al
+  consultarlo genera los puntos que "llegaron" desde la última consulta según el reloj. Se
+  comparte por proceso (``st.cache_resource``) y guarda solo los últimos ``buffer`` puntos.
+  Cualquier fuente con el mismo ``poll(after, limit)`` sirve (ej. una cola de mensajes).
+- ``LiveView``: estado de una sesión: cursor en el feed, historia acotada a ``cap`` puntos
+  (buffer circular) y KPIs incrementales (``utils.kpi_engine``). ``chart_frame`` es lo que
+  se manda al gráfico en cada tick: la historia reducida al ancho del gráfico. Streamlit no
+  tiene cómo agregar puntos a un gráfico ya dibujado, así que se redibuja entero, pero con
+  a lo sumo ~``width_px`` puntos por serie, sin importar el tope de historia.
+
+Backpressure: cada consulta trae a lo sumo ``limit`` puntos. Si la fuente produjo más de lo
+que la página alcanzó a dibujar (intervalo corto, feed rápido, pestaña lenta), se saltan los
+más viejos y se informan en ``dropped``: la vista queda al día en vez de acumular atraso.
+
+Env:
+- LIVE_FEED_RATE: puntos por segundo del feed simulado (default: 20)
+- LIVE_FEED_BUFFER: puntos que retiene el feed (default: 100000)
+- LIVE_MAX_BATCH: máximo de puntos por consulta antes de descartar (default: 2000)
+"""
+
+from __future__ import annotations
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils.downsample import CHART_WIDTH_PX, reduce_indices
+from utils.kpi_engine import KPIEngine
+
+LIVE_FEED_RATE = float(os.getenv("LIVE_FEED_RATE", "20"))
+LIVE_FEED_BUFFER = int(os.getenv("LIVE_FEED_BUFFER", "100000"))
+LIVE_MAX_BATCH = int(os.getenv("LIVE_MAX_BATCH", "2000"))
+
+
+@dataclass
+class FeedBatch:
+    frame: pd.DataFrame  # índice ``x`` = número de secuencia del punto
+    last_seq: int        # cursor para la próxima consulta
+    dropped: int         # puntos pendientes que se saltaron por backpressure
+
+
+class _Ring:
+    """Últimos ``capacity`` puntos de varias columnas, en orden de llegada (admite saltos de secuencia)."""
+
+    def __init__(self, columns: Sequence[str], capacity: int):
+        self.columns = list(columns)
+        self.capacity = max(1, int(capacity))
+        self._seq = np.zeros(self.capacity, dtype=np.int64)
+        self._cols = {c: np.zeros(self.capacity, dtype="float64") for c in self.columns}
+        self._written = 0
+        self.last_seq = 0  # secuencia del último punto escrito (0 = vacío)
+
+    def write(self, seq: np.ndarray, values: Dict[str, np.ndarray]) -> None:
+        if not len(seq):
+            return
+        seq, values = seq[-self.capacity:], {c: v[-self.capacity:] for c, v in values.items()}
+        pos = (self._written + np.arange(len(seq))) % self.capacity
+        self._seq[pos] = seq
+        for c in self.columns:
+            self._cols[c][pos] = values[c]
+        self._written += len(seq)
+        self.last_seq = int(seq[-1])
+
+    def __len__(self) -> int:
+        return min(self._written, self.capacity)
+
+    def frame(self, after: int = 0) -> pd.DataFrame:
+        """Puntos retenidos con secuencia > ``after``, del más viejo al más nuevo."""
+        n = len(self)
+        pos = (self._written - n + np.arange(n)) % self.capacity
+        pos = pos[self._seq[pos] > after]
+        index = pd.Index(self._seq[pos], name="x")
+        return pd.DataFrame({c: self._cols[c][pos] for c in self.columns}, index=index)
+
+
+class SimulatedFeed:
+    def __init__(
+        self,
+        columns: Sequence[str] = ("serie_a", "serie_b"),
+        rate: float = LIVE_FEED_RATE,
+        buffer: int = LIVE_FEED_BUFFER,
+        seed: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.columns = list(columns)
+        self.rate = float(rate)
+        self._clock = clock
+        self._t0 = clock()
+        self._rng = np.random.default_rng(seed)
+        self._level = np.zeros(len(self.columns))
+        self._ring = _Ring(self.columns, buffer)
+        self._lock = threading.Lock()
+        self.produced = 0
+
+    def _advance(self) -> None:
+        due = int((self._clock() - self._t0) * self.rate)
+        n = due - self.produced
+        if n <= 0:
+            return
+        # Lo que no cabe en el buffer no se genera: nadie podría leerlo.
+        keep = min(n, self._ring.capacity)
+        steps = self._rng.standard_normal((keep, len(self.columns))).cumsum(axis=0) + self._level
+        self._level = steps[-1]
+        seq = np.arange(due - keep + 1, due + 1, dtype=np.int64)
+        self._ring.write(seq, {c: steps[:, i] for i, c in enumerate(self.columns)})
+        self.produced = due
+
+    @property
+    def latest(self) -> int:
+        with self._lock:
+            self._advance()
+            return self._ring.last_seq
+
+    def poll(self, after: int, limit: int = LIVE_MAX_BATCH) -> FeedBatch:
+        """Puntos con secuencia > ``after`` (a lo sumo los ``limit`` más nuevos)."""
+        with self._lock:
+            self._advance()
+            last = self._ring.last_seq
+            pending = max(0, last - after)
+            start = max(after, last - limit)
+            frame = self._ring.frame(start)
+        return FeedBatch(frame=frame, last_seq=last, dropped=pending - len(frame))
+
+
+class LiveView:
+    """Cursor, historia acotada y KPIs de una sesión sobre un feed."""
+
+    def __init__(self, feed: SimulatedFeed, cap: int, *, kpis: Optional[KPIEngine] = None):
+        self.feed = feed
+        self.cap = int(cap)
+        self.kpis = kpis or KPIEngine(feed.columns)
+        self._history = _Ring(feed.columns, self.cap)
+        # Arranca con la historia reciente que tenga el feed (a lo sumo ``cap`` puntos).
+        self.cursor = max(0, feed.latest - self.cap)
+        self.received = 0
+        self.dropped = 0
+        self.polls = 0
+
+    def pull(self, limit: int = LIVE_MAX_BATCH) -> FeedBatch:
+        batch = self.feed.poll(self.cursor, limit)
+        self.cursor = batch.last_seq
+        self.polls += 1
+        self.dropped += batch.dropped
+        if len(batch.frame):
+            self.received += len(batch.frame)
+            self._history.write(
+                batch.frame.index.to_numpy(), {c: batch.frame[c].to_numpy() for c in self.feed.columns},
+            )
+            self.kpis.extend(batch.frame)
+        return batch
+
+    def history(self) -> pd.DataFrame:
+        return self._history.frame()
+
+    @property
+    def history_len(self) -> int:
+        return len(self._history)
+
+    def chart_frame(self, *, width_px: int = CHART_WIDTH_PX, method: str = "lttb") -> pd.DataFrame:
+        """Historia reducida a ~``width_px`` puntos por serie, para redibujar el gráfico."""
+        rows = self.history()
+        return rows.iloc[reduce_indices(rows, max(3, width_px), method)]
@@ -0,0 +1,124 @@
+"""
+Cache LRU thread-safe con tope en bytes, compartido por las sesiones del proceso.
+
+Lo usan la capa de datos de los reportes (``utils.report_data``) y las descargas
+(``utils.exports``).
+"""
+
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+
+class MemoryLRU:
+    """
+    Cache LRU thread-safe con tope en bytes. ``sizeof`` estima el peso de cada valor.
+    Si un valor solo supera el tope se devuelve sin guardarlo. ``on_evict(key, value)``
+    se llama al sacar una entrada (por tope, reemplazo o ``clear``).
+
+    ``get_or_load`` carga cada clave una sola vez aunque varias sesiones la pidan a la
+    vez: la primera corre el ``loader`` y las demás esperan su resultado.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        sizeof: Callable[[object], int],
+        on_evict: Optional[Callable[[Hashable, object], None]] = None,
+    ):
+        self.max_bytes = int(max_bytes)
+        self._sizeof = sizeof
+        self._on_evict = on_evict
+        self._data: "OrderedDict[Hashable, Tuple[object, int]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._loading: Dict[Hashable, Future] = {}
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[object]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Sin contar acierto/fallo ni mover la entrada."""
+        with self._lock:
+            return key in self._data
+
+    def peek(self, key: Hashable) -> Optional[object]:
+        """Como ``get``, sin contar acierto/fallo ni mover la entrada."""
+        with self._lock:
+            item = self._data.get(key)
+            return None if item is None else item[0]
+
+    def put(self, key: Hashable, value: object) -> None:
+        size = int(self._sizeof(value))
+        with self._lock:
+            self._drop(key)
+            if size > self.max_bytes:
+                return
+            self._data[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._data:
+                old_key = next(iter(self._data))
+                self._drop(old_key)
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], object], *, track: bool = True) -> object:
+        """``track=False`` (precargas en segundo plano): no cuenta acierto/fallo."""
+        value = self.get(key) if track else self.peek(key)
+        if value is not None:
+            return value
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:  # se cargó entre el ``get`` y ahora
+                return item[0]
+            future = self._loading.get(key)
+            owner = future is None
+            if owner:
+                future = self._loading[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            value = loader()
+            self.put(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+
+    def _drop(self, key: Hashable) -> None:
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.current_bytes -= item[1]
+            if self._on_evict is not None:
+                self._on_evict(key, item[0])
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._data):
+                self._drop(key)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,397 @@
+"""
+Etapas pesadas de los reportes en un pool de procesos, fuera del GIL de las sesiones.
+
+Todo lo que corre en el hilo del script compite por el GIL con las demás sesiones del worker:
+una agregación grande o una descarga de millones de filas frena los reruns de todos. Este
+módulo manda esas etapas a ``OFFLOAD_WORKERS`` procesos:
+
+- ``aggregate``: agregaciones de una tabla de hechos Parquet con el motor de ``utils.report_engine``
+  (varias a la vez corren en paralelo)
+- ``synthetic_cells``: tabla de hechos sintética + celdas del cubo (``REPORT_SYNTHETIC_ROWS``)
+- ``write_export``: codificar una descarga (CSV/Parquet/XLSX/HTML con formato) a disco
+- ``render_styled``: el HTML con semáforo y degradado PV de una tabla grande de la página 4
+
+Los DataFrames viajan como Arrow IPC en memoria compartida (``multiprocessing.shared_memory``),
+no con pickle: quien envía escribe el stream directo en el bloque compartido y quien recibe lo
+copia una vez a memoria propia y lo libera. Sin ``pyarrow`` viajan con pickle.
+
+Los procesos se lanzan con ``python -m utils.offload_worker`` (``subprocess``), no con
+``multiprocessing``: multiprocessing le pasa a cada proceso nuevo el ``__main__`` del padre, que
+durante un run es el script de la página, y el proceso lo ejecutaría entero (login, API,
+``st.*``). Cada proceso recibe ``(función, argumentos)`` por stdin y responde por stdout; un
+hilo por proceso le pasa las tareas en orden de llegada.
+
+Mientras espera el resultado el hilo del script está bloqueado en un ``Future`` (sin el GIL),
+así que las demás sesiones siguen. ``placeholder(texto)`` muestra un aviso en la página hasta
+que llegue. Con ``OFFLOAD_WORKERS=0``, o con tablas de menos de ``OFFLOAD_MIN_ROWS`` filas (el
+viaje al pool no compensa), todo corre en el hilo que llama, igual que antes.
+
+Env:
+- OFFLOAD_WORKERS: procesos del pool; 0 = sin pool (default: 2)
+- OFFLOAD_MIN_ROWS: filas mínimas para mandar una tabla al pool (default: 50000)
+"""
+
+from __future__ import annotations
+import atexit
+import contextlib
+import importlib.util
+import os
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+OFFLOAD_WORKERS = int(os.getenv("OFFLOAD_WORKERS", "2"))
+OFFLOAD_MIN_ROWS = int(os.getenv("OFFLOAD_MIN_ROWS", "50000"))
+
+_HAS_ARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+# ---------- Transporte por memoria compartida ----------
+@dataclass(frozen=True)
+class SharedFrame:
+    """Referencia a un DataFrame serializado como Arrow IPC en un bloque de memoria compartida."""
+    name: str
+    size: int
+    rows: int
+
+
+Payload = Union[SharedFrame, pd.DataFrame]
+
+
+def share(df: pd.DataFrame) -> Payload:
+    """Escribe ``df`` en un bloque compartido nuevo; el que lo recibe lo libera (``receive``)."""
+    if not _HAS_ARROW:
+        return df
+    import pyarrow as pa
+    from multiprocessing import resource_tracker, shared_memory
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    counter = pa.MockOutputStream()  # tamaño exacto del stream sin escribirlo
+    with pa.ipc.new_stream(counter, table.schema) as writer:
+        writer.write_table(table)
+    size = counter.size()
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    target = pa.py_buffer(shm.buf)
+    sink = writer = None
+    try:
+        sink = pa.FixedSizeBufferWriter(target)
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        sink.close()
+    except BaseException:
+        del target, sink, writer
+        shm.close()
+        shm.unlink()
+        raise
+    # ``close`` falla si queda algún buffer de Arrow apuntando al bloque.
+    del target, sink, writer
+    name = shm.name
+    shm.close()
+    # El bloque pasa a ser del receptor: que el tracker de este proceso no lo borre al salir.
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return SharedFrame(name, size, len(df))
+
+
+def receive(payload: Payload) -> pd.DataFrame:
+    """DataFrame de un ``share``: una copia a memoria propia y el bloque compartido se libera."""
+    if isinstance(payload, pd.DataFrame):
+        return payload
+    import pyarrow as pa
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(name=payload.name)
+    try:
+        view = shm.buf[:payload.size]
+        data = pa.py_buffer(bytes(view))
+        view.release()
+    finally:
+        shm.close()
+        shm.unlink()
+    return pa.ipc.open_stream(data).read_all().to_pandas()
+
+
+# ---------- Tareas (corren en los procesos del pool) ----------
+def _aggregate_task(engine: str, source: str, by: Sequence[str], where: Optional[Mapping]) -> Payload:
+    from utils.report_engine import get_engine
+    return share(get_engine(engine).aggregate(source, by, where))
+
+
+def _synthetic_cells(n_rows: int, seed: int, dims: Sequence[str]) -> pd.DataFrame:
+    from utils.report_cube import AggregateCube
+    from utils.synthetic import make_fact_table
+    facts = make_fact_table(n_rows, n_periods=1, seed=seed)
+    return AggregateCube.from_facts(facts, dims).cells
+
+
+def _synthetic_cells_task(n_rows: int, seed: int, dims: Sequence[str]) -> Payload:
+    return share(_synthetic_cells(n_rows, seed, dims))
+
+
+def _export_task(payload: Payload, fmt: str, path: str, rows: int) -> str:
+    from utils.exports import WRITERS
+    WRITERS[fmt](receive(payload), path, rows)
+    return path
+
+
+def _render_styled_task(payload: Payload) -> str:
+    from utils.report_style import styled_html
+    return styled_html(receive(payload))
+
+
+# ---------- Pool ----------
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _Worker:
+    """Un proceso ``utils.offload_worker``: una tarea a la vez, por stdin/stdout."""
+
+    def __init__(self) -> None:
+        try:
+            self.proc = subprocess.Popen(
+                [sys.executable, "-m", "utils.offload_worker"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=_ROOT,
+            )
+        except OSError as exc:
+            raise BrokenProcessPool(f"no se pudo lanzar un proceso del pool: {exc}") from exc
+
+    def call(self, fn: Callable[..., object], args: tuple) -> object:
+        try:
+            pickle.dump((fn, args), self.proc.stdin, protocol=pickle.HIGHEST_PROTOCOL)
+            self.proc.stdin.flush()
+            ok, value = pickle.load(self.proc.stdout)
+        except (EOFError, OSError, pickle.UnpicklingError) as exc:
+            self.proc.kill()
+            raise BrokenProcessPool(f"el proceso {self.proc.pid} del pool terminó") from exc
+        if not ok:
+            raise value
+        return value
+
+    def close(self) -> None:
+        # Sin stdin el proceso sale solo al terminar la tarea en curso.
+        with contextlib.suppress(OSError):
+            self.proc.stdin.close()
+
+
+class _Pool:
+    """``workers`` procesos ``_Worker``, lanzados al llegar la primera tarea de cada hilo."""
+
+    def __init__(self, workers: int) -> None:
+        self._tasks: queue.SimpleQueue = queue.SimpleQueue()
+        self._broken = False
+        self._threads = [threading.Thread(target=self._serve, name=f"offload-{i}", daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, fn: Callable[..., object], *args: object) -> Future:
+        if self._broken:
+            raise BrokenProcessPool("un proceso del pool terminó")
+        future: Future = Future()
+        self._tasks.put((future, fn, args))
+        return future
+
+    def _serve(self) -> None:
+        worker: Optional[_Worker] = None
+        try:
+            while (task := self._tasks.get()) is not None:
+                future, fn, args = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    worker = worker or _Worker()
+                    future.set_result(worker.call(fn, args))
+                except BrokenProcessPool as exc:
+                    self._broken = True
+                    worker = None
+                    future.set_exception(exc)
+                except BaseException as exc:
+                    future.set_exception(exc)
+        finally:
+            if worker is not None:
+                worker.close()
+
+    def shutdown(self) -> None:
+        """Cancela lo que no empezó; cada proceso sale al terminar su tarea en curso."""
+        with contextlib.suppress(queue.Empty):
+            while True:
+                task = self._tasks.get_nowait()
+                if task is not None:
+                    task[0].cancel()
+        for _ in self._threads:
+            self._tasks.put(None)
+
+
+_POOL: Optional[_Pool] = None
+_POOL_LOCK = threading.Lock()
+_STATS: Dict[str, float] = {"pool": 0, "inline": 0, "errors": 0, "pool_ms": 0.0, "shared_bytes": 0}
+_STATS_LOCK = threading.Lock()
+
+
+def _submit(fn: Callable[..., object], *args: object) -> Future:
+    with _POOL_LOCK:
+        return _pool().submit(fn, *args)
+
+
+def _pool() -> _Pool:
+    # Con ``_POOL_LOCK`` tomado.
+    global _POOL
+    if _POOL is None:
+        _POOL = _Pool(OFFLOAD_WORKERS)
+        atexit.register(shutdown)
+    return _POOL
+
+
+def shutdown() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown()
+            _POOL = None
+
+
+def enabled(rows: Optional[int] = None) -> bool:
+    """Usar el pool (y si se da ``rows``, si la tabla es lo bastante grande)."""
+    return OFFLOAD_WORKERS > 0 and (rows is None or rows >= OFFLOAD_MIN_ROWS)
+
+
+def _count(key: str, value: float = 1) -> None:
+    with _STATS_LOCK:
+        _STATS[key] += value
+
+
+def _submit_all(calls: Sequence[Tuple[Callable[..., object], tuple]]) -> List[object]:
+    """Corre las tareas en paralelo en el pool y devuelve sus resultados en orden."""
+    from utils import profiler
+
+    t0 = time.perf_counter()
+    names = ", ".join(sorted({fn.__name__.strip("_") for fn, _ in calls}))
+    with profiler.stage(f"pool: {names}", tasks=len(calls)):
+        futures: List[Future] = []
+        try:
+            futures = [_submit(fn, *args) for fn, args in calls]
+            results = [f.result() for f in futures]
+        except BrokenProcessPool:
+            # Un proceso murió (OOM, señal): el pool ya no sirve; el siguiente pedido arma otro.
+            _count("errors")
+            shutdown()
+            raise
+        except Exception:
+            _count("errors")
+            # Los demás pueden dejar bloques compartidos que nadie leerá: liberarlos al terminar.
+            for f in futures:
+                f.cancel()
+                f.add_done_callback(_discard_result)
+            raise
+    _count("pool", len(calls))
+    _count("pool_ms", (time.perf_counter() - t0) * 1000)
+    _count("shared_bytes", sum(r.size for r in results if isinstance(r, SharedFrame)))
+    return results
+
+
+def _discard_result(future: Future) -> None:
+    if not future.cancelled() and future.exception() is None:
+        _discard(future.result())
+
+
+def _discard(payload: object) -> None:
+    if isinstance(payload, SharedFrame):
+        with contextlib.suppress(FileNotFoundError):
+            receive(payload)
+
+
+def stats() -> Dict[str, float]:
+    with _STATS_LOCK:
+        return {**_STATS, "workers": OFFLOAD_WORKERS, "min_rows": OFFLOAD_MIN_ROWS}
+
+
+# ---------- API ----------
+# Si el pool se rompe (``BrokenProcessPool``) la etapa se repite en el hilo que llama: la
+# página muestra el resultado igual, solo que sin la ventaja del pool.
+def aggregate(engine: str, source: str, groups: Sequence[Sequence[str]],
+              where: Optional[Mapping] = None) -> List[pd.DataFrame]:
+    """
+    ``get_engine(engine).aggregate(source, by, where)`` para cada ``by`` de ``groups``, en
+    paralelo en el pool (el tamaño de la fuente no se conoce antes: siempre va al pool).
+    """
+    if enabled():
+        plain_where = {k: list(v) for k, v in (where or {}).items()} or None
+        try:
+            payloads = _submit_all([(_aggregate_task, (engine, source, list(by), plain_where)) for by in groups])
+            return [receive(p) for p in payloads]
+        except BrokenProcessPool:
+            pass
+    from utils.report_engine import get_engine
+    _count("inline", len(groups))
+    return [get_engine(engine).aggregate(source, by, where) for by in groups]
+
+
+def synthetic_cells(n_rows: int, seed: int, dims: Sequence[str]) -> pd.DataFrame:
+    """Celdas del cubo de una tabla de hechos sintética de ``n_rows`` filas."""
+    if enabled(n_rows):
+        try:
+            return receive(_submit_all([(_synthetic_cells_task, (n_rows, seed, list(dims)))])[0])
+        except BrokenProcessPool:
+            pass
+    _count("inline")
+    return _synthetic_cells(n_rows, seed, dims)
+
+
+def write_export(df: pd.DataFrame, fmt: str, path: str, rows: int) -> None:
+    """Escribe la descarga ``fmt`` de ``df`` en ``path`` (en el pool si la tabla es grande)."""
+    from utils.exports import WRITERS
+
+    if enabled(len(df)):
+        payload = share(df)
+        try:
+            _submit_all([(_export_task, (payload, fmt, path, rows))])
+            _count("shared_bytes", payload.size if isinstance(payload, SharedFrame) else 0)
+            return
+        except BrokenProcessPool:
+            pass
+        finally:
+            _discard(payload)  # libera el bloque si el proceso no llegó a leerlo
+    _count("inline")
+    WRITERS[fmt](df, path, rows)
+
+
+def render_styled(df: pd.DataFrame) -> str:
+    """``report_style.styled_html(df)``: en el pool si la tabla es grande (el Styler recorre cada celda)."""
+    from utils.report_style import styled_html
+
+    if enabled(len(df)):
+        payload = share(df)
+        try:
+            html = _submit_all([(_render_styled_task, (payload,))])[0]
+            _count("shared_bytes", payload.size if isinstance(payload, SharedFrame) else 0)
+            return html
+        except BrokenProcessPool:
+            pass
+        finally:
+            _discard(payload)  # libera el bloque si el proceso no llegó a leerlo
+    _count("inline")
+    return styled_html(df)
+
+
+@contextlib.contextmanager
+def placeholder(text: str, *, show: bool = True) -> Iterator[None]:
+    """Aviso en la página mientras corre el bloque (ej. esperando al pool); se borra al terminar."""
+    if not show:
+        yield
+        return
+    import streamlit as st
+
+    slot = st.empty()
+    slot.info(f"⏳ {text}")
+    try:
+        yield
+    finally:
+        slot.empty()
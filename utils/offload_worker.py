@@ -0,0 +1,50 @@
+"""
+Proceso del pool de ``utils.offload``: ``python -m utils.offload_worker``.
+
+El padre lo lanza con ``subprocess`` desde la raíz del repo, así que el ``__main__`` de este
+proceso es este módulo y no el script de la página que corría en el padre. Lee tareas
+``(función, argumentos)`` en pickle por stdin, una a la vez, y responde ``(True, resultado)``
+o ``(False, excepción)`` por stdout. Sale cuando el padre cierra stdin.
+
+Las funciones viajan por nombre de módulo (``utils.offload``, ``utils.exports``): se importan
+al llegar la primera tarea. Lo que impriman las tareas va a stderr, para no mezclarse con
+las respuestas.
+"""
+
+from __future__ import annotations
+import os
+import pickle
+import signal
+import sys
+
+
+def _reply(out, ok: bool, value: object) -> None:
+    try:
+        data = pickle.dumps((ok, value), protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as exc:  # resultado o excepción que no se puede serializar
+        data = pickle.dumps((False, RuntimeError(f"{type(exc).__name__}: {exc}")))
+    out.write(data)
+    out.flush()
+
+
+def main() -> None:
+    # Ctrl+C en la terminal llega a todo el grupo: el proceso sale cuando el padre cierra stdin.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    out = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    tasks = sys.stdin.buffer
+    while True:
+        try:
+            fn, args = pickle.load(tasks)
+        except EOFError:
+            return
+        try:
+            result = fn(*args)
+        except Exception as exc:
+            _reply(out, False, exc)
+        else:
+            _reply(out, True, result)
+
+
+if __name__ == "__main__":
+    main()
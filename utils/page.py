@@ -0,0 +1,80 @@
+"""
+Arranque común de las páginas: configuración, login y logo de la sidebar.
+
+Cada página empieza con::
+
+    from utils import page
+    token = page.setup("Reporte posicionamiento", script=__file__)
+
+en vez de repetir ``set_page_config`` + ``auth.ensure_authenticated`` + el HTML del logo.
+``script`` da el nombre de la página para el perfil de runs (``utils.profiler``).
+
+Streamlit vuelve a dibujar todo en cada rerun, así que ``ensure_authenticated`` corre en
+cada rerun: revisa el token en ``session_state`` y dibuja el botón de cierre de sesión. Solo
+la limpieza de cookies antiguas queda marcada en la sesión y corre una vez; la cookie se lee
+mientras la sesión no tenga token (el componente de cookies puede tardar un run en
+responder). El primer run autenticado del proceso arranca además el warm-up de caches en
+segundo plano (``utils.warmup``).
+
+Los módulos pesados que solo usan algunas páginas (``st_aggrid``, el ``Styler`` de pandas,
+``openpyxl``/``pyarrow`` de las descargas) se importan dentro de las funciones que los usan,
+no al cargar la página. ``python -m benchmarks.profile_pages`` mide el arranque en frío de
+cada página.
+"""
+
+from __future__ import annotations
+import os
+from typing import Optional
+
+import streamlit as st
+
+from utils import auth, profiler, warmup
+
+FAVICON_URL = "https://chiper.cl/wp-content/uploads/2023/06/cropped-favicon-192x192.png"
+LOGO_URL = "https://chiper.cl/wp-content/uploads/2023/09/logo-chiper-1.svg"
+LOGO_LINK = "https://yourwebsite.com"
+
+_LOGO_HTML = f"""
+    <div style="text-align:center; margin-bottom:20px;">
+        <a href="{LOGO_LINK}" target="_blank">
+            <img src="{LOGO_URL}" width="120">
+        </a>
+    </div>
+    """
+
+
+def setup(
+    page_title: Optional[str] = None,
+    *,
+    script: str,
+    layout: str = "wide",
+    page_icon: Optional[str] = None,
+    initial_sidebar_state: str = "auto",
+    sidebar_logo: bool = True,
+) -> str:
+    """
+    Configura la página (si se da ``page_title``), exige sesión y dibuja el logo.
+    ``script`` es el ``__file__`` de la página. Devuelve el token; si el usuario no está
+    autenticado detiene la página.
+    """
+    if page_title is not None:
+        st.set_page_config(
+            page_title=page_title,
+            page_icon=page_icon,
+            layout=layout,
+            initial_sidebar_state=initial_sidebar_state,
+        )
+
+    # El perfil del run (``?profile=1``) empieza acá; el desglose va bajo el logo.
+    profiler.begin_run(os.path.basename(script))
+    try:
+        with profiler.stage("auth"):
+            token = auth.ensure_authenticated(show_controls_in_sidebar=True)
+    except ValueError:
+        st.stop()  # el usuario no se autenticó; detenemos la app
+    warmup.start()  # una vez por proceso; ya hay token para la API
+
+    if sidebar_logo:
+        st.sidebar.markdown(_LOGO_HTML, unsafe_allow_html=True)
+    profiler.sidebar_overlay()
+    return token
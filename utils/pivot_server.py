@@ -0,0 +1,155 @@
+"""
+Modelo de filas "server-side" para la tabla dinámica de la página 5.
+
+En vez de mandar todo el detalle al navegador y dejar que AgGrid agrupe/agregue, el
+servidor resuelve un nivel de agrupación a la vez: dado el camino de grupos abierto
+(``()`` → macros, ``("abarrotes",)`` → categorías de abarrotes, ...), filtra, agrega
+y ordena en Python sobre el cubo de agregados y devuelve solo las filas de ese nivel.
+
+Los agregados de cada (camino, filtro) se guardan en un cache LRU pequeño; ordenar o
+volver a un grupo ya abierto no recalcula nada. ``tree`` junta varios niveles en una sola
+tabla: los grupos de arriba y, debajo de cada grupo abierto, sus hijos.
+"""
+
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Collection, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.report_cube import AggregateCube, MEASURE_COLUMNS, finish
+from utils.search_index import SearchIndex, fold
+
+CHILDREN_COLUMN = "Hijos"
+LEVEL_COLUMN = "Nivel"
+
+
+class PivotServer:
+    def __init__(
+        self,
+        cube: AggregateCube,
+        group_cols: Sequence[str],
+        index: Optional[SearchIndex] = None,
+        *,
+        max_cached: int = 256,
+    ):
+        missing = set(group_cols) - set(cube.dims)
+        if missing:
+            raise KeyError(f"Columnas de grupo fuera del cubo: {sorted(missing)}")
+        if index is not None and index.n_rows != len(cube.cells):
+            raise ValueError("El índice debe estar construido sobre la misma tabla que el cubo")
+        self.cube = cube
+        self.group_cols = list(group_cols)
+        self.index = index
+        self.max_cached = max_cached
+        self._cache: "OrderedDict[Hashable, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self.group_cols)
+
+    def level(
+        self,
+        path: Sequence[str] = (),
+        *,
+        term: str = "",
+        fuzzy: bool = True,
+        weighted: bool = False,
+        sort_by: Optional[str] = None,
+        ascending: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Filas del nivel ``len(path)`` bajo ``path``: una por grupo, con las medidas del
+        reporte y ``Hijos`` (cantidad de subgrupos o filas debajo).
+        """
+        path = tuple(path)
+        if len(path) >= self.depth:
+            raise ValueError(f"El camino {path} ya está en la hoja (profundidad {self.depth})")
+        key = (path, fold(term), fuzzy, weighted)
+        with self._lock:
+            out = self._cache.get(key)
+            if out is not None:
+                self.hits += 1
+                self._cache.move_to_end(key)
+        if out is None:
+            out = self._compute(path, term, fuzzy, weighted)
+            with self._lock:
+                self.misses += 1
+                self._cache[key] = out
+                if len(self._cache) > self.max_cached:
+                    self._cache.popitem(last=False)
+        if sort_by:
+            out = out.sort_values(sort_by, ascending=ascending, kind="stable", ignore_index=True)
+        return out
+
+    def _compute(self, path: Tuple[str, ...], term: str, fuzzy: bool, weighted: bool) -> pd.DataFrame:
+        cells = self.cube.cells
+        mask = np.ones(len(cells), dtype=bool)
+        for col, value in zip(self.group_cols, path):
+            mask &= (cells[col] == value).to_numpy()
+        if term.strip() and self.index is not None:
+            mask &= self.index.mask(term, fuzzy=fuzzy)
+
+        by = self.group_cols[:len(path) + 1]
+        sub = cells[mask]
+        grouped = sub.groupby(by, sort=False, observed=True, dropna=False)
+        agg = grouped[MEASURE_COLUMNS].sum()
+        # Hijos: subgrupos del siguiente nivel o, en el último, filas de la tabla (``n``).
+        if len(by) < self.depth:
+            agg[CHILDREN_COLUMN] = grouped[self.group_cols[len(by)]].nunique()
+        else:
+            agg[CHILDREN_COLUMN] = agg["n"].astype("int64")
+        agg = agg.reset_index()
+        out = finish(agg, weighted=weighted, keep=by)
+        out[CHILDREN_COLUMN] = agg[CHILDREN_COLUMN].to_numpy()
+        return out
+
+    def tree(
+        self,
+        expanded: Collection[Tuple[str, ...]] = (),
+        *,
+        term: str = "",
+        fuzzy: bool = True,
+        weighted: bool = False,
+        sort_by: Optional[str] = None,
+        ascending: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Filas del primer nivel y, bajo cada camino de ``expanded`` (p. ej. ``{("abarrotes",),
+        ("bebidas",)}``), las de su subnivel, en orden de árbol. ``Nivel`` indica la profundidad;
+        las columnas de grupo más profundas que la fila quedan vacías.
+        """
+        expanded = {tuple(p) for p in expanded}
+        parts: List[pd.DataFrame] = []
+
+        def walk(path: Tuple[str, ...]) -> None:
+            level = self.level(path, term=term, fuzzy=fuzzy, weighted=weighted,
+                               sort_by=sort_by, ascending=ascending)
+            col = self.group_cols[len(path)]
+            values = level[col].astype(str).tolist()
+            level = level.assign(**{LEVEL_COLUMN: len(path)}, **dict(zip(self.group_cols, path)))
+            start = 0
+            for i, value in enumerate(values):
+                child = path + (value,)
+                if child in expanded and len(child) < self.depth:
+                    parts.append(level.iloc[start:i + 1])
+                    start = i + 1
+                    walk(child)
+            parts.append(level.iloc[start:])
+
+        walk(())
+        out = pd.concat(parts, ignore_index=True)
+        return out.reindex(columns=self.group_cols + [c for c in out.columns if c not in self.group_cols])
+
+    def options(self, path: Sequence[str] = (), *, term: str = "", fuzzy: bool = True) -> List[str]:
+        """Grupos que se pueden abrir bajo ``path`` (para el selector de navegación)."""
+        level = self.level(path, term=term, fuzzy=fuzzy)
+        return level[self.group_cols[len(path)]].astype(str).tolist()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,288 @@
+"""
+Perfil por rerun: cuánto se va en auth, API, datos, Styler, descargas, etc.
+
+Las páginas y los módulos marcan etapas con::
+
+    with profiler.stage("datos: load_report", periodo=periodo):
+        ...
+
+    @profiler.profiled("styler")
+    def style_report(df): ...
+
+Con el perfil activo (``?profile=1`` en la URL, o ``PROFILE_ENABLED=1`` para todas las
+sesiones), cada run del script (o de un fragmento) guarda sus etapas anidadas y:
+
+- muestra en la sidebar el desglose del rerun actual (se actualiza al cerrar cada etapa de
+  primer nivel; los fragmentos no pueden escribir en la sidebar, así que un rerun parcial
+  no la actualiza)
+- agrega el run a un archivo ``.json`` en ``PROFILE_DIR``, en el formato "JSON Array" de
+  Chrome trace: ``[`` al crearlo y después un evento por línea terminado en coma (metadatos
+  del run, cada etapa cerrada y el tiempo total hasta ese momento). Cada etapa de primer
+  nivel solo agrega sus líneas; el archivo no se reescribe. El formato admite que falte el
+  ``]`` final, así que el archivo se abre tal cual en ``chrome://tracing`` /
+  https://ui.perfetto.dev. ``python -m benchmarks.profile_summary`` resume y compara carpetas
+  de trazas.
+
+Sin perfil activo, o fuera del hilo del script (hilos de fondo, benchmarks, procesos sin
+Streamlit), ``stage`` no hace nada más que revisar el estado (~µs). Este módulo no importa
+Streamlit: si nadie lo cargó, todo queda desactivado.
+
+Env:
+- PROFILE_ENABLED: perfilar todas las sesiones sin el query param (default: 0)
+- PROFILE_DIR: carpeta de las trazas (default: .cache/profiles)
+- PROFILE_MAX_FILES: trazas que se conservan; se borran primero las más viejas (default: 1000)
+"""
+
+from __future__ import annotations
+import contextlib
+import functools
+import glob
+import json
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, TypeVar
+
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "0").strip().lower() in ("1", "true", "yes")
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(".cache", "profiles"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "1000"))
+
+QUERY_PARAM = "profile"
+RUN_KEY = "_profile_run"
+COUNTER_KEY = "_profile_runs"
+
+F = TypeVar("F", bound=Callable[..., object])
+
+
+@dataclass
+class Span:
+    name: str
+    start: float     # perf_counter() al entrar
+    duration: float  # segundos
+    depth: int
+    args: Dict[str, object] = field(default_factory=dict)
+
+
+@dataclass
+class RunProfile:
+    page: str
+    session: str
+    number: int
+    partial: bool
+    started_at: float = field(default_factory=time.time)
+    t0: float = field(default_factory=time.perf_counter)
+    spans: List[Span] = field(default_factory=list)
+    depth: int = 0
+    fragment_depth: int = 0  # > 0 mientras corre un fragmento: no se escribe en la sidebar
+    path: Optional[str] = None
+    written: int = 0  # spans ya agregados al archivo
+    slot: object = None  # placeholder de la sidebar (solo en runs completos)
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.t0) * 1000
+
+
+# ---------- Contexto ----------
+def _script_ctx():
+    if "streamlit" not in sys.modules:
+        return None
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    return get_script_run_ctx(suppress_warning=True)
+
+
+def enabled() -> bool:
+    """Perfil activo para la sesión actual (env o ``?profile=1``)."""
+    if _script_ctx() is None:
+        return False
+    if PROFILE_ENABLED:
+        return True
+    import streamlit as st
+    try:
+        return st.query_params.get(QUERY_PARAM, "") in ("1", "true")
+    except Exception:
+        return False
+
+
+def current_run() -> Optional[RunProfile]:
+    if _script_ctx() is None:
+        return None
+    import streamlit as st
+    return st.session_state.get(RUN_KEY)
+
+
+def begin_run(page: str, *, partial: bool = False) -> Optional[RunProfile]:
+    """Empieza el perfil de un run (lo llaman ``page.setup`` y los fragmentos en reruns parciales)."""
+    ctx = _script_ctx()
+    if ctx is None:
+        return None
+    import streamlit as st
+
+    if not enabled():
+        st.session_state.pop(RUN_KEY, None)
+        return None
+    number = st.session_state.get(COUNTER_KEY, 0) + 1
+    st.session_state[COUNTER_KEY] = number
+    run = RunProfile(page=page, session=str(getattr(ctx, "session_id", "")), number=number, partial=partial)
+    st.session_state[RUN_KEY] = run
+    return run
+
+
+def sidebar_overlay() -> None:
+    """Reserva el lugar del desglose en la sidebar (runs completos, fuera de fragmentos)."""
+    run = current_run()
+    if run is None or run.partial or run.fragment_depth:
+        return
+    import streamlit as st
+    run.slot = st.sidebar.empty()
+    _flush(run)
+
+
+# ---------- Etapas ----------
+@contextlib.contextmanager
+def stage(name: str, **args: object) -> Iterator[None]:
+    run = current_run()
+    if run is None:
+        yield
+        return
+    depth = run.depth
+    run.depth += 1
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.spans.append(Span(name, t0, time.perf_counter() - t0, depth, dict(args)))
+        run.depth = depth
+        if depth == 0:
+            _flush(run)
+
+
+@contextlib.contextmanager
+def fragment_stage(name: str, *, partial: bool) -> Iterator[None]:
+    """
+    Etapa de un fragmento (``utils.fragments``). En un rerun parcial, el fragmento más externo
+    empieza un perfil nuevo; en un run completo queda como etapa del run de la página.
+    """
+    run = current_run()
+    if partial and (run is None or run.depth == 0):
+        run = begin_run(run.page if run else "fragmento", partial=True)
+    if run is None:
+        yield
+        return
+    run.fragment_depth += 1
+    try:
+        with stage(name):
+            yield
+    finally:
+        run.fragment_depth -= 1
+
+
+def refresh() -> None:
+    """Actualiza la sidebar tras una llamada a fragmento hecha desde el cuerpo de la página."""
+    run = current_run()
+    if run is not None and run.depth == 0 and run.fragment_depth == 0:
+        _flush(run)
+
+
+def profiled(name: Optional[str] = None) -> Callable[[F], F]:
+    """Decorador: toda llamada a la función es una etapa (por defecto con su nombre)."""
+    def deco(fn: F) -> F:
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def inner(*a, **kw):
+            with stage(label):
+                return fn(*a, **kw)
+
+        return inner  # type: ignore[return-value]
+
+    return deco
+
+
+# ---------- Salida ----------
+def _flush(run: RunProfile) -> None:
+    """Al cerrar una etapa de primer nivel: actualiza la sidebar y agrega las etapas nuevas a la traza."""
+    if run.slot is not None and run.fragment_depth == 0:
+        try:
+            run.slot.code(format_run(run), language=None)
+        except Exception:
+            run.slot = None  # el placeholder ya no es escribible (ej. rerun interrumpido)
+    try:
+        write_trace(run)
+    except OSError:
+        pass
+
+
+def format_run(run: RunProfile) -> str:
+    kind = "parcial" if run.partial else "completo"
+    lines = [f"⏱ {run.page} · run {run.number} ({kind}) · {run.elapsed_ms:.0f} ms"]
+    for span in sorted(run.spans, key=lambda s: s.start):
+        label = "  " * span.depth + span.name
+        lines.append(f"{label[:34]:<34} {span.duration * 1000:>8.1f} ms")
+    return "\n".join(lines)
+
+
+def _span_event(run: RunProfile, span: Span) -> Dict[str, object]:
+    return {
+        "name": span.name,
+        "cat": "stage",
+        "ph": "X",
+        "ts": round((span.start - run.t0) * 1e6, 1),
+        "dur": round(span.duration * 1e6, 1),
+        "pid": os.getpid(),
+        "tid": 1,
+        "args": {k: str(v) for k, v in span.args.items()},
+    }
+
+
+def trace_events(run: RunProfile, *, first: int = 0, header: bool = True) -> List[Dict[str, object]]:
+    """
+    Eventos Chrome trace del run desde el span ``first``: metadatos (``ph: M``, si ``header``),
+    etapas (``ph: X``, µs desde el inicio del run) y el total hasta ahora (``ph: C``).
+    """
+    events: List[Dict[str, object]] = []
+    if header:
+        events.append({
+            "name": "run", "ph": "M", "pid": os.getpid(), "tid": 1,
+            "args": {
+                "page": run.page,
+                "session": run.session,
+                "run": run.number,
+                "partial": run.partial,
+                "started_at": run.started_at,
+            },
+        })
+    events.extend(_span_event(run, span) for span in run.spans[first:])
+    elapsed = run.elapsed_ms
+    events.append({
+        "name": "elapsed_ms", "ph": "C", "ts": round(elapsed * 1e3, 1), "pid": os.getpid(), "tid": 1,
+        "args": {"elapsed_ms": elapsed},
+    })
+    return events
+
+
+def _prune(directory: str) -> None:
+    files = sorted(glob.glob(os.path.join(directory, "*.json")), key=lambda p: os.path.getmtime(p))
+    for path in files[: max(0, len(files) - PROFILE_MAX_FILES)]:
+        with contextlib.suppress(OSError):
+            os.remove(path)
+
+
+def write_trace(run: RunProfile, directory: str = PROFILE_DIR) -> str:
+    """Agrega al archivo del run las etapas cerradas desde la última escritura (un evento por línea)."""
+    header = run.path is None
+    if header:
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(run.started_at))
+        page = os.path.splitext(os.path.basename(run.page))[0]
+        session = re.sub(r"[^0-9A-Za-z]", "", run.session)[:8] or "local"
+        run.path = os.path.join(directory, f"{stamp}-{session}-{page}-{run.number:04d}.json")
+        _prune(directory)
+    events = trace_events(run, first=run.written, header=header)
+    run.written = len(run.spans)
+    with open(run.path, "a", encoding="utf-8") as fh:
+        # JSON Array sin cerrar: Chrome y Perfetto aceptan la coma final y la falta de ``]``.
+        fh.write(("[\n" if header else "") + "".join(json.dumps(e, ensure_ascii=False) + ",\n" for e in events))
+    return run.path
@@ -0,0 +1,310 @@
+"""
+Datos de referencia del catálogo (proveedores y categorías) compartidos por todo el proceso.
+
+En vez de que cada sesión pida su copia por ``_get_json``, ``get_reference_data()``
+(``st.cache_resource``) devuelve un único servicio por proceso que:
+
+- carga las tablas completas desde la API (paginando) la primera vez que alguien las pide
+- las guarda con tipos compactos (``utils.schema``) y con índices para buscar sin recorrerlas:
+  ``row(id)`` (id → fila) e ``ids(nombre)`` (nombre normalizado con ``search_index.fold`` → ids)
+- las refresca cada ``REFDATA_REFRESH_S``; cada refresco arma una tabla nueva y la reemplaza de
+  una vez, así las sesiones nunca ven una tabla a medio actualizar
+- respeta un tope de memoria: un refresco que lo supera se descarta y queda la versión anterior
+
+Las tablas se comparten entre sesiones: tratarlas como solo lectura. ``stats()`` resume filas,
+memoria, edad, refrescos, fallas y aciertos de búsqueda (la página 2 lo muestra).
+
+Credenciales: las cargas y refrescos nunca usan el token global de ``utils.api_client`` (el de
+la última sesión que pasó por ``page.setup``). Con ``REFDATA_TOKEN`` (credencial de servicio)
+un hilo de fondo, que arranca una vez al crear el servicio, refresca con ese token. Sin ella
+el refresco es perezoso: la lectura de una tabla vencida devuelve la versión actual y la
+recarga en segundo plano con el token de la sesión que la pidió (``table(name, token=...)``).
+Si la API rechaza el token, el refresco falla, queda en ``stats`` y se sigue con la tabla
+anterior.
+
+Env:
+- REFDATA_REFRESH_S: segundos entre refrescos; 0 los desactiva (default: 600)
+- REFDATA_TOKEN: credencial de servicio para el refresco en segundo plano (default: vacío =
+  refresco perezoso con el token de la sesión)
+- REFDATA_MAX_MB: tope de memoria de todas las tablas e índices en MB (default: 64)
+- REFDATA_PAGE_SIZE: filas por página al cargar desde la API (default: 100)
+"""
+
+from __future__ import annotations
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils import api_client, profiler
+from utils.schema import CATALOG_SCHEMA, compact, frame_nbytes
+from utils.search_index import fold
+
+REFDATA_REFRESH_S = float(os.getenv("REFDATA_REFRESH_S", "600"))
+REFDATA_MAX_MB = float(os.getenv("REFDATA_MAX_MB", "64"))
+REFDATA_PAGE_SIZE = int(os.getenv("REFDATA_PAGE_SIZE", "100"))
+REFDATA_TOKEN = os.getenv("REFDATA_TOKEN", "").strip()
+
+# Tabla -> (endpoint, columnas con nombres para ``ids``)
+TABLES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "proveedores": ("/catalogo/proveedores", ("nombre",)),
+    "categorias": ("/catalogo/categorias", ("categoria", "macrocategoria")),
+}
+MAX_PAGES = 10_000  # corta la paginación si la API ignora ``offset``
+RETRY_S = 30.0      # tras una carga fallida, las lecturas no reintentan antes de esto
+
+
+class RefTable:
+    """Una tabla inmutable con sus índices. Se reemplaza entera en cada refresco."""
+
+    def __init__(self, name: str, frame: pd.DataFrame, name_columns: Sequence[str]):
+        self.name = name
+        self.frame = frame
+        self.loaded_at = time.time()
+        ids = pd.to_numeric(frame["id"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        self._pos = {int(v): i for i, v in enumerate(ids) if not np.isnan(v)}
+        groups: Dict[str, List[int]] = {}
+        for col in name_columns:
+            if col not in frame.columns:
+                continue
+            for value, id_ in zip(frame[col].astype("string").fillna(""), ids):
+                if value and not np.isnan(id_):
+                    groups.setdefault(fold(value), []).append(int(id_))
+        self._by_name = {key: np.unique(np.asarray(v, dtype=np.int64)) for key, v in groups.items()}
+        self.nbytes = frame_nbytes(frame) + self._index_nbytes()
+
+    def _index_nbytes(self) -> int:
+        # Estimación: dicts + claves + arreglos de ids (lo que se agrega a la tabla).
+        keys = sum(sys.getsizeof(k) for k in self._by_name) + 28 * len(self._pos)
+        arrays = sum(a.nbytes for a in self._by_name.values())
+        return sys.getsizeof(self._pos) + sys.getsizeof(self._by_name) + keys + arrays
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def row(self, id_: int) -> Optional[Dict[str, object]]:
+        pos = self._pos.get(int(id_))
+        if pos is None:
+            return None
+        # Escalares numpy -> Python: la fila se muestra con ``st.json`` o se manda a la API.
+        return {
+            k: None if pd.isna(v) else (v.item() if isinstance(v, np.generic) else v)
+            for k, v in self.frame.iloc[pos].items()
+        }
+
+    def ids(self, name: str) -> np.ndarray:
+        """Ids cuyo nombre normalizado es exactamente ``name`` normalizado."""
+        return self._by_name.get(fold(name), np.zeros(0, dtype=np.int64))
+
+    def __contains__(self, id_: object) -> bool:
+        try:
+            return int(id_) in self._pos
+        except (TypeError, ValueError):
+            return False
+
+
+@dataclass
+class _TableStats:
+    refreshes: int = 0
+    failures: int = 0
+    rejected: int = 0  # refrescos descartados por superar el tope de memoria
+    last_error: str = ""
+    last_ms: float = 0.0
+    last_attempt: float = 0.0  # monotonic
+
+
+class ReferenceData:
+    """Servicio de proceso: tablas de referencia, refresco en segundo plano y estadísticas."""
+
+    def __init__(
+        self,
+        tables: Dict[str, Tuple[str, Tuple[str, ...]]] = TABLES,
+        *,
+        refresh_s: float = REFDATA_REFRESH_S,
+        max_bytes: int = int(REFDATA_MAX_MB * 1024 * 1024),
+        page_size: int = REFDATA_PAGE_SIZE,
+        service_token: str = REFDATA_TOKEN,
+    ):
+        self.specs = dict(tables)
+        self.service_token = service_token or None
+        self.refresh_s = float(refresh_s)
+        self.max_bytes = int(max_bytes)
+        self.page_size = int(page_size)
+        self._tables: Dict[str, RefTable] = {}
+        self._stats = {name: _TableStats() for name in self.specs}
+        self._lock = threading.Lock()       # protege ``_tables`` y los contadores
+        self._load_lock = threading.Lock()  # una carga a la vez (las demás esperan y reusan)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lazy = False  # hay un refresco perezoso en curso
+        self.hits = 0
+        self.misses = 0
+
+    # ---------- Lectura ----------
+    def table(self, name: str, token: Optional[str] = None) -> Optional[RefTable]:
+        """
+        La tabla actual (cargándola con ``token`` si nunca se cargó). ``None`` si no se pudo
+        cargar. Sin refresco de fondo, una tabla vencida se recarga aparte con ``token``.
+        """
+        with self._lock:
+            table = self._tables.get(name)
+            stats = self._stats[name]
+            retry = time.monotonic() - stats.last_attempt >= RETRY_S
+            stale = (
+                table is not None and (retry or not stats.last_error) and not self._lazy and self._thread is None
+                and self.refresh_s > 0 and time.time() - table.loaded_at >= self.refresh_s
+            )
+            if stale:
+                self._lazy = True
+        if table is None and retry:
+            self.refresh([name], only_missing=True, token=token)
+            with self._lock:
+                table = self._tables.get(name)
+        elif stale:
+            threading.Thread(target=self._lazy_refresh, args=(name, token), name="refdata-refresh",
+                             daemon=True).start()
+        return table
+
+    def _lazy_refresh(self, name: str, token: Optional[str]) -> None:
+        try:
+            self.refresh([name], token=token)
+        finally:
+            with self._lock:
+                self._lazy = False
+
+    def row(self, name: str, id_: int, token: Optional[str] = None) -> Optional[Dict[str, object]]:
+        table = self.table(name, token)
+        found = table.row(id_) if table is not None else None
+        with self._lock:
+            if found is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return found
+
+    def ids(self, name: str, value: str, token: Optional[str] = None) -> np.ndarray:
+        table = self.table(name, token)
+        return table.ids(value) if table is not None else np.zeros(0, dtype=np.int64)
+
+    # ---------- Carga ----------
+    def _fetch(self, path: str, token: Optional[str]) -> pd.DataFrame:
+        headers = {"Authorization": f"Bearer {token}"} if token else None
+        rows: List[Dict[str, object]] = []
+        seen_first = set()
+        for page in range(MAX_PAGES):
+            r = api_client.get(path, params={"limit": self.page_size, "offset": page * self.page_size},
+                               headers=headers)
+            r.raise_for_status()
+            batch = r.json()
+            if not isinstance(batch, list) or not batch:
+                break
+            first = repr(batch[0])
+            if first in seen_first:  # la API ignoró ``offset``: ya tenemos todo
+                break
+            seen_first.add(first)
+            rows.extend(batch)
+            if len(batch) < self.page_size:
+                break
+        if not rows or "id" not in rows[0]:
+            raise ValueError(f"{path} no devolvió filas con 'id'")
+        return compact(pd.DataFrame(rows), CATALOG_SCHEMA)
+
+    def refresh(
+        self,
+        names: Optional[Sequence[str]] = None,
+        *,
+        only_missing: bool = False,
+        token: Optional[str] = None,
+    ) -> None:
+        """
+        Recarga las tablas (todas por defecto) con ``token`` o, si no se da, con la credencial
+        de servicio. Las fallas quedan en ``stats``, no se propagan.
+        ``only_missing``: saltar las que ya cargó otra sesión mientras se esperaba el lock.
+        """
+        token = token or self.service_token
+        with self._load_lock:
+            for name in names or list(self.specs):
+                if only_missing and name in self._tables:
+                    continue
+                path, name_columns = self.specs[name]
+                stats = self._stats[name]
+                stats.last_attempt = time.monotonic()
+                t0 = time.perf_counter()
+                try:
+                    with profiler.stage(f"refdata: {name}"):
+                        table = RefTable(name, self._fetch(path, token), name_columns)
+                except Exception as exc:
+                    with self._lock:
+                        stats.failures += 1
+                        stats.last_error = f"{type(exc).__name__}: {exc}"[:200]
+                    continue
+                with self._lock:
+                    others = sum(t.nbytes for n, t in self._tables.items() if n != name)
+                    stats.last_ms = (time.perf_counter() - t0) * 1000
+                    if others + table.nbytes > self.max_bytes:
+                        stats.rejected += 1
+                        stats.last_error = (
+                            f"{table.nbytes / 2**20:,.1f} MB superan el tope de {self.max_bytes / 2**20:,.0f} MB"
+                        )
+                        continue
+                    self._tables[name] = table
+                    stats.refreshes += 1
+                    stats.last_error = ""
+
+    def start_refresher(self) -> None:
+        """Refresco periódico en segundo plano; solo con credencial de servicio (si no, es perezoso)."""
+        if self.refresh_s <= 0 or not self.service_token:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._refresh_loop, name="refdata-refresh", daemon=True)
+        self._thread.start()
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(self.refresh_s):
+            self.refresh()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    # ---------- Estadísticas ----------
+    def stats(self) -> pd.DataFrame:
+        """Una fila por tabla: filas, memoria, edad, refrescos, fallas y último error."""
+        now = time.time()
+        with self._lock:
+            rows = []
+            for name, st_ in self._stats.items():
+                table = self._tables.get(name)
+                rows.append({
+                    "Tabla": name,
+                    "Filas": len(table) if table is not None else 0,
+                    "KB": round(table.nbytes / 1024, 1) if table is not None else 0.0,
+                    "Edad (s)": round(now - table.loaded_at) if table is not None else None,
+                    "Refrescos": st_.refreshes,
+                    "Fallas": st_.failures,
+                    "Descartados": st_.rejected,
+                    "Última carga (ms)": round(st_.last_ms, 1),
+                    "Error": st_.last_error,
+                })
+        return pd.DataFrame(rows)
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            used = sum(t.nbytes for t in self._tables.values())
+            return {"tables": len(self._tables), "bytes": used, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+@st.cache_resource(show_spinner=False)
+def get_reference_data() -> ReferenceData:
+    """El servicio del proceso (uno para todas las sesiones); el refresco de fondo arranca acá, una vez."""
+    service = ReferenceData()
+    service.start_refresher()
+    return service
@@ -0,0 +1,201 @@
+"""
+Cubo de agregados para los reportes de posicionamiento.
+
+Guarda, por cada celda de las dimensiones (Macro, Categoría, Marca, Período o las que
+tenga la tabla), solo medidas aditivas:
+
+- ``n``: filas de origen
+- ``PV`` y ``VENTA NETA``: sumas
+- ``<ratio>__sum``: suma simple de CENTRAL 1 / ALVI 1 / MARGEN sin los NaN
+- ``<ratio>__n``: filas con ese ratio informado (promedio = sum / n del ratio, como ``mean()``)
+- ``<ratio>__pvw``: suma ponderada por PV y ``<ratio>__pv``: PV de las filas con el ratio
+  informado (promedio ponderado = pvw / pv)
+
+Al ser aditivas, los totales, promedios y PV normalizado de cualquier subconjunto
+filtrado salen de sumar celdas, sin volver a recorrer la tabla de hechos.
+
+En la app no hay un cubo único Macro × Categoría × Marca × Período: los reportes se
+cargan de a un período y las páginas filtran las tablas ya armadas (ponderado, marcas,
+detalle), así que ``report_data`` arma un cubo por tabla y período a la granularidad de esa
+tabla (``CUBE_DIMS``), sin dimensión Período. Las celdas Macro × Categoría × Marca de un
+período solo se usan para armar esas tablas en los proveedores con tabla de hechos (parquet,
+sintético); el cubo con las cuatro dimensiones lo mide ``benchmarks.bench_reports``.
+"""
+
+from __future__ import annotations
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+SUM_MEASURES = ["PV", "VENTA NETA"]
+RATIO_MEASURES = ["CENTRAL 1", "ALVI 1", "MARGEN"]
+
+
+def _sum_col(ratio: str) -> str:
+    return f"{ratio}__sum"
+
+
+def _count_col(ratio: str) -> str:
+    return f"{ratio}__n"
+
+
+def _pvw_col(ratio: str) -> str:
+    return f"{ratio}__pvw"
+
+
+def _pv_col(ratio: str) -> str:
+    return f"{ratio}__pv"
+
+
+MEASURE_COLUMNS = (
+    ["n"] + SUM_MEASURES
+    + [_sum_col(r) for r in RATIO_MEASURES]
+    + [_count_col(r) for r in RATIO_MEASURES]
+    + [_pvw_col(r) for r in RATIO_MEASURES]
+    + [_pv_col(r) for r in RATIO_MEASURES]
+)
+
+
+class AggregateCube:
+    """
+    Celdas agregadas a la granularidad ``dims``. Si cada combinación de ``dims`` es
+    única en la tabla de origen, las celdas conservan su orden (``sort=False``) y una
+    máscara calculada sobre la tabla sirve tal cual sobre el cubo.
+
+    Si la tabla repite combinaciones (ej. la misma etiqueta en dos filas), ``from_facts``
+    guarda además las medidas por fila (``rows``) y las máscaras, que siguen siendo por fila
+    de la tabla, se aplican sobre ellas.
+    """
+
+    def __init__(self, cells: pd.DataFrame, dims: Sequence[str], rows: Optional[pd.DataFrame] = None):
+        self.dims: List[str] = list(dims)
+        self.cells = cells
+        self._rows = rows
+        # Medidas como matriz (medida × celda): los totales con máscara son un solo producto
+        # matriz-vector, sin copiar las celdas seleccionadas. Un NaN que quede en las medidas
+        # (celdas de otra fuente) contaminaría el producto aunque su fila esté fuera de la máscara.
+        self._matrix = _measure_matrix(cells)
+        self._row_matrix = None if rows is None else _measure_matrix(rows)
+        self._rollups: Dict[Tuple[str, ...], pd.DataFrame] = {}
+
+    @classmethod
+    def from_facts(cls, facts: pd.DataFrame, dims: Sequence[str], *, precompute: bool = False) -> "AggregateCube":
+        dims = list(dims)
+        # Los NaN no suman (como ``sum()``) y no cuentan en el promedio (como ``mean()``).
+        pv = np.nan_to_num(facts["PV"].to_numpy(dtype="float64"))
+        cols = {d: facts[d].to_numpy() for d in dims}
+        cols["n"] = np.ones(len(facts), dtype="float64")
+        for m in SUM_MEASURES:
+            cols[m] = np.nan_to_num(facts[m].to_numpy(dtype="float64"))
+        for r in RATIO_MEASURES:
+            vals = facts[r].to_numpy(dtype="float64")
+            known = ~np.isnan(vals)
+            vals = np.where(known, vals, 0.0)
+            cols[_sum_col(r)] = vals
+            cols[_count_col(r)] = known.astype("float64")
+            cols[_pvw_col(r)] = vals * pv
+            cols[_pv_col(r)] = np.where(known, pv, 0.0)
+        work = pd.DataFrame(cols)
+        cells = (
+            work.groupby(dims, sort=False, observed=True, dropna=False)[MEASURE_COLUMNS]
+                .sum()
+                .reset_index()
+        )
+        # Combinaciones repetidas: una máscara por fila ya no calza con las celdas.
+        cube = cls(cells, dims, rows=work if len(cells) < len(work) else None)
+        if precompute:
+            cube.precompute()
+        return cube
+
+    @property
+    def nbytes(self) -> int:
+        frames = [self.cells, *self._rollups.values()] + ([self._rows] if self._rows is not None else [])
+        return int(sum(f.memory_usage(index=True, deep=True).sum() for f in frames))
+
+    # ---------- Rollups ----------
+    def precompute(self) -> None:
+        """Materializa los rollups sin filtro para todas las combinaciones de dims."""
+        for k in range(1, len(self.dims)):
+            for by in combinations(self.dims, k):
+                self._rollup_cells(list(by), None)
+
+    def rollup(self, by: Sequence[str], mask: Optional[np.ndarray] = None, *, weighted: bool = False) -> pd.DataFrame:
+        """Tabla en formato reporte agrupada por ``by`` (subconjunto de dims)."""
+        return finish(self._rollup_cells(list(by), mask), weighted=weighted, keep=list(by))
+
+    def _rollup_cells(self, by: List[str], mask: Optional[np.ndarray]) -> pd.DataFrame:
+        unknown = set(by) - set(self.dims)
+        if unknown:
+            raise KeyError(f"Dimensiones fuera del cubo: {sorted(unknown)}")
+        if mask is not None and self._rows is not None:
+            cells = self._rows[self._check_mask(mask)]
+        elif by == self.dims:
+            return self.cells if mask is None else self.cells[self._check_mask(mask)]
+        else:
+            key = tuple(by)
+            if mask is None and key in self._rollups:
+                return self._rollups[key]
+            cells = self.cells if mask is None else self.cells[self._check_mask(mask)]
+        out = cells.groupby(by, sort=False, observed=True, dropna=False)[MEASURE_COLUMNS].sum().reset_index()
+        if mask is None:
+            self._rollups[key] = out
+        return out
+
+    def _check_mask(self, mask: np.ndarray) -> np.ndarray:
+        mask = np.asarray(mask, dtype=bool)
+        n = len(self.cells) if self._rows is None else len(self._rows)
+        if len(mask) != n:
+            raise ValueError(f"La máscara tiene {len(mask)} valores y la tabla del cubo {n} filas")
+        return mask
+
+    # ---------- Totales ----------
+    def totals(self, mask: Optional[np.ndarray] = None, *, weighted: bool = False) -> Dict[str, float]:
+        """
+        Totales del subconjunto ``mask`` (booleano alineado con las filas de la tabla):
+        PV y VENTA NETA suma; CENTRAL 1 / ALVI 1 / MARGEN promedio simple o ponderado por PV.
+        """
+        if mask is None:
+            vec = self._matrix.sum(axis=1)
+        else:
+            matrix = self._matrix if self._row_matrix is None else self._row_matrix
+            vec = matrix @ self._check_mask(mask).astype("float64")
+        return _finish_totals(dict(zip(MEASURE_COLUMNS, vec.tolist())), weighted=weighted)
+
+
+def _measure_matrix(frame: pd.DataFrame) -> np.ndarray:
+    """Medidas como matriz medida × fila, con los NaN en 0."""
+    matrix = np.nan_to_num(frame[MEASURE_COLUMNS].to_numpy(dtype="float64").T)
+    return np.ascontiguousarray(matrix)
+
+
+def _safe_div(num: float, den: float) -> float:
+    return num / den if den else np.nan
+
+
+def _finish_totals(sums: Dict[str, float], *, weighted: bool) -> Dict[str, float]:
+    out = {"n": sums["n"], "PV": sums["PV"], "VENTA NETA": sums["VENTA NETA"]}
+    for r in RATIO_MEASURES:
+        if weighted:
+            out[r] = _safe_div(sums[_pvw_col(r)], sums[_pv_col(r)])
+        else:
+            out[r] = _safe_div(sums[_sum_col(r)], sums[_count_col(r)])
+    return out
+
+
+def finish(cells: pd.DataFrame, *, weighted: bool = False, keep: Sequence[str] = ()) -> pd.DataFrame:
+    """Convierte celdas con medidas aditivas a las columnas del reporte."""
+    out = {c: cells[c].to_numpy() for c in keep}
+    out["PV"] = cells["PV"].to_numpy(dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for r in RATIO_MEASURES:
+            if weighted:
+                num, den = cells[_pvw_col(r)], cells[_pv_col(r)]
+            else:
+                num, den = cells[_sum_col(r)], cells[_count_col(r)]
+            den = den.to_numpy(dtype="float64")
+            out[r] = np.where(den != 0, num.to_numpy(dtype="float64") / den, np.nan)
+    out["VENTA NETA"] = cells["VENTA NETA"].to_numpy(dtype="float64")
+    cols = list(keep) + ["PV", "CENTRAL 1", "ALVI 1", "VENTA NETA", "MARGEN"]
+    return pd.DataFrame(out)[cols]
@@ -0,0 +1,487 @@
+"""
+Capa de datos para los reportes de posicionamiento (páginas 4 y 5).
+
+Un ``ReportProvider`` entrega, para un ``periodo``, las tres tablas base del reporte
+(ponderado por venta, por marca y detalle Macro/Categoría). Las lecturas pasan por un
+cache LRU compartido por todo el proceso y acotado en memoria, de modo que escribir en
+el buscador o cambiar "Normalizar PV" nunca vuelve a generar ni a pedir los datos. Debajo
+hay un cache en disco (``utils.disk_cache``) que sobrevive a reinicios y deploys. Las
+agregaciones de las fuentes "parquet" y "synthetic" a escala corren en el pool de procesos
+de ``utils.offload``.
+
+Las tablas devueltas se comparten entre sesiones: tratarlas como solo lectura.
+
+Env:
+- REPORT_SOURCE: synthetic | file | parquet | api (default: synthetic)
+- REPORT_DATA_DIR: carpeta para la fuente "file" (default: data/reportes)
+- REPORT_FACTS_PATH: tabla de hechos (archivo o carpeta Parquet) para la fuente "parquet";
+  se agrega con el motor de ``utils.report_engine`` (default: <REPORT_DATA_DIR>/hechos)
+- REPORT_CACHE_MB: tope de memoria del cache compartido en MB (default: 256)
+- REPORT_API_TTL_S: vida en segundos de un reporte leído de la fuente "api", en memoria y en
+  disco; pasado ese tiempo se vuelve a pedir (default: 300)
+- REPORT_SYNTHETIC_ROWS: si es > 0, la fuente "synthetic" genera una tabla de hechos de ese
+  tamaño y deriva las tablas del reporte con el cubo (default: 0, tablas chicas de demo)
+- REPORT_WARM: al primer uso en el proceso, cargar desde disco en segundo plano los períodos
+  guardados por ``utils.disk_cache`` (default: 1)
+"""
+
+from __future__ import annotations
+import os
+import re
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils import api_client, offload, profiler
+from utils.disk_cache import DISK
+from utils.memory_cache import MemoryLRU
+from utils.pivot_server import PivotServer
+from utils.report_cube import AggregateCube
+from utils.report_engine import ReportEngine, get_engine
+from utils.schema import REPORT_SCHEMA, compact, frame_nbytes, memory_report
+from utils.search_index import SearchIndex, build_indexes
+
+REPORT_COLUMNS = ["Macro / Categoría", "PV", "CENTRAL 1", "ALVI 1", "VENTA NETA", "MARGEN"]
+DETAIL_COLUMNS = ["Macro", "Categoría", "PV", "CENTRAL 1", "ALVI 1", "VENTA NETA", "MARGEN"]
+
+PERIODOS = ["01-09 al 21-09", "22-09 al 30-09", "01-10 al 21-10"]
+
+REPORT_SOURCE = os.getenv("REPORT_SOURCE", "synthetic").strip().lower()
+REPORT_DATA_DIR = os.getenv("REPORT_DATA_DIR", os.path.join("data", "reportes"))
+REPORT_FACTS_PATH = os.getenv("REPORT_FACTS_PATH", os.path.join(REPORT_DATA_DIR, "hechos"))
+REPORT_CACHE_MB = float(os.getenv("REPORT_CACHE_MB", "256"))
+REPORT_API_TTL_S = float(os.getenv("REPORT_API_TTL_S", "300"))
+REPORT_SYNTHETIC_ROWS = int(os.getenv("REPORT_SYNTHETIC_ROWS", "0"))
+REPORT_WARM = os.getenv("REPORT_WARM", "1").strip().lower() not in ("0", "false", "no")
+
+
+# Dimensiones del cubo de agregados de cada tabla (ver utils.report_cube).
+CUBE_DIMS = {
+    "weighted": ["Macro / Categoría"],
+    "brands": ["Macro / Categoría"],
+    "detail": ["Macro", "Categoría"],
+}
+
+# Columnas de etiquetas que cubre el índice de búsqueda de cada tabla (ver utils.search_index).
+SEARCH_COLUMNS = {
+    "weighted": ["Macro / Categoría"],
+    "brands": ["Macro / Categoría"],
+    "detail": ["Macro", "Categoría"],
+}
+
+
+@dataclass(frozen=True)
+class ReportData:
+    """Tablas base de un período (sin fila 'Grand Total'), sus cubos de agregados e índices de búsqueda."""
+    periodo: str
+    weighted: pd.DataFrame   # columnas REPORT_COLUMNS, una fila por macro
+    brands: pd.DataFrame     # columnas REPORT_COLUMNS, una fila por marca
+    detail: pd.DataFrame     # columnas DETAIL_COLUMNS, una fila por macro/categoría
+    cubes: Dict[str, AggregateCube] = field(default_factory=dict, compare=False)
+    indexes: Dict[str, SearchIndex] = field(default_factory=dict, compare=False)
+    pivots: Dict[str, PivotServer] = field(default_factory=dict, compare=False)
+    version: str = ""        # cambia en cada carga; sirve de clave para caches derivados (descargas)
+
+    @property
+    def nbytes(self) -> int:
+        frames = sum(frame_nbytes(df) for df in (self.weighted, self.brands, self.detail))
+        derived = [*self.cubes.values(), *self.indexes.values()]
+        return frames + sum(d.nbytes for d in derived)
+
+    def pivot(self, name: str = "detail") -> PivotServer:
+        """Modelo server-side de la tabla dinámica; se crea una vez y lo comparten las sesiones."""
+        server = self.pivots.get(name)
+        if server is None:
+            cube, index = self.cubes[name], self.indexes.get(name)
+            if index is not None and index.n_rows != len(cube.cells):
+                # Tabla con pares (Macro, Categoría) repetidos: el cubo los junta en una celda,
+                # así que el servidor busca sobre las etiquetas de las celdas.
+                index = SearchIndex(cube.cells, index.columns)
+            server = PivotServer(cube, CUBE_DIMS[name], index)
+            server = self.pivots.setdefault(name, server)
+        return server
+
+    def memory_report(self) -> pd.DataFrame:
+        return memory_report({"ponderado": self.weighted, "marcas": self.brands, "detalle": self.detail})
+
+
+def _label_table(cube: AggregateCube, by: str) -> pd.DataFrame:
+    """Rollup ponderado por PV de ``by`` en formato reporte (etiqueta en 'Macro / Categoría')."""
+    df = cube.rollup([by], weighted=True).rename(columns={by: "Macro / Categoría"})
+    return df.sort_values("PV", ascending=False, ignore_index=True)
+
+
+# ---------- Providers ----------
+class ReportProvider:
+    """Fuente de datos del reporte. Las subclases implementan ``load``."""
+    name = "base"
+    disk_ttl: Optional[float] = None  # vida en disco; None = ``DISK_CACHE_TTL``
+
+    def cache_key(self, periodo: str) -> Hashable:
+        return (self.name, periodo)
+
+    def load(self, periodo: str) -> ReportData:
+        raise NotImplementedError
+
+
+class SyntheticProvider(ReportProvider):
+    """Datos fake reproducibles: la semilla se deriva del período."""
+    name = "synthetic"
+
+    MACROS = [
+        "abarrotes","aseo_y_limpieza","bebes","bebidas_no_alcoholicas","confites_y_snacks",
+        "despensa","farmacia_e_higiene_personal","ferreteria","galletas","mascotas","papeles"
+    ]
+
+    MARCAS = [
+        "icb","carozzi","abarrotes","bebes","bebidas_no_alcoholicas","confites_y_snacks",
+        "despensa","galletas","mascotas","tresmontes","virutex_ilko","tucapel","ccu","colun",
+        "genomma","lucchetti","spl","electrolit","ambientes_limpios","novaceites"
+    ]
+
+    CATEGORIAS = {
+        "abarrotes": ["arroz","aceite","fideos"],
+        "aseo_y_limpieza": ["detergente","cloro","suavizante"],
+        "bebes": ["pañales","toallitas"],
+        "bebidas_no_alcoholicas": ["gaseosas","jugos","agua"],
+        "confites_y_snacks": ["chocolates","snacks_salados"],
+        "despensa": ["salsas","conservas"],
+        "farmacia_e_higiene_personal": ["analgésicos","jabones"],
+        "ferreteria": ["pinturas","herramientas"],
+        "galletas": ["dulces","saladas"],
+        "mascotas": ["alimento_perro","alimento_gato"],
+        "papeles": ["higiénico","toalla"]
+    }
+
+    def __init__(self, n_rows: int = REPORT_SYNTHETIC_ROWS):
+        self.n_rows = n_rows
+
+    def cache_key(self, periodo: str) -> Hashable:
+        return (self.name, periodo, self.n_rows)
+
+    def load(self, periodo: str) -> ReportData:
+        seed = zlib.crc32(periodo.encode("utf-8"))
+        if self.n_rows > 0:
+            return self._from_facts(periodo, seed)
+        rng = np.random.default_rng(seed)
+        return ReportData(
+            periodo=periodo,
+            weighted=self._weighted(rng),
+            brands=self._brands(rng),
+            detail=self._detail(rng),
+        )
+
+    def _from_facts(self, periodo: str, seed: int) -> ReportData:
+        """Tablas del reporte a escala: rollups (ponderados por PV) de una tabla de hechos grande."""
+        dims = ["Macro", "Categoría", "Marca"]
+        cube = AggregateCube(offload.synthetic_cells(self.n_rows, seed, dims), dims)
+        return ReportData(
+            periodo=periodo,
+            weighted=_label_table(cube, "Macro"),
+            brands=_label_table(cube, "Marca"),
+            detail=cube.rollup(["Macro", "Categoría"], weighted=True),
+        )
+
+    def _weighted(self, rng: np.random.Generator) -> pd.DataFrame:
+        n = len(self.MACROS)
+        pv = rng.random(n)
+        pv = pv / pv.sum()  # suma 1
+        df = pd.DataFrame({
+            "Macro / Categoría": self.MACROS,
+            "PV": pv,
+            "CENTRAL 1": 0.98 + 0.08 * rng.random(n),  # 98% a 106%
+            "ALVI 1": 0.95 + 0.12 * rng.random(n),     # 95% a 107%
+            "VENTA NETA": (5e6 + 90e6 * rng.random(n)).round(0),
+            "MARGEN": 0.08 + 0.12 * rng.random(n),     # 8% a 20%
+        })
+        return df.sort_values("PV", ascending=False, ignore_index=True)
+
+    def _brands(self, rng: np.random.Generator) -> pd.DataFrame:
+        n = len(self.MARCAS)
+        df = pd.DataFrame({
+            "Macro / Categoría": self.MARCAS,
+            "PV": rng.random(n) * 0.03,                       # marcas con PV pequeño
+            "CENTRAL 1": 1.00 + 0.12 * (rng.random(n) - 0.5),  # ~ 94% a 106%
+            "ALVI 1": 1.00 + 0.16 * (rng.random(n) - 0.5),     # ~ 92% a 108%
+            "VENTA NETA": (2e5 + 2.0e7 * rng.random(n)).round(0),
+            "MARGEN": 0.10 + 0.12 * rng.random(n),
+        })
+        return df.sort_values("PV", ascending=False, ignore_index=True)
+
+    def _detail(self, rng: np.random.Generator) -> pd.DataFrame:
+        pairs = [(macro, cat) for macro, cats in self.CATEGORIAS.items() for cat in cats]
+        n = len(pairs)
+        return pd.DataFrame({
+            "Macro": [p[0] for p in pairs],
+            "Categoría": [p[1] for p in pairs],
+            "PV": rng.uniform(0.001, 0.05, n),
+            "CENTRAL 1": rng.uniform(0.92, 1.08, n),
+            "ALVI 1": rng.uniform(0.92, 1.10, n),
+            "VENTA NETA": rng.integers(80_000, 40_000_000, n).astype("float64"),
+            "MARGEN": rng.uniform(0.07, 0.22, n),
+        })
+
+
+def file_stamp(*paths: str) -> Tuple[Tuple[int, int], ...]:
+    """``(mtime_ns, tamaño)`` de cada archivo (``(0, 0)`` si no existe), para claves de cache."""
+    stamps = []
+    for path in paths:
+        try:
+            st_ = os.stat(path)
+            stamps.append((st_.st_mtime_ns, st_.st_size))
+        except OSError:
+            stamps.append((0, 0))
+    return tuple(stamps)
+
+
+class LocalFileProvider(ReportProvider):
+    """
+    Lee ``<base_dir>/<periodo>/{ponderado,marcas,detalle}.{parquet,csv}``.
+    El período se normaliza a un nombre de carpeta seguro (``01-09_al_21-09``).
+    """
+    name = "file"
+    TABLES = {"weighted": "ponderado", "brands": "marcas", "detail": "detalle"}
+
+    def __init__(self, base_dir: str = REPORT_DATA_DIR):
+        self.base_dir = base_dir
+
+    def cache_key(self, periodo: str) -> Hashable:
+        # La firma de los archivos entra en la clave: editarlos invalida también el cache en disco.
+        folder = os.path.join(self.base_dir, periodo_slug(periodo))
+        files = [self._path(folder, stem) for stem in self.TABLES.values()]
+        return (self.name, os.path.abspath(self.base_dir), periodo, file_stamp(*files))
+
+    def load(self, periodo: str) -> ReportData:
+        folder = os.path.join(self.base_dir, periodo_slug(periodo))
+        frames = {attr: self._read(folder, stem) for attr, stem in self.TABLES.items()}
+        return ReportData(periodo=periodo, **frames)
+
+    @staticmethod
+    def _path(folder: str, stem: str) -> str:
+        """``<stem>.parquet`` si existe, si no ``<stem>.csv``."""
+        parquet = os.path.join(folder, f"{stem}.parquet")
+        return parquet if os.path.exists(parquet) else os.path.join(folder, f"{stem}.csv")
+
+    @classmethod
+    def _read(cls, folder: str, stem: str) -> pd.DataFrame:
+        path = cls._path(folder, stem)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No existe {stem}.parquet ni {stem}.csv en {folder}")
+        return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+
+
+class ParquetFactsProvider(ReportProvider):
+    """
+    Tabla de hechos en Parquet (``Período, Macro, Categoría, Marca`` + medidas), agregada con
+    el motor columnar (``REPORT_ENGINE``): filtro por período y agrupación se ejecutan sobre
+    el archivo y a pandas solo llegan las celdas agregadas.
+    """
+    name = "parquet"
+
+    def __init__(self, path: str = REPORT_FACTS_PATH, engine: Optional[ReportEngine] = None):
+        self.path = path
+        self.engine = engine or get_engine()
+
+    def cache_key(self, periodo: str) -> Hashable:
+        return (self.name, os.path.abspath(self.path), self.engine.name, periodo, file_stamp(self.path))
+
+    def load(self, periodo: str) -> ReportData:
+        where = {"Período": [periodo]}
+        # Las dos agregaciones corren en paralelo en el pool de procesos (``utils.offload``).
+        groups = [["Macro", "Categoría"], ["Marca"]]
+        detail_cells, brand_cells = offload.aggregate(self.engine.name, self.path, groups, where)
+        detail_cube = AggregateCube(detail_cells, groups[0])
+        brand_cube = AggregateCube(brand_cells, groups[1])
+        return ReportData(
+            periodo=periodo,
+            weighted=_label_table(detail_cube, "Macro"),
+            brands=_label_table(brand_cube, "Marca"),
+            detail=detail_cube.rollup(["Macro", "Categoría"], weighted=True),
+        )
+
+
+class ApiProvider(ReportProvider):
+    """
+    Lee el reporte desde la API (``GET /reportes/posicionamiento/<tabla>?periodo=...``).
+    Cada endpoint devuelve una lista de dicts con las columnas del reporte.
+    """
+    name = "api"
+    ENDPOINTS = {
+        "weighted": "/reportes/posicionamiento/ponderado",
+        "brands": "/reportes/posicionamiento/marcas",
+        "detail": "/reportes/posicionamiento/detalle",
+    }
+
+    disk_ttl = REPORT_API_TTL_S
+
+    def __init__(self, token: Optional[str] = None):
+        # Sin ``token`` usa el global de ``api_client`` (el de la sesión); los hilos de fondo
+        # pasan una credencial de servicio.
+        self.token = token
+
+    def cache_key(self, periodo: str) -> Hashable:
+        # La API no expone una versión de los datos: la clave cambia cada ``REPORT_API_TTL_S``,
+        # así que pasado ese tiempo el reporte se vuelve a pedir (el LRU saca la entrada vieja).
+        bucket = int(time.time() // REPORT_API_TTL_S) if REPORT_API_TTL_S > 0 else 0
+        return (self.name, api_client.API_BASE_URL, periodo, bucket)
+
+    def load(self, periodo: str) -> ReportData:
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else None
+        frames = {}
+        for attr, path in self.ENDPOINTS.items():
+            r = api_client.get(path, params={"periodo": periodo}, headers=headers)
+            r.raise_for_status()
+            frames[attr] = pd.DataFrame(r.json())
+        return ReportData(periodo=periodo, **frames)
+
+
+PROVIDERS: Dict[str, Callable[[], ReportProvider]] = {
+    SyntheticProvider.name: SyntheticProvider,
+    LocalFileProvider.name: LocalFileProvider,
+    ParquetFactsProvider.name: ParquetFactsProvider,
+    ApiProvider.name: ApiProvider,
+}
+
+
+def periodo_slug(periodo: str) -> str:
+    return re.sub(r"[^0-9A-Za-z_-]+", "_", periodo.strip())
+
+
+def get_provider(source: Optional[str] = None) -> ReportProvider:
+    source = (source or REPORT_SOURCE).strip().lower()
+    try:
+        return PROVIDERS[source]()
+    except KeyError:
+        raise ValueError(f"REPORT_SOURCE desconocido: {source!r} (usa {', '.join(PROVIDERS)})")
+
+
+# Cache compartido por todas las sesiones del proceso.
+TABLES = ("weighted", "brands", "detail")
+_CACHE = MemoryLRU(int(REPORT_CACHE_MB * 1024 * 1024), sizeof=lambda d: d.nbytes)
+
+
+def build_derived(data: ReportData, *, compacted: bool = False) -> ReportData:
+    """
+    Pasa las tablas a tipos compactos (``utils.schema``) y precalcula cubos de agregados e
+    índices de búsqueda de cada tabla (una vez por carga).
+
+    ``compacted=True`` para tablas leídas del disco: ya se guardaron compactas y ``compact``
+    las copiaría fuera del ``memory_map`` (cada proceso tendría su copia).
+    """
+    frames = {
+        name: getattr(data, name) if compacted else compact(getattr(data, name), REPORT_SCHEMA)
+        for name in TABLES
+    }
+    cubes = {name: AggregateCube.from_facts(frames[name], dims) for name, dims in CUBE_DIMS.items()}
+    return replace(
+        data,
+        **frames,
+        cubes=cubes,
+        indexes=build_indexes(frames, SEARCH_COLUMNS),
+        version=data.version or uuid.uuid4().hex,
+    )
+
+
+# ---------- Cache en disco (sobrevive a reinicios) ----------
+
+
+def _disk_source(provider: ReportProvider) -> str:
+    return f"report:{provider.name}"
+
+
+def _disk_params(provider: ReportProvider, periodo: str, table: str) -> Dict[str, object]:
+    return {"key": list(provider.cache_key(periodo)), "table": table}
+
+
+def _read_disk(provider: ReportProvider, periodo: str) -> Optional[ReportData]:
+    frames = {}
+    for table in TABLES:
+        df = DISK.get(_disk_source(provider), _disk_params(provider, periodo, table))
+        if df is None:
+            return None
+        frames[table] = df
+    return ReportData(periodo=periodo, **frames)
+
+
+def _load(provider: ReportProvider, periodo: str) -> ReportData:
+    """Disco → fuente. Lo leído de la fuente se guarda en disco ya con tipos compactos."""
+    with profiler.stage("datos: disco"):
+        cached = _read_disk(provider, periodo)
+    if cached is not None:
+        with profiler.stage("datos: derivados"):
+            return build_derived(cached, compacted=True)
+    with profiler.stage(f"datos: fuente {provider.name}"):
+        data = build_derived(provider.load(periodo))
+    for table in TABLES:
+        DISK.put(_disk_source(provider), _disk_params(provider, periodo, table), getattr(data, table),
+                 ttl=provider.disk_ttl)
+    return data
+
+
+def warm(periodos: Sequence[str] = PERIODOS, provider: Optional[ReportProvider] = None) -> int:
+    """
+    Sube al cache en memoria los períodos que ya están en disco, sin tocar la fuente. Pasa por
+    ``get_or_load``: si una sesión pide el mismo período a la vez, se carga una sola vez.
+    """
+    provider = provider or get_provider()
+    DISK.warm()
+    loaded = 0
+    for periodo in periodos:
+        key = provider.cache_key(periodo)
+        if key not in _CACHE:
+            on_disk = all(DISK.contains(_disk_source(provider), _disk_params(provider, periodo, table))
+                          for table in TABLES)
+            if not on_disk:
+                continue
+            _CACHE.get_or_load(key, lambda: _load(provider, periodo), track=False)
+        loaded += 1
+    return loaded
+
+
+_WARM_LOCK = threading.Lock()
+_warm_started = False
+
+
+def _start_warm() -> None:
+    """Una vez por proceso: calienta desde disco en segundo plano el resto de los períodos."""
+    global _warm_started
+    with _WARM_LOCK:
+        if _warm_started or not REPORT_WARM:
+            return
+        _warm_started = True
+    threading.Thread(target=warm, name="report-warm", daemon=True).start()
+
+
+def load_report(periodo: str, provider: Optional[ReportProvider] = None) -> ReportData:
+    """
+    Devuelve las tablas base del período: memoria → disco → fuente. La fuente solo se lee
+    si el período no está en ninguno de los dos caches.
+    """
+    if provider is None:
+        _start_warm()
+    provider = provider or get_provider()
+    with profiler.stage("datos: load_report", periodo=periodo):
+        return _CACHE.get_or_load(provider.cache_key(periodo), lambda: _load(provider, periodo))
+
+
+def is_cached(periodo: str, provider: Optional[ReportProvider] = None) -> bool:
+    """El período ya está en el cache en memoria (cargarlo no lee la fuente)."""
+    return (provider or get_provider()).cache_key(periodo) in _CACHE
+
+
+def cache_stats() -> Dict[str, object]:
+    """Estadísticas del LRU en memoria; ``"disk"`` trae las del cache en disco (dict anidado)."""
+    return {**_CACHE.stats(), "disk": DISK.stats()}
+
+
+def clear_cache(disk: bool = False) -> None:
+    _CACHE.clear()
+    if disk:
+        for name in PROVIDERS:
+            DISK.clear(f"report:{name}")
@@ -0,0 +1,327 @@
+"""
+Motor de consultas columnar para agregar tablas de hechos en Parquet sin cargarlas en pandas.
+
+Las páginas de reporte trabajan sobre tablas ya agregadas (ver ``utils.report_data``). Cuando
+la fuente es una tabla de hechos grande (Período × Macro × Categoría × Marca, ventas reales),
+filtrar y agrupar se delega a un motor que lee el Parquet por columnas: solo lee las columnas
+que la consulta usa (projection pushdown), descarta row groups con el filtro (predicate
+pushdown) y agrega por lotes, así que la tabla completa nunca pasa por memoria.
+
+Todos los motores devuelven lo mismo: una fila por grupo con las medidas aditivas de
+``utils.report_cube`` (``MEASURE_COLUMNS``), ordenada por las columnas del grupo. De ahí
+``AggregateCube(cells, by)`` y ``report_cube.finish`` arman las tablas del reporte igual que
+con pandas.
+
+Motores (``auto`` toma el primero instalado, en este orden):
+- ``duckdb``: SQL sobre ``read_parquet``
+- ``polars``: ``scan_parquet`` lazy con ejecución streaming
+- ``arrow``: ``pyarrow.dataset`` + agregación parcial por lote (viene con pyarrow)
+- ``pandas``: lee el Parquet filtrado y agrupa en memoria (siempre disponible)
+
+``source`` es un archivo ``.parquet`` o una carpeta (dataset, admite particiones Hive
+``Período=P01/``). ``where`` es ``{columna: valores}`` (``columna IN valores``, AND entre columnas).
+
+Env:
+- REPORT_ENGINE: auto | duckdb | polars | arrow | pandas (default: auto)
+- REPORT_ENGINE_BATCH_ROWS: filas por lote en ``scan`` y en la agregación arrow (default: 262144)
+"""
+
+from __future__ import annotations
+import logging
+import os
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils.report_cube import MEASURE_COLUMNS, RATIO_MEASURES, SUM_MEASURES, AggregateCube
+
+logger = logging.getLogger(__name__)
+
+REPORT_ENGINE = os.getenv("REPORT_ENGINE", "auto").strip().lower()
+REPORT_ENGINE_BATCH_ROWS = int(os.getenv("REPORT_ENGINE_BATCH_ROWS", "262144"))
+
+Where = Mapping[str, Sequence[object]]
+
+# Columnas de la tabla de hechos que leen las medidas.
+INPUT_MEASURES = SUM_MEASURES + RATIO_MEASURES
+
+
+def _check_by(by: Sequence[str]) -> None:
+    if not by:
+        raise ValueError("aggregate necesita al menos una columna de agrupación")
+
+
+def _projection(by: Sequence[str], where: Optional[Where]) -> List[str]:
+    _check_by(by)
+    cols = list(by) + [c for c in (where or {}) if c not in by]
+    return cols + [m for m in INPUT_MEASURES if m not in cols]
+
+
+def _finalize(cells: pd.DataFrame, by: Sequence[str]) -> pd.DataFrame:
+    """Mismos tipos y orden en todos los motores: etiquetas str, medidas float64 sin NaN."""
+    out = {}
+    for c in by:
+        col = cells[c]
+        out[c] = col.astype(str) if not pd.api.types.is_numeric_dtype(col) else col
+    for m in MEASURE_COLUMNS:
+        out[m] = cells[m].astype("float64").fillna(0.0)
+    return pd.DataFrame(out).sort_values(list(by), ignore_index=True)
+
+
+def _dataset_path(source: str) -> str:
+    return os.fspath(source)
+
+
+class ReportEngine:
+    """Backend de consultas. Las subclases implementan ``aggregate`` y ``scan``."""
+    name = "base"
+
+    def aggregate(self, source: str, by: Sequence[str], where: Optional[Where] = None) -> pd.DataFrame:
+        """Celdas agregadas por ``by``: columnas ``by`` + ``MEASURE_COLUMNS``."""
+        raise NotImplementedError
+
+    def scan(
+        self,
+        source: str,
+        columns: Sequence[str],
+        where: Optional[Where] = None,
+        batch_rows: int = REPORT_ENGINE_BATCH_ROWS,
+    ) -> Iterator[pd.DataFrame]:
+        """Filas filtradas en lotes de hasta ``batch_rows``, sin materializar el resultado completo."""
+        raise NotImplementedError
+
+    def cube(self, source: str, by: Sequence[str], where: Optional[Where] = None) -> AggregateCube:
+        return AggregateCube(self.aggregate(source, by, where), by)
+
+
+# ---------- DuckDB ----------
+def _quote(col: str) -> str:
+    return '"' + col.replace('"', '""') + '"'
+
+
+class DuckDBEngine(ReportEngine):
+    name = "duckdb"
+
+    def __init__(self):
+        import duckdb
+        self._duckdb = duckdb
+
+    def _from(self, source: str) -> str:
+        path = _dataset_path(source)
+        if os.path.isdir(path):
+            path = os.path.join(path, "**", "*.parquet")
+        return "read_parquet(" + "'" + path.replace("'", "''") + "'" + ", hive_partitioning = true)"
+
+    def _where(self, where: Optional[Where]):
+        clauses, params = [], []
+        for col, values in (where or {}).items():
+            values = list(values)
+            clauses.append(f"{_quote(col)} IN ({', '.join('?' * len(values))})" if values else "FALSE")
+            params.extend(values)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def aggregate(self, source, by, where=None):
+        _check_by(by)
+        keys = ", ".join(_quote(c) for c in by)
+        pv = _quote("PV")
+        aggs = ["CAST(count(*) AS DOUBLE) AS n"]
+        aggs += [f"coalesce(sum({_quote(m)}), 0) AS {_quote(m)}" for m in SUM_MEASURES]
+        aggs += [f"coalesce(sum({_quote(r)}), 0) AS {_quote(r + '__sum')}" for r in RATIO_MEASURES]
+        aggs += [f"CAST(count({_quote(r)}) AS DOUBLE) AS {_quote(r + '__n')}" for r in RATIO_MEASURES]
+        aggs += [f"coalesce(sum({_quote(r)} * {pv}), 0) AS {_quote(r + '__pvw')}" for r in RATIO_MEASURES]
+        aggs += [f"coalesce(sum(CASE WHEN {_quote(r)} IS NOT NULL THEN {pv} END), 0) AS {_quote(r + '__pv')}"
+                 for r in RATIO_MEASURES]
+        where_sql, params = self._where(where)
+        sql = f"SELECT {keys}, {', '.join(aggs)} FROM {self._from(source)}{where_sql} GROUP BY {keys}"
+        # Conexión por consulta: DuckDB no comparte conexiones entre hilos de Streamlit.
+        with self._duckdb.connect() as con:
+            return _finalize(con.execute(sql, params).df(), by)
+
+    def scan(self, source, columns, where=None, batch_rows=REPORT_ENGINE_BATCH_ROWS):
+        where_sql, params = self._where(where)
+        sql = f"SELECT {', '.join(_quote(c) for c in columns)} FROM {self._from(source)}{where_sql}"
+        with self._duckdb.connect() as con:
+            reader = con.execute(sql, params).to_arrow_reader(batch_rows)
+            for batch in reader:
+                yield batch.to_pandas()
+
+
+# ---------- Polars ----------
+class PolarsEngine(ReportEngine):
+    name = "polars"
+
+    def __init__(self):
+        import polars as pl
+        self._pl = pl
+
+    def _lazy(self, source: str, where: Optional[Where]):
+        pl = self._pl
+        path = _dataset_path(source)
+        if os.path.isdir(path):
+            path = os.path.join(path, "**", "*.parquet")
+        lf = pl.scan_parquet(path, hive_partitioning=True)
+        for col, values in (where or {}).items():
+            lf = lf.filter(pl.col(col).cast(pl.Utf8).is_in([str(v) for v in values]))
+        return lf
+
+    def _collect(self, lf):
+        try:
+            return lf.collect(engine="streaming")
+        except TypeError:  # polars < 1.23
+            return lf.collect(streaming=True)
+
+    def aggregate(self, source, by, where=None):
+        _check_by(by)
+        pl = self._pl
+        pv = pl.col("PV")
+        aggs = [pl.len().cast(pl.Float64).alias("n")]
+        aggs += [pl.col(m).sum().alias(m) for m in SUM_MEASURES]
+        aggs += [pl.col(r).sum().alias(f"{r}__sum") for r in RATIO_MEASURES]
+        aggs += [pl.col(r).count().cast(pl.Float64).alias(f"{r}__n") for r in RATIO_MEASURES]
+        aggs += [(pl.col(r) * pv).sum().alias(f"{r}__pvw") for r in RATIO_MEASURES]
+        aggs += [pv.filter(pl.col(r).is_not_null()).sum().alias(f"{r}__pv") for r in RATIO_MEASURES]
+        lf = self._lazy(source, where).group_by([pl.col(c).cast(pl.Utf8) for c in by]).agg(aggs)
+        return _finalize(self._collect(lf).to_pandas(), by)
+
+    def scan(self, source, columns, where=None, batch_rows=REPORT_ENGINE_BATCH_ROWS):
+        lf = self._lazy(source, where).select(list(columns))
+        if hasattr(lf, "collect_batches"):
+            for df in lf.collect_batches(chunk_size=batch_rows):
+                yield df.to_pandas()
+            return
+        for df in self._collect(lf).iter_slices(batch_rows):
+            yield df.to_pandas()
+
+
+# ---------- pyarrow.dataset ----------
+class ArrowEngine(ReportEngine):
+    """
+    Sin motor SQL: ``pyarrow.dataset`` hace el pushdown y cada lote se agrega por separado.
+    Como las medidas son aditivas, los parciales se combinan con otra suma.
+    """
+    name = "arrow"
+
+    def __init__(self):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+        self._pa, self._pc, self._ds = pa, pc, ds
+
+    def _scanner(self, source: str, columns: Sequence[str], where: Optional[Where], batch_rows: int):
+        ds, pc = self._ds, self._pc
+        dataset = ds.dataset(_dataset_path(source), format="parquet", partitioning="hive")
+        expr = None
+        for col, values in (where or {}).items():
+            field_type = dataset.schema.field(col).type
+            if self._pa.types.is_dictionary(field_type):
+                field_type = field_type.value_type
+            cond = pc.field(col).isin(self._pa.array(list(values), type=field_type))
+            expr = cond if expr is None else expr & cond
+        return dataset.scanner(columns=list(columns), filter=expr, batch_size=batch_rows)
+
+    def _batch_cells(self, batch, by: Sequence[str]):
+        pa, pc = self._pa, self._pc
+        pv = batch.column("PV").cast(pa.float64())
+        cols = {c: batch.column(c) for c in by}
+        cols = {c: (a.dictionary_decode() if pa.types.is_dictionary(a.type) else a) for c, a in cols.items()}
+        cols["n"] = pa.array(np.ones(batch.num_rows))
+        for m in SUM_MEASURES:
+            cols[m] = batch.column(m).cast(pa.float64())
+        for r in RATIO_MEASURES:
+            vals = batch.column(r).cast(pa.float64())
+            known = pc.is_valid(vals)
+            cols[f"{r}__sum"] = vals
+            cols[f"{r}__n"] = known.cast(pa.float64())
+            cols[f"{r}__pvw"] = pc.multiply(vals, pv)
+            cols[f"{r}__pv"] = pc.if_else(known, pv, 0.0)
+        return pa.table(cols)
+
+    def _sum_cells(self, table, by: Sequence[str]):
+        out = table.group_by(list(by), use_threads=False).aggregate([(m, "sum") for m in MEASURE_COLUMNS])
+        return out.rename_columns([c[:-4] if c.endswith("_sum") and c[:-4] in MEASURE_COLUMNS else c
+                                   for c in out.column_names])
+
+    def aggregate(self, source, by, where=None):
+        pa = self._pa
+        scanner = self._scanner(source, _projection(by, where), where, REPORT_ENGINE_BATCH_ROWS)
+        partials = []
+        for batch in scanner.to_batches():
+            if batch.num_rows:
+                partials.append(self._sum_cells(self._batch_cells(batch, by), by))
+        if not partials:
+            return _finalize(pd.DataFrame(columns=[*by, *MEASURE_COLUMNS]), by)
+        cells = self._sum_cells(pa.concat_tables(partials), by)
+        return _finalize(cells.to_pandas(), by)
+
+    def scan(self, source, columns, where=None, batch_rows=REPORT_ENGINE_BATCH_ROWS):
+        for batch in self._scanner(source, columns, where, batch_rows).to_batches():
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+
+# ---------- pandas ----------
+class PandasEngine(ReportEngine):
+    """Respaldo sin dependencias extra: lee las columnas necesarias y agrupa en memoria."""
+    name = "pandas"
+
+    def _read(self, source: str, columns: Sequence[str], where: Optional[Where]) -> pd.DataFrame:
+        filters = [(col, "in", list(values)) for col, values in (where or {}).items()] or None
+        try:
+            df = pd.read_parquet(_dataset_path(source), columns=list(columns), filters=filters)
+        except (TypeError, ValueError):  # motor de parquet sin soporte de filters
+            df = pd.read_parquet(_dataset_path(source), columns=list(columns))
+        for col, values in (where or {}).items():
+            df = df[df[col].astype(str).isin([str(v) for v in values])]
+        return df
+
+    def aggregate(self, source, by, where=None):
+        df = self._read(source, _projection(by, where), where)
+        return _finalize(AggregateCube.from_facts(df, by).cells, by)
+
+    def scan(self, source, columns, where=None, batch_rows=REPORT_ENGINE_BATCH_ROWS):
+        df = self._read(source, columns, where)
+        for start in range(0, len(df), batch_rows):
+            yield df.iloc[start:start + batch_rows]
+
+
+ENGINES: Dict[str, Callable[[], ReportEngine]] = {
+    DuckDBEngine.name: DuckDBEngine,
+    PolarsEngine.name: PolarsEngine,
+    ArrowEngine.name: ArrowEngine,
+    PandasEngine.name: PandasEngine,
+}
+
+
+def available_engines() -> List[str]:
+    """Motores que se pueden instanciar en este entorno (dependencia opcional instalada)."""
+    out = []
+    for name, factory in ENGINES.items():
+        try:
+            factory()
+        except ImportError:
+            continue
+        out.append(name)
+    return out
+
+
+def get_engine(name: Optional[str] = None) -> ReportEngine:
+    """
+    Motor pedido (o ``REPORT_ENGINE``). Con ``auto`` usa el primero instalado; un motor pedido
+    por nombre que no está instalado deja un warning en el log y cae a pandas, para que un
+    REPORT_ENGINE de otro entorno no tire la app.
+    """
+    name = (name or REPORT_ENGINE).strip().lower()
+    if name == "auto":
+        for factory in ENGINES.values():
+            try:
+                return factory()
+            except ImportError:
+                continue
+    if name not in ENGINES:
+        raise ValueError(f"REPORT_ENGINE desconocido: {name!r} (usa auto, {', '.join(ENGINES)})")
+    try:
+        return ENGINES[name]()
+    except ImportError as exc:
+        logger.warning("REPORT_ENGINE=%r no está instalado (%s); se usa pandas", name, exc)
+        return PandasEngine()
@@ -0,0 +1,73 @@
+"""
+Formato y colores de las tablas del reporte de posicionamiento (páginas 4 y 5).
+
+- ``style_report``: Styler con semáforo y degradado PV, para las tablas de la página 4
+- ``styled_html``: el HTML de ese Styler, para tablas grandes y la exportación "HTML con
+  formato" (se arma en el pool de ``utils.offload``)
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+import pandas as pd
+
+from utils import profiler
+
+if TYPE_CHECKING:  # el Styler (y jinja2) se cargan recién al estilizar, con ``df.style``
+    from pandas.io.formats.style import Styler
+
+
+def pct_fmt(x: float) -> str:
+    if pd.isna(x):
+        return ""
+    return f"{x:.2%}"
+
+def money_fmt(x: float) -> str:
+    if pd.isna(x):
+        return ""
+    return f"$ {x:,.0f}"
+
+def semaforo_100(s: pd.Series) -> list[str]:
+    """
+    Colorea alrededor de 100%:
+    < 95% rojo; 95-100 ámbar; 100-105 verde claro; >105 verde.
+    """
+    styles = []
+    for v in s:
+        if pd.isna(v):
+            styles.append("")
+            continue
+        if v < 0.95:
+            styles.append("background-color:#f8d7da; color:#842029")
+        elif v < 1.00:
+            styles.append("background-color:#fff3cd; color:#664d03")
+        elif v <= 1.05:
+            styles.append("background-color:#d1e7dd; color:#0f5132")
+        else:
+            styles.append("background-color:#bfe5c5; color:#0b3e26")
+    return styles
+
+def heat_pv(s: pd.Series) -> list[str]:
+    """Degradado simple para PV: más alto, más intenso."""
+    if s.max() == 0:
+        return ["" for _ in s]
+    vals = (s - s.min()) / (s.max() - s.min() + 1e-9)
+    return [f"background: linear-gradient(90deg,#ffeaa7 {v*100:.0f}%, transparent {v*100:.0f}%);" for v in vals]
+
+@profiler.profiled("styler")
+def style_report(df: pd.DataFrame) -> Styler:
+    """Styler de una tabla con columnas del reporte (formatos + semáforo + degradado PV)."""
+    return (
+        df.style
+          .format({"PV": pct_fmt, "CENTRAL 1": pct_fmt, "ALVI 1": pct_fmt,
+                   "VENTA NETA": money_fmt, "MARGEN": pct_fmt})
+          .apply(heat_pv, subset=["PV"])
+          .apply(semaforo_100, subset=["CENTRAL 1"])
+          .apply(semaforo_100, subset=["ALVI 1"])
+    )
+
+def styled_html(df: pd.DataFrame) -> str:
+    """HTML (sin índice) de ``style_report(df)``; recorre cada celda, mejor fuera del hilo del script."""
+    # El Styler arma todo el HTML de una vez (no hay escritura por bloques).
+    with pd.option_context("styler.render.max_elements", max(df.size, 1)):
+        return style_report(df).hide(axis="index").to_html()
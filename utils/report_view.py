@@ -0,0 +1,67 @@
+"""
+Vista filtrada de una tabla del reporte, sin copias intermedias.
+
+``ReportView`` guarda la tabla base (compartida, solo lectura), una máscara booleana y los
+totales del subconjunto, que salen del cubo de agregados. Filtrar, normalizar PV y calcular
+el 'Grand Total' no copian, no concatenan ni reordenan nada: el total vive aparte de las
+filas de detalle y la única copia se hace en ``materialize()``, cuando la tabla se muestra
+o se descarga.
+"""
+
+from __future__ import annotations
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.report_cube import AggregateCube
+
+TOTAL_LABEL = "Grand Total"
+LABEL_COLUMN = "Macro / Categoría"
+
+
+class ReportView:
+    def __init__(
+        self,
+        base: pd.DataFrame,
+        cube: AggregateCube,
+        mask: Optional[np.ndarray] = None,
+        *,
+        normalize: bool = False,
+        weighted: bool = False,
+        label_col: str = LABEL_COLUMN,
+    ):
+        self.base = base
+        self.mask = np.ones(len(base), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        self.label_col = label_col
+        self.positions = np.flatnonzero(self.mask)
+        totals = cube.totals(self.mask, weighted=weighted)
+        # Normalizar es escalar PV: el orden por PV y los promedios ponderados no cambian.
+        self.pv_scale = totals["PV"] if normalize and totals["PV"] > 0 else 1.0
+        self.grand_total: Dict[str, float] = {**totals, "PV": totals["PV"] / self.pv_scale}
+        self._frame: Optional[pd.DataFrame] = None
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.positions)
+
+    def column(self, name: str) -> np.ndarray:
+        """Valores visibles de una columna (PV ya normalizado)."""
+        vals = self.base[name].to_numpy()[self.positions]
+        return vals / self.pv_scale if name == "PV" and self.pv_scale != 1.0 else vals
+
+    def materialize(self) -> pd.DataFrame:
+        """
+        Construye (una sola vez) la tabla para mostrar/descargar: filas visibles + 'Grand Total'.
+        Es el único punto con copia (``take``) y concat; la vista se reutiliza en render y descarga.
+        """
+        if self._frame is not None:
+            return self._frame
+        detail = self.base.take(self.positions)
+        if self.pv_scale != 1.0:
+            detail["PV"] = detail["PV"].to_numpy() / self.pv_scale
+        total = pd.DataFrame(
+            {c: [TOTAL_LABEL if c == self.label_col else self.grand_total.get(c, np.nan)] for c in detail.columns}
+        )
+        self._frame = pd.concat([detail, total], ignore_index=True)
+        return self._frame
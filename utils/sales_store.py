@@ -0,0 +1,185 @@
+"""
+Ventas SKU-día indexadas por fecha y categoría, para los filtros de la plantilla (página 3).
+
+Se arma una vez por proceso a partir de la tabla de hechos (``fecha, categoria, sku, ventas,
+costos``) y responde los filtros sin recorrer las filas:
+
+- Serie diaria y participación por categoría: salen de totales preagregados día × categoría
+  (matriz densa chica); un rango de fechas es un corte de columnas.
+- Top N SKUs en un rango de fechas: las filas se ordenan por (sku, día) y se guardan sumas
+  acumuladas de ventas y costos. La venta de cada SKU en el rango es ``acum[hi] - acum[lo]``
+  con ``lo``/``hi`` buscados por ``searchsorted`` sobre la clave ``sku * n_días + día``:
+  O(SKUs · log filas), sin importar cuántos días abarque el rango. Los SKUs se numeran por
+  categoría, así que filtrar por categoría es un rango contiguo de SKUs. Los N mayores se
+  eligen con ``argpartition`` y solo esos N se ordenan.
+
+Los arreglos se comparten entre sesiones: tratarlos como solo lectura.
+
+Env:
+- SALES_STORE_SKUS: SKUs de los datos de ejemplo (default: 2000)
+- SALES_STORE_DAYS: días de los datos de ejemplo desde 2025-01-01 (default: 365)
+"""
+
+from __future__ import annotations
+import datetime as dt
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+MEASURES = ["ventas", "costos"]
+
+SALES_STORE_SKUS = int(os.getenv("SALES_STORE_SKUS", "2000"))
+SALES_STORE_DAYS = int(os.getenv("SALES_STORE_DAYS", "365"))
+
+DateLike = object  # date, datetime, Timestamp o str
+
+
+class SalesStore:
+    def __init__(self, facts: pd.DataFrame):
+        fecha = pd.to_datetime(facts["fecha"]).dt.normalize()
+        self.date_min: pd.Timestamp = fecha.min()
+        self.date_max: pd.Timestamp = fecha.max()
+        self.n_days = int((self.date_max - self.date_min).days) + 1
+        day = (fecha - self.date_min).dt.days.to_numpy(dtype=np.int64)
+
+        cat_codes, self.categories = pd.factorize(facts["categoria"], sort=True)
+        self.categories = [str(c) for c in self.categories]
+        sku_raw, sku_names = pd.factorize(facts["sku"])
+        sku_names = np.asarray(sku_names, dtype=object)
+
+        # Categoría de cada SKU (cada SKU pertenece a una sola) y renumeración por categoría.
+        sku_cat = np.zeros(len(sku_names), dtype=np.int64)
+        sku_cat[sku_raw] = cat_codes
+        order = np.lexsort((np.arange(len(sku_names)), sku_cat))
+        remap = np.empty_like(order)
+        remap[order] = np.arange(len(order))
+        self.sku_names = sku_names[order]
+        self.sku_cat = sku_cat[order]
+        self.n_skus = len(self.sku_names)
+        # SKUs de la categoría c: [cat_sku_offs[c], cat_sku_offs[c + 1])
+        self.cat_sku_offs = np.searchsorted(self.sku_cat, np.arange(len(self.categories) + 1))
+        sku = remap[sku_raw]
+
+        values = {m: facts[m].to_numpy(dtype="float64") for m in MEASURES}
+
+        # Totales día × categoría.
+        flat = cat_codes.astype(np.int64) * self.n_days + day
+        size = len(self.categories) * self.n_days
+        self.daily: Dict[str, np.ndarray] = {
+            m: np.bincount(flat, weights=v, minlength=size).reshape(len(self.categories), self.n_days)
+            for m, v in values.items()
+        }
+
+        # Filas ordenadas por (sku, día) con sumas acumuladas (prefijo con 0 al inicio).
+        key = sku.astype(np.int64) * self.n_days + day
+        by_key = np.argsort(key, kind="stable")
+        key_type = np.int32 if self.n_skus * self.n_days < np.iinfo(np.int32).max else np.int64
+        self._key = key[by_key].astype(key_type)
+        self._cum: Dict[str, np.ndarray] = {
+            m: np.concatenate([[0.0], np.cumsum(v[by_key])]) for m, v in values.items()
+        }
+        # Bloque de filas de cada SKU (camino rápido sin filtro de fechas).
+        bounds = np.arange(self.n_skus + 1, dtype=np.int64) * self.n_days
+        self._sku_offs = np.searchsorted(self._key, bounds.astype(key_type))
+        self.n_rows = len(facts)
+
+    # ---------- Índices ----------
+    def _day(self, value: DateLike) -> int:
+        ts = pd.Timestamp(value).normalize()
+        return int((ts - self.date_min).days)
+
+    def day_range(self, start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> Tuple[int, int]:
+        """Días [d0, d1) dentro del store para el rango inclusivo ``start``..``end``."""
+        d0 = 0 if start is None else max(0, self._day(start))
+        d1 = self.n_days if end is None else min(self.n_days, self._day(end) + 1)
+        return d0, max(d0, d1)
+
+    def _cats(self, categoria: Optional[str]) -> List[int]:
+        if categoria is None or categoria == "Todas":
+            return list(range(len(self.categories)))
+        try:
+            return [self.categories.index(str(categoria))]
+        except ValueError:
+            return []
+
+    # ---------- Consultas ----------
+    def daily_series(
+        self, start: Optional[DateLike] = None, end: Optional[DateLike] = None, categoria: Optional[str] = None
+    ) -> pd.DataFrame:
+        """Ventas y costos por día (índice ``fecha``) en el rango y categoría."""
+        d0, d1 = self.day_range(start, end)
+        cats = self._cats(categoria)
+        data = {m: self.daily[m][cats, d0:d1].sum(axis=0) for m in MEASURES}
+        index = pd.date_range(self.date_min + pd.Timedelta(days=d0), periods=d1 - d0, freq="D", name="fecha")
+        return pd.DataFrame(data, index=index)
+
+    def share(self, start: Optional[DateLike] = None, end: Optional[DateLike] = None, measure: str = "ventas") -> pd.DataFrame:
+        """Participación de cada categoría en ``measure`` dentro del rango."""
+        d0, d1 = self.day_range(start, end)
+        totals = self.daily[measure][:, d0:d1].sum(axis=1)
+        total = totals.sum()
+        return pd.DataFrame({
+            "categoria": self.categories,
+            "participacion": totals / total if total else np.zeros(len(totals)),
+        })
+
+    def sku_totals(
+        self,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+        categoria: Optional[str] = None,
+        measure: str = "ventas",
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(ids de SKU, total de ``measure`` en el rango) para los SKUs de la categoría."""
+        d0, d1 = self.day_range(start, end)
+        ids = np.concatenate([
+            np.arange(self.cat_sku_offs[c], self.cat_sku_offs[c + 1]) for c in self._cats(categoria)
+        ] or [np.zeros(0, dtype=np.int64)])
+        if d0 == 0 and d1 == self.n_days:
+            lo, hi = self._sku_offs[ids], self._sku_offs[ids + 1]
+        else:
+            # Consultas del mismo tipo que la clave: si no, searchsorted convierte la clave entera.
+            base = ids.astype(np.int64) * self.n_days
+            lo = np.searchsorted(self._key, (base + d0).astype(self._key.dtype), side="left")
+            hi = np.searchsorted(self._key, (base + d1).astype(self._key.dtype), side="left")
+        cum = self._cum[measure]
+        return ids, cum[hi] - cum[lo]
+
+    def top_skus(
+        self,
+        n: int,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+        categoria: Optional[str] = None,
+        measure: str = "ventas",
+    ) -> pd.DataFrame:
+        """Los ``n`` SKUs con mayor ``measure`` en el rango, de mayor a menor."""
+        ids, totals = self.sku_totals(start, end, categoria, measure)
+        if n < len(totals):
+            part = np.argpartition(-totals, n - 1)[:n]
+        else:
+            part = np.arange(len(totals))
+        part = part[np.argsort(-totals[part], kind="stable")]
+        chosen = ids[part]
+        return pd.DataFrame({
+            "sku": self.sku_names[chosen],
+            "categoria": np.asarray(self.categories, dtype=object)[self.sku_cat[chosen]],
+            measure: totals[part],
+        })
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self._key, self._sku_offs, self.sku_names, self.sku_cat, *self._cum.values(), *self.daily.values()]
+        return int(sum(a.nbytes for a in arrays))
+
+    @property
+    def dates(self) -> Tuple[dt.date, dt.date]:
+        return self.date_min.date(), self.date_max.date()
+
+
+def demo_store(seed: int = 0) -> SalesStore:
+    """Store con ventas sintéticas (``utils.synthetic.make_sales_table``)."""
+    from utils.synthetic import make_sales_table
+    return SalesStore(make_sales_table(SALES_STORE_SKUS, SALES_STORE_DAYS, seed=seed))
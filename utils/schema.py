@@ -0,0 +1,169 @@
+"""
+Tipos compactos para los DataFrames de reportes y catálogo.
+
+Los frames llegan con tipos por defecto (etiquetas repetidas como ``object``, todo número
+como ``float64``/``int64``) y cada sesión guarda copias. ``compact(df, schema)`` los convierte
+según un esquema de tipos lógicos por columna:
+
+- ``label``: etiquetas repetidas → ``category``; si casi todas son distintas, string Arrow
+- ``text``: texto libre / códigos (sku, nombre) → string Arrow
+- ``id``: enteros (nullable) con el ancho mínimo que admite el rango (Int8 .. Int64)
+- ``ratio``: proporciones y porcentajes → ``float32`` (~7 dígitos, sobra para 2 decimales)
+- ``money``: montos → ``float64`` (``float32`` pierde pesos sobre ~16,7 millones)
+
+Las columnas sin tipo en el esquema se infieren (``infer_kind``): solo las numéricas con
+nombre de id/código van como ``id``; los demás números (enteros o float) se dejan como están,
+porque pueden ser medidas y un entero angosto desborda en la primera cuenta (``Int8 * 2``). ``memory_report`` resume la memoria por frame para mostrarla en
+las páginas.
+
+Las conversiones no cambian valores visibles: las cuentas (cubos, totales) se siguen haciendo
+en ``float64`` (ver ``utils.report_cube``).
+"""
+
+from __future__ import annotations
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+# Fracción máxima de valores distintos para que una etiqueta vaya como categoría.
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# Columnas que por nombre son ids o códigos (id, id_x, x_id, cod, codigo_x, x_code, sku...).
+_ID_NAME = re.compile(r"^(id|sku|cod|codigo|code)$|^(id|sku|cod|codigo|code)_.+$|^.+_(id|sku|cod|codigo|code)$",
+                      re.IGNORECASE)
+_INT_TYPES = [("Int8", np.int8), ("Int16", np.int16), ("Int32", np.int32), ("Int64", np.int64)]
+
+
+def _arrow_string_dtype():
+    try:
+        import pyarrow  # noqa: F401
+        return pd.StringDtype("pyarrow")
+    except ImportError:
+        return pd.StringDtype()
+
+
+@dataclass(frozen=True)
+class Schema:
+    """Tipo lógico por columna; ``columns`` sin entrada se infieren."""
+    name: str
+    columns: Dict[str, str] = field(default_factory=dict)
+
+
+REPORT_SCHEMA = Schema("reporte", {
+    "Macro / Categoría": "label",
+    "Macro": "label",
+    "Categoría": "label",
+    "Marca": "label",
+    "PV": "ratio",
+    "CENTRAL 1": "ratio",
+    "ALVI 1": "ratio",
+    "MARGEN": "ratio",
+    "VENTA NETA": "money",
+})
+
+# Catálogo (/catalogo/*): ids por nombre de columna (infer_kind), códigos y nombres como texto.
+CATALOG_SCHEMA = Schema("catalogo", {
+    "sku": "text",
+    "nombre": "text",
+    "proveedor": "label",
+    "categoria": "label",
+    "macrocategoria": "label",
+})
+
+
+def infer_kind(name: str, s: pd.Series) -> Optional[str]:
+    """Tipo lógico para una columna fuera del esquema (``None`` = dejarla como está)."""
+    if pd.api.types.is_bool_dtype(s):
+        return None
+    if _ID_NAME.match(str(name)) and (pd.api.types.is_numeric_dtype(s) or s.isna().all()):
+        return "id"
+    if pd.api.types.is_numeric_dtype(s):
+        # Una medida (unidades, montos redondeados) sigue siendo medida: solo se achican los
+        # ids/códigos por nombre (arriba) o los declarados ``id`` en el esquema.
+        return None
+    if isinstance(s.dtype, (pd.StringDtype, pd.CategoricalDtype)):
+        return "label"
+    if pd.api.types.is_object_dtype(s) and s.map(lambda v: v is None or isinstance(v, str) or v != v).all():
+        return "label"
+    return None
+
+
+def _as_label(s: pd.Series) -> pd.Series:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s.cat.remove_unused_categories()
+    n = len(s)
+    if n and s.nunique(dropna=True) <= CATEGORY_MAX_UNIQUE_RATIO * n:
+        return s.astype("category")
+    return _as_text(s)
+
+
+def _as_text(s: pd.Series) -> pd.Series:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype(object)
+    return s.astype(_arrow_string_dtype())
+
+
+def _as_id(s: pd.Series) -> pd.Series:
+    num = pd.to_numeric(s, errors="coerce")
+    vals = num.dropna()
+    lo, hi = (vals.min(), vals.max()) if len(vals) else (0, 0)
+    for dtype, np_type in _INT_TYPES:
+        info = np.iinfo(np_type)
+        if info.min <= lo and hi <= info.max:
+            return num.astype(dtype)
+    return num.astype("Int64")
+
+
+def _as_ratio(s: pd.Series) -> pd.Series:
+    return pd.to_numeric(s, errors="coerce").astype("float32")
+
+
+def _as_money(s: pd.Series) -> pd.Series:
+    return pd.to_numeric(s, errors="coerce").astype("float64")
+
+
+CONVERTERS = {
+    "label": _as_label,
+    "text": _as_text,
+    "id": _as_id,
+    "ratio": _as_ratio,
+    "money": _as_money,
+}
+
+
+def compact(df: pd.DataFrame, schema: Optional[Schema] = None) -> pd.DataFrame:
+    """Copia de ``df`` con tipos compactos. Si una columna no convierte, queda como estaba."""
+    columns = schema.columns if schema else {}
+    out = {}
+    for name in df.columns:
+        s = df[name]
+        kind = columns.get(name) or infer_kind(name, s)
+        if kind is None:
+            out[name] = s
+            continue
+        try:
+            out[name] = CONVERTERS[kind](s)
+        except (TypeError, ValueError):
+            out[name] = s
+    return pd.DataFrame(out, index=df.index)
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def memory_report(frames: Mapping[str, pd.DataFrame]) -> pd.DataFrame:
+    """Una fila por frame: filas, columnas, memoria (KB) y tipos."""
+    rows = []
+    for name, df in frames.items():
+        rows.append({
+            "Tabla": name,
+            "Filas": len(df),
+            "Columnas": df.shape[1],
+            "KB": round(frame_nbytes(df) / 1024, 1),
+            "Tipos": ", ".join(sorted({str(t) for t in df.dtypes})),
+        })
+    return pd.DataFrame(rows, columns=["Tabla", "Filas", "Columnas", "KB", "Tipos"])
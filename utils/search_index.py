@@ -0,0 +1,155 @@
+"""
+Índice de búsqueda por trigramas para el filtro de texto de los reportes.
+
+Se construye una vez por carga de datos sobre todas las columnas de etiquetas. Las
+etiquetas se normalizan (minúsculas, sin tildes, ``_`` y signos como espacio) y cada
+etiqueta única se indexa por sus trigramas. Una búsqueda:
+
+1. normaliza el término igual que las etiquetas;
+2. cuenta, por etiqueta, cuántos trigramas del término contiene, juntando las listas de
+   postings (los términos de 1-2 caracteres usan su propia lista de uni/bigramas);
+3. acepta las etiquetas que contienen el término completo (subcadena sin tildes) o, en
+   modo difuso, al menos ``threshold`` de sus trigramas ("higiene" encuentra "higiénico").
+   El modo difuso es el default y devuelve la unión de ambos ("higiene" trae
+   "farmacia_e_higiene_personal" y "higiénico"); ``fuzzy=False`` deja solo la subcadena;
+4. pasa de etiquetas a filas con un CSR por columna (etiqueta -> filas).
+
+El costo depende de cuántas etiquetas y filas coinciden, no de recorrer los textos fila
+por fila.
+"""
+
+from __future__ import annotations
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def fold(text: str) -> str:
+    """Minúsculas, sin tildes y con separadores colapsados a un espacio."""
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", text).strip()
+
+
+def trigrams(text: str) -> List[str]:
+    return list({text[i:i + 3] for i in range(len(text) - 2)})
+
+
+class SearchIndex:
+    def __init__(self, df: pd.DataFrame, columns: Sequence[str]):
+        self.columns = list(columns)
+        self.n_rows = len(df)
+
+        # Etiquetas únicas normalizadas de todas las columnas + código por fila y columna.
+        folded_per_col = []
+        for col in self.columns:
+            codes, uniques = pd.factorize(df[col], use_na_sentinel=True)
+            folded_uniques = np.array([fold(u) for u in uniques], dtype=object)
+            folded_per_col.append((codes, folded_uniques))
+        all_folded = np.concatenate([u for _, u in folded_per_col]) if folded_per_col else np.array([], dtype=object)
+        label_codes, labels = pd.factorize(all_folded)
+        self.labels: np.ndarray = np.asarray(labels, dtype=object)
+        n_labels = len(self.labels)
+
+        # Por columna, filas ordenadas por etiqueta (CSR): etiqueta -> filas sin recorrer la tabla.
+        self._csr: List[Tuple[np.ndarray, np.ndarray]] = []
+        offset = 0
+        for codes, uniques in folded_per_col:
+            remap = label_codes[offset:offset + len(uniques)].astype(np.int64)
+            offset += len(uniques)
+            # NA queda en una etiqueta ficticia (n_labels) que nunca coincide
+            row_codes = np.where(codes >= 0, remap[np.maximum(codes, 0)], n_labels)
+            order = np.argsort(row_codes, kind="stable").astype(np.int32)
+            offs = np.zeros(n_labels + 2, dtype=np.int64)
+            np.cumsum(np.bincount(row_codes, minlength=n_labels + 1), out=offs[1:])
+            self._csr.append((order, offs))
+
+        # Trigramas para términos normales; uni/bigramas para términos de 1-2 caracteres.
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for label_id, label in enumerate(self.labels):
+            for g in {label[i:i + n] for n in (1, 2, 3) for i in range(len(label) - n + 1)}:
+                postings[g].append(label_id)
+        self._postings: Dict[str, np.ndarray] = {
+            g: np.asarray(ids, dtype=np.int32) for g, ids in postings.items()
+        }
+
+    @property
+    def nbytes(self) -> int:
+        csr = sum(o.nbytes + f.nbytes for o, f in self._csr)
+        posts = sum(p.nbytes for p in self._postings.values())
+        labels = sum(len(s) for s in self.labels)
+        return int(csr + posts + labels)
+
+    def match_labels(self, term: str, *, fuzzy: bool = True,
+                     threshold: float = 0.75) -> Optional[np.ndarray]:
+        """Ids de etiquetas únicas que coinciden; ``None`` significa todas (término vacío)."""
+        term = fold(term)
+        if not term:
+            return None
+        if len(term) < 3:
+            return self._postings.get(term, _EMPTY)
+        grams = trigrams(term)
+        lists = [self._postings.get(g, _EMPTY) for g in grams]
+        need = max(1, math.ceil(threshold * len(grams))) if fuzzy else len(grams)
+        ids = _ids_with_count(np.concatenate(lists), need, len(self.labels))
+        if not fuzzy and len(grams) > 1:
+            # Todos los trigramas presentes no garantizan la subcadena: se confirma.
+            ids = np.fromiter((i for i in ids if term in self.labels[i]), dtype=np.int64)
+        # En modo difuso las coincidencias exactas (todos los trigramas) quedan incluidas.
+        return ids
+
+    def _rows(self, col_pos: int, label_ids: np.ndarray) -> np.ndarray:
+        order, offs = self._csr[col_pos]
+        starts = offs[label_ids]
+        lens = offs[label_ids + 1] - starts
+        total = int(lens.sum())
+        if total == 0:
+            return _EMPTY
+        # posiciones starts[i] .. starts[i]+lens[i]-1 de cada etiqueta, en un solo arreglo
+        shift = np.repeat(starts - (np.cumsum(lens) - lens), lens)
+        return order[shift + np.arange(total)]
+
+    def mask(self, term: str, *, fuzzy: bool = True, threshold: float = 0.75) -> np.ndarray:
+        """Máscara por fila: True si alguna columna de etiqueta coincide con ``term``."""
+        ids = self.match_labels(term, fuzzy=fuzzy, threshold=threshold)
+        if ids is None:
+            return np.ones(self.n_rows, dtype=bool)
+        out = np.zeros(self.n_rows, dtype=bool)
+        for col_pos in range(len(self.columns)):
+            out[self._rows(col_pos, ids)] = True
+        return out
+
+    def column_mask(self, column: str, term: str, *, fuzzy: bool = True,
+                    threshold: float = 0.75) -> np.ndarray:
+        ids = self.match_labels(term, fuzzy=fuzzy, threshold=threshold)
+        if ids is None:
+            return np.ones(self.n_rows, dtype=bool)
+        out = np.zeros(self.n_rows, dtype=bool)
+        out[self._rows(self.columns.index(column), ids)] = True
+        return out
+
+    def search(self, term: str, **kwargs) -> np.ndarray:
+        """Ids (posiciones) de las filas que coinciden, ordenados."""
+        return np.flatnonzero(self.mask(term, **kwargs))
+
+
+_EMPTY = np.zeros(0, dtype=np.int32)
+
+
+def _ids_with_count(postings: np.ndarray, need: int, n_labels: int) -> np.ndarray:
+    """Ids que aparecen al menos ``need`` veces. ``unique`` si hay pocos postings, si no ``bincount``."""
+    if len(postings) * 8 < n_labels:
+        ids, counts = np.unique(postings, return_counts=True)
+        return ids[counts >= need]
+    return np.flatnonzero(np.bincount(postings, minlength=n_labels) >= need)
+
+
+def build_indexes(frames: Dict[str, pd.DataFrame], columns: Dict[str, Iterable[str]]) -> Dict[str, SearchIndex]:
+    return {name: SearchIndex(frames[name], list(cols)) for name, cols in columns.items()}
@@ -0,0 +1,132 @@
+"""
+Generador vectorizado de datos sintéticos para los reportes, con semilla.
+
+- ``make_fact_table``: tabla de hechos Período × Macro × Categoría × Marca con las medidas
+  del reporte, del tamaño que se pida (10³ a 10⁷ filas o más).
+- ``make_report_table``: tabla ya agregada con el esquema del reporte
+  (``"Macro / Categoría"`` + medidas) y una fila por etiqueta.
+- ``make_sales_table``: ventas diarias por SKU (``fecha, categoria, sku, ventas, costos``)
+  para la plantilla (``utils.sales_store``).
+
+Todo se arma con operaciones de numpy sobre arreglos completos; no hay bucles por fila.
+"""
+
+from __future__ import annotations
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+
+BASE_MACROS = [
+    "abarrotes","aseo_y_limpieza","bebes","bebidas_no_alcoholicas","confites_y_snacks",
+    "despensa","farmacia_e_higiene_personal","ferreteria","galletas","mascotas","papeles"
+]
+
+BASE_CATEGORIAS = [
+    "arroz","aceite","fideos","detergente","cloro","suavizante","pañales","toallitas",
+    "gaseosas","jugos","agua","chocolates","snacks_salados","salsas","conservas",
+    "analgésicos","jabones","pinturas","herramientas","dulces","saladas",
+    "alimento_perro","alimento_gato","higiénico","toalla"
+]
+
+BASE_MARCAS = [
+    "icb","carozzi","tresmontes","virutex_ilko","tucapel","ccu","colun",
+    "genomma","lucchetti","spl","electrolit","ambientes_limpios","novaceites"
+]
+
+
+def _names(base: Sequence[str], n: int, prefix: str) -> List[str]:
+    """Usa los nombres reales primero y completa con ``<prefix>_<i>``."""
+    return list(base[:n]) + [f"{prefix}_{i:04d}" for i in range(len(base), n)]
+
+
+def make_fact_table(
+    n_rows: int,
+    *,
+    n_brands: int = 200,
+    n_categories: int = 60,
+    n_macros: int = len(BASE_MACROS),
+    n_periods: int = 3,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Hechos con columnas ``Período, Macro, Categoría, Marca, PV, CENTRAL 1, ALVI 1,
+    VENTA NETA, MARGEN``. Las etiquetas son categóricas; cada categoría pertenece a una
+    macro fija y el PV suma 1 en cada período.
+    """
+    rng = np.random.default_rng(seed)
+    macros = _names(BASE_MACROS, n_macros, "macro")
+    categorias = _names(BASE_CATEGORIAS, n_categories, "categoria")
+    marcas = _names(BASE_MARCAS, n_brands, "marca")
+    periodos = [f"P{i + 1:02d}" for i in range(n_periods)]
+
+    cat_codes = rng.integers(0, n_categories, n_rows)
+    macro_of_cat = np.arange(n_categories) % n_macros
+    period_codes = rng.integers(0, n_periods, n_rows)
+    # Pocas marcas concentran la venta (Zipf truncado), como en los datos reales.
+    brand_codes = np.minimum(rng.zipf(1.3, n_rows) - 1, n_brands - 1)
+
+    venta = np.round(8e4 + 4e7 * rng.random(n_rows) ** 3, 0)
+    pv = venta / np.bincount(period_codes, weights=venta, minlength=n_periods)[period_codes]
+
+    return pd.DataFrame({
+        "Período": pd.Categorical.from_codes(period_codes, periodos),
+        "Macro": pd.Categorical.from_codes(macro_of_cat[cat_codes], macros),
+        "Categoría": pd.Categorical.from_codes(cat_codes, categorias),
+        "Marca": pd.Categorical.from_codes(brand_codes, marcas),
+        "PV": pv,
+        "CENTRAL 1": rng.uniform(0.92, 1.08, n_rows),
+        "ALVI 1": rng.uniform(0.92, 1.10, n_rows),
+        "VENTA NETA": venta,
+        "MARGEN": rng.uniform(0.07, 0.22, n_rows),
+    })
+
+
+def make_report_table(n_rows: int, *, seed: int = 0) -> pd.DataFrame:
+    """Tabla agregada del reporte con ``n_rows`` etiquetas únicas (``<marca>_<i>``), ordenada por PV."""
+    rng = np.random.default_rng(seed)
+    pv = rng.random(n_rows)
+    ids = np.arange(n_rows)
+    marcas = pd.Series(np.array(BASE_MARCAS, dtype=object)[ids % len(BASE_MARCAS)])
+    labels = marcas.str.cat(pd.Series(ids).astype(str), sep="_")
+    df = pd.DataFrame({
+        "Macro / Categoría": labels,
+        "PV": pv / pv.sum(),
+        "CENTRAL 1": 1.00 + 0.12 * (rng.random(n_rows) - 0.5),
+        "ALVI 1": 1.00 + 0.16 * (rng.random(n_rows) - 0.5),
+        "VENTA NETA": (2e5 + 2.0e7 * rng.random(n_rows)).round(0),
+        "MARGEN": 0.10 + 0.12 * rng.random(n_rows),
+    })
+    return df.sort_values("PV", ascending=False, ignore_index=True)
+
+
+def make_sales_table(
+    n_skus: int,
+    n_days: int,
+    *,
+    categories: Sequence[str] = ("A", "B", "C"),
+    start: str = "2025-01-01",
+    density: float = 0.6,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Ventas SKU-día: cada SKU pertenece a una categoría fija, tiene un nivel de venta propio
+    (lognormal, pocos SKUs concentran la venta) y vende en ~``density`` de los días.
+    """
+    rng = np.random.default_rng(seed)
+    sku_cat = rng.integers(0, len(categories), n_skus)
+    level = rng.lognormal(mean=5.0, sigma=1.0, size=n_skus)
+
+    day = np.repeat(np.arange(n_days), n_skus)
+    sku = np.tile(np.arange(n_skus), n_days)
+    keep = rng.random(len(day)) < density
+    day, sku = day[keep], sku[keep]
+
+    ventas = np.round(level[sku] * rng.uniform(0.5, 1.5, len(sku)), 0)
+    return pd.DataFrame({
+        "fecha": pd.Timestamp(start) + pd.to_timedelta(day, unit="D"),
+        "categoria": pd.Categorical.from_codes(sku_cat[sku], list(categories)),
+        "sku": pd.Categorical.from_codes(sku, [f"S{i:06d}" for i in range(n_skus)]),
+        "ventas": ventas,
+        "costos": np.round(ventas * rng.uniform(0.5, 0.8, len(sku)), 0),
+    })
@@ -0,0 +1,239 @@
+"""
+Warm-up de caches: precarga lo más pedido al arrancar y lo mantiene fresco.
+
+Streamlit no tiene un gancho de "servidor listo", así que el warm-up arranca en el primer run
+autenticado del proceso (``page.setup`` llama a ``start()``; las siguientes llamadas no hacen
+nada). Corre en hilos de fondo y no bloquea la página.
+
+El plan (``WARMUP_FILE``, JSON; sin archivo se usa ``DEFAULT_PLAN``) lista:
+
+- ``reports``: períodos del reporte a dejar en el cache compartido (``report_data.load_report``;
+  con ``REPORT_SOURCE=api``, solo con ``WARMUP_TOKEN``)
+- ``endpoints``: listados ``{"path", "params"}`` a dejar en disco (``utils.catalog``), con los
+  mismos parámetros por defecto que pide la página 2; solo con credencial de servicio
+  (``WARMUP_TOKEN``)
+- ``refdata``: cargar los datos de referencia (``utils.reference_data``; solo con
+  ``REFDATA_TOKEN``, sin credencial de servicio se cargan al leerlos)
+
+Las tareas corren con a lo sumo ``WARMUP_CONCURRENCY`` a la vez. La primera ronda usa lo que ya
+haya en disco; después, cada ``WARMUP_REFRESH_S`` una ronda vuelve a pedir los listados a la API
+y repone los reportes que el LRU haya sacado. ``status()`` y ``progress()`` alimentan la página
+"Estado de caches".
+
+Credenciales: los hilos de fondo nunca usan el token global de ``utils.api_client`` (el de la
+última sesión que pasó por ``page.setup``): cuando vence, su 401 lo borraría para todas las
+sesiones. Sin credencial de servicio, las tareas que van a la API quedan como "no aplica" y
+esos datos se cargan al pedirlos cada sesión, con su token.
+
+Env:
+- WARMUP_ENABLED: arrancar el warm-up (default: 1)
+- WARMUP_FILE: JSON con el plan (default: plan incluido)
+- WARMUP_CONCURRENCY: tareas simultáneas (default: 4)
+- WARMUP_REFRESH_S: segundos entre rondas de refresco; 0 = solo la ronda inicial (default: 300)
+- WARMUP_TOKEN: credencial de servicio para los listados y el reporte de la API (default:
+  ``REFDATA_TOKEN``; vacío = no se precargan)
+"""
+
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+WARMUP_FILE = os.getenv("WARMUP_FILE", "")
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", "4"))
+WARMUP_REFRESH_S = float(os.getenv("WARMUP_REFRESH_S", "300"))
+WARMUP_TOKEN = (os.getenv("WARMUP_TOKEN", "") or os.getenv("REFDATA_TOKEN", "")).strip()
+
+# Período por defecto del selector (``report_data.PERIODOS[0]``, escrito acá para no importar
+# pandas al arrancar) + primera página de cada listado de la página 2.
+DEFAULT_PLAN: Dict[str, object] = {
+    "reports": ["01-09 al 21-09"],
+    "endpoints": [
+        {"path": "/catalogo/skus", "params": {"limit": 50}},
+        {"path": "/catalogo/proveedores", "params": {"limit": 10, "offset": 0, "orden": "nombre"}},
+        {"path": "/catalogo/categorias", "params": {"limit": 10, "offset": 0, "orden": "macrocategoria"}},
+    ],
+    "refdata": True,
+}
+
+
+@dataclass
+class Task:
+    name: str
+    kind: str  # report | endpoint | refdata
+    params: Dict[str, object] = field(default_factory=dict)
+    status: str = "pendiente"  # pendiente | cargando | listo | error | no aplica
+    runs: int = 0
+    errors: int = 0
+    last_ms: float = 0.0
+    last_error: str = ""
+    finished_at: Optional[float] = None
+    note: str = ""  # por qué no aplica
+
+
+class NotApplicable(Exception):
+    """La tarea no corre en este proceso (ej. falta la credencial de servicio)."""
+
+
+def load_plan(path: str = WARMUP_FILE) -> Dict[str, object]:
+    if not path:
+        return DEFAULT_PLAN
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def plan_tasks(plan: Dict[str, object]) -> List[Task]:
+    tasks = [Task(f"reporte {p}", "report", {"periodo": p}) for p in plan.get("reports", [])]
+    for ep in plan.get("endpoints", []):
+        params = dict(ep.get("params") or {})
+        query = "&".join(f"{k}={v}" for k, v in params.items())
+        tasks.append(Task(f"GET {ep['path']}" + (f"?{query}" if query else ""), "endpoint",
+                          {"path": ep["path"], "params": params}))
+    if plan.get("refdata"):
+        tasks.append(Task("datos de referencia", "refdata"))
+    return tasks
+
+
+def _run_task(task: Task, refresh: bool) -> None:
+    if task.kind == "report":
+        from utils import report_data
+        provider = None
+        if report_data.REPORT_SOURCE == report_data.ApiProvider.name:
+            if not WARMUP_TOKEN:
+                raise NotApplicable("fuente api sin WARMUP_TOKEN: lo carga la primera sesión que lo pide")
+            provider = report_data.ApiProvider(token=WARMUP_TOKEN)
+        report_data.load_report(str(task.params["periodo"]), provider)
+    elif task.kind == "endpoint":
+        if not WARMUP_TOKEN:
+            raise NotApplicable("sin WARMUP_TOKEN: lo carga cada sesión con su token")
+        from utils import catalog
+        catalog.fetch_frame(str(task.params["path"]), dict(task.params["params"]), refresh=refresh,
+                            token=WARMUP_TOKEN)
+    elif task.kind == "refdata":
+        # El servicio se refresca solo (``REFDATA_REFRESH_S``); acá basta con que esté cargado.
+        # Sin credencial de servicio no hay token propio: carga la primera sesión que lo lea.
+        from utils.reference_data import get_reference_data
+        refdata = get_reference_data()
+        if not refdata.service_token:
+            raise NotApplicable("sin REFDATA_TOKEN: lo carga la primera sesión que lo lee")
+        failed = [name for name in refdata.specs if refdata.table(name) is None]
+        if failed:
+            raise RuntimeError(f"no se pudo cargar: {', '.join(failed)}")
+    else:
+        raise ValueError(f"tipo de tarea desconocido: {task.kind!r}")
+
+
+class Warmer:
+    """Corre el plan en rondas con concurrencia acotada y guarda el estado de cada tarea."""
+
+    def __init__(self, tasks: List[Task], *, concurrency: int = WARMUP_CONCURRENCY,
+                 refresh_s: float = WARMUP_REFRESH_S):
+        self.tasks = tasks
+        self.concurrency = max(1, int(concurrency))
+        self.refresh_s = float(refresh_s)
+        self.started_at = time.time()
+        self.rounds = 0
+        self.next_round_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "Warmer":
+        self._thread = threading.Thread(target=self._loop, name="cache-warmup", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="cache-warmup") as pool:
+            while not self._stop.is_set():
+                refresh = self.rounds > 0
+                list(pool.map(lambda t: self._run(t, refresh), self.tasks))
+                with self._lock:
+                    self.rounds += 1
+                    if self.refresh_s <= 0:
+                        self.next_round_at = None
+                        return
+                    self.next_round_at = time.time() + self.refresh_s
+                self._stop.wait(self.refresh_s)
+
+    def _run(self, task: Task, refresh: bool) -> None:
+        with self._lock:
+            task.status = "cargando"
+        t0 = time.perf_counter()
+        note = error = ""
+        try:
+            _run_task(task, refresh)
+        except NotApplicable as exc:
+            note = str(exc)
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"[:200]
+        with self._lock:
+            task.runs += 1
+            task.last_ms = (time.perf_counter() - t0) * 1000
+            task.finished_at = time.time()
+            task.last_error = error
+            task.note = note
+            task.errors += bool(error)
+            task.status = "error" if error else "no aplica" if note else "listo"
+
+    # ---------- Estado ----------
+    def progress(self) -> Tuple[int, int]:
+        """(tareas terminadas al menos una vez, total)."""
+        with self._lock:
+            return sum(t.runs > 0 for t in self.tasks), len(self.tasks)
+
+    @property
+    def ready(self) -> bool:
+        """Todas las tareas terminaron bien en su último intento (o no aplican)."""
+        with self._lock:
+            return all(t.status in ("listo", "no aplica") for t in self.tasks)
+
+    def status(self) -> List[Dict[str, object]]:
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "Tarea": t.name,
+                    "Estado": t.status,
+                    "Corridas": t.runs,
+                    "Errores": t.errors,
+                    "Última (ms)": round(t.last_ms, 1),
+                    "Hace (s)": round(now - t.finished_at) if t.finished_at else None,
+                    "Error": t.last_error,
+                    "Nota": t.note,
+                }
+                for t in self.tasks
+            ]
+
+
+# ---------- Una vez por proceso ----------
+_WARMER: Optional[Warmer] = None
+_START_LOCK = threading.Lock()
+
+
+def start() -> Optional[Warmer]:
+    """Arranca el warm-up del proceso si está habilitado (idempotente)."""
+    global _WARMER
+    if not WARMUP_ENABLED or _WARMER is not None:
+        return _WARMER
+    with _START_LOCK:
+        if _WARMER is None:
+            try:
+                _WARMER = Warmer(plan_tasks(load_plan())).start()
+            except (OSError, ValueError, KeyError) as exc:
+                # Plan ilegible: no corre nada y la página de estado lo muestra como tarea con error.
+                error = f"{WARMUP_FILE}: {exc}"[:200]
+                _WARMER = Warmer([Task("plan", "plan", status="error", last_error=error)], refresh_s=0)
+    return _WARMER
+
+
+def get_warmer() -> Optional[Warmer]:
+    return _WARMER